@@ -8,6 +8,9 @@ from .client import (
 
 __all__ = [
     "SandboxBackend",
+    "AsyncSandboxBackend",
+    "GrepNoticeMiddleware",
+    "AsyncDeepAgentClient",
     "DeepAgentClient",
     "DeepAgentConversation",
     "DeepAgentError",
@@ -29,6 +32,37 @@ def __getattr__(name: str):
         globals()["SandboxBackend"] = SandboxBackend
         return SandboxBackend
 
+    if name == "GrepNoticeMiddleware":
+        try:
+            from .backend import GrepNoticeMiddleware  # type: ignore
+        except Exception as exc:  # noqa: BLE001
+            raise ImportError(
+                "GrepNoticeMiddleware requires optional deepagents/langchain deps"
+            ) from exc
+        globals()["GrepNoticeMiddleware"] = GrepNoticeMiddleware
+        return GrepNoticeMiddleware
+
+    if name == "AsyncDeepAgentClient":
+        try:
+            from .async_client import AsyncDeepAgentClient  # type: ignore
+        except Exception as exc:  # noqa: BLE001
+            raise ImportError(
+                "AsyncDeepAgentClient requires httpx (pip install astraforge-toolkit[async])"
+            ) from exc
+        globals()["AsyncDeepAgentClient"] = AsyncDeepAgentClient
+        return AsyncDeepAgentClient
+
+    if name == "AsyncSandboxBackend":
+        try:
+            from .async_backend import AsyncSandboxBackend  # type: ignore
+        except Exception as exc:  # noqa: BLE001
+            raise ImportError(
+                "AsyncSandboxBackend requires httpx and deepagents "
+                "(pip install astraforge-toolkit[async])"
+            ) from exc
+        globals()["AsyncSandboxBackend"] = AsyncSandboxBackend
+        return AsyncSandboxBackend
+
     if name in {
         "sandbox_shell",
         "sandbox_python_repl",
@@ -0,0 +1,428 @@
+from __future__ import annotations
+
+import asyncio
+import re
+import shlex
+from typing import Any, Dict, List, Mapping, Optional, Sequence
+
+import httpx
+from deepagents.backends.protocol import EditResult, WriteResult
+from deepagents.backends.utils import FileInfo, GrepMatch
+from requests import Session
+
+from .async_client import build_async_http_client
+from .backend import (
+    PolicyWrapper,
+    _format_ranged_read,
+    _glob_command,
+    _grep_command,
+    _GrepOutput,
+    _index_query_command,
+    _inplace_edit_command,
+    _inplace_edit_payload,
+    _inplace_edit_payload_path,
+    _is_not_ready_response,
+    _ls_command,
+    _parse_glob_output,
+    _parse_index_response,
+    _parse_inplace_edit,
+    _ranged_read_command,
+    _ripgrep_command,
+    _SandboxBackend,
+    _shell_result,
+    _ShellResult,
+)
+
+
+class _AsyncSandboxBackend(_SandboxBackend):
+    """Async variant of `_SandboxBackend` built on a pooled ``httpx.AsyncClient``.
+
+    The ``a``-prefixed methods (``als_info``, ``aread``, ``agrep_raw``, ...) never block
+    the event loop, so parallel subagents overlap their sandbox calls; with ``h2``
+    installed they share one HTTP/2 connection. Provisioning and restore are rare once
+    readiness is cached, so they reuse the synchronous implementation in a worker thread
+    (one at a time). The inherited synchronous methods keep working.
+    """
+
+    def __init__(
+        self,
+        rt,
+        *,
+        client: Optional[httpx.AsyncClient] = None,
+        http2: bool = True,
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(rt, **kwargs)
+        self._client = client or build_async_http_client(
+            api_key=self.api_key, timeout=self._timeout, http2=http2
+        )
+        self._client.headers.setdefault("X-Api-Key", self.api_key)
+        self._ready_lock = asyncio.Lock()
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+    async def __aenter__(self) -> "_AsyncSandboxBackend":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.aclose()
+
+    # internal helpers ------------------------------------------------------
+
+    async def _aensure_session_ready(self) -> str:
+        cached = self._cached_ready_session_id()
+        if cached is not None:
+            return cached
+        async with self._ready_lock:
+            return await asyncio.to_thread(self._ensure_session_ready)
+
+    async def _apost_session_action(
+        self, action: str, payload: Mapping[str, Any]
+    ) -> httpx.Response:
+        """Async `_post_session_action`: one POST, plus one recheck and retry when not ready."""
+        session_id = await self._aensure_session_ready()
+        url = f"{self.base_url}/sandbox/sessions/{session_id}/{action}/"
+        response = await self._client.post(url, json=payload)
+        if not _is_not_ready_response(response):
+            return response
+        self._forget_readiness()
+        session_id = await self._aensure_session_ready()
+        url = f"{self.base_url}/sandbox/sessions/{session_id}/{action}/"
+        return await self._client.post(url, json=payload)
+
+    async def _ashell(self, command: str, cwd: Optional[str] = None) -> _ShellResult:
+        payload: Dict[str, Any] = {"command": command}
+        if cwd:
+            payload["cwd"] = cwd
+        response = await self._apost_session_action("shell", payload)
+        result = _shell_result(self._parse_json(response, expected_status=200))
+        if self._debug:
+            self._log.debug(
+                "sandbox shell",
+                extra={"command": command, "cwd": cwd, "exit_code": result.exit_code},
+            )
+        return result
+
+    async def _aupload_text(self, target: str, content: str) -> _ShellResult:
+        payload = {"path": target, "content": content, "encoding": "utf-8"}
+        response = await self._apost_session_action("upload", payload)
+        return _shell_result(self._parse_json(response, expected_status=200))
+
+    async def _aindex_query(self, request: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        if not self._workspace_index:
+            return None
+        result = await self._ashell(_index_query_command(request, self.root_dir))
+        return _parse_index_response(result.exit_code, result.stdout or "")
+
+    # BackendProtocol (async) -----------------------------------------------
+
+    async def als_info(self, path: str) -> List[FileInfo]:
+        target = self._abs_path(path or self.root_dir)
+        indexed = await self._aindex_query({"op": "ls", "path": target})
+        if indexed is not None:
+            return [FileInfo(**item) for item in indexed.get("entries") or []]
+        result = await self._ashell(_ls_command(target))
+        if int(result.exit_code) != 0:
+            return []
+        return self._parse_ls_output(target, result.stdout or "")
+
+    async def aread(self, file_path: str, offset: int = 0, limit: int = 2000) -> str:
+        target = self._abs_path(file_path)
+        command = _ranged_read_command(target, max(offset, 0), limit, self._read_max_bytes)
+        result = await self._ashell(command)
+        if int(result.exit_code) != 0:
+            msg = f"Error: File '{file_path}' not found"
+            self._log_llm_error(msg)
+            return msg
+        content, failed = _format_ranged_read(
+            result.stdout or "", file_path, offset, self._read_max_bytes
+        )
+        if failed:
+            self._log_llm_error(content)
+        return content
+
+    async def aread_many(
+        self, file_paths: Sequence[str], offset: int = 0, limit: int = 2000
+    ) -> List[str]:
+        if not file_paths:
+            return []
+        results = await self.abatch(
+            self._read_many_operations(file_paths, offset, limit), parallel=True
+        )
+        return self._format_read_many(file_paths, results, offset)
+
+    async def awrite(self, file_path: str, content: str) -> WriteResult:
+        target = self._abs_path(file_path)
+        exists_check = await self._ashell(f"test ! -e {shlex.quote(target)}")
+        if int(exists_check.exit_code) != 0:
+            error = (
+                f"Cannot write to {file_path} because it already exists. "
+                "Read and then make an edit, or write to a new path."
+            )
+            self._log_llm_error(error)
+            return WriteResult(error=error)
+
+        result = await self._aupload_text(target, content)
+        exit_code = int(result.exit_code)
+        if exit_code != 0:
+            message = result.stderr or f"Write failed with exit code {exit_code}"
+            self._log_llm_error(message)
+            return WriteResult(error=message)
+        return WriteResult(path=target, files_update=None)
+
+    async def aedit(
+        self,
+        file_path: str,
+        old_string: str,
+        new_string: str,
+        replace_all: bool = False,
+    ) -> EditResult:
+        target = self._abs_path(file_path)
+        payload = _inplace_edit_payload(old_string, new_string)
+        payload_path = None
+        if payload is not None:
+            payload_path = _inplace_edit_payload_path()
+            uploaded = await self._aupload_text(payload_path, payload)
+            if int(uploaded.exit_code) != 0:
+                detail = uploaded.stderr or uploaded.stdout or "payload upload failed"
+                error = f"Edit failed: {detail}"
+                self._log_llm_error(error)
+                return EditResult(error=error)
+        result = await self._ashell(
+            _inplace_edit_command(
+                target, old_string, new_string, replace_all, payload_path=payload_path
+            )
+        )
+        occurrences, error = _parse_inplace_edit(
+            result.stdout or "", file_path, old_string, new_string, replace_all
+        )
+        if error is not None:
+            self._log_llm_error(error)
+            return EditResult(error=error)
+        return EditResult(path=target, files_update=None, occurrences=occurrences)
+
+    async def agrep_raw(
+        self,
+        pattern: str,
+        path: str | None = None,
+        glob: str | None = None,
+        *,
+        max_matches: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+    ) -> List[GrepMatch] | str:
+        try:
+            re.compile(pattern)
+        except re.error as exc:
+            msg = f"Invalid regex pattern: {exc}"
+            self._log_llm_error(msg)
+            return msg
+
+        base = self._abs_path(path or self.root_dir)
+        max_matches = max_matches or self._grep_max_matches
+        max_bytes = max_bytes or self._grep_max_bytes
+
+        indexed = await self._aindex_query(
+            {
+                "op": "grep",
+                "path": base,
+                "pattern": pattern,
+                "glob": glob,
+                "max_matches": max_matches,
+                "max_bytes": max_bytes,
+                "max_filesize": self._grep_max_filesize,
+            }
+        )
+        if indexed is not None:
+            output = _GrepOutput(
+                matches=indexed.get("matches") or [],
+                exit_code=0,
+                truncated=bool(indexed.get("truncated")),
+            )
+            return self._budgeted_matches(output, max_matches, max_bytes)
+
+        result = await self._ashell(
+            _ripgrep_command(
+                pattern,
+                base,
+                glob,
+                max_matches=max_matches,
+                max_bytes=max_bytes,
+                max_filesize=self._grep_max_filesize,
+            )
+        )
+        rg_matches = self._ripgrep_result(result.stdout or "", max_matches, max_bytes)
+        if rg_matches is not None:
+            return rg_matches
+
+        result = await self._ashell(
+            _grep_command(pattern, base, glob, max_matches=max_matches, max_bytes=max_bytes)
+        )
+        return self._grep_fallback_result(pattern, result.stdout or "", max_matches, max_bytes)
+
+    async def aglob_info(self, pattern: str, path: str = "/") -> List[FileInfo]:
+        search_pattern = pattern.lstrip("/") if pattern.startswith("/") else pattern
+        base = self._abs_path(path or self.root_dir)
+        indexed = await self._aindex_query(
+            {
+                "op": "glob",
+                "path": base,
+                "pattern": search_pattern,
+                "max_results": self._glob_max_results,
+            }
+        )
+        if indexed is not None:
+            return [FileInfo(**item) for item in indexed.get("files") or []]
+        result = await self._ashell(
+            _glob_command(
+                base,
+                search_pattern,
+                ignore=self._glob_ignore,
+                max_results=self._glob_max_results,
+            )
+        )
+        if int(result.exit_code) != 0:
+            return []
+        return [FileInfo(**item) for item in _parse_glob_output(result.stdout or "")]
+
+    async def abatch(
+        self,
+        operations: Sequence[Mapping[str, Any]],
+        *,
+        parallel: bool = False,
+        stop_on_error: bool = False,
+    ) -> List[Dict[str, Any]]:
+        payload_ops: List[Dict[str, Any]] = []
+        for operation in operations:
+            item = dict(operation)
+            if item.get("path"):
+                item["path"] = self._abs_path(str(item["path"]))
+            payload_ops.append(item)
+        response = await self._apost_session_action(
+            "batch",
+            {"operations": payload_ops, "parallel": parallel, "stop_on_error": stop_on_error},
+        )
+        data = self._parse_json(response, expected_status=200)
+        return list(data.get("results") or [])
+
+    async def apython_exec(self, code: str, timeout: Optional[int] = 30) -> str:
+        result = await self._ashell(f"python - <<'PYCODE'\n{code}\nPYCODE")
+        if int(result.exit_code) != 0:
+            return result.stderr or f"Error executing Python code (exit {result.exit_code})"
+        return result.stdout or ""
+
+    async def ashell(
+        self, command: str, cwd: Optional[str] = None, timeout: Optional[int] = 30
+    ) -> str:
+        result = await self._ashell(command, cwd=cwd)
+        if int(result.exit_code) != 0:
+            return result.stderr or f"Command failed with exit code {result.exit_code}"
+        return result.stdout or ""
+
+    async def adownload(self, path: str) -> bytes:
+        target = self._abs_path(path)
+        session_id = await self._aensure_session_ready()
+        url = f"{self.base_url}/sandbox/sessions/{session_id}/files/content/"
+        response = await self._client.get(url, params={"path": target})
+        if response.status_code != 200:
+            raise RuntimeError(f"Failed to download {path}: {response.status_code}")
+        return response.content
+
+
+class AsyncPolicyWrapper(PolicyWrapper):
+    """`PolicyWrapper` that also guards the async backend methods."""
+
+    async def als_info(self, path: str) -> List[FileInfo]:
+        if self._deny(path):
+            return []
+        return await self.inner.als_info(path)
+
+    async def aread(self, file_path: str, offset: int = 0, limit: int = 2000) -> str:
+        if self._deny(file_path):
+            return self._error(file_path)
+        return await self.inner.aread(file_path, offset=offset, limit=limit)
+
+    async def agrep_raw(
+        self, pattern: str, path: str | None = None, glob: str | None = None, **budget: Any
+    ) -> List[GrepMatch] | str:
+        if self._deny(path):
+            return self._error(path)
+        return await self.inner.agrep_raw(pattern, path, glob, **budget)
+
+    async def aglob_info(self, pattern: str, path: str = "/") -> List[FileInfo]:
+        if self._deny(path):
+            return []
+        return await self.inner.aglob_info(pattern, path)
+
+    async def awrite(self, file_path: str, content: str) -> WriteResult:
+        if self._deny(file_path):
+            return WriteResult(error=self._error(file_path))
+        return await self.inner.awrite(file_path, content)
+
+    async def aedit(
+        self, file_path: str, old_string: str, new_string: str, replace_all: bool = False
+    ) -> EditResult:
+        if self._deny(file_path):
+            return EditResult(error=self._error(file_path))
+        return await self.inner.aedit(file_path, old_string, new_string, replace_all)
+
+    async def aread_many(
+        self, file_paths: Sequence[str], offset: int = 0, limit: int = 2000
+    ) -> List[str]:
+        allowed = [path for path in file_paths if not self._deny(path)]
+        contents = iter(
+            await self.inner.aread_many(allowed, offset=offset, limit=limit) if allowed else []
+        )
+        return [self._error(path) if self._deny(path) else next(contents) for path in file_paths]
+
+    async def abatch(
+        self, operations: Sequence[Mapping[str, Any]], **options: Any
+    ) -> List[Dict[str, Any]]:
+        rejected = self._reject_batch(operations)
+        if rejected is not None:
+            return rejected
+        return await self.inner.abatch(operations, **options)
+
+
+class AsyncSandboxBackend(AsyncPolicyWrapper):
+    """Policy-enforced async sandbox backend; see `_AsyncSandboxBackend`."""
+
+    def __init__(
+        self,
+        rt,
+        *,
+        base_url: Optional[str] = None,
+        api_key: Optional[str] = None,
+        root_dir: str = "/workspace",
+        session_params: Optional[Mapping[str, Any]] = None,
+        session_id: Optional[str] = None,
+        timeout: Optional[float] = 60.0,
+        session: Optional[Session] = None,
+        client: Optional[httpx.AsyncClient] = None,
+        http2: bool = True,
+        debug: Optional[bool] = None,
+        allowed_root: Optional[str] = "/workspace",
+    ) -> None:
+        impl = _AsyncSandboxBackend(
+            rt,
+            base_url=base_url,
+            api_key=api_key,
+            root_dir=root_dir,
+            session_params=session_params,
+            session_id=session_id,
+            timeout=timeout,
+            session=session,
+            client=client,
+            http2=http2,
+            debug=debug,
+        )
+        super().__init__(impl, allowed_root=allowed_root or "/workspace")
+
+    async def aclose(self) -> None:
+        await self.inner.aclose()
+
+    async def __aenter__(self) -> "AsyncSandboxBackend":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.aclose()
@@ -0,0 +1,455 @@
+from __future__ import annotations
+
+import importlib.util
+import os
+from pathlib import Path
+from typing import (
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    MutableMapping,
+    Optional,
+    Union,
+)
+
+import httpx
+
+from .client import (
+    DEFAULT_CHUNK_SIZE,
+    DeepAgentConversation,
+    DeepAgentError,
+    SandboxArtifact,
+    SandboxSession,
+    UploadContent,
+    _encode_chunks,
+    _ResponseHandlingMixin,
+)
+
+
+async def _aiter_upload(
+    content: Any, encoding: str, chunk_size: int
+) -> AsyncIterator[bytes]:
+    """Adapt file objects and (async) chunk iterables to the async request body stream."""
+    if hasattr(content, "read"):
+        while chunk := content.read(chunk_size):
+            yield chunk
+    elif hasattr(content, "__aiter__"):
+        async for chunk in content:
+            if isinstance(chunk, str):
+                chunk = chunk.encode(encoding)
+            if chunk:
+                yield bytes(chunk)
+    else:
+        for chunk in _encode_chunks(content, encoding):
+            yield chunk
+
+
+def http2_available() -> bool:
+    """HTTP/2 needs the optional ``h2`` package (``pip install astraforge-toolkit[async]``)."""
+    return importlib.util.find_spec("h2") is not None
+
+
+def build_async_http_client(
+    *,
+    api_key: str,
+    timeout: float | None,
+    http2: bool = True,
+    max_connections: int = 20,
+) -> httpx.AsyncClient:
+    """Pooled ``httpx.AsyncClient`` shared by the async client and sandbox backend.
+
+    With HTTP/2 every concurrent request is multiplexed over one connection per host.
+    """
+    return httpx.AsyncClient(
+        http2=http2 and http2_available(),
+        timeout=timeout,
+        headers={"X-Api-Key": api_key},
+        limits=httpx.Limits(
+            max_connections=max_connections, max_keepalive_connections=max_connections
+        ),
+    )
+
+
+class AsyncDeepAgentClient(_ResponseHandlingMixin):
+    """Asynchronous counterpart of :class:`~astraforge_toolkit.DeepAgentClient`.
+
+    Built on ``httpx.AsyncClient`` so async LangGraph agents do not block the event loop,
+    and concurrent calls share one pooled (HTTP/2 when ``h2`` is installed) connection.
+
+    Example:
+        >>> async with AsyncDeepAgentClient(base_url=..., api_key=...) as client:
+        ...     conv = await client.create_conversation()
+        ...     async for chunk in client.stream_message(conv.conversation_id, "Hello!"):
+        ...         print(chunk.get("tokens") or chunk.get("messages"))
+    """
+
+    def __init__(
+        self,
+        *,
+        base_url: str,
+        api_key: str,
+        timeout: float | None = 60.0,
+        client: httpx.AsyncClient | None = None,
+        http2: bool = True,
+    ) -> None:
+        if not base_url:
+            raise ValueError("base_url is required")
+        if not api_key:
+            raise ValueError("api_key is required")
+
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self.timeout = timeout
+        self._client = client or build_async_http_client(
+            api_key=api_key, timeout=timeout, http2=http2
+        )
+        self._client.headers.setdefault("X-Api-Key", self.api_key)
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+    async def __aenter__(self) -> "AsyncDeepAgentClient":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.aclose()
+
+    # Public API ------------------------------------------------------------
+
+    async def create_conversation(
+        self,
+        session_params: Optional[Mapping[str, Any]] = None,
+    ) -> DeepAgentConversation:
+        url = f"{self.base_url}/deepagent/conversations/"
+        payload: Dict[str, Any] = dict(session_params or {})
+        response = await self._client.post(url, json=payload)
+        data = self._parse_json(response, expected_status=201)
+        return self._build_conversation(data)
+
+    async def create_sandbox_session(
+        self,
+        session_params: Optional[Mapping[str, Any]] = None,
+        *,
+        wait: bool = True,
+        ready_timeout: float = 120.0,
+    ) -> SandboxSession:
+        """Create a sandbox session; with ``wait=True`` await its status events until ready."""
+        url = f"{self.base_url}/sandbox/sessions/"
+        payload: Dict[str, Any] = dict(session_params or {})
+        response = await self._client.post(url, json=payload, headers={"Prefer": "respond-async"})
+        data = self._parse_json(response, expected_status=(201, 202))
+        sandbox = self._build_sandbox_session(data)
+        if wait and sandbox.status == "starting":
+            return await self.wait_for_sandbox_session(sandbox.session_id, timeout=ready_timeout)
+        return sandbox
+
+    async def wait_for_sandbox_session(
+        self, session_id: str, *, timeout: float = 120.0
+    ) -> SandboxSession:
+        """Wait until a starting sandbox session is ready; raise if it fails."""
+        if not session_id:
+            raise ValueError("session_id is required")
+
+        url = f"{self.base_url}/sandbox/sessions/{session_id}/events/"
+        request = self._client.build_request(
+            "GET",
+            url,
+            params={"timeout": int(timeout)},
+            headers={"Accept": "text/event-stream"},
+        )
+        response = await self._client.send(request, stream=True)
+        await self._ensure_stream_ok(response, expected_status=200)
+        async for event in self._aiter_sse(response):
+            status = str(event.get("status") or "")
+            if status and status != "starting":
+                break
+        sandbox = await self.get_sandbox_session(session_id)
+        if sandbox.status != "ready":
+            detail = sandbox.raw.get("error_message") or sandbox.status
+            raise DeepAgentError(f"Sandbox session {session_id} did not become ready: {detail}")
+        return sandbox
+
+    async def list_sandbox_sessions(self) -> List[SandboxSession]:
+        url = f"{self.base_url}/sandbox/sessions/"
+        response = await self._client.get(url)
+        data = self._parse_json(response, expected_status=200)
+        sessions_payload: Any = data
+        if isinstance(data, Mapping) and "results" in data:
+            sessions_payload = data.get("results")
+        if not isinstance(sessions_payload, list):
+            raise DeepAgentError(f"Unexpected sandbox sessions payload: {data}")
+        return [self._build_sandbox_session(item) for item in sessions_payload]
+
+    async def get_sandbox_session(self, session_id: str) -> SandboxSession:
+        if not session_id:
+            raise ValueError("session_id is required")
+
+        url = f"{self.base_url}/sandbox/sessions/{session_id}/"
+        response = await self._client.get(url)
+        data = self._parse_json(response, expected_status=200)
+        return self._build_sandbox_session(data)
+
+    async def delete_sandbox_session(self, session_id: str) -> None:
+        if not session_id:
+            raise ValueError("session_id is required")
+
+        url = f"{self.base_url}/sandbox/sessions/{session_id}/"
+        response = await self._client.delete(url)
+        self._ensure_ok(response, expected_status=204)
+
+    async def stop_sandbox_session(self, session_id: str) -> None:
+        if not session_id:
+            raise ValueError("session_id is required")
+
+        url = f"{self.base_url}/sandbox/sessions/{session_id}/stop/"
+        response = await self._client.post(url)
+        self._ensure_ok(response, expected_status=204)
+
+    async def heartbeat_sandbox_session(self, session_id: str) -> Mapping[str, Any]:
+        if not session_id:
+            raise ValueError("session_id is required")
+
+        url = f"{self.base_url}/sandbox/sessions/{session_id}/heartbeat/"
+        response = await self._client.post(url)
+        return self._parse_json(response, expected_status=200)
+
+    async def send_message(
+        self,
+        conversation_id: str,
+        messages: Iterable[Mapping[str, Any]],
+        *,
+        stream: bool = False,
+    ) -> Mapping[str, Any] | AsyncIterator[Mapping[str, Any]]:
+        if not conversation_id:
+            raise ValueError("conversation_id is required")
+
+        url = f"{self.base_url}/deepagent/conversations/{conversation_id}/messages/"
+        body = {
+            "messages": list(messages),
+            "stream": stream,
+        }
+        if not stream:
+            response = await self._client.post(url, json=body)
+            return self._parse_json(response, expected_status=200)
+
+        request = self._client.build_request(
+            "POST", url, json=body, headers={"Accept": "text/event-stream"}
+        )
+        response = await self._client.send(request, stream=True)
+        await self._ensure_stream_ok(response, expected_status=200)
+        return self._aiter_sse(response)
+
+    async def stream_message(
+        self,
+        conversation_id: str,
+        content: str,
+    ) -> AsyncIterator[Mapping[str, Any]]:
+        message = {"role": "user", "content": content}
+        iterator = await self.send_message(
+            conversation_id=conversation_id,
+            messages=[message],
+            stream=True,
+        )
+        assert not isinstance(iterator, Mapping)
+        async for event in iterator:
+            yield event
+
+    async def upload_file(
+        self,
+        session_id: str,
+        path: str,
+        *,
+        content: Union[UploadContent, AsyncIterable[Union[bytes, str]]],
+        encoding: str = "utf-8",
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ) -> Mapping[str, Any]:
+        """Upload content into a sandbox session; file objects and iterables are streamed."""
+        if not session_id:
+            raise ValueError("session_id is required")
+        if not path:
+            raise ValueError("path is required")
+
+        body: Any
+        if isinstance(content, str):
+            body = content.encode(encoding)
+        elif isinstance(content, (bytes, bytearray, memoryview)):
+            body = bytes(content)
+        else:
+            body = _aiter_upload(content, encoding, chunk_size)
+        url = f"{self.base_url}/sandbox/sessions/{session_id}/files/upload/"
+        response = await self._client.post(
+            url,
+            params={"path": path},
+            content=body,
+            headers={"Content-Type": "application/octet-stream"},
+        )
+        return self._parse_json(response, expected_status=200)
+
+    async def get_file_content(
+        self,
+        session_id: str,
+        path: str,
+        *,
+        encoding: str | None = None,
+    ) -> bytes | str:
+        """Fetch file bytes from a sandbox session. Optionally decode to text."""
+        if not session_id:
+            raise ValueError("session_id is required")
+        if not path:
+            raise ValueError("path is required")
+
+        url = f"{self.base_url}/sandbox/sessions/{session_id}/files/content/"
+        response = await self._client.get(url, params={"path": path})
+        self._ensure_ok(response, expected_status=200)
+        if encoding:
+            try:
+                return response.content.decode(encoding)
+            except UnicodeDecodeError:
+                return response.content.decode(encoding, errors="replace")
+        return response.content
+
+    async def iter_file_content(
+        self,
+        session_id: str,
+        path: str,
+        *,
+        offset: int = 0,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ) -> AsyncIterator[bytes]:
+        """Stream a sandbox file's bytes in chunks, optionally starting at byte ``offset``."""
+        response = await self._open_file_content(session_id, path, offset=offset)
+        skip = offset if offset > 0 and response.status_code == 200 else 0
+        async for chunk in self._aiter_body(response, chunk_size):
+            if skip:
+                if len(chunk) <= skip:
+                    skip -= len(chunk)
+                    continue
+                chunk, skip = chunk[skip:], 0
+            yield chunk
+
+    async def download_file(
+        self,
+        session_id: str,
+        path: str,
+        destination: str | os.PathLike[str],
+        *,
+        resume: bool = False,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ) -> int:
+        """Stream a sandbox file to ``destination``; ``resume=True`` continues a partial file."""
+        target = Path(destination)
+        offset = target.stat().st_size if resume and target.exists() else 0
+        response = await self._open_file_content(
+            session_id, path, offset=offset, expected_status=(200, 206, 416)
+        )
+        if response.status_code == 416:
+            await response.aclose()
+            return self._unresumable(path, target, offset, response)
+        appending = response.status_code == 206
+        written = offset if appending else 0
+        with target.open("ab" if appending else "wb") as handle:
+            async for chunk in self._aiter_body(response, chunk_size):
+                handle.write(chunk)
+                written += len(chunk)
+        return written
+
+    async def export_file(
+        self,
+        session_id: str,
+        path: str,
+        *,
+        filename: str | None = None,
+        content_type: str | None = None,
+    ) -> SandboxArtifact:
+        """Export a file from the sandbox and receive an artifact descriptor."""
+        if not session_id:
+            raise ValueError("session_id is required")
+        if not path:
+            raise ValueError("path is required")
+
+        url = f"{self.base_url}/sandbox/sessions/{session_id}/files/export/"
+        body: Dict[str, Any] = {"path": path}
+        if filename:
+            body["filename"] = filename
+        if content_type:
+            body["content_type"] = content_type
+        response = await self._client.post(url, json=body)
+        data = self._parse_json(response, expected_status=201)
+        return self._build_artifact(data)
+
+    async def run_batch(
+        self,
+        session_id: str,
+        operations: Iterable[Mapping[str, Any]],
+        *,
+        parallel: bool = False,
+        stop_on_error: bool = False,
+    ) -> MutableMapping[str, Any]:
+        """Run exec/read/write/edit/stat operations in one request (see ``DeepAgentClient``)."""
+        if not session_id:
+            raise ValueError("session_id is required")
+
+        url = f"{self.base_url}/sandbox/sessions/{session_id}/batch/"
+        body = {
+            "operations": list(operations),
+            "parallel": parallel,
+            "stop_on_error": stop_on_error,
+        }
+        response = await self._client.post(url, json=body)
+        return self._parse_json(response, expected_status=200)
+
+    # Internal helpers ------------------------------------------------------
+
+    async def _ensure_stream_ok(
+        self, response: httpx.Response, *, expected_status: int | tuple[int, ...]
+    ) -> None:
+        expected = expected_status if isinstance(expected_status, tuple) else (expected_status,)
+        if response.status_code in expected:
+            return
+        try:
+            await response.aread()
+        finally:
+            await response.aclose()
+        self._ensure_ok(response, expected_status=expected_status)
+
+    async def _aiter_sse(self, response: httpx.Response) -> AsyncIterator[Mapping[str, Any]]:
+        try:
+            async for raw_line in response.aiter_lines():
+                event = self._parse_sse_line(raw_line)
+                if event is not None:
+                    yield event
+        finally:
+            await response.aclose()
+
+    async def _open_file_content(
+        self,
+        session_id: str,
+        path: str,
+        *,
+        offset: int = 0,
+        expected_status: tuple[int, ...] = (200, 206),
+    ) -> httpx.Response:
+        if not session_id:
+            raise ValueError("session_id is required")
+        if not path:
+            raise ValueError("path is required")
+
+        url = f"{self.base_url}/sandbox/sessions/{session_id}/files/content/"
+        request = self._client.build_request(
+            "GET", url, params={"path": path}, headers=self._range_headers(offset)
+        )
+        response = await self._client.send(request, stream=True)
+        await self._ensure_stream_ok(response, expected_status=expected_status)
+        return response
+
+    async def _aiter_body(self, response: httpx.Response, chunk_size: int) -> AsyncIterator[bytes]:
+        try:
+            async for chunk in response.aiter_bytes(chunk_size):
+                if chunk:
+                    yield chunk
+        finally:
+            await response.aclose()
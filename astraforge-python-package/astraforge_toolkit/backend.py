@@ -1,13 +1,18 @@
 from __future__ import annotations
 
+import base64
 import json
 import logging
 import os
 import re
 import shlex
 import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
 from dataclasses import dataclass
-from typing import Any, Dict, List, Mapping, Optional
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Sequence
 
 import requests
 from deepagents.backends.protocol import BackendProtocol, EditResult, WriteResult
@@ -18,6 +23,8 @@ from deepagents.backends.utils import (
     format_content_with_line_numbers,
     perform_string_replacement,
 )
+from langchain.agents.middleware import AgentMiddleware
+from langchain_core.messages import ToolMessage
 from requests import Response, Session
 
 
@@ -28,6 +35,14 @@ class _ShellResult:
     stderr: str
 
 
+def _shell_result(data: Mapping[str, Any]) -> _ShellResult:
+    return _ShellResult(
+        exit_code=int(data.get("exit_code", 1) or 0),
+        stdout=str(data.get("stdout") or ""),
+        stderr=str(data.get("stderr") or ""),
+    )
+
+
 def _env_flag(value: Optional[str]) -> bool:
     if value is None:
         return False
@@ -44,6 +59,526 @@ def _env_float(name: str, default: float) -> float:
         return default
 
 
+def _ls_command(target: str) -> str:
+    return f"ls -la --time-style=+%Y-%m-%dT%H:%M:%SZ {shlex.quote(target)}"
+
+
+def _parse_expires_at(data: Mapping[str, Any]) -> Optional[datetime]:
+    raw = data.get("expires_at")
+    if not isinstance(raw, str) or not raw:
+        return None
+    try:
+        return datetime.fromisoformat(raw.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+
+
+def _is_not_ready_response(response: Response) -> bool:
+    """Whether a session action failed because the sandbox is gone or not ready."""
+    if response.status_code in (404, 409, 410):
+        return True
+    if response.status_code != 400:
+        return False
+    try:
+        detail = response.json().get("detail")
+    except Exception:  # noqa: BLE001
+        return False
+    return isinstance(detail, str) and "not ready" in detail.lower()
+
+
+_READ_TRAILER = "__ASTRAFORGE_READ_TOTAL__"
+
+
+def _ranged_read_command(target: str, start: int, limit: int, max_bytes: int) -> str:
+    """Shell snippet printing lines ``start+1 .. start+limit`` (at most ``max_bytes + 1``
+    bytes of them) followed by a trailer with the file's total line count."""
+    first = start + 1
+    last = start + max(limit, 1)
+    quoted = shlex.quote(target)
+    return (
+        f"[ -f {quoted} ] || exit 1; "
+        f"total=$(wc -l < {quoted}); "
+        f'[ -n "$(tail -c 1 {quoted})" ] && total=$((total + 1)); '
+        f"sed -n '{first},{last}p;{last}q' {quoted} | head -c {max_bytes + 1}; "
+        f"printf '\\n{_READ_TRAILER} %s\\n' \"$total\""
+    )
+
+
+def _read_window(body: str, max_bytes: int) -> tuple[list[str], bool]:
+    """Lines of a ranged-read window that fit in ``max_bytes``; the flag marks a capped window."""
+    raw = body.encode("utf-8")
+    if len(raw) <= max_bytes:
+        return body.splitlines(), False
+    lines = raw[:max_bytes].decode("utf-8", errors="ignore").splitlines()
+    if len(lines) > 1:
+        # The byte cap cut the last line short; it is re-read on the next page.
+        lines = lines[:-1]
+    return lines, True
+
+
+def _format_read_lines(
+    lines: List[str], total: int, file_path: str, offset: int, max_bytes: int, truncated: bool
+) -> tuple[str, bool]:
+    """Number a read window and add the paging footer; the flag marks errors."""
+    if total == 0:
+        return check_empty_content(""), False
+    start_idx = offset if offset > 0 else 0
+    if start_idx >= total:
+        return f"Error: Line offset {offset} exceeds file length ({total} lines)", True
+
+    content = format_content_with_line_numbers(lines, start_line=start_idx + 1)
+    end_idx = start_idx + len(lines)
+    if truncated:
+        content += (
+            f"\n[Output capped at {max_bytes} bytes; file has {total} lines. "
+            f"Continue with offset={end_idx}.]"
+        )
+    elif start_idx > 0 or end_idx < total:
+        content += f"\n[Lines {start_idx + 1}-{end_idx} of {total}.]"
+    return content, False
+
+
+def _format_ranged_read(
+    stdout: str, file_path: str, offset: int, max_bytes: int
+) -> tuple[str, bool]:
+    """Turn ``_ranged_read_command`` output into numbered lines; the flag marks errors."""
+    body, marker, trailer = stdout.rpartition(f"{_READ_TRAILER} ")
+    if not marker:
+        return f"Error: File '{file_path}' not found", True
+    try:
+        total = int(trailer.strip())
+    except ValueError:
+        return f"Error: File '{file_path}' not found", True
+    body = body[:-1] if body.endswith("\n") else body
+    lines, truncated = _read_window(body, max_bytes)
+    return _format_read_lines(lines, total, file_path, offset, max_bytes, truncated)
+
+
+# Raw old+new string bytes shipped inside the edit script; base64 keeps it well under 128 KiB.
+_INPLACE_EDIT_INLINE_MAX_BYTES = 64 * 1024
+
+
+def _inplace_edit_payload(old_string: str, new_string: str) -> str | None:
+    """JSON file contents for an edit too large to inline, or None when it fits.
+
+    The inline script is a single exec argument, which Linux caps at 128 KiB
+    (MAX_ARG_STRLEN); larger edits upload this payload first.
+    """
+    size = len(old_string.encode("utf-8")) + len(new_string.encode("utf-8"))
+    if size <= _INPLACE_EDIT_INLINE_MAX_BYTES:
+        return None
+    return json.dumps({"old": old_string, "new": new_string})
+
+
+def _inplace_edit_payload_path() -> str:
+    return f"/tmp/.astraforge-edit-{uuid.uuid4().hex}.json"
+
+
+def _inplace_edit_command(
+    target: str,
+    old_string: str,
+    new_string: str,
+    replace_all: bool,
+    *,
+    payload_path: str | None = None,
+) -> str:
+    """Python snippet that performs the replacement inside the sandbox and swaps the file
+    in atomically, printing a JSON status with the occurrence count.
+
+    With ``payload_path`` the strings are read (and the file removed) from an
+    :func:`_inplace_edit_payload` upload instead of being embedded in the script.
+    """
+    if payload_path is None:
+        old_b64 = base64.b64encode(old_string.encode("utf-8")).decode("ascii")
+        new_b64 = base64.b64encode(new_string.encode("utf-8")).decode("ascii")
+        load = (
+            f"old = base64.b64decode({old_b64!r}).decode(\"utf-8\")\n"
+            f"new = base64.b64decode({new_b64!r}).decode(\"utf-8\")"
+        )
+    else:
+        load = (
+            "try:\n"
+            f"    with open({payload_path!r}, encoding=\"utf-8\") as fh:\n"
+            "        strings = json.load(fh)\n"
+            "finally:\n"
+            f"    os.unlink({payload_path!r})\n"
+            "old, new = strings[\"old\"], strings[\"new\"]"
+        )
+    return f"""python - <<'PY'
+import base64
+import json
+import os
+import tempfile
+
+path = {target!r}
+{load}
+replace_all = {bool(replace_all)!r}
+
+try:
+    with open(path, encoding="utf-8", newline="") as fh:
+        content = fh.read()
+except UnicodeDecodeError:
+    print(json.dumps({{"status": "binary"}}))
+    raise SystemExit(0)
+except OSError:
+    print(json.dumps({{"status": "missing"}}))
+    raise SystemExit(0)
+
+occurrences = content.count(old)
+if occurrences == 0 and "\\r\\n" in content and "\\n" in old and "\\r\\n" not in old:
+    # Tools send LF strings; match them against CRLF files and keep the file's endings.
+    old = old.replace("\\n", "\\r\\n")
+    new = new.replace("\\r\\n", "\\n").replace("\\n", "\\r\\n")
+    occurrences = content.count(old)
+if occurrences == 0 or (occurrences > 1 and not replace_all):
+    print(json.dumps({{"status": "mismatch", "occurrences": occurrences}}))
+    raise SystemExit(0)
+
+fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=".astraforge-edit-")
+try:
+    with os.fdopen(fd, "w", encoding="utf-8", newline="") as fh:
+        fh.write(content.replace(old, new))
+    os.chmod(tmp, os.stat(path).st_mode & 0o7777)
+    os.replace(tmp, path)
+except OSError as exc:
+    try:
+        os.unlink(tmp)
+    except OSError:
+        pass
+    print(json.dumps({{"status": "error", "message": str(exc)}}))
+    raise SystemExit(1)
+print(json.dumps({{"status": "ok", "occurrences": occurrences}}))
+PY"""
+
+
+def _parse_inplace_edit(
+    stdout: str, file_path: str, old_string: str, new_string: str, replace_all: bool
+) -> tuple[int | None, str | None]:
+    """Return ``(occurrences, None)`` on success or ``(None, error)`` for the LLM."""
+    try:
+        data = json.loads((stdout or "").strip().splitlines()[-1])
+    except (IndexError, json.JSONDecodeError):
+        data = {}
+    status = data.get("status") if isinstance(data, dict) else None
+    if status == "ok":
+        return int(data.get("occurrences") or 0), None
+    if status == "missing":
+        return None, f"Error: File '{file_path}' not found"
+    if status == "binary":
+        return None, f"Error: File '{file_path}' is not valid UTF-8 text"
+    if status == "mismatch":
+        # Reuse the upstream wording for not-found/ambiguous matches; the sandbox only
+        # reports the count, so synthesize content with exactly that many occurrences.
+        occurrences = int(data.get("occurrences") or 0)
+        replacement = perform_string_replacement(
+            old_string * occurrences, old_string, new_string, replace_all
+        )
+        if isinstance(replacement, str):
+            return None, replacement
+        return None, f"Error: String not found in file: '{old_string}'"
+    message = data.get("message") if isinstance(data, dict) else None
+    return None, f"Edit failed: {message or (stdout or '').strip() or 'unknown error'}"
+
+
+_DEFAULT_GLOB_IGNORE = ".git,node_modules,__pycache__,.venv"
+
+
+def _python_glob_command(base: str, pattern: str, ignore: tuple[str, ...], max_results: int) -> str:
+    """``Path.rglob`` walk used when neither ``rg`` nor ``fd`` is installed."""
+    return f"""python - <<'PY'
+from pathlib import Path
+
+base = Path({base!r})
+pattern = {pattern!r}
+ignore = set({list(ignore)!r})
+remaining = {max_results!r}
+
+if not base.exists() or not base.is_dir():
+    raise SystemExit(0)
+
+for matched in base.rglob(pattern):
+    if ignore.intersection(matched.relative_to(base).parts):
+        continue
+    try:
+        if not matched.is_file():
+            continue
+        st = matched.stat()
+    except OSError:
+        continue
+    print(st.st_size, int(st.st_mtime), matched)
+    remaining -= 1
+    if remaining <= 0:
+        break
+PY"""
+
+
+def _glob_command(
+    base: str,
+    pattern: str,
+    *,
+    ignore: tuple[str, ...],
+    max_results: int,
+) -> str:
+    """List files under ``base`` matching ``pattern`` as ``<size> <mtime> <path>`` lines.
+
+    Prefers ``rg --files`` (honours ``.gitignore``), then ``fd`` for patterns without a
+    ``/``, and otherwise falls back to ``_python_glob_command``. Matching follows
+    ``Path.rglob``: the pattern may match at any depth below ``base``.
+    """
+    quoted_base = shlex.quote(base)
+    rg_glob = pattern if pattern.startswith("**") else f"**/{pattern}"
+    rg = ["rg", "--files", "--hidden", "--no-messages", "--glob", rg_glob]
+    for name in ignore:
+        rg.extend(["--glob", f"!{name}"])
+    rg_cmd = " ".join(shlex.quote(part) for part in rg) + f" -- {quoted_base}"
+
+    fd_cmd = ""
+    if "/" not in pattern:
+        fd = ["--type", "f", "--hidden", "--glob", "--max-results", str(max_results)]
+        for name in ignore:
+            fd.extend(["--exclude", name])
+        fd_args = " ".join(shlex.quote(part) for part in fd)
+        fd_cmd = (
+            'elif fd_bin=$(command -v fdfind || command -v fd); then '
+            f'list_files() {{ "$fd_bin" {fd_args} -- {shlex.quote(pattern)} {quoted_base}; }}; '
+        )
+
+    return (
+        f"[ -d {quoted_base} ] || exit 0; "
+        "if command -v rg >/dev/null 2>&1; then "
+        f"list_files() {{ {rg_cmd}; }}; "
+        f"{fd_cmd}"
+        "else\n"
+        f"{_python_glob_command(base, pattern, ignore, max_results)}\n"
+        "exit $?; fi; "
+        f"list_files | head -n {int(max_results)} | tr '\\n' '\\0' "
+        "| xargs -0 -r stat -c '%s %Y %n' 2>/dev/null; exit 0"
+    )
+
+
+def _parse_glob_output(stdout: str) -> List[Dict[str, Any]]:
+    """Parse ``_glob_command`` output into ``FileInfo``-shaped dicts sorted by path."""
+    results: List[Dict[str, Any]] = []
+    for line in stdout.splitlines():
+        parts = line.split(" ", 2)
+        if len(parts) != 3:
+            continue
+        size, mtime, path = parts
+        try:
+            modified = datetime.fromtimestamp(int(mtime), tz=timezone.utc).isoformat()
+            results.append(
+                {"path": path, "is_dir": False, "size": int(size), "modified_at": modified}
+            )
+        except (ValueError, OverflowError, OSError):
+            results.append({"path": path, "is_dir": False})
+    results.sort(key=lambda item: item.get("path", ""))
+    return results
+
+
+_GREP_MAX_COLUMNS = 1000
+_GREP_EXIT_MARKER = "__ASTRAFORGE_GREP_EXIT__"
+
+
+def _budgeted(search: list[str], max_matches: int, max_bytes: int) -> str:
+    """Pipe ``search`` through ``head`` so the budget is enforced inside the sandbox.
+
+    ``head`` closing the pipe stops the search early. The exit-code trailer only
+    survives when the output was not cut, which is the only case it matters.
+    """
+    command = " ".join(shlex.quote(part) for part in search)
+    return (
+        f"{{ {command} 2>/dev/null; echo {_GREP_EXIT_MARKER} $?; }} "
+        f"| head -n {int(max_matches) + 2} | head -c {int(max_bytes) + 1}"
+    )
+
+
+def _ripgrep_command(
+    pattern: str,
+    base: str,
+    glob: str | None,
+    *,
+    max_matches: int,
+    max_bytes: int,
+    max_filesize: str | None,
+) -> str:
+    """``rg`` emitting ``path\\0line:text`` records, capped by matches and bytes."""
+    parts = [
+        "rg",
+        "--line-number",
+        "--with-filename",
+        "--no-heading",
+        "--null",
+        "--color",
+        "never",
+        "--max-count",
+        str(max_matches + 1),
+        "--max-columns",
+        str(_GREP_MAX_COLUMNS),
+        "--max-columns-preview",
+    ]
+    if max_filesize:
+        parts.extend(["--max-filesize", max_filesize])
+    if glob:
+        parts.extend(["--glob", glob])
+    parts.extend(["-e", pattern, "--", base])
+    return _budgeted(parts, max_matches, max_bytes)
+
+
+def _grep_command(
+    pattern: str,
+    base: str,
+    glob: str | None,
+    *,
+    max_matches: int,
+    max_bytes: int,
+) -> str:
+    """``grep -R`` fallback with the same record format and budget as ``_ripgrep_command``."""
+    parts = ["grep", "-RInZ", "--max-count", str(max_matches + 1)]
+    if glob:
+        parts.append(f"--include={glob}")
+    parts.extend(["-e", pattern, "--", base])
+    return _budgeted(parts, max_matches, max_bytes)
+
+
+@dataclass
+class _GrepOutput:
+    matches: List[Dict[str, Any]]
+    exit_code: int | None
+    truncated: bool
+
+
+def _parse_grep_output(stdout: str, *, max_matches: int) -> _GrepOutput:
+    """Parse ``_ripgrep_command``/``_grep_command`` output record by record."""
+    # No trailer means ``head`` cut the stream: by lines (detected below) or by bytes.
+    truncated = bool(stdout) and _GREP_EXIT_MARKER not in stdout
+    end = len(stdout)
+    if truncated and not stdout.endswith("\n"):
+        # The byte cap cut the final record short; drop it.
+        end = stdout.rfind("\n") + 1
+    matches: List[Dict[str, Any]] = []
+    exit_code: int | None = None
+    pos = 0
+    while pos < end:
+        newline = stdout.find("\n", pos, end)
+        line = stdout[pos:newline if newline != -1 else end]
+        pos = end if newline == -1 else newline + 1
+        if line.startswith(_GREP_EXIT_MARKER):
+            try:
+                exit_code = int(line[len(_GREP_EXIT_MARKER):].strip())
+            except ValueError:
+                pass
+            continue
+        path, sep, rest = line.partition("\0")
+        line_no, colon, text = rest.partition(":")
+        if not sep or not colon:
+            continue
+        try:
+            number = int(line_no)
+        except ValueError:
+            continue
+        if len(matches) >= max_matches:
+            truncated = True
+            break
+        matches.append({"path": path, "line": number, "text": text.rstrip("\r")})
+    return _GrepOutput(matches=matches, exit_code=exit_code, truncated=truncated)
+
+
+def _grep_truncation_notice(max_matches: int, max_bytes: int) -> str:
+    return (
+        f"Search stopped at {max_matches} matches or {max_bytes} bytes of output; "
+        "refine the pattern or narrow path/glob to see the rest."
+    )
+
+
+class GrepResults(list):
+    """Grep matches plus whether the budget cut the search short.
+
+    Truncation travels beside the matches instead of as a pseudo-match, which the
+    deepagents ``files_with_matches``/``count`` modes would list as a real file.
+    """
+
+    def __init__(self, matches=(), *, truncated: bool = False, notice: str = "") -> None:
+        super().__init__(matches)
+        self.truncated = truncated
+        self.notice = notice
+
+
+_GREP_NOTICES: ContextVar[Optional[List[str]]] = ContextVar(
+    "astraforge_toolkit_grep_notices", default=None
+)
+
+
+@contextmanager
+def _collect_grep_notices() -> Iterator[List[str]]:
+    notices: List[str] = []
+    token = _GREP_NOTICES.set(notices)
+    try:
+        yield notices
+    finally:
+        _GREP_NOTICES.reset(token)
+
+
+def _report_grep_notice(notice: str) -> None:
+    notices = _GREP_NOTICES.get()
+    if notices is not None and notice not in notices:
+        notices.append(notice)
+
+
+def _with_grep_notices(result: Any, notices: List[str]) -> Any:
+    if not notices or not isinstance(result, ToolMessage) or not isinstance(result.content, str):
+        return result
+    return result.model_copy(update={"content": "\n\n".join([result.content, *notices])})
+
+
+class GrepNoticeMiddleware(AgentMiddleware):
+    """Append grep truncation notices to the text the ``grep`` tool returns.
+
+    The deepagents grep tool formats ``grep_raw`` results with ``format_grep_matches``,
+    which only sees the matches, so a capped search would otherwise read as complete.
+    Pass it to ``create_deep_agent(middleware=[GrepNoticeMiddleware()])``.
+    """
+
+    def wrap_tool_call(self, request, handler):
+        if request.tool_call.get("name") != "grep":
+            return handler(request)
+        with _collect_grep_notices() as notices:
+            result = handler(request)
+        return _with_grep_notices(result, notices)
+
+    async def awrap_tool_call(self, request, handler):
+        if request.tool_call.get("name") != "grep":
+            return await handler(request)
+        with _collect_grep_notices() as notices:
+            result = await handler(request)
+        return _with_grep_notices(result, notices)
+
+
+def _index_query_command(request: Dict[str, Any], root: str) -> str:
+    """Ask the in-sandbox workspace index (``astraforge-workspace-index``) one question.
+
+    ``--spawn`` starts the daemon when it is not running yet (e.g. Kubernetes pods that
+    bypass ``entrypoint.sh``); that call still falls back to the regular command.
+    """
+    binary = os.getenv("ASTRA_FORGE_WORKSPACE_INDEX_COMMAND", "astraforge-workspace-index")
+    return (
+        f"{binary} --spawn --root {shlex.quote(root)} "
+        f"query {shlex.quote(json.dumps(request))} 2>/dev/null"
+    )
+
+
+def _parse_index_response(exit_code: int, stdout: str) -> Optional[Dict[str, Any]]:
+    """Return the index answer, or ``None`` when the caller should run its fallback."""
+    if int(exit_code) != 0:
+        return None
+    try:
+        data = json.loads(stdout or "")
+    except json.JSONDecodeError:
+        return None
+    if not isinstance(data, dict) or data.get("fallback") or data.get("error"):
+        return None
+    return data
+
+
 class _SandboxBackend(BackendProtocol):
     """DeepAgents backend that executes via a remote AstraForge sandbox API.
 
@@ -87,8 +622,25 @@ class _SandboxBackend(BackendProtocol):
         self._workspace_root = root_dir
         self._http: Session = session or requests.Session()
         self._http.headers.setdefault("X-Api-Key", self.api_key)
-        self._ready_timeout = _env_float("ASTRA_FORGE_SANDBOX_READY_TIMEOUT", 30.0)
+        self._ready_timeout = _env_float("ASTRA_FORGE_SANDBOX_READY_TIMEOUT", 120.0)
         self._ready_poll_interval = _env_float("ASTRA_FORGE_SANDBOX_READY_POLL_INTERVAL", 0.5)
+        self._read_max_bytes = max(1024, int(_env_float("ASTRA_FORGE_READ_MAX_BYTES", 262144)))
+        self._glob_ignore = tuple(
+            name.strip()
+            for name in os.getenv("ASTRA_FORGE_GLOB_IGNORE", _DEFAULT_GLOB_IGNORE).split(",")
+            if name.strip()
+        )
+        self._glob_max_results = max(1, int(_env_float("ASTRA_FORGE_GLOB_MAX_RESULTS", 5000)))
+        self._grep_max_matches = max(1, int(_env_float("ASTRA_FORGE_GREP_MAX_MATCHES", 1000)))
+        self._grep_max_bytes = max(1024, int(_env_float("ASTRA_FORGE_GREP_MAX_BYTES", 524288)))
+        self._grep_max_filesize = os.getenv("ASTRA_FORGE_GREP_MAX_FILESIZE", "10M").strip()
+        self._workspace_index = _env_flag(os.getenv("ASTRA_FORGE_WORKSPACE_INDEX"))
+        # None until the server has been asked; False once it lacks the events endpoint.
+        self._events_supported: Optional[bool] = None
+        # Readiness is trusted until the session's expires_at; a "not ready" reply to a
+        # session action drops it (see _post_session_action).
+        self._ready_session_id: Optional[str] = None
+        self._ready_expires_at: Optional[datetime] = None
 
     # internal helpers ------------------------------------------------------
 
@@ -136,40 +688,52 @@ class _SandboxBackend(BackendProtocol):
                 f"Invalid JSON from sandbox API: {response.text!r}"
             ) from exc
 
-    def _shell(self, command: str, cwd: Optional[str] = None) -> _ShellResult:
+    def _post_session_action(self, action: str, payload: Mapping[str, Any]) -> Response:
+        """POST to ``sessions/<id>/<action>/`` without a readiness GET in the steady state.
+
+        When the server answers that the sandbox is gone or not ready, readiness is
+        re-checked (restoring the latest snapshot if needed) and the call is retried once.
+        """
         session_id = self._ensure_session_ready()
-        url = f"{self.base_url}/sandbox/sessions/{session_id}/shell/"
+        url = f"{self.base_url}/sandbox/sessions/{session_id}/{action}/"
+        response = self._http.post(url, json=payload, timeout=self._timeout)
+        if not _is_not_ready_response(response):
+            return response
+        if self._debug:
+            self._log.debug(
+                "sandbox not ready; re-checking before retry",
+                extra={"session_id": session_id, "action": action, "status": response.status_code},
+            )
+        self._forget_readiness()
+        session_id = self._ensure_session_ready()
+        url = f"{self.base_url}/sandbox/sessions/{session_id}/{action}/"
+        return self._http.post(url, json=payload, timeout=self._timeout)
+
+    def _shell(self, command: str, cwd: Optional[str] = None) -> _ShellResult:
         payload: Dict[str, Any] = {"command": command}
         if cwd:
             payload["cwd"] = cwd
-        response = self._http.post(url, json=payload, timeout=self._timeout)
-        data = self._parse_json(response, expected_status=200)
-        exit_code = int(data.get("exit_code", 1) or 0)
-        stdout = str(data.get("stdout") or "")
-        stderr = str(data.get("stderr") or "")
+        response = self._post_session_action("shell", payload)
+        result = _shell_result(self._parse_json(response, expected_status=200))
         if self._debug:
             self._log.debug(
                 "sandbox shell",
-                extra={"command": command, "cwd": cwd, "exit_code": exit_code},
+                extra={"command": command, "cwd": cwd, "exit_code": result.exit_code},
             )
-        return _ShellResult(exit_code=exit_code, stdout=stdout, stderr=stderr)
+        return result
 
     def _upload_text(self, target: str, content: str) -> _ShellResult:
-        session_id = self._ensure_session_ready()
-        url = f"{self.base_url}/sandbox/sessions/{session_id}/upload/"
         payload = {
             "path": target,
             "content": content,
             "encoding": "utf-8",
         }
-        response = self._http.post(url, json=payload, timeout=self._timeout)
-        data = self._parse_json(response, expected_status=200)
-        exit_code = int(data.get("exit_code", 1) or 0)
-        stdout = str(data.get("stdout") or "")
-        stderr = str(data.get("stderr") or "")
-        return _ShellResult(exit_code=exit_code, stdout=stdout, stderr=stderr)
+        response = self._post_session_action("upload", payload)
+        return _shell_result(self._parse_json(response, expected_status=200))
 
-    def _start_session(self, restore_snapshot_id: Optional[str] = None, *, session_id: Optional[str] = None) -> str:
+    def _start_session(
+        self, restore_snapshot_id: Optional[str] = None, *, session_id: Optional[str] = None
+    ) -> str:
         payload: Dict[str, Any] = dict(self._session_params)
         target_session_id = session_id or self._session_id
         if target_session_id:
@@ -177,26 +741,45 @@ class _SandboxBackend(BackendProtocol):
         if restore_snapshot_id:
             payload["restore_snapshot_id"] = restore_snapshot_id
         url = f"{self.base_url}/sandbox/sessions/"
-        response = self._http.post(url, json=payload, timeout=self._timeout)
+        # Ask the server to provision in the background; older servers ignore the header.
+        headers = {"Prefer": "respond-async"}
+        response = self._http.post(url, json=payload, timeout=self._timeout, headers=headers)
+        retry_payload = dict(payload)
         if response.status_code == 404:
-            # The pinned session cannot be reused (e.g., container marked for removal); retry without the id.
-            retry_payload = dict(payload)
+            # The pinned session cannot be reused (e.g., container marked for removal);
+            # retry without the id.
             if target_session_id:
-                retry_payload.pop("id", None)
-                response = self._http.post(url, json=retry_payload, timeout=self._timeout)
+                retry_payload = {k: v for k, v in retry_payload.items() if k != "id"}
+                response = self._http.post(
+                    url, json=retry_payload, timeout=self._timeout, headers=headers
+                )
             # If the snapshot is corrupted, a second 404 may include tar/gzip errors.
             # Drop the restore_snapshot_id so we can still provision a fresh session.
             if response.status_code == 404 and retry_payload.get("restore_snapshot_id"):
-                retry_payload.pop("restore_snapshot_id", None)
-                response = self._http.post(url, json=retry_payload, timeout=self._timeout)
-        data = self._parse_json(response, expected_status=(200, 201))
+                retry_payload = {
+                    k: v for k, v in retry_payload.items() if k != "restore_snapshot_id"
+                }
+                response = self._http.post(
+                    url, json=retry_payload, timeout=self._timeout, headers=headers
+                )
+        data = self._parse_json(response, expected_status=(200, 201, 202))
         try:
             self._session_id = str(data["id"])
         except Exception as exc:  # noqa: BLE001
             raise RuntimeError(f"Unexpected sandbox session payload: {data!r}") from exc
+        if str(data.get("status") or "").lower() == "starting":
+            data = self._wait_for_status(self._session_id)
+            status_value = str(data.get("status") or "").lower()
+            if status_value != "ready":
+                if retry_payload.get("restore_snapshot_id"):
+                    # Asynchronous equivalent of the corrupted-restore 404 above.
+                    return self._start_session(session_id=self._session_id)
+                detail = data.get("error_message") or status_value
+                raise RuntimeError(f"Sandbox session {self._session_id} failed to start: {detail}")
         workspace_path = str(data.get("workspace_path") or self.root_dir)
         self._workspace_root = workspace_path
         self.root_dir = workspace_path
+        self._ready_expires_at = _parse_expires_at(data)
         return self._session_id
 
     def _get_session(self, session_id: str) -> Dict[str, Any]:
@@ -205,6 +788,28 @@ class _SandboxBackend(BackendProtocol):
         return self._parse_json(response, expected_status=200)
 
     def _ensure_session_ready(self) -> str:
+        """Return a ready session id, asking the server only when readiness is not cached."""
+        cached = self._cached_ready_session_id()
+        if cached is not None:
+            return cached
+        self._ready_session_id = None
+        session_id = self._check_session_ready()
+        self._ready_session_id = session_id
+        return session_id
+
+    def _cached_ready_session_id(self) -> Optional[str]:
+        if self._ready_session_id is None or self._ready_session_id != self._session_id:
+            return None
+        expires_at = self._ready_expires_at
+        if expires_at is not None and expires_at <= datetime.now(timezone.utc):
+            return None
+        return self._ready_session_id
+
+    def _forget_readiness(self) -> None:
+        self._ready_session_id = None
+        self._ready_expires_at = None
+
+    def _check_session_ready(self) -> str:
         session_id = self._ensure_session_id()
         try:
             data = self._get_session(session_id)
@@ -218,18 +823,8 @@ class _SandboxBackend(BackendProtocol):
         latest_snapshot_id = (
             metadata.get("latest_snapshot_id") if isinstance(metadata, dict) else None
         )
-        expires_at_raw = data.get("expires_at")
-        expired = False
-        if isinstance(expires_at_raw, str) and expires_at_raw:
-            try:
-                from datetime import datetime, timezone
-
-                expires_dt = datetime.fromisoformat(expires_at_raw.replace("Z", "+00:00"))
-                expired = expires_dt < datetime.now(timezone.utc)
-            except Exception:
-                expired = False
-
-        if expired:
+        expires_at = _parse_expires_at(data)
+        if expires_at is not None and expires_at < datetime.now(timezone.utc):
             return self._start_session(
                 restore_snapshot_id=str(latest_snapshot_id) if latest_snapshot_id else None,
                 session_id=session_id,
@@ -238,6 +833,7 @@ class _SandboxBackend(BackendProtocol):
         if status_value == "ready":
             self._workspace_root = workspace_path
             self.root_dir = workspace_path
+            self._ready_expires_at = expires_at
             return session_id
 
         if status_value in {"failed", "terminated"}:
@@ -246,6 +842,7 @@ class _SandboxBackend(BackendProtocol):
                 session_id=session_id,
             )
 
+        self._ready_expires_at = expires_at
         ready_id, ready_workspace = self._wait_for_ready(
             session_id=session_id,
             latest_snapshot_id=latest_snapshot_id,
@@ -262,31 +859,89 @@ class _SandboxBackend(BackendProtocol):
         latest_snapshot_id: Optional[str],
         current_workspace: str,
     ) -> tuple[str, str]:
-        """Poll a starting session until it is ready or falls back to a fresh one."""
+        """Wait for a starting session to become ready or fall back to a fresh one."""
+        data = self._wait_for_status(session_id)
+        status_value = str(data.get("status") or "").lower()
+        workspace_path = str(data.get("workspace_path") or current_workspace)
+        metadata = data.get("metadata") or {}
+        if isinstance(metadata, dict):
+            latest_snapshot_id = metadata.get("latest_snapshot_id") or latest_snapshot_id
+        if status_value == "ready":
+            return session_id, workspace_path
+        new_id = self._start_session(
+            restore_snapshot_id=str(latest_snapshot_id) if latest_snapshot_id else None,
+            session_id=session_id,
+        )
+        return new_id, self._workspace_root
+
+    def _wait_for_status(self, session_id: str) -> Dict[str, Any]:
+        """Block until the session leaves ``starting`` and return its status payload.
+
+        Uses the server-sent ``events`` stream when available and falls back to
+        polling the session for servers without it.
+        """
         deadline = time.time() + self._ready_timeout
-        workspace_path = current_workspace
         while time.time() < deadline:
+            if self._events_supported is not False:
+                data = self._wait_for_status_event(session_id, deadline)
+                if data is not None:
+                    return data
+                if self._events_supported:
+                    # The stream ended while the session was still starting; reconnect.
+                    continue
             data = self._get_session(session_id)
-            status_value = str(data.get("status") or "").lower()
-            workspace_path = str(data.get("workspace_path") or workspace_path)
-            metadata = data.get("metadata") or {}
-            latest_snapshot_id = (
-                metadata.get("latest_snapshot_id") if isinstance(metadata, dict) else latest_snapshot_id
-            )
-
-            if status_value == "ready":
-                return session_id, workspace_path
-            if status_value in {"failed", "terminated"}:
-                new_id = self._start_session(
-                    restore_snapshot_id=str(latest_snapshot_id) if latest_snapshot_id else None,
-                    session_id=session_id,
-                )
-                return new_id, self._workspace_root
+            if str(data.get("status") or "").lower() != "starting":
+                return data
             time.sleep(self._ready_poll_interval)
         raise RuntimeError(
             f"Sandbox session {session_id} still starting after {self._ready_timeout} seconds"
         )
 
+    def _wait_for_status_event(self, session_id: str, deadline: float) -> Optional[Dict[str, Any]]:
+        url = f"{self.base_url}/sandbox/sessions/{session_id}/events/"
+        remaining = max(1, int(deadline - time.time()))
+        try:
+            response = self._http.get(
+                url,
+                params={"timeout": remaining},
+                headers={"Accept": "text/event-stream"},
+                stream=True,
+                timeout=self._timeout,
+            )
+        except requests.RequestException:
+            return None
+        try:
+            content_type = str(response.headers.get("Content-Type") or "")
+            if response.status_code != 200 or not content_type.startswith("text/event-stream"):
+                self._events_supported = False
+                return None
+            self._events_supported = True
+            event = ""
+            for raw_line in response.iter_lines():
+                line = (raw_line or b"").decode("utf-8", errors="replace").rstrip("\r")
+                if line.startswith("event:"):
+                    event = line[len("event:") :].strip()
+                elif line.startswith("data:") and event == "status":
+                    try:
+                        payload = json.loads(line[len("data:") :].strip())
+                    except ValueError:
+                        continue
+                    if str(payload.get("status") or "").lower() != "starting":
+                        return payload
+        except requests.RequestException:
+            return None
+        finally:
+            response.close()
+        # Stream ended (server timeout or disconnect) while still starting.
+        return None
+
+    def _index_query(self, request: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Answer from the in-sandbox workspace index when enabled; ``None`` means fall back."""
+        if not self._workspace_index:
+            return None
+        result = self._shell(_index_query_command(request, self.root_dir))
+        return _parse_index_response(result.exit_code, result.stdout or "")
+
     def _log_llm_error(self, message: str) -> None:
         try:
             self._log.error("backend response to llm: %s", message)
@@ -306,13 +961,15 @@ class _SandboxBackend(BackendProtocol):
             Directories have a trailing / in their path and is_dir=True.
         """
         target = self._abs_path(path or self.root_dir)
-        result = self._shell(
-            f"ls -la --time-style=+%Y-%m-%dT%H:%M:%SZ {shlex.quote(target)}",
-            cwd=None,
-        )
+        indexed = self._index_query({"op": "ls", "path": target})
+        if indexed is not None:
+            return [FileInfo(**item) for item in indexed.get("entries") or []]
+        result = self._shell(_ls_command(target), cwd=None)
         if int(result.exit_code) != 0:
             return []
-        stdout = result.stdout or ""
+        return self._parse_ls_output(target, result.stdout or "")
+
+    def _parse_ls_output(self, target: str, stdout: str) -> List[FileInfo]:
         entries: List[FileInfo] = []
         for line in stdout.splitlines():
             line = line.strip()
@@ -349,31 +1006,79 @@ class _SandboxBackend(BackendProtocol):
         Args:
             file_path: Absolute file path
             offset: Line offset to start reading from (0-indexed)
-            limit: Maximum number of lines to readReturns:
+            limit: Maximum number of lines to read
+
+        Only the requested window (capped at ``ASTRA_FORGE_READ_MAX_BYTES``) leaves the
+        sandbox; a footer reports the file's total line count when the window is partial.
+
+        Returns:
             Formatted file content with line numbers, or error message.
         """
         target = self._abs_path(file_path)
-        result = self._shell(f"cat {shlex.quote(target)}")
+        # Slice the requested window inside the sandbox so transfer size tracks the page,
+        # not the file.
+        command = _ranged_read_command(target, max(offset, 0), limit, self._read_max_bytes)
+        result = self._shell(command)
         if int(result.exit_code) != 0:
             msg = f"Error: File '{file_path}' not found"
             self._log_llm_error(msg)
             return msg
-        content = result.stdout or ""
-        empty_msg = check_empty_content(content)
-        if empty_msg:
-            return empty_msg
-
-        lines = content.splitlines()
-        start_idx = offset if offset > 0 else 0
-        end_idx = min(start_idx + limit, len(lines))
-
-        if start_idx >= len(lines):
-            msg = f"Error: Line offset {offset} exceeds file length ({len(lines)} lines)"
-            self._log_llm_error(msg)
-            return msg
+        content, failed = _format_ranged_read(
+            result.stdout or "", file_path, offset, self._read_max_bytes
+        )
+        if failed:
+            self._log_llm_error(content)
+        return content
 
-        selected = lines[start_idx:end_idx]
-        return format_content_with_line_numbers(selected, start_line=start_idx + 1)
+    def read_many(self, file_paths: Sequence[str], offset: int = 0, limit: int = 2000) -> List[str]:
+        """Read several files in one ``/batch/`` round trip; each entry matches :meth:`read`."""
+        if not file_paths:
+            return []
+        results = self.batch(self._read_many_operations(file_paths, offset, limit), parallel=True)
+        return self._format_read_many(file_paths, results, offset)
+
+    def _read_many_operations(
+        self, file_paths: Sequence[str], offset: int, limit: int
+    ) -> List[Dict[str, Any]]:
+        return [
+            {
+                "op": "read",
+                "path": path,
+                "offset": max(offset, 0),
+                "limit": limit,
+                "max_bytes": self._read_max_bytes,
+            }
+            for path in file_paths
+        ]
+
+    def _format_read_many(
+        self, file_paths: Sequence[str], results: Sequence[Mapping[str, Any]], offset: int
+    ) -> List[str]:
+        contents: List[str] = []
+        for index, path in enumerate(file_paths):
+            result = results[index] if index < len(results) else None
+            if result is None:
+                # A short batch response must not shift or silently drop paths.
+                content, failed = f"Error: No result returned for '{path}'", True
+            elif result.get("ok"):
+                window = str(result.get("content") or "")
+                lines = window.split("\n") if window else []
+                content, failed = _format_read_lines(
+                    lines,
+                    int(result.get("total_lines") or 0),
+                    path,
+                    offset,
+                    self._read_max_bytes,
+                    bool(result.get("truncated")),
+                )
+            elif "total_lines" in result:
+                content, failed = f"Error: {result.get('error')}", True
+            else:
+                content, failed = f"Error: File '{path}' not found", True
+            if failed:
+                self._log_llm_error(content)
+            contents.append(content)
+        return contents
 
     def write(self, file_path: str, content: str) -> WriteResult:
         """Create a new file with content.
@@ -418,43 +1123,50 @@ class _SandboxBackend(BackendProtocol):
         Returns EditResult with files_update and occurrences.
         """
         target = self._abs_path(file_path)
-        raw_result = self._shell(f"cat {shlex.quote(target)}")
-        if int(raw_result.exit_code) != 0:
-            msg = f"Error: File '{file_path}' not found"
-            self._log_llm_error(msg)
-            return EditResult(error=msg)
-
-        replacement = perform_string_replacement(
-            raw_result.stdout or "", old_string, new_string, replace_all
+        # Ship only the strings; the sandbox rewrites the file so latency is independent
+        # of its size.
+        payload = _inplace_edit_payload(old_string, new_string)
+        payload_path = None
+        if payload is not None:
+            payload_path = _inplace_edit_payload_path()
+            uploaded = self._upload_text(payload_path, payload)
+            if int(uploaded.exit_code) != 0:
+                detail = uploaded.stderr or uploaded.stdout or "payload upload failed"
+                error = f"Edit failed: {detail}"
+                self._log_llm_error(error)
+                return EditResult(error=error)
+        result = self._shell(
+            _inplace_edit_command(
+                target, old_string, new_string, replace_all, payload_path=payload_path
+            )
         )
-        if isinstance(replacement, str):
-            self._log_llm_error(replacement)
-            return EditResult(error=replacement)
-        updated, occurrences = replacement
-
-        result = self._upload_text(target, updated)
-        exit_code = int(result.exit_code)
-        if exit_code != 0:
-            message = result.stderr or f"Edit failed with exit code {exit_code}"
+        occurrences, error = _parse_inplace_edit(
+            result.stdout or "", file_path, old_string, new_string, replace_all
+        )
+        if error is not None:
             if self._debug:
-                stdout = (result.stdout or "").strip()
                 self._log.debug(
                     "sandbox edit failed: path=%s exit=%s stderr=%r stdout=%r",
                     target,
-                    exit_code,
+                    result.exit_code,
                     result.stderr,
-                    stdout,
+                    (result.stdout or "").strip(),
                 )
-            self._log_llm_error(message)
-            return EditResult(error=message)
-        return EditResult(path=target, files_update=None, occurrences=int(occurrences))
+            self._log_llm_error(error)
+            return EditResult(error=error)
+        return EditResult(path=target, files_update=None, occurrences=occurrences)
 
     def grep_raw(
         self,
         pattern: str,
         path: str | None = None,
         glob: str | None = None,
+        *,
+        max_matches: Optional[int] = None,
+        max_bytes: Optional[int] = None,
     ) -> List[GrepMatch] | str:
+        """Search file contents; at most ``max_matches`` matches / ``max_bytes`` of output
+        leave the sandbox; a capped search returns :class:`GrepResults` with ``truncated`` set."""
         try:
             re.compile(pattern)
         except re.error as exc:
@@ -463,122 +1175,142 @@ class _SandboxBackend(BackendProtocol):
             return msg
 
         base = self._abs_path(path or self.root_dir)
+        max_matches = max_matches or self._grep_max_matches
+        max_bytes = max_bytes or self._grep_max_bytes
+
+        indexed = self._index_query(
+            {
+                "op": "grep",
+                "path": base,
+                "pattern": pattern,
+                "glob": glob,
+                "max_matches": max_matches,
+                "max_bytes": max_bytes,
+                "max_filesize": self._grep_max_filesize,
+            }
+        )
+        if indexed is not None:
+            output = _GrepOutput(
+                matches=indexed.get("matches") or [],
+                exit_code=0,
+                truncated=bool(indexed.get("truncated")),
+            )
+            return self._budgeted_matches(output, max_matches, max_bytes)
 
-        rg_matches = self._ripgrep_search(pattern, base, glob)
+        rg_matches = self._ripgrep_search(pattern, base, glob, max_matches, max_bytes)
         if rg_matches is not None:
             return rg_matches
 
-        return self._grep_fallback(pattern, base, glob)
+        return self._grep_fallback(pattern, base, glob, max_matches, max_bytes)
+
+    def _budgeted_matches(
+        self, output: _GrepOutput, max_matches: int, max_bytes: int
+    ) -> List[GrepMatch]:
+        matches = [GrepMatch(**item) for item in output.matches]
+        if not output.truncated:
+            return GrepResults(matches)
+        notice = _grep_truncation_notice(max_matches, max_bytes)
+        _report_grep_notice(notice)
+        return GrepResults(matches, truncated=True, notice=notice)
 
     def _ripgrep_search(
-        self, pattern: str, base: str, glob: str | None
+        self, pattern: str, base: str, glob: str | None, max_matches: int, max_bytes: int
     ) -> List[GrepMatch] | None:
-        parts = ["rg", "--json"]
-        if glob:
-            parts.extend(["--glob", glob])
-        parts.extend(["--", pattern, base])
-        command = " ".join(shlex.quote(p) for p in parts)
+        command = _ripgrep_command(
+            pattern,
+            base,
+            glob,
+            max_matches=max_matches,
+            max_bytes=max_bytes,
+            max_filesize=self._grep_max_filesize,
+        )
         result = self._shell(command)
-        if int(result.exit_code) not in (0, 1):
-            return None
+        return self._ripgrep_result(result.stdout or "", max_matches, max_bytes)
 
-        matches: List[GrepMatch] = []
-        for line in (result.stdout or "").splitlines():
-            try:
-                data = json.loads(line)
-            except json.JSONDecodeError:
-                continue
-            if data.get("type") != "match":
-                continue
-            pdata = data.get("data", {})
-            ftext = pdata.get("path", {}).get("text")
-            line_no = pdata.get("line_number")
-            text = (pdata.get("lines", {}) or {}).get("text", "").rstrip("\n")
-            if not ftext or line_no is None:
-                continue
-            matches.append(GrepMatch(path=ftext, line=int(line_no), text=text))
-        return matches
+    def _ripgrep_result(
+        self, stdout: str, max_matches: int, max_bytes: int
+    ) -> List[GrepMatch] | None:
+        output = _parse_grep_output(stdout, max_matches=max_matches)
+        # A missing trailer means the budget cut the stream, so rg was running fine.
+        if output.exit_code not in (None, 0, 1):
+            return None
+        return self._budgeted_matches(output, max_matches, max_bytes)
 
     def _grep_fallback(
-        self, pattern: str, base: str, glob: str | None
+        self, pattern: str, base: str, glob: str | None, max_matches: int, max_bytes: int
     ) -> List[GrepMatch] | str:
-        parts = ["grep", "-RIn"]
-        if glob:
-            parts.append(f"--include={glob}")
-        parts.extend([pattern, base])
-        command = " ".join(shlex.quote(p) for p in parts)
+        command = _grep_command(pattern, base, glob, max_matches=max_matches, max_bytes=max_bytes)
         result = self._shell(command)
-        exit_code = int(result.exit_code)
-        stdout = result.stdout or ""
-        if exit_code == 2:
+        return self._grep_fallback_result(pattern, result.stdout or "", max_matches, max_bytes)
+
+    def _grep_fallback_result(
+        self, pattern: str, stdout: str, max_matches: int, max_bytes: int
+    ) -> List[GrepMatch] | str:
+        output = _parse_grep_output(stdout, max_matches=max_matches)
+        if output.exit_code == 2 and not output.matches:
             msg = f"Invalid regex pattern: {pattern}"
             self._log_llm_error(msg)
             return msg
-        if exit_code not in (0, 1):
+        if output.exit_code not in (None, 0, 1, 2):
             msg = f"grep error: {stdout.strip()}"
             self._log_llm_error(msg)
             return msg
-        if not stdout.strip():
-            return []
-
-        matches: List[GrepMatch] = []
-        for line in stdout.splitlines():
-            try:
-                file_path, line_no, text = line.split(":", 2)
-            except ValueError:
-                continue
-            try:
-                lineno_int = int(line_no)
-            except ValueError:
-                continue
-            matches.append(GrepMatch(path=file_path, line=lineno_int, text=text))
-        return matches
+        return self._budgeted_matches(output, max_matches, max_bytes)
 
     def glob_info(self, pattern: str, path: str = "/") -> List[FileInfo]:
         search_pattern = pattern.lstrip("/") if pattern.startswith("/") else pattern
         base = self._abs_path(path or self.root_dir)
-        command = f"""python - <<'PY'
-import json
-from datetime import datetime
-from pathlib import Path
-
-base = Path({base!r})
-pattern = {search_pattern!r}
-
-if not base.exists() or not base.is_dir():
-    print("[]")
-    raise SystemExit(0)
-
-results = []
-for matched in base.rglob(pattern):
-    try:
-        is_file = matched.is_file()
-    except OSError:
-        continue
-    if not is_file:
-        continue
-    try:
-        st = matched.stat()
-        results.append({{
-            "path": str(matched),
-            "is_dir": False,
-            "size": int(st.st_size),
-            "modified_at": datetime.fromtimestamp(st.st_mtime).isoformat(),
-        }})
-    except OSError:
-        results.append({{"path": str(matched), "is_dir": False}})
-
-results.sort(key=lambda item: item.get("path", ""))
-print(json.dumps(results))
-PY"""
+        indexed = self._index_query(
+            {
+                "op": "glob",
+                "path": base,
+                "pattern": search_pattern,
+                "max_results": self._glob_max_results,
+            }
+        )
+        if indexed is not None:
+            return [FileInfo(**item) for item in indexed.get("files") or []]
+        command = _glob_command(
+            base,
+            search_pattern,
+            ignore=self._glob_ignore,
+            max_results=self._glob_max_results,
+        )
         result = self._shell(command)
         if int(result.exit_code) != 0:
             return []
-        try:
-            parsed = json.loads(result.stdout or "[]")
-        except json.JSONDecodeError:
-            return []
-        return [FileInfo(**item) for item in parsed if isinstance(item, dict)]
+        return [FileInfo(**item) for item in _parse_glob_output(result.stdout or "")]
+
+    def batch(
+        self,
+        operations: Sequence[Mapping[str, Any]],
+        *,
+        parallel: bool = False,
+        stop_on_error: bool = False,
+    ) -> List[Dict[str, Any]]:
+        """Run exec/read/write/edit/stat operations in one request, returning one result each.
+
+        Relative ``path`` values resolve against ``root_dir``. With ``parallel=True`` runs of
+        consecutive reads and stats execute concurrently inside the sandbox.
+        """
+        payload_ops: List[Dict[str, Any]] = []
+        for operation in operations:
+            item = dict(operation)
+            if item.get("path"):
+                item["path"] = self._abs_path(str(item["path"]))
+            payload_ops.append(item)
+        response = self._post_session_action(
+            "batch",
+            {"operations": payload_ops, "parallel": parallel, "stop_on_error": stop_on_error},
+        )
+        data = self._parse_json(response, expected_status=200)
+        results = list(data.get("results") or [])
+        if self._debug:
+            self._log.debug(
+                "sandbox batch",
+                extra={"operations": len(payload_ops), "duration_sec": data.get("duration_sec")},
+            )
+        return results
 
     def python_exec(self, code: str, timeout: Optional[int] = 30) -> str:
         command = f"python - <<'PYCODE'\n{code}\nPYCODE"
@@ -652,11 +1384,11 @@ class PolicyWrapper(BackendProtocol):
         return self.inner.read(file_path, offset=offset, limit=limit)
 
     def grep_raw(
-        self, pattern: str, path: str | None = None, glob: str | None = None
+        self, pattern: str, path: str | None = None, glob: str | None = None, **budget: Any
     ) -> List[GrepMatch] | str:
         if self._deny(path):
             return self._error(path)
-        return self.inner.grep_raw(pattern, path, glob)
+        return self.inner.grep_raw(pattern, path, glob, **budget)
 
     def glob_info(self, pattern: str, path: str = "/") -> List[FileInfo]:
         if self._deny(path):
@@ -675,6 +1407,46 @@ class PolicyWrapper(BackendProtocol):
             return EditResult(error=self._error(file_path))
         return self.inner.edit(file_path, old_string, new_string, replace_all)
 
+    def read_many(
+        self, file_paths: Sequence[str], offset: int = 0, limit: int = 2000
+    ) -> List[str]:
+        allowed = [path for path in file_paths if not self._deny(path)]
+        contents = iter(
+            self.inner.read_many(allowed, offset=offset, limit=limit) if allowed else []
+        )
+        return [self._error(path) if self._deny(path) else next(contents) for path in file_paths]
+
+    def batch(
+        self, operations: Sequence[Mapping[str, Any]], **options: Any
+    ) -> List[Dict[str, Any]]:
+        rejected = self._reject_batch(operations)
+        if rejected is not None:
+            return rejected
+        return self.inner.batch(operations, **options)
+
+    def _reject_batch(
+        self, operations: Sequence[Mapping[str, Any]]
+    ) -> Optional[List[Dict[str, Any]]]:
+        denied = {
+            index
+            for index, operation in enumerate(operations)
+            if operation.get("path") is not None and self._deny(operation.get("path"))
+        }
+        if denied:
+            # Reject the whole batch so later operations never run without their predecessors.
+            return [
+                {
+                    "index": index,
+                    "op": operation.get("op"),
+                    "ok": False,
+                    "error": self._error(operation.get("path")),
+                }
+                if index in denied
+                else {"index": index, "op": operation.get("op"), "ok": False, "skipped": True}
+                for index, operation in enumerate(operations)
+            ]
+        return None
+
     def __getattr__(self, name: str):
         # Delegate attribute access to the inner backend for compatibility.
         return getattr(self.inner, name)
@@ -1,17 +1,55 @@
 from __future__ import annotations
 
 import json
+import os
 from dataclasses import dataclass, field
-from typing import Any, Dict, Iterable, Iterator, List, Mapping, MutableMapping, Optional
+from pathlib import Path
+from typing import (
+    IO,
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    MutableMapping,
+    Optional,
+    Union,
+)
 
 import requests
 from requests import Response, Session
 
+DEFAULT_CHUNK_SIZE = 256 * 1024
+
+# bytes/str are sent as-is; file objects and chunk iterables are streamed.
+UploadContent = Union[bytes, str, IO[bytes], Iterable[Union[bytes, str]]]
+
 
 class DeepAgentError(RuntimeError):
     """Base error for DeepAgent client failures."""
 
 
+def _encode_chunks(chunks: Iterable[bytes | str], encoding: str) -> Iterator[bytes]:
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode(encoding)
+        if chunk:
+            yield bytes(chunk)
+
+
+def _skip_bytes(chunks: Iterable[bytes], skip: int) -> Iterator[bytes]:
+    """Drop the first ``skip`` bytes of a chunk stream."""
+    for chunk in chunks:
+        if skip:
+            if len(chunk) <= skip:
+                skip -= len(chunk)
+                continue
+            chunk, skip = chunk[skip:], 0
+        if chunk:
+            yield chunk
+
+
 @dataclass
 class DeepAgentConversation:
     """Lightweight wrapper around a DeepAgent conversation payload."""
@@ -50,7 +88,132 @@ class SandboxArtifact:
     raw: Mapping[str, Any] = field(default_factory=dict)
 
 
-class DeepAgentClient:
+class _ResponseHandlingMixin:
+    """Response checks and payload builders shared by the sync and async clients.
+
+    Both ``requests.Response`` and ``httpx.Response`` expose the attributes used here.
+    """
+
+    def _parse_json(
+        self, response: Any, *, expected_status: int | tuple[int, ...]
+    ) -> MutableMapping[str, Any]:
+        self._ensure_ok(response, expected_status=expected_status)
+        try:
+            return response.json()  # type: ignore[return-value]
+        except json.JSONDecodeError as exc:  # pragma: no cover - network edge case
+            raise DeepAgentError(f"Invalid JSON response from {response.url}") from exc
+
+    def _ensure_ok(self, response: Any, *, expected_status: int | tuple[int, ...]) -> None:
+        expected = expected_status if isinstance(expected_status, tuple) else (expected_status,)
+        if response.status_code in expected:
+            return
+        detail: Any
+        try:
+            payload = response.json()
+            detail = payload.get("detail") or payload
+        except Exception:  # pragma: no cover - fallback path
+            detail = response.text
+        raise DeepAgentError(
+            f"Request to {response.url} failed with status {response.status_code}: {detail!r}"
+        )
+
+    def _parse_sse_line(self, raw_line: str | None) -> Mapping[str, Any] | None:
+        if raw_line is None:
+            return None
+        line = raw_line.strip()
+        if not line or not line.startswith("data:"):
+            return None
+        json_payload = line[len("data:") :].strip()
+        if not json_payload:
+            return None
+        try:
+            parsed = json.loads(json_payload)
+        except json.JSONDecodeError:
+            return None
+        if isinstance(parsed, dict):
+            return parsed
+        return {"data": parsed}
+
+    def _range_headers(self, offset: int) -> Dict[str, str]:
+        return {"Range": f"bytes={offset}-"} if offset > 0 else {}
+
+    def _remote_size(self, response: Any) -> int | None:
+        """Total size from a ``Content-Range: bytes a-b/N`` (or ``bytes */N``) header."""
+        _, _, total = str(response.headers.get("Content-Range") or "").rpartition("/")
+        return int(total) if total.isdigit() else None
+
+    def _unresumable(self, path: str, destination: Path, offset: int, response: Any) -> int:
+        """Handle a 416 on resume: the local copy is complete, or cannot be continued."""
+        if self._remote_size(response) == offset:
+            return offset
+        raise DeepAgentError(
+            f"Cannot resume download of {path}: {destination} ({offset} bytes) "
+            "does not match the remote file"
+        )
+
+    def _build_conversation(self, data: Mapping[str, Any]) -> DeepAgentConversation:
+        try:
+            conversation_id = str(data["conversation_id"])
+            sandbox_session_id = str(data["sandbox_session_id"])
+            status = str(data.get("status", ""))
+        except Exception as exc:  # noqa: BLE001
+            raise DeepAgentError(f"Unexpected conversation payload: {data}") from exc
+        return DeepAgentConversation(
+            conversation_id=conversation_id,
+            sandbox_session_id=sandbox_session_id,
+            status=status,
+            raw=data,
+        )
+
+    def _build_sandbox_session(self, data: Mapping[str, Any]) -> SandboxSession:
+        try:
+            session_id = str(data["id"])
+        except Exception as exc:  # noqa: BLE001
+            raise DeepAgentError(f"Unexpected sandbox session payload: {data}") from exc
+        workspace_path = str(data.get("workspace_path") or "")
+        status = str(data.get("status")) if data.get("status") is not None else None
+        image = str(data.get("image")) if data.get("image") is not None else None
+        mode = str(data.get("mode")) if data.get("mode") is not None else None
+        idle_timeout = data.get("idle_timeout_sec")
+        max_lifetime = data.get("max_lifetime_sec")
+        created_at = str(data.get("created_at")) if data.get("created_at") else None
+        updated_at = str(data.get("updated_at")) if data.get("updated_at") else None
+        return SandboxSession(
+            session_id=session_id,
+            workspace_path=workspace_path,
+            status=status,
+            image=image,
+            mode=mode,
+            idle_timeout_sec=int(idle_timeout) if idle_timeout is not None else None,
+            max_lifetime_sec=int(max_lifetime) if max_lifetime is not None else None,
+            created_at=created_at,
+            updated_at=updated_at,
+            raw=data,
+        )
+
+    def _build_artifact(self, data: Mapping[str, Any]) -> SandboxArtifact:
+        try:
+            artifact_id = str(data["id"])
+            filename = str(data.get("filename") or "")
+        except Exception as exc:  # noqa: BLE001
+            raise DeepAgentError(f"Unexpected sandbox artifact payload: {data}") from exc
+        content_type = str(data.get("content_type")) if data.get("content_type") else None
+        try:
+            size_bytes = int(data.get("size_bytes") or 0)
+        except (TypeError, ValueError):
+            size_bytes = 0
+        download_url = str(data.get("download_url")) if data.get("download_url") else None
+        return SandboxArtifact(
+            artifact_id=artifact_id,
+            filename=filename,
+            content_type=content_type,
+            size_bytes=size_bytes,
+            download_url=download_url,
+            raw=data,
+        )
+
+
+class DeepAgentClient(_ResponseHandlingMixin):
     """Synchronous client for the AstraForge DeepAgent HTTP API.
 
     This client talks to the same `/api/deepagent/...` and `/api/sandbox/...` endpoints
@@ -98,29 +261,60 @@ class DeepAgentClient:
         payload: Dict[str, Any] = dict(session_params or {})
         response = self._session.post(url, json=payload, timeout=self.timeout)
         data = self._parse_json(response, expected_status=201)
-        try:
-            conversation_id = str(data["conversation_id"])
-            sandbox_session_id = str(data["sandbox_session_id"])
-            status = str(data.get("status", ""))
-        except Exception as exc:  # noqa: BLE001
-            raise DeepAgentError(f"Unexpected conversation payload: {data}") from exc
-        return DeepAgentConversation(
-            conversation_id=conversation_id,
-            sandbox_session_id=sandbox_session_id,
-            status=status,
-            raw=data,
-        )
+        return self._build_conversation(data)
 
     def create_sandbox_session(
         self,
         session_params: Optional[Mapping[str, Any]] = None,
+        *,
+        wait: bool = True,
+        ready_timeout: float = 120.0,
     ) -> SandboxSession:
-        """Create a sandbox session without creating a DeepAgent conversation."""
+        """Create a sandbox session without creating a DeepAgent conversation.
+
+        The server provisions in the background and answers ``202`` with
+        ``status="starting"``; with ``wait=True`` this blocks on the session's
+        status events until it is ready.
+        """
         url = f"{self.base_url}/sandbox/sessions/"
         payload: Dict[str, Any] = dict(session_params or {})
-        response = self._session.post(url, json=payload, timeout=self.timeout)
-        data = self._parse_json(response, expected_status=201)
-        return self._build_sandbox_session(data)
+        response = self._session.post(
+            url,
+            json=payload,
+            timeout=self.timeout,
+            headers={"Prefer": "respond-async", **self._session.headers},
+        )
+        data = self._parse_json(response, expected_status=(201, 202))
+        sandbox = self._build_sandbox_session(data)
+        if wait and sandbox.status == "starting":
+            return self.wait_for_sandbox_session(sandbox.session_id, timeout=ready_timeout)
+        return sandbox
+
+    def wait_for_sandbox_session(
+        self, session_id: str, *, timeout: float = 120.0
+    ) -> SandboxSession:
+        """Block until a starting sandbox session is ready; raise if it fails."""
+        if not session_id:
+            raise ValueError("session_id is required")
+
+        url = f"{self.base_url}/sandbox/sessions/{session_id}/events/"
+        response = self._session.get(
+            url,
+            params={"timeout": int(timeout)},
+            timeout=self.timeout,
+            stream=True,
+            headers={"Accept": "text/event-stream", **self._session.headers},
+        )
+        self._ensure_ok(response, expected_status=200)
+        for event in self._iter_sse(response):
+            status = str(event.get("status") or "")
+            if status and status != "starting":
+                break
+        sandbox = self.get_sandbox_session(session_id)
+        if sandbox.status != "ready":
+            detail = sandbox.raw.get("error_message") or sandbox.status
+            raise DeepAgentError(f"Sandbox session {session_id} did not become ready: {detail}")
+        return sandbox
 
     def list_sandbox_sessions(self) -> List[SandboxSession]:
         """List sandbox sessions for the authenticated user."""
@@ -215,20 +409,27 @@ class DeepAgentClient:
         session_id: str,
         path: str,
         *,
-        content: bytes | str,
+        content: UploadContent,
         encoding: str = "utf-8",
     ) -> Mapping[str, Any]:
-        """Upload raw bytes into a sandbox session at the given path."""
+        """Upload content into a sandbox session at the given path.
+
+        ``content`` may be bytes, text, a binary file object or an iterable of chunks.
+        File objects and iterables are streamed (chunked transfer encoding when the length
+        is unknown) instead of being loaded into memory first.
+        """
         if not session_id:
             raise ValueError("session_id is required")
         if not path:
             raise ValueError("path is required")
 
-        body: bytes
+        body: Any
         if isinstance(content, str):
             body = content.encode(encoding)
-        else:
+        elif isinstance(content, (bytes, bytearray, memoryview)) or hasattr(content, "read"):
             body = content
+        else:
+            body = _encode_chunks(content, encoding)
 
         url = f"{self.base_url}/sandbox/sessions/{session_id}/files/upload/"
         response = self._session.post(
@@ -247,7 +448,10 @@ class DeepAgentClient:
         *,
         encoding: str | None = None,
     ) -> bytes | str:
-        """Fetch file bytes from a sandbox session. Optionally decode to text."""
+        """Fetch file bytes from a sandbox session. Optionally decode to text.
+
+        Use :meth:`iter_file_content` or :meth:`download_file` for large files.
+        """
         if not session_id:
             raise ValueError("session_id is required")
         if not path:
@@ -267,6 +471,49 @@ class DeepAgentClient:
                 return response.content.decode(encoding, errors="replace")
         return response.content
 
+    def iter_file_content(
+        self,
+        session_id: str,
+        path: str,
+        *,
+        offset: int = 0,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ) -> Iterator[bytes]:
+        """Stream a sandbox file's bytes in chunks, optionally starting at byte ``offset``."""
+        response = self._open_file_content(session_id, path, offset=offset)
+        skip = offset if offset > 0 and response.status_code == 200 else 0
+        return _skip_bytes(self._iter_body(response, chunk_size), skip)
+
+    def download_file(
+        self,
+        session_id: str,
+        path: str,
+        destination: str | os.PathLike[str],
+        *,
+        resume: bool = False,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ) -> int:
+        """Stream a sandbox file to ``destination`` and return its size in bytes.
+
+        With ``resume=True`` an existing partial ``destination`` is continued from its
+        current size with a ``Range`` request instead of being downloaded again.
+        """
+        target = Path(destination)
+        offset = target.stat().st_size if resume and target.exists() else 0
+        response = self._open_file_content(
+            session_id, path, offset=offset, expected_status=(200, 206, 416)
+        )
+        if response.status_code == 416:
+            response.close()
+            return self._unresumable(path, target, offset, response)
+        appending = response.status_code == 206
+        written = offset if appending else 0
+        with target.open("ab" if appending else "wb") as handle:
+            for chunk in self._iter_body(response, chunk_size):
+                handle.write(chunk)
+                written += len(chunk)
+        return written
+
     def export_file(
         self,
         session_id: str,
@@ -291,94 +538,74 @@ class DeepAgentClient:
         data = self._parse_json(response, expected_status=201)
         return self._build_artifact(data)
 
-    # Internal helpers ------------------------------------------------------
+    def run_batch(
+        self,
+        session_id: str,
+        operations: Iterable[Mapping[str, Any]],
+        *,
+        parallel: bool = False,
+        stop_on_error: bool = False,
+    ) -> Mapping[str, Any]:
+        """Run exec/read/write/edit/stat operations in one request.
 
-    def _parse_json(self, response: Response, *, expected_status: int) -> MutableMapping[str, Any]:
-        self._ensure_ok(response, expected_status=expected_status)
-        try:
-            return response.json()  # type: ignore[return-value]
-        except json.JSONDecodeError as exc:  # pragma: no cover - network edge case
-            raise DeepAgentError(f"Invalid JSON response from {response.url}") from exc
+        Returns ``{"results": [...], "duration_sec": ...}`` with one result per operation,
+        in order. ``parallel`` lets consecutive reads and stats run concurrently.
+        """
+        if not session_id:
+            raise ValueError("session_id is required")
 
-    def _ensure_ok(self, response: Response, *, expected_status: int) -> None:
-        if response.status_code == expected_status:
-            return
-        detail: Any
-        try:
-            payload = response.json()
-            detail = payload.get("detail") or payload
-        except Exception:  # pragma: no cover - fallback path
-            detail = response.text
-        raise DeepAgentError(
-            f"Request to {response.url} failed with status {response.status_code}: {detail!r}"
-        )
+        url = f"{self.base_url}/sandbox/sessions/{session_id}/batch/"
+        body = {
+            "operations": list(operations),
+            "parallel": parallel,
+            "stop_on_error": stop_on_error,
+        }
+        response = self._session.post(url, json=body, timeout=self.timeout)
+        return self._parse_json(response, expected_status=200)
+
+    # Internal helpers ------------------------------------------------------
 
     def _iter_sse(self, response: Response) -> Iterator[Mapping[str, Any]]:
         try:
             for raw_line in response.iter_lines(decode_unicode=True):
-                if raw_line is None:
-                    continue
-                line = raw_line.strip()
-                if not line or not line.startswith("data:"):
-                    continue
-
-                json_payload = line[len("data:") :].strip()
-                if not json_payload:
-                    continue
-                try:
-                    parsed = json.loads(json_payload)
-                except json.JSONDecodeError:
-                    continue
-                if isinstance(parsed, dict):
-                    yield parsed
-                else:
-                    yield {"data": parsed}
+                event = self._parse_sse_line(raw_line)
+                if event is not None:
+                    yield event
         finally:
             response.close()
 
-    def _build_sandbox_session(self, data: Mapping[str, Any]) -> SandboxSession:
-        try:
-            session_id = str(data["id"])
-        except Exception as exc:  # noqa: BLE001
-            raise DeepAgentError(f"Unexpected sandbox session payload: {data}") from exc
-        workspace_path = str(data.get("workspace_path") or "")
-        status = str(data.get("status")) if data.get("status") is not None else None
-        image = str(data.get("image")) if data.get("image") is not None else None
-        mode = str(data.get("mode")) if data.get("mode") is not None else None
-        idle_timeout = data.get("idle_timeout_sec")
-        max_lifetime = data.get("max_lifetime_sec")
-        created_at = str(data.get("created_at")) if data.get("created_at") else None
-        updated_at = str(data.get("updated_at")) if data.get("updated_at") else None
-        return SandboxSession(
-            session_id=session_id,
-            workspace_path=workspace_path,
-            status=status,
-            image=image,
-            mode=mode,
-            idle_timeout_sec=int(idle_timeout) if idle_timeout is not None else None,
-            max_lifetime_sec=int(max_lifetime) if max_lifetime is not None else None,
-            created_at=created_at,
-            updated_at=updated_at,
-            raw=data,
+    def _open_file_content(
+        self,
+        session_id: str,
+        path: str,
+        *,
+        offset: int = 0,
+        expected_status: tuple[int, ...] = (200, 206),
+    ) -> Response:
+        if not session_id:
+            raise ValueError("session_id is required")
+        if not path:
+            raise ValueError("path is required")
+
+        url = f"{self.base_url}/sandbox/sessions/{session_id}/files/content/"
+        response = self._session.get(
+            url,
+            params={"path": path},
+            headers=self._range_headers(offset),
+            stream=True,
+            timeout=self.timeout,
         )
+        if response.status_code not in expected_status:
+            try:
+                self._ensure_ok(response, expected_status=expected_status)
+            finally:
+                response.close()
+        return response
 
-    def _build_artifact(self, data: Mapping[str, Any]) -> SandboxArtifact:
-        try:
-            artifact_id = str(data["id"])
-            filename = str(data.get("filename") or "")
-        except Exception as exc:  # noqa: BLE001
-            raise DeepAgentError(f"Unexpected sandbox artifact payload: {data}") from exc
-        content_type = str(data.get("content_type")) if data.get("content_type") else None
+    def _iter_body(self, response: Response, chunk_size: int) -> Iterator[bytes]:
         try:
-            size_bytes = int(data.get("size_bytes") or 0)
-        except (TypeError, ValueError):
-            size_bytes = 0
-        download_url = str(data.get("download_url")) if data.get("download_url") else None
-        return SandboxArtifact(
-            artifact_id=artifact_id,
-            filename=filename,
-            content_type=content_type,
-            size_bytes=size_bytes,
-            download_url=download_url,
-            raw=data,
-        )
+            for chunk in response.iter_content(chunk_size=chunk_size):
+                if chunk:
+                    yield chunk
+        finally:
+            response.close()
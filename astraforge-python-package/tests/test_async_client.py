@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import re
+
+import pytest
+
+httpx = pytest.importorskip("httpx")
+
+from astraforge_toolkit.async_backend import AsyncSandboxBackend  # noqa: E402
+from astraforge_toolkit.async_client import AsyncDeepAgentClient  # noqa: E402
+
+
+class _Rt:
+    config = {"configurable": {"sandbox_session_id": "live"}}
+
+
+def _client(handler) -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+def test_stream_message_iterates_sse_without_blocking():
+    def handler(request: httpx.Request) -> httpx.Response:
+        assert request.url.path == "/api/deepagent/conversations/c1/messages/"
+        assert json.loads(request.content)["stream"] is True
+        body = 'data: {"tokens": "Hel"}\n\n: keepalive\n\ndata: {"tokens": "lo"}\n\ndata: [1]\n\n'
+        return httpx.Response(200, text=body, headers={"Content-Type": "text/event-stream"})
+
+    async def run() -> list:
+        client = AsyncDeepAgentClient(
+            base_url="http://localhost/api", api_key="key", client=_client(handler)
+        )
+        async with client:
+            return [chunk async for chunk in client.stream_message("c1", "hi")]
+
+    assert asyncio.run(run()) == [{"tokens": "Hel"}, {"tokens": "lo"}, {"data": [1]}]
+
+
+def test_async_client_surfaces_api_errors():
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(404, json={"detail": "Not found."})
+
+    async def run() -> None:
+        client = AsyncDeepAgentClient(
+            base_url="http://localhost/api", api_key="key", client=_client(handler)
+        )
+        async with client:
+            await client.get_sandbox_session("missing")
+
+    with pytest.raises(RuntimeError, match="Not found"):
+        asyncio.run(run())
+
+
+def test_async_client_streams_uploads_and_ranged_downloads(tmp_path):
+    data = b"abcdefghij" * 50
+    uploaded: list[bytes] = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        if request.method == "POST":
+            assert "content-length" not in request.headers
+            uploaded.append(b"".join([part async for part in request.stream]))
+            return httpx.Response(200, json={"exit_code": 0})
+        start = int(request.headers["Range"][len("bytes=") : -1])
+        return httpx.Response(
+            206,
+            content=data[start:],
+            headers={"Content-Range": f"bytes {start}-{len(data) - 1}/{len(data)}"},
+        )
+
+    async def chunks():
+        yield "hello "
+        yield b"world"
+
+    target = tmp_path / "out.bin"
+    target.write_bytes(data[:120])
+
+    async def run() -> tuple[bytes, int]:
+        async with AsyncDeepAgentClient(
+            base_url="http://localhost/api", api_key="key", client=_client(handler)
+        ) as client:
+            await client.upload_file("s1", "/workspace/up.txt", content=chunks())
+            tail = b"".join([c async for c in client.iter_file_content("s1", "/x", offset=490)])
+            size = await client.download_file("s1", "/x", target, resume=True)
+            return tail, size
+
+    tail, size = asyncio.run(run())
+
+    assert uploaded == [b"hello world"]
+    assert tail == data[490:]
+    assert size == len(data)
+    assert target.read_bytes() == data
+
+
+def test_async_backend_overlaps_concurrent_reads():
+    in_flight = 0
+    peak = 0
+    gets: list[str] = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal in_flight, peak
+        if request.method == "GET":
+            gets.append(request.url.path)
+            return httpx.Response(
+                200,
+                json={"id": "live", "status": "ready", "workspace_path": "/workspace"},
+            )
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.05)
+        in_flight -= 1
+        command = json.loads(request.content)["command"]
+        name = re.search(r"/workspace/(\S+\.py)", command).group(1)
+        stdout = f"contents of {name}\n__ASTRAFORGE_READ_TOTAL__ 1\n"
+        return httpx.Response(200, json={"exit_code": 0, "stdout": stdout, "stderr": ""})
+
+    backend = AsyncSandboxBackend(
+        _Rt(),
+        base_url="http://localhost/api",
+        api_key="key",
+        client=_client(handler),
+    )
+    # Readiness would otherwise be checked with the synchronous client in a worker thread.
+    backend.inner._ready_session_id = backend.inner._session_id = "live"
+
+    async def run() -> list[str]:
+        async with backend:
+            return await asyncio.gather(*(backend.aread(f"/workspace/f{i}.py") for i in range(5)))
+
+    pages = asyncio.run(run())
+
+    assert [page.split("\t", 1)[1] for page in pages] == [f"contents of f{i}.py" for i in range(5)]
+    assert peak == 5
+    assert gets == []
+    assert asyncio.run(backend.aread("/etc/passwd")).startswith("Path '/etc/passwd' is outside")
@@ -1,8 +1,15 @@
 from __future__ import annotations
 
 import json
+import subprocess
+from datetime import datetime, timezone
 
-from astraforge_toolkit.backend import _SandboxBackend
+from deepagents.middleware.filesystem import FilesystemMiddleware
+from langchain.agents import create_agent
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from astraforge_toolkit.backend import GrepNoticeMiddleware, _SandboxBackend, _ShellResult
 
 
 class _DummyRt:
@@ -16,13 +23,21 @@ class _DummySession:
         self.post_calls: list[tuple[str, dict]] = []
         self._get_payloads = list(get_payloads)
         self._post_json = post_json
+        self.headers: dict[str, str] = {}
 
     def get(self, url, **kwargs):  # type: ignore[override]
         self.get_calls.append((url, kwargs))
         from requests import Response
 
-        payload = self._get_payloads.pop(0) if self._get_payloads else {}
         response = Response()
+        if url.endswith("/events/"):
+            # Servers without the status event stream.
+            response.status_code = 404
+            response._content = b"{}"
+            response._content_consumed = True
+            response.url = url
+            return response
+        payload = self._get_payloads.pop(0) if self._get_payloads else {}
         response.status_code = 200
         response._content = json.dumps(payload).encode("utf-8")
         response.url = url
@@ -46,6 +61,7 @@ class _DummySessionWith404:
         self.post_calls: list[tuple[str, dict]] = []
         self._get_payloads = list(get_payloads)
         self._post_responses = list(post_responses)
+        self.headers: dict[str, str] = {}
 
     def get(self, url, **kwargs):  # type: ignore[override]
         self.get_calls.append((url, kwargs))
@@ -209,3 +225,233 @@ def test_http_backend_drops_snapshot_when_restore_is_corrupted(monkeypatch):
     assert first_payload.get("id") == "pinned-session"
     assert "id" not in second_payload and second_payload.get("restore_snapshot_id") == "snap-123"
     assert "restore_snapshot_id" not in third_payload and "id" not in third_payload
+
+
+class _DummyAsyncSession:
+    """Server that answers creation with 202/starting and publishes readiness over SSE."""
+
+    def __init__(self) -> None:
+        self.headers: dict[str, str] = {}
+        self.get_calls: list[tuple[str, dict]] = []
+        self.post_calls: list[tuple[str, dict]] = []
+
+    def post(self, url, **kwargs):  # type: ignore[override]
+        self.post_calls.append((url, kwargs))
+        from requests import Response
+
+        response = Response()
+        response.status_code = 202
+        payload = {"id": "async-session", "status": "starting"}
+        response._content = json.dumps(payload).encode("utf-8")
+        response.url = url
+        return response
+
+    def get(self, url, **kwargs):  # type: ignore[override]
+        self.get_calls.append((url, kwargs))
+        import io
+
+        from requests import Response
+
+        starting = {"id": "async-session", "status": "starting", "workspace_path": "/workspace"}
+        ready = {"id": "async-session", "status": "ready", "workspace_path": "/workspace-async"}
+        body = (
+            f"event: status\ndata: {json.dumps(starting)}\n\n"
+            ": heartbeat\n\n"
+            f"event: status\ndata: {json.dumps(ready)}\n\n"
+        )
+        response = Response()
+        response.status_code = 200
+        response.headers["Content-Type"] = "text/event-stream"
+        response.raw = io.BytesIO(body.encode("utf-8"))
+        response.url = url
+        return response
+
+
+def test_http_backend_waits_on_status_events_for_async_creation():
+    session = _DummyAsyncSession()
+    backend = _SandboxBackend(
+        _DummyRt(),
+        base_url="http://localhost/api",
+        api_key="key",
+        session=session,  # type: ignore[arg-type]
+    )
+
+    session_id = backend._start_session()
+
+    assert session_id == "async-session"
+    assert backend._workspace_root == "/workspace-async"
+    assert session.post_calls[0][1]["headers"]["Prefer"] == "respond-async"
+    [(url, kwargs)] = session.get_calls
+    assert url.endswith("/sandbox/sessions/async-session/events/")
+    assert kwargs["stream"] is True
+
+
+class _CountingServer:
+    """Fake API that records every request and serves sessions from an in-memory table."""
+
+    def __init__(self, sessions: dict[str, dict]) -> None:
+        self.headers: dict[str, str] = {}
+        self.sessions = sessions
+        self.requests: list[tuple[str, str]] = []
+        self.not_ready: set[str] = set()
+
+    def _response(self, url: str, status_code: int, payload: dict):
+        from requests import Response
+
+        response = Response()
+        response.status_code = status_code
+        response._content = json.dumps(payload).encode("utf-8")
+        response.url = url
+        return response
+
+    def get(self, url, **kwargs):  # type: ignore[override]
+        self.requests.append(("GET", url))
+        session_id = url.rstrip("/").rsplit("/", 1)[-1]
+        if url.endswith("/events/") or session_id not in self.sessions:
+            return self._response(url, 404, {"detail": "Not found."})
+        return self._response(url, 200, self.sessions[session_id])
+
+    def post(self, url, **kwargs):  # type: ignore[override]
+        self.requests.append(("POST", url))
+        if url.endswith("/sandbox/sessions/"):
+            self.sessions["restored"] = {
+                "id": "restored",
+                "status": "ready",
+                "workspace_path": "/workspace",
+                "expires_at": "2999-01-01T00:00:00Z",
+            }
+            return self._response(url, 201, self.sessions["restored"])
+        session_id = url.split("/sandbox/sessions/", 1)[1].split("/", 1)[0]
+        if session_id in self.not_ready:
+            return self._response(url, 400, {"detail": "Sandbox is not ready for execution"})
+        payload = {"exit_code": 0, "stdout": f"ran in {session_id}", "stderr": ""}
+        return self._response(url, 200, payload)
+
+
+def test_http_backend_caches_readiness_and_recovers_lazily():
+    server = _CountingServer(
+        {
+            "live": {
+                "id": "live",
+                "status": "ready",
+                "workspace_path": "/workspace",
+                "expires_at": "2999-01-01T00:00:00Z",
+                "metadata": {"latest_snapshot_id": "snap-1"},
+            }
+        }
+    )
+    backend = _SandboxBackend(
+        _DummyRt(session_id="live"),
+        base_url="http://localhost/api",
+        api_key="key",
+        session=server,  # type: ignore[arg-type]
+    )
+
+    assert backend.shell("true") == "ran in live"
+    server.requests.clear()
+    for _ in range(3):
+        backend.shell("true")
+    # Steady state: one POST per tool call, no readiness GET.
+    assert [method for method, _ in server.requests] == ["POST", "POST", "POST"]
+
+    server.requests.clear()
+    server.not_ready.add("live")
+    server.sessions["live"]["status"] = "terminated"
+
+    assert backend.shell("true") == "ran in restored"
+    assert [(method, url.split("/api", 1)[1]) for method, url in server.requests] == [
+        ("POST", "/sandbox/sessions/live/shell/"),
+        ("GET", "/sandbox/sessions/live/"),
+        ("POST", "/sandbox/sessions/"),
+        ("POST", "/sandbox/sessions/restored/shell/"),
+    ]
+
+    server.requests.clear()
+    backend.shell("true")
+    assert len(server.requests) == 1
+
+
+def test_http_backend_rechecks_readiness_after_expiry():
+    server = _CountingServer(
+        {
+            "live": {
+                "id": "live",
+                "status": "ready",
+                "workspace_path": "/workspace",
+                "expires_at": "2999-01-01T00:00:00Z",
+            }
+        }
+    )
+    backend = _SandboxBackend(
+        _DummyRt(session_id="live"),
+        base_url="http://localhost/api",
+        api_key="key",
+        session=server,  # type: ignore[arg-type]
+    )
+    backend.shell("true")
+
+    # The session reaches its max lifetime: the cached expiry forces one readiness check.
+    server.sessions["live"]["expires_at"] = "2000-01-01T00:00:00Z"
+    backend._ready_expires_at = datetime(2000, 1, 1, tzinfo=timezone.utc)
+    server.requests.clear()
+
+    assert backend.shell("true") == "ran in restored"
+    assert [method for method, _ in server.requests] == ["GET", "POST", "POST"]
+
+
+def test_read_many_reports_paths_missing_from_a_short_batch_response(monkeypatch):
+    backend = _SandboxBackend(
+        _DummyRt(session_id="live"),
+        base_url="http://localhost/api",
+        api_key="key",
+        session=_CountingServer({}),  # type: ignore[arg-type]
+    )
+    monkeypatch.setattr(
+        backend,
+        "batch",
+        lambda operations, **_: [
+            {"index": 0, "op": "read", "ok": True, "content": "hello", "total_lines": 1}
+        ],
+    )
+
+    first, second = backend.read_many(["/workspace/a.txt", "/workspace/b.txt"])
+
+    assert "hello" in first
+    assert second == "Error: No result returned for '/workspace/b.txt'"
+
+
+class _ToolCallingFakeModel(GenericFakeChatModel):
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+
+def test_grep_tool_output_carries_the_truncation_notice(tmp_path, monkeypatch):
+    monkeypatch.setenv("ASTRA_FORGE_GREP_MAX_MATCHES", "20")
+    (tmp_path / "app.log").write_text("".join(f"hit {i}\n" for i in range(500)))
+    backend = _SandboxBackend(
+        _DummyRt(session_id="s1"),
+        base_url="http://localhost/api",
+        api_key="key",
+        root_dir=str(tmp_path),
+        session=_DummySession(get_payloads=[], post_json={}),  # type: ignore[arg-type]
+    )
+
+    def _local_shell(command, cwd=None):
+        done = subprocess.run(["sh", "-c", command], capture_output=True, text=True, check=False)
+        return _ShellResult(exit_code=done.returncode, stdout=done.stdout, stderr=done.stderr)
+
+    monkeypatch.setattr(backend, "_shell", _local_shell)
+    call = {"name": "grep", "args": {"pattern": "hit", "path": str(tmp_path)}, "id": "capped"}
+    model = _ToolCallingFakeModel(
+        messages=iter([AIMessage(content="", tool_calls=[call]), AIMessage(content="done")])
+    )
+    agent = create_agent(
+        model,
+        middleware=[FilesystemMiddleware(backend=lambda _rt: backend), GrepNoticeMiddleware()],
+    )
+
+    result = agent.invoke({"messages": [HumanMessage(content="find hits")]})
+
+    output = next(m.content for m in result["messages"] if isinstance(m, ToolMessage))
+    assert output.startswith(str(tmp_path / "app.log"))
+    assert output.endswith("refine the pattern or narrow path/glob to see the rest.")
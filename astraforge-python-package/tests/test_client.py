@@ -1,3 +1,4 @@
+import io
 import json
 
 from requests import Response, Session
@@ -66,3 +67,107 @@ def test_get_file_content_replaces_invalid_bytes_on_decode():
 
     assert isinstance(content, str)
     assert "hello" in content
+
+
+def test_run_batch_posts_all_operations_in_one_request():
+    results = {"results": [{"index": 0, "op": "read", "ok": True}], "duration_sec": 0.01}
+    session = DummySession(post_json=results)
+    client = DeepAgentClient(base_url="http://localhost/api", api_key="key", session=session)
+
+    payload = client.run_batch(
+        "abc",
+        [{"op": "read", "path": "/workspace/a.py"}, {"op": "stat", "path": "/workspace/b.py"}],
+        parallel=True,
+    )
+
+    assert payload == results
+    assert len(session.post_calls) == 1
+    url, kwargs = session.post_calls[0]
+    assert url.endswith("/sandbox/sessions/abc/batch/")
+    assert [op["op"] for op in kwargs["json"]["operations"]] == ["read", "stat"]
+    assert kwargs["json"]["parallel"] is True
+    assert kwargs["json"]["stop_on_error"] is False
+
+
+class RangeSession(Session):
+    """Serves ``files/content`` from memory, honouring ``Range: bytes=N-`` like the API."""
+
+    def __init__(self, data: bytes, *, honour_range: bool = True):
+        super().__init__()
+        self.data = data
+        self.honour_range = honour_range
+        self.get_calls: list[tuple[str, dict]] = []
+
+    def get(self, url, **kwargs):  # type: ignore[override]
+        self.get_calls.append((url, kwargs))
+        response = Response()
+        response.url = url
+        range_header = kwargs.get("headers", {}).get("Range")
+        start = int(range_header[len("bytes=") : -1]) if range_header else 0
+        if range_header and self.honour_range and start >= len(self.data):
+            response.status_code = 416
+            response.headers["Content-Range"] = f"bytes */{len(self.data)}"
+            response.raw = io.BytesIO(b"")
+            return response
+        if range_header and self.honour_range:
+            response.status_code = 206
+            size = len(self.data)
+            response.headers["Content-Range"] = f"bytes {start}-{size - 1}/{size}"
+            response.raw = io.BytesIO(self.data[start:])
+        else:
+            response.status_code = 200
+            response.raw = io.BytesIO(self.data)
+        return response
+
+
+def test_upload_file_streams_file_objects_and_chunk_iterables():
+    session = DummySession(post_json={"exit_code": 0})
+    client = DeepAgentClient(base_url="http://localhost/api", api_key="key", session=session)
+    handle = io.BytesIO(b"from a file")
+
+    client.upload_file("abc", "/workspace/a.bin", content=handle)
+    client.upload_file("abc", "/workspace/b.txt", content=(part for part in ["one ", b"two"]))
+
+    (_, file_kwargs), (_, iter_kwargs) = session.post_calls
+    assert file_kwargs["data"] is handle
+    assert not isinstance(iter_kwargs["data"], (bytes, list))
+    assert b"".join(iter_kwargs["data"]) == b"one two"
+
+
+def test_iter_file_content_streams_from_offset():
+    session = RangeSession(b"0123456789" * 100)
+    client = DeepAgentClient(base_url="http://localhost/api", api_key="key", session=session)
+
+    chunks = list(client.iter_file_content("abc", "/workspace/big.bin", offset=995, chunk_size=2))
+
+    assert b"".join(chunks) == b"56789"
+    assert len(chunks) == 3
+    _, kwargs = session.get_calls[0]
+    assert kwargs["stream"] is True
+    assert kwargs["headers"] == {"Range": "bytes=995-"}
+
+    # A server that ignores Range still yields only the requested suffix.
+    session.honour_range = False
+    assert b"".join(client.iter_file_content("abc", "/workspace/big.bin", offset=995)) == b"56789"
+
+
+def test_download_file_resumes_partial_downloads(tmp_path):
+    data = bytes(range(256)) * 40
+    session = RangeSession(data)
+    client = DeepAgentClient(base_url="http://localhost/api", api_key="key", session=session)
+    target = tmp_path / "out.bin"
+    target.write_bytes(data[:1000])
+
+    assert client.download_file("abc", "/workspace/out.bin", target, resume=True) == len(data)
+    assert target.read_bytes() == data
+    assert session.get_calls[-1][1]["headers"] == {"Range": "bytes=1000-"}
+
+    # Already complete: the 416 reply is treated as done and nothing is rewritten.
+    assert client.download_file("abc", "/workspace/out.bin", target, resume=True) == len(data)
+    assert target.read_bytes() == data
+
+    # Without resume (or when Range is ignored) the file is rewritten from the start.
+    target.write_bytes(b"stale")
+    session.honour_range = False
+    assert client.download_file("abc", "/workspace/out.bin", target, resume=True) == len(data)
+    assert target.read_bytes() == data
@@ -8,6 +8,8 @@ from django.conf import settings
 from django.db import models
 from django.utils import timezone
 
+from astraforge.infrastructure.activity import ActivityBuffer
+
 IDENTITY_PROVIDER_PASSWORD = "password"
 
 
@@ -46,9 +48,14 @@ class ApiKey(models.Model):
 
     def mark_used(self):
         self.last_used_at = timezone.now()
+        if API_KEY_ACTIVITY.record(self.pk, self.last_used_at):
+            return
         self.save(update_fields=["last_used_at"])
 
 
+API_KEY_ACTIVITY = ActivityBuffer("activity:api_key", ApiKey, ["last_used_at"])
+
+
 class AccessStatus(models.TextChoices):
     PENDING = "pending", "Pending approval"
     APPROVED = "approved", "Approved"
@@ -7,9 +7,14 @@ from datetime import datetime, timezone
 import json
 import subprocess
 import uuid
-from typing import TYPE_CHECKING, Any, Protocol
-
-from astraforge.domain.models.request import ExecutionPlan, Request, RequestState
+from typing import TYPE_CHECKING, Any, Iterable, Protocol
+
+from astraforge.domain.models.request import (
+    ExecutionPlan,
+    Request,
+    RequestState,
+    RequestSummary,
+)
 from astraforge.domain.models.workspace import ExecutionOutcome, WorkspaceContext
 
 if TYPE_CHECKING:
@@ -23,10 +28,37 @@ if TYPE_CHECKING:
     )
 
 
+class StaleRequestError(RuntimeError):
+    """The request was changed by another writer since it was loaded."""
+
+
 class RequestRepository(Protocol):
     """Persistence boundary for request aggregates."""
 
     def save(self, request: Request) -> None:  # pragma: no cover
+        """Write the whole request; ``StaleRequestError`` if its ``version`` is outdated."""
+        ...
+
+    # Partial writes for hot paths. They never overwrite columns or metadata keys they
+    # were not asked to write, so concurrent writers touching different keys both win.
+
+    def update(
+        self,
+        request: Request,
+        *,
+        fields: Iterable[str] = (),
+        metadata_keys: Iterable[str] = (),
+    ) -> None:  # pragma: no cover
+        """Persist only ``fields`` and the listed top-level ``metadata`` keys of ``request``.
+
+        A key missing from ``request.metadata`` is removed from the stored document.
+        """
+        ...
+
+    def append_metadata(
+        self, request: Request, key: str, item: Any
+    ) -> None:  # pragma: no cover
+        """Append ``item`` to the list at ``metadata[key]`` in place, locally and in storage."""
         ...
 
     def get(self, request_id: str, *, user_id: str | None = None) -> Request:  # pragma: no cover
@@ -35,6 +67,52 @@ class RequestRepository(Protocol):
     def list(self, *, user_id: str | None = None) -> list[Request]:  # pragma: no cover
         ...
 
+    def list_summaries(
+        self,
+        *,
+        user_id: str | None = None,
+        tenant_ids: Iterable[str] | None = None,
+        offset: int = 0,
+        limit: int | None = None,
+    ) -> list[RequestSummary]:  # pragma: no cover
+        """Newest-first summaries; filtering and slicing happen in the store."""
+        ...
+
+    def count(
+        self, *, user_id: str | None = None, tenant_ids: Iterable[str] | None = None
+    ) -> int:  # pragma: no cover
+        ...
+
+    # Runs are stored beside the request, not inside ``metadata``, so streaming an event
+    # is an append instead of a rewrite of the whole request.
+
+    def create_run(self, request_id: str, run: dict[str, Any]) -> None:  # pragma: no cover
+        ...
+
+    def append_run_event(
+        self, request_id: str, run_id: str, event: dict[str, Any]
+    ) -> None:  # pragma: no cover
+        ...
+
+    def update_run(self, run_id: str, **fields: Any) -> None:  # pragma: no cover
+        ...
+
+    def list_runs(
+        self, request_ids: Iterable[str], *, include_events: bool = False
+    ) -> dict[str, list[dict[str, Any]]]:  # pragma: no cover
+        """Runs grouped by request id, oldest first.
+
+        Without ``include_events`` only summary fields are returned (``diff`` is replaced
+        by ``diff_size``); with it, the full run including ``events``.
+        """
+        ...
+
+    def get_run(
+        self, run_id: str, *, user_id: str | None = None
+    ) -> tuple[Request, dict[str, Any]]:  # pragma: no cover
+        """The full run (with ``events``) and its request; ``KeyError`` when not found."""
+        ...
+
 
 @dataclass
 class SubmitRequest:
@@ -67,14 +145,13 @@ class ExecuteRequest:
             "status": "running",
             "started_at": _timestamp(),
             "finished_at": None,
-            "events": [],
-            "diff": None,
-            "reports": {},
-            "artifacts": {},
         }
-        existing_runs = list(request.metadata.get("runs", []))
-        existing_runs.append(run_record)
-        request.metadata["runs"] = existing_runs
+        self.repository.create_run(request.id, run_record)
+
+        def finish_run(status: str, **fields: Any) -> None:
+            self.repository.update_run(
+                run_record["id"], status=status, finished_at=_timestamp(), **fields
+            )
 
         def publish(event: dict[str, Any]) -> None:
             created = event.get("created_at")
@@ -90,11 +167,9 @@ class ExecuteRequest:
                 "run_id": run_record["id"],
                 **event_payload,
             }
-            run_record["events"].append(payload)
+            self.repository.append_run_event(request.id, run_record["id"], payload)
             self.run_log.publish(request.id, payload)
 
-        self.repository.save(request)
-
         publish(
             {
                 "type": "status",
@@ -103,7 +178,7 @@ class ExecuteRequest:
             }
         )
         request.transition(RequestState.EXECUTING)
-        self.repository.save(request)
+        self.repository.update(request, fields=["state"])
 
         workspace: WorkspaceContext | None = None
         try:
@@ -112,16 +187,18 @@ class ExecuteRequest:
                 stream=publish,
             )
             request.metadata["workspace"] = workspace.as_dict()
-            self.repository.save(request)
+            self.repository.update(request, metadata_keys=["workspace"])
 
             outcome = self.workspace_operator.run_agent(
                 request,
                 workspace,
                 stream=publish,
             )
+            changed_keys = ["execution"]
             history_content = outcome.artifacts.get("history")
             if history_content:
                 request.metadata["history_jsonl"] = history_content
+                changed_keys.append("history_jsonl")
             final_message = outcome.artifacts.get("final_message")
             if not isinstance(final_message, str):
                 derived = self._extract_assistant_message_from_history(history_content)
@@ -141,29 +218,31 @@ class ExecuteRequest:
             commit_hash = outcome.artifacts.get("commit")
             if commit_hash:
                 request.metadata["last_commit"] = commit_hash
+                changed_keys.append("last_commit")
             request.transition(RequestState.PATCH_READY)
-            run_record["status"] = "completed"
-            run_record["finished_at"] = _timestamp()
-            run_record["diff"] = outcome.diff
-            run_record["reports"] = outcome.reports
-            run_record["artifacts"] = outcome.artifacts
-            self.repository.save(request)
+            self.repository.update(request, fields=["state"], metadata_keys=changed_keys)
+            finish_run(
+                "completed",
+                diff=outcome.diff,
+                reports=outcome.reports,
+                artifacts=outcome.artifacts,
+            )
             publish({"type": "completed", "message": "Execution finished"})
             return outcome
         except subprocess.CalledProcessError as exc:
-            request.metadata.setdefault("execution_errors", []).append(
+            self.repository.append_metadata(
+                request,
+                "execution_errors",
                 {
                     "command": " ".join(str(part) for part in exc.cmd),
                     "exit_code": exc.returncode,
                     "output": (exc.output or "").strip(),
-                }
+                },
             )
             request.transition(RequestState.FAILED)
-            run_record["status"] = "failed"
-            run_record["finished_at"] = _timestamp()
-            self.repository.save(request)
+            self.repository.update(request, fields=["state"])
             message = exc.output.strip() if isinstance(exc.output, str) else str(exc)
-            run_record["error"] = message or "Command execution failed"
+            finish_run("failed", error=message or "Command execution failed")
             publish(
                 {
                     "type": "error",
@@ -174,10 +253,8 @@ class ExecuteRequest:
             raise RuntimeError(message or "Command execution failed") from exc
         except Exception as exc:
             request.transition(RequestState.FAILED)
-            run_record["status"] = "failed"
-            run_record["finished_at"] = _timestamp()
-            run_record["error"] = str(exc)
-            self.repository.save(request)
+            self.repository.update(request, fields=["state"])
+            finish_run("failed", error=str(exc))
             publish(
                 {
                     "type": "error",
@@ -189,7 +266,6 @@ class ExecuteRequest:
         finally:
             if workspace is not None:
                 self.workspace_operator.teardown(workspace)
-            self.repository.save(request)
 
     def _emit(self, request: Request, event: dict[str, object]) -> None:
         payload = {"request_id": request.id, **event}
@@ -211,7 +287,6 @@ class ExecuteRequest:
             return
         existing = request.metadata.get("chat_messages")
         messages: list[dict[str, object]] = existing if isinstance(existing, list) else []
-        messages = list(messages)
         for entry in messages:
             if (
                 isinstance(entry, dict)
@@ -219,14 +294,16 @@ class ExecuteRequest:
                 and str(entry.get("message", "")).strip() == message_text
             ):
                 return
-        messages.append(
+        # Appended in place so user messages posted during the run are kept.
+        self.repository.append_metadata(
+            request,
+            "chat_messages",
             {
                 "role": "assistant",
                 "message": message_text,
                 "created_at": created_at,
-            }
+            },
         )
-        request.metadata["chat_messages"] = messages
 
     def _extract_assistant_message_from_history(self, history_content: object) -> str | None:
         if not isinstance(history_content, str):
@@ -307,7 +384,9 @@ class SubmitMergeRequest:
         request.metadata.setdefault("mr", {})
         request.metadata["mr"].update({**proposal.as_dict(), "ref": mr_ref})
         request.transition(RequestState.MR_OPENED)
-        self.repository.save(request)
+        # The MR already exists on the provider; a partial write cannot be lost to a
+        # chat message or LLM setting saved while ``open_mr`` was running.
+        self.repository.update(request, fields=["state"], metadata_keys=["mr"])
         if self.run_log is not None:
             self.run_log.publish(
                 request.id,
@@ -364,7 +443,9 @@ class BootstrapEnvironment:
         request.metadata["environment"] = environment
         request.metadata["executor"] = executor_info
         request.transition(RequestState.SPEC_READY)
-        self.repository.save(request)
+        self.repository.update(
+            request, fields=["state"], metadata_keys=["environment", "executor"]
+        )
         return environment
 
     def _launch_command(
@@ -398,7 +479,7 @@ class GeneratePlan:
         plan = self.executor.plan(request)
         request.metadata["plan"] = plan
         request.transition(RequestState.PLAN_READY)
-        self.repository.save(request)
+        self.repository.update(request, fields=["state"], metadata_keys=["plan"])
         return plan
 
 
@@ -417,7 +498,7 @@ class ApplyPlan:
             change_set = self.executor.apply(plan, repo, workspace_ref)
             request.metadata["change_set"] = change_set
             request.transition(RequestState.PATCH_READY)
-            self.repository.save(request)
+            self.repository.update(request, fields=["state"], metadata_keys=["change_set"])
             mr_ref = self.vcs.open_mr(
                 repo=repo,
                 source_branch=branch,
@@ -428,7 +509,7 @@ class ApplyPlan:
             )
             request.metadata["mr_ref"] = mr_ref
             request.transition(RequestState.MR_OPENED)
-            self.repository.save(request)
+            self.repository.update(request, fields=["state"], metadata_keys=["mr_ref"])
             return mr_ref
         finally:
             self.provisioner.cleanup(workspace_ref)
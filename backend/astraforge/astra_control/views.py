@@ -252,10 +252,8 @@ class AstraControlSessionViewSet(viewsets.ModelViewSet):
 
         try:
             orchestrator = SandboxOrchestrator()
-            file_content = uploaded_file.read()
-
-            # Upload file to sandbox
-            orchestrator.upload_bytes(session.sandbox_session, sandbox_path, file_content)
+            # Upload file to sandbox, streaming it straight from the upload handler
+            orchestrator.upload_bytes(session.sandbox_session, sandbox_path, uploaded_file)
 
             # Track document in session state
             document_metadata = {
@@ -307,11 +307,22 @@ CELERY_TASK_ROUTES = {
     "astraforge.application.tasks.*": {"queue": "astraforge.core"},
 }
 SANDBOX_REAP_INTERVAL_SEC = env.int("SANDBOX_REAP_INTERVAL_SEC", default=60)
+SANDBOX_WARM_POOL_INTERVAL_SEC = env.int("SANDBOX_WARM_POOL_INTERVAL_SEC", default=30)
+# Buffered last-activity / last-used timestamps are written back this often (0 writes through).
+ACTIVITY_FLUSH_INTERVAL_SEC = env.int("ACTIVITY_FLUSH_INTERVAL_SEC", default=5)
 CELERY_BEAT_SCHEDULE = {
     "reap-sandbox-sessions": {
         "task": "astraforge.sandbox.tasks.reap_sandboxes",
         "schedule": SANDBOX_REAP_INTERVAL_SEC,
     },
+    "refill-sandbox-warm-pool": {
+        "task": "astraforge.sandbox.tasks.refill_warm_pool",
+        "schedule": SANDBOX_WARM_POOL_INTERVAL_SEC,
+    },
+    "flush-activity": {
+        "task": "astraforge.sandbox.tasks.flush_activity",
+        "schedule": max(1, ACTIVITY_FLUSH_INTERVAL_SEC),
+    },
 }
 
 PROVIDER_FACTORIES = {
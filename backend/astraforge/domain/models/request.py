@@ -49,6 +49,8 @@ class Request:
     updated_at: datetime = field(default_factory=datetime.utcnow)
     artifacts: Dict[str, Any] = field(default_factory=dict)
     metadata: Dict[str, Any] = field(default_factory=dict)
+    # Stored row version this object was loaded at; used for optimistic locking on save.
+    version: int = 0
 
     def transition(self, target: RequestState) -> None:
         """Advance the request to a new state, enforcing allowed transitions."""
@@ -60,6 +62,23 @@ class Request:
         self.updated_at = datetime.utcnow()
 
 
+@dataclass(slots=True)
+class RequestSummary:
+    """List projection of a request without the heavy payload/metadata/artifact JSON."""
+
+    id: str
+    user_id: str
+    tenant_id: str
+    source: str
+    sender: str
+    state: RequestState
+    title: str
+    description: str
+    project: Dict[str, Any]
+    created_at: datetime
+    updated_at: datetime
+
+
 _ALLOWED_TRANSITIONS: Dict[RequestState, List[RequestState]] = {
     RequestState.RECEIVED: [RequestState.SPEC_READY, RequestState.EXECUTING, RequestState.FAILED],
     RequestState.SPEC_READY: [
@@ -0,0 +1,142 @@
+"""Write-behind buffer for hot "last seen" timestamps.
+
+Sandbox commands and API-key requests used to UPDATE their row on every call.
+``ActivityBuffer.record`` instead keeps the newest timestamp per row in a Redis
+sorted set (``ZADD GT``), and ``flush`` writes everything pending in one
+``bulk_update`` before removing the flushed entries. Entries stay in Redis
+until the database write commits, so a worker crashing mid-flush loses
+nothing; the next flush (beat task, reaper sweep or sandbox termination)
+picks them up. When Redis is unreachable ``record`` returns ``False`` and the
+caller writes the row directly, exactly as before.
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from datetime import datetime, timezone as dt_timezone
+from typing import Iterable
+
+import redis
+from django.conf import settings
+from django.db import models
+
+logger = logging.getLogger(__name__)
+
+# Seconds to stop trying Redis after a connection error.
+_UNAVAILABLE_BACKOFF_SEC = 30
+
+_BUFFERS: list["ActivityBuffer"] = []
+_shared_client: "redis.Redis | None" = None
+_unavailable_until = 0.0
+
+
+def flush_interval() -> int:
+    """Seconds between scheduled flushes; ``0`` disables buffering entirely."""
+    return max(0, int(getattr(settings, "ACTIVITY_FLUSH_INTERVAL_SEC", 5) or 0))
+
+
+def _shared_redis() -> "redis.Redis | None":
+    global _shared_client
+    if time.monotonic() < _unavailable_until:
+        return None
+    if _shared_client is None:
+        _shared_client = redis.from_url(
+            settings.REDIS_URL, socket_connect_timeout=1, socket_timeout=2
+        )
+    return _shared_client
+
+
+def _mark_unavailable(exc: Exception) -> None:
+    global _unavailable_until
+    _unavailable_until = time.monotonic() + _UNAVAILABLE_BACKOFF_SEC
+    logger.debug("Activity buffer unavailable; writing through", extra={"error": str(exc)})
+
+
+class ActivityBuffer:
+    """Coalesces timestamp writes for ``fields`` of ``model`` rows, keyed by primary key."""
+
+    def __init__(
+        self,
+        key: str,
+        model: type[models.Model],
+        fields: Iterable[str],
+        *,
+        client: "redis.Redis | None" = None,
+    ) -> None:
+        self.key = key
+        self.model = model
+        self.fields = list(fields)
+        self.client = client
+        _BUFFERS.append(self)
+
+    def _redis(self) -> "redis.Redis | None":
+        if self.client is not None:
+            return self.client
+        if not flush_interval():
+            return None
+        return _shared_redis()
+
+    def record(self, pk, when: datetime) -> bool:
+        """Buffer ``when`` for row ``pk``; ``False`` means the caller must write it itself."""
+        client = self._redis()
+        if client is None:
+            return False
+        try:
+            client.zadd(self.key, {str(pk): when.timestamp()}, gt=True)
+        except redis.RedisError as exc:
+            _mark_unavailable(exc)
+            return False
+        return True
+
+    def take(self, pk) -> datetime | None:
+        """Remove and return the pending timestamp for ``pk`` without touching the database."""
+        client = self._redis()
+        if client is None:
+            return None
+        try:
+            pipe = client.pipeline()
+            pipe.zscore(self.key, str(pk))
+            pipe.zrem(self.key, str(pk))
+            score, _ = pipe.execute()
+        except redis.RedisError as exc:
+            _mark_unavailable(exc)
+            return None
+        return None if score is None else datetime.fromtimestamp(score, tz=dt_timezone.utc)
+
+    def flush(self) -> int:
+        """Persist every pending timestamp; returns the number of rows written."""
+        client = self._redis()
+        if client is None:
+            return 0
+        # Anything recorded after the cutoff stays queued for the next flush.
+        cutoff = time.time()
+        try:
+            entries = client.zrangebyscore(self.key, "-inf", cutoff, withscores=True)
+        except redis.RedisError as exc:
+            _mark_unavailable(exc)
+            return 0
+        if not entries:
+            return 0
+        pk_field = self.model._meta.pk
+        rows = []
+        for member, score in entries:
+            if isinstance(member, bytes):
+                member = member.decode("utf-8")
+            when = datetime.fromtimestamp(score, tz=dt_timezone.utc)
+            row = self.model(pk=pk_field.to_python(member))
+            for field in self.fields:
+                setattr(row, field, when)
+            rows.append(row)
+        self.model.objects.bulk_update(rows, self.fields, batch_size=500)
+        try:
+            client.zremrangebyscore(self.key, "-inf", cutoff)
+        except redis.RedisError as exc:
+            # Rows were written; re-flushing the same timestamps later is harmless.
+            _mark_unavailable(exc)
+        return len(rows)
+
+
+def flush_all() -> dict[str, int]:
+    """Flush every registered buffer (run by the ``flush-activity`` beat task)."""
+    return {buffer.key: buffer.flush() for buffer in _BUFFERS}
@@ -11,7 +11,7 @@ from deepagents import create_deep_agent
 from langchain_openai import ChatOpenAI
 
 from astraforge.domain.models.request import Request
-from astraforge.sandbox.deepagent_backend import SandboxBackend
+from astraforge.sandbox.deepagent_backend import GrepNoticeMiddleware, SandboxBackend
 
 
 def _should_disable_ssl_verify() -> bool:
@@ -473,6 +473,7 @@ def get_deep_agent(request: Request | None = None):
             "markdown plan and all generated HTML files."
         ),
         "tools": tools,
+        "middleware": [GrepNoticeMiddleware()],
     }
     subagents: list[Any] = [slide_deck_subagent]
 
@@ -483,6 +484,7 @@ def get_deep_agent(request: Request | None = None):
         "backend": backend_factory,
         "system_prompt": system_prompt,
         "subagents": subagents,
+        "middleware": [GrepNoticeMiddleware()],
     }
     if tools:
         create_kwargs["tools"] = tools
@@ -62,6 +62,19 @@ class KubernetesProvisioner(Provisioner):
             if exc.status not in (404, 410):
                 raise
 
+    def label(self, ref: str, labels: dict[str, str]) -> None:
+        """Merge ``labels`` into the pod's labels (used to hand warm pods to sessions)."""
+        namespace, name = self._parse_ref(ref)
+        api = self._ensure_api()
+        try:
+            api.patch_namespaced_pod(
+                name=name, namespace=namespace, body={"metadata": {"labels": labels}}
+            )
+        except ApiException as exc:
+            raise WorkspaceProvisioningError(
+                f"Failed to label workspace pod {name}: {exc.reason}"
+            ) from exc
+
     # internal helpers -----------------------------------------------------
 
     def _ensure_api(self) -> client.CoreV1Api:
@@ -1,13 +1,27 @@
 from __future__ import annotations
 
+import json
 import logging
+from collections import defaultdict
 from dataclasses import asdict
-from typing import Dict, List
+from datetime import datetime
+from typing import Any, Dict, Iterable, List
 
 from django.apps import apps
+from django.db import NotSupportedError, transaction
+from django.db.models import F, Func, JSONField, Q
+from django.db.models.functions import Length
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 
-from astraforge.application.use_cases import RequestRepository
-from astraforge.domain.models.request import Attachment, Request, RequestPayload, RequestState
+from astraforge.application.use_cases import RequestRepository, StaleRequestError
+from astraforge.domain.models.request import (
+    Attachment,
+    Request,
+    RequestPayload,
+    RequestState,
+    RequestSummary,
+)
 
 
 logger = logging.getLogger(__name__)
@@ -18,39 +32,153 @@ _LEGACY_STATE_ALIASES = {
 }
 
 
+_REMOVE = object()
+
+
+class _JSONKeyUpdate(Func):
+    """A JSON document with one top-level key set, appended to, or removed.
+
+    Rendered as ``jsonb_set``/``jsonb -`` on PostgreSQL and ``json_set``/``json_remove`` on
+    SQLite, so the rest of the stored document is left as the database currently has it.
+    """
+
+    output_field = JSONField()
+
+    def __init__(self, document, key: str, value: Any = _REMOVE, *, append: bool = False) -> None:
+        super().__init__(document)
+        self.key = key
+        self.value = value
+        self.append = append
+
+    def as_sql(self, compiler, connection, **extra_context):
+        raise NotSupportedError("JSON key updates require PostgreSQL or SQLite.")
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        document, params = compiler.compile(self.source_expressions[0])
+        current = f"COALESCE({document}, '{{}}'::jsonb)"
+        if self.value is _REMOVE:
+            return f"({current} - %s::text)", [*params, self.key]
+        if self.append:
+            value_sql = (
+                f"(CASE WHEN jsonb_typeof({current} -> %s::text) = 'array' "
+                f"THEN {current} -> %s::text ELSE '[]'::jsonb END) || jsonb_build_array(%s::jsonb)"
+            )
+            value_params = [*params, self.key, *params, self.key, json.dumps(self.value)]
+        else:
+            value_sql, value_params = "%s::jsonb", [json.dumps(self.value)]
+        return (
+            f"jsonb_set({current}, ARRAY[%s::text], {value_sql}, true)",
+            [*params, self.key, *value_params],
+        )
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        document, params = compiler.compile(self.source_expressions[0])
+        current = f"COALESCE({document}, '{{}}')"
+        path = '$."{}"'.format(self.key.replace('"', '\\"'))
+        if self.value is _REMOVE:
+            return f"json_remove({current}, %s)", [*params, path]
+        if self.append:
+            value_sql = (
+                f"json_insert(CASE WHEN json_type({current}, %s) = 'array' "
+                f"THEN json_extract({current}, %s) ELSE '[]' END, '$[#]', json(%s))"
+            )
+            value_params = [*params, path, *params, path, json.dumps(self.value)]
+        else:
+            value_sql, value_params = "json(%s)", [json.dumps(self.value)]
+        return f"json_set({current}, %s, {value_sql})", [*params, path, *value_params]
+
+
 class DjangoRequestRepository(RequestRepository):
     """Django ORM backed request repository."""
 
     def __init__(self) -> None:
         self.model = apps.get_model("requests", "RequestRecord")
+        self.run_model = apps.get_model("requests", "RunRecord")
+        self.run_event_model = apps.get_model("requests", "RunEventRecord")
 
     def save(self, request: Request) -> None:
-        payload = self._serialize_payload(request.payload)
-        existing = self.model.objects.filter(id=request.id).first()
-        if (
-            existing
-            and existing.user_id
-            and request.user_id
-            and str(existing.user_id) != str(request.user_id)
-        ):
-            raise PermissionError("Request already exists for a different user.")
-        defaults: Dict[str, object] = {
+        values: Dict[str, object] = {
             "user_id": request.user_id or None,
             "tenant_id": request.tenant_id,
             "source": request.source,
             "sender": request.sender,
-            "payload": payload,
+            "payload": self._serialize_payload(request.payload),
             "state": request.state.value,
             "artifacts": request.artifacts,
             "metadata": request.metadata,
         }
-        record, _created = self.model.objects.update_or_create(
-            id=request.id,
-            defaults=defaults,
+        now = timezone.now()
+        query = self.model.objects.filter(id=request.id, version=request.version)
+        if request.user_id:
+            query = query.filter(Q(user_id__isnull=True) | Q(user_id=request.user_id))
+        # QuerySet.update() bypasses auto_now.
+        if query.update(**values, version=F("version") + 1, updated_at=now):
+            request.version += 1
+            request.updated_at = now
+            return
+        existing = self.model.objects.filter(id=request.id).values("user_id").first()
+        if existing is None:
+            record = self.model.objects.create(id=request.id, version=1, **values)
+            # ensure timestamps are in sync with domain entity
+            request.version = 1
+            request.created_at = record.created_at
+            request.updated_at = record.updated_at
+            return
+        if (
+            existing["user_id"]
+            and request.user_id
+            and str(existing["user_id"]) != str(request.user_id)
+        ):
+            raise PermissionError("Request already exists for a different user.")
+        raise StaleRequestError(f"Request {request.id} was modified concurrently.")
+
+    def update(
+        self,
+        request: Request,
+        *,
+        fields: Iterable[str] = (),
+        metadata_keys: Iterable[str] = (),
+    ) -> None:
+        values: Dict[str, Any] = {}
+        for name in fields:
+            if name == "payload":
+                values[name] = self._serialize_payload(request.payload)
+            elif name == "state":
+                values[name] = request.state.value
+            elif name in {"tenant_id", "source", "sender", "artifacts"}:
+                values[name] = getattr(request, name)
+            else:
+                raise ValueError(f"Unsupported request field {name!r}")
+        document: Any = F("metadata")
+        keys = list(metadata_keys)
+        for key in keys:
+            document = _JSONKeyUpdate(document, key, request.metadata.get(key, _REMOVE))
+        if keys:
+            values["metadata"] = document
+        self._write(request, values)
+
+    def append_metadata(self, request: Request, key: str, item: Any) -> None:
+        current = request.metadata.get(key)
+        request.metadata[key] = [*(current if isinstance(current, list) else []), item]
+        self._write(
+            request, {"metadata": _JSONKeyUpdate(F("metadata"), key, item, append=True)}
         )
-        # ensure timestamps are in sync with domain entity
-        request.created_at = record.created_at
-        request.updated_at = record.updated_at
+
+    def _write(self, request: Request, values: Dict[str, Any]) -> None:
+        if not values:
+            return
+        now = timezone.now()
+        with transaction.atomic():
+            query = self.model.objects.filter(id=request.id)
+            if not query.update(**values, version=F("version") + 1, updated_at=now):
+                raise KeyError(request.id)
+            # The row stays locked until commit, so this is the version our write produced.
+            stored_version = query.values_list("version", flat=True).get()
+        # Adopt it only if no other writer got in since the request was loaded; otherwise
+        # the local copy lacks their changes and a later ``save()`` must still see it as stale.
+        if stored_version == request.version + 1:
+            request.version = stored_version
+        request.updated_at = now
 
     def get(self, request_id: str, *, user_id: str | None = None) -> Request:
         try:
@@ -68,8 +196,173 @@ class DjangoRequestRepository(RequestRepository):
             query = query.filter(user_id=user_id)
         return [self._to_domain(record) for record in query.order_by("-created_at")]
 
+    def list_summaries(
+        self,
+        *,
+        user_id: str | None = None,
+        tenant_ids: Iterable[str] | None = None,
+        offset: int = 0,
+        limit: int | None = None,
+    ) -> List[RequestSummary]:
+        # Only the JSON keys a summary needs are extracted; the payload, metadata and
+        # artifacts documents never leave the database.
+        rows = (
+            self._filtered(user_id, tenant_ids)
+            .order_by("-created_at", "-id")
+            .values(
+                "id",
+                "user_id",
+                "tenant_id",
+                "source",
+                "sender",
+                "state",
+                "created_at",
+                "updated_at",
+                "payload__title",
+                "payload__description",
+                "metadata__project",
+            )
+        )
+        rows = rows[offset:] if limit is None else rows[offset : offset + limit]
+        summaries = []
+        for row in rows:
+            project = row["metadata__project"]
+            summaries.append(
+                RequestSummary(
+                    id=str(row["id"]),
+                    user_id=str(row["user_id"]) if row["user_id"] else "",
+                    tenant_id=row["tenant_id"],
+                    source=row["source"],
+                    sender=row["sender"],
+                    state=self._coerce_state(row["state"]),
+                    title=row["payload__title"] or "",
+                    description=row["payload__description"] or "",
+                    project=project if isinstance(project, dict) else {},
+                    created_at=row["created_at"],
+                    updated_at=row["updated_at"],
+                )
+            )
+        return summaries
+
+    def count(
+        self, *, user_id: str | None = None, tenant_ids: Iterable[str] | None = None
+    ) -> int:
+        return self._filtered(user_id, tenant_ids).count()
+
+    def create_run(self, request_id: str, run: dict[str, Any]) -> None:
+        self.run_model.objects.create(
+            id=str(run["id"]),
+            request_id=request_id,
+            status=str(run.get("status") or "running"),
+            started_at=self._parse_timestamp(run.get("started_at")),
+            finished_at=self._parse_timestamp(run.get("finished_at")),
+        )
+
+    def append_run_event(self, request_id: str, run_id: str, event: dict[str, Any]) -> None:
+        self.run_event_model.objects.create(
+            run_id=run_id,
+            request_id=request_id,
+            type=str(event.get("type") or "")[:64],
+            payload=event,
+            created_at=self._parse_timestamp(event.get("created_at")) or timezone.now(),
+        )
+
+    def update_run(self, run_id: str, **fields: Any) -> None:
+        values: Dict[str, Any] = dict(fields)
+        for key in ("started_at", "finished_at"):
+            if key in values:
+                values[key] = self._parse_timestamp(values[key])
+        for key in ("diff", "error"):
+            if key in values:
+                values[key] = str(values[key] or "")
+        # QuerySet.update() bypasses auto_now.
+        values["updated_at"] = timezone.now()
+        self.run_model.objects.filter(id=run_id).update(**values)
+
+    def list_runs(
+        self, request_ids: Iterable[str], *, include_events: bool = False
+    ) -> dict[str, list[dict[str, Any]]]:
+        ids = [str(request_id) for request_id in request_ids]
+        if not ids:
+            return {}
+        query = self.run_model.objects.filter(request_id__in=ids).order_by(
+            "started_at", "created_at"
+        )
+        events: Dict[str, List[dict[str, Any]]] = defaultdict(list)
+        if include_events:
+            event_rows = (
+                self.run_event_model.objects.filter(request_id__in=ids)
+                .order_by("id")
+                .values_list("run_id", "payload")
+            )
+            for run_id, payload in event_rows:
+                events[run_id].append(payload)
+        else:
+            query = query.defer("diff", "reports", "artifacts").annotate(diff_size=Length("diff"))
+        grouped: dict[str, list[dict[str, Any]]] = {}
+        for record in query:
+            entry = self._run_to_dict(record, events.get(record.id, []) if include_events else None)
+            grouped.setdefault(entry["request_id"], []).append(entry)
+        return grouped
+
+    def get_run(
+        self, run_id: str, *, user_id: str | None = None
+    ) -> tuple[Request, dict[str, Any]]:
+        query = self.run_model.objects.select_related("request")
+        if user_id is not None:
+            query = query.filter(request__user_id=user_id)
+        try:
+            record = query.get(id=run_id)
+        except self.run_model.DoesNotExist as exc:
+            raise KeyError(run_id) from exc
+        events = list(
+            self.run_event_model.objects.filter(run_id=record.id)
+            .order_by("id")
+            .values_list("payload", flat=True)
+        )
+        return self._to_domain(record.request), self._run_to_dict(record, events)
+
     # helpers -----------------------------------------------------------
 
+    def _filtered(self, user_id: str | None, tenant_ids: Iterable[str] | None):
+        query = self.model.objects.all()
+        if user_id is not None:
+            query = query.filter(user_id=user_id)
+        if tenant_ids is not None:
+            query = query.filter(tenant_id__in=list(tenant_ids))
+        return query
+
+    def _run_to_dict(self, record, events: List[dict[str, Any]] | None) -> dict[str, Any]:
+        entry: dict[str, Any] = {
+            "id": record.id,
+            "request_id": str(record.request_id),
+            "status": record.status,
+            "started_at": record.started_at.isoformat() if record.started_at else None,
+            "finished_at": record.finished_at.isoformat() if record.finished_at else None,
+        }
+        if record.error:
+            entry["error"] = record.error
+        if events is None:
+            entry["diff_size"] = record.diff_size or 0
+            return entry
+        entry["diff"] = record.diff or None
+        entry["reports"] = record.reports or {}
+        entry["artifacts"] = record.artifacts or {}
+        entry["events"] = events
+        return entry
+
+    @staticmethod
+    def _parse_timestamp(value: object) -> datetime | None:
+        if isinstance(value, datetime):
+            parsed: datetime | None = value
+        elif isinstance(value, str) and value:
+            parsed = parse_datetime(value)
+        else:
+            return None
+        if parsed is not None and timezone.is_naive(parsed):
+            parsed = timezone.make_aware(parsed, timezone.get_default_timezone())
+        return parsed
+
     def _serialize_payload(self, payload: RequestPayload) -> Dict[str, object]:
         return {
             "title": payload.title,
@@ -104,6 +397,7 @@ class DjangoRequestRepository(RequestRepository):
             updated_at=record.updated_at,
             artifacts=record.artifacts or {},
             metadata=record.metadata or {},
+            version=record.version,
         )
         return request
 
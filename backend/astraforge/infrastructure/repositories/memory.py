@@ -2,22 +2,54 @@
 
 from __future__ import annotations
 
-from typing import Dict
+import copy
+from typing import Any, Dict, Iterable, List
 
-from astraforge.application.use_cases import RequestRepository
-from astraforge.domain.models.request import Request
+from astraforge.application.use_cases import RequestRepository, StaleRequestError
+from astraforge.domain.models.request import Request, RequestSummary
 
 
 class InMemoryRequestRepository(RequestRepository):
     def __init__(self) -> None:
         self._store: Dict[str, Request] = {}
+        self._runs: Dict[str, Dict[str, Any]] = {}
+        self._run_events: Dict[str, List[Dict[str, Any]]] = {}
 
     def save(self, request: Request) -> None:
         existing = self._store.get(request.id)
         if existing and existing.user_id and request.user_id and existing.user_id != request.user_id:
             raise PermissionError("Request already exists for a different user.")
+        if existing is not None and existing is not request and existing.version != request.version:
+            raise StaleRequestError(f"Request {request.id} was modified concurrently.")
+        request.version += 1
         self._store[request.id] = request
 
+    def update(
+        self,
+        request: Request,
+        *,
+        fields: Iterable[str] = (),
+        metadata_keys: Iterable[str] = (),
+    ) -> None:
+        stored = self._store[request.id]
+        for name in fields:
+            setattr(stored, name, copy.deepcopy(getattr(request, name)))
+        for key in metadata_keys:
+            if key in request.metadata:
+                stored.metadata[key] = copy.deepcopy(request.metadata[key])
+            else:
+                stored.metadata.pop(key, None)
+        stored.version += 1
+        request.version = stored.version
+
+    def append_metadata(self, request: Request, key: str, item: Any) -> None:
+        stored = self._store[request.id]
+        for target in {id(stored): stored, id(request): request}.values():
+            current = target.metadata.get(key)
+            target.metadata[key] = [*(current if isinstance(current, list) else []), item]
+        stored.version += 1
+        request.version = stored.version
+
     def get(self, request_id: str, *, user_id: str | None = None) -> Request:
         request = self._store[request_id]
         if user_id is not None and request.user_id != user_id:
@@ -28,3 +60,90 @@ class InMemoryRequestRepository(RequestRepository):
         if user_id is None:
             return list(self._store.values())
         return [req for req in self._store.values() if req.user_id == user_id]
+
+    def list_summaries(
+        self,
+        *,
+        user_id: str | None = None,
+        tenant_ids: Iterable[str] | None = None,
+        offset: int = 0,
+        limit: int | None = None,
+    ) -> list[RequestSummary]:
+        items = sorted(
+            self._filter(user_id, tenant_ids), key=lambda req: req.created_at, reverse=True
+        )
+        end = None if limit is None else offset + limit
+        return [
+            RequestSummary(
+                id=req.id,
+                user_id=req.user_id,
+                tenant_id=req.tenant_id,
+                source=req.source,
+                sender=req.sender,
+                state=req.state,
+                title=req.payload.title,
+                description=req.payload.description,
+                project=dict(req.metadata.get("project") or {}),
+                created_at=req.created_at,
+                updated_at=req.updated_at,
+            )
+            for req in items[offset:end]
+        ]
+
+    def count(
+        self, *, user_id: str | None = None, tenant_ids: Iterable[str] | None = None
+    ) -> int:
+        return len(self._filter(user_id, tenant_ids))
+
+    def _filter(self, user_id: str | None, tenant_ids: Iterable[str] | None) -> list[Request]:
+        items = self.list(user_id=user_id)
+        if tenant_ids is not None:
+            allowed = set(tenant_ids)
+            items = [req for req in items if req.tenant_id in allowed]
+        return items
+
+    def create_run(self, request_id: str, run: dict[str, Any]) -> None:
+        stored = {
+            "diff": None,
+            "reports": {},
+            "artifacts": {},
+            **copy.deepcopy(run),
+            "request_id": request_id,
+        }
+        self._runs[str(stored["id"])] = stored
+        self._run_events[str(stored["id"])] = []
+
+    def append_run_event(self, request_id: str, run_id: str, event: dict[str, Any]) -> None:
+        self._run_events[run_id].append(copy.deepcopy(event))
+
+    def update_run(self, run_id: str, **fields: Any) -> None:
+        self._runs[run_id].update(copy.deepcopy(fields))
+
+    def list_runs(
+        self, request_ids: Iterable[str], *, include_events: bool = False
+    ) -> dict[str, list[dict[str, Any]]]:
+        wanted = {str(request_id) for request_id in request_ids}
+        grouped: dict[str, list[dict[str, Any]]] = {}
+        for run_id, run in self._runs.items():
+            if run["request_id"] not in wanted:
+                continue
+            entry = copy.deepcopy(run)
+            if include_events:
+                entry["events"] = copy.deepcopy(self._run_events[run_id])
+            else:
+                entry["diff_size"] = len(entry.pop("diff", None) or "")
+                entry.pop("reports", None)
+                entry.pop("artifacts", None)
+            grouped.setdefault(run["request_id"], []).append(entry)
+        return grouped
+
+    def get_run(
+        self, run_id: str, *, user_id: str | None = None
+    ) -> tuple[Request, dict[str, Any]]:
+        run = self._runs.get(run_id)
+        if run is None:
+            raise KeyError(run_id)
+        request = self.get(run["request_id"], user_id=user_id)
+        entry = copy.deepcopy(run)
+        entry["events"] = copy.deepcopy(self._run_events[run_id])
+        return request, entry
@@ -8,10 +8,11 @@ import logging
 import os
 import shlex
 import subprocess
+import threading
 import uuid
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any, Callable, Dict, Iterable, List, Tuple, TYPE_CHECKING
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Tuple, TYPE_CHECKING
 from urllib.parse import quote, urlparse, urlunparse
 
 from astraforge.domain.models.request import Request
@@ -98,6 +99,121 @@ class CommandRunner:
         )
         return CommandResult(exit_code=process.returncode, stdout=stdout, stderr="")
 
+    def run_with_input(
+        self,
+        command: Iterable[str],
+        chunks: Iterable[bytes],
+        *,
+        allow_failure: bool = False,
+    ) -> CommandResult:
+        """Run a command while streaming binary ``chunks`` into its stdin.
+
+        Only one chunk is held in memory at a time; stdout is drained on a
+        background thread so a chatty command cannot deadlock the writer.
+        """
+        args = list(command)
+        rendered = " ".join(shlex.quote(arg) for arg in args)
+        logger.debug(
+            "Executing command with streamed stdin",
+            extra={"command": args, "dry_run": self.dry_run},
+        )
+        if self.dry_run:
+            for _ in chunks:
+                pass
+            return CommandResult(exit_code=0, stdout="", stderr="")
+        process = subprocess.Popen(
+            args,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+        )
+        output: List[bytes] = []
+        assert process.stdout is not None and process.stdin is not None
+        reader = threading.Thread(target=lambda: output.append(process.stdout.read()), daemon=True)
+        reader.start()
+        try:
+            for chunk in chunks:
+                if chunk:
+                    process.stdin.write(chunk)
+        except BrokenPipeError:
+            pass
+        except BaseException:
+            # The producer failed mid-stream; do not let the command act on a truncated input.
+            process.kill()
+            process.wait()
+            reader.join()
+            raise
+        finally:
+            try:
+                process.stdin.close()
+            except BrokenPipeError:
+                pass
+        process.wait()
+        reader.join()
+        stdout = b"".join(output).decode("utf-8", errors="replace")
+        stdout = stdout.replace("\r\n", "\n").replace("\r", "\n")
+        if process.returncode != 0 and not allow_failure:
+            logger.error(
+                "Command failed",
+                extra={"command": args, "exit_code": process.returncode, "stdout": stdout},
+            )
+            raise subprocess.CalledProcessError(process.returncode, args, output=stdout)
+        logger.debug(
+            "Command completed",
+            extra={"command": rendered, "exit_code": process.returncode, "stdout": stdout[:500]},
+        )
+        return CommandResult(exit_code=process.returncode, stdout=stdout, stderr="")
+
+    def iter_output(
+        self,
+        command: Iterable[str],
+        *,
+        chunk_size: int = 64 * 1024,
+    ) -> Iterator[bytes]:
+        """Run a command and yield its raw stdout in bounded chunks.
+
+        stderr is kept separate so it can never corrupt binary output; a
+        non-zero exit raises ``CalledProcessError`` once stdout is exhausted.
+        Closing the generator early kills the command.
+        """
+        args = list(command)
+        logger.debug(
+            "Executing command with streamed stdout",
+            extra={"command": args, "dry_run": self.dry_run},
+        )
+        if self.dry_run:
+            return
+        process = subprocess.Popen(
+            args,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+        assert process.stdout is not None and process.stderr is not None
+        errors: List[bytes] = []
+        reader = threading.Thread(target=lambda: errors.append(process.stderr.read()), daemon=True)
+        reader.start()
+        try:
+            while True:
+                chunk = process.stdout.read1(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+            process.wait()
+        finally:
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+            process.stdout.close()
+            reader.join()
+        if process.returncode != 0:
+            stderr = b"".join(errors).decode("utf-8", errors="replace")
+            logger.error(
+                "Command failed",
+                extra={"command": args, "exit_code": process.returncode, "stderr": stderr},
+            )
+            raise subprocess.CalledProcessError(process.returncode, args, output="", stderr=stderr)
+
 
 def _should_execute_commands() -> bool:
     return os.getenv("ASTRAFORGE_EXECUTE_COMMANDS", "0").lower() in {
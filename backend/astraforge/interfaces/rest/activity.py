@@ -0,0 +1,318 @@
+"""Activity feed queries for ``ActivityLogViewSet``.
+
+Every source (requests, runs, merge requests, sandbox sessions) is projected to
+``(kind, object_id, ts)`` and combined with ``UNION ALL``, so ordering, keyset
+pagination and counting happen in the database. Only the rows of the requested
+page are then loaded and rendered.
+"""
+
+from __future__ import annotations
+
+import base64
+import binascii
+import hashlib
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Iterable
+
+from django.db.models import (
+    CharField,
+    DateTimeField,
+    Exists,
+    F,
+    Func,
+    IntegerField,
+    OuterRef,
+    Q,
+    QuerySet,
+    Subquery,
+    Value,
+)
+from django.db.models.functions import Cast, Coalesce
+
+from astraforge.requests.models import RequestRecord, RunRecord
+from astraforge.sandbox.models import SandboxSession
+
+# Internal kinds; each value must be unique because ``(ts, kind, object_id)`` is the
+# feed's total order.
+REQUEST = "request"
+RUN = "run"
+LEGACY_RUN = "run_legacy"  # request executed before runs were recorded
+MERGE = "merge"
+SANDBOX = "sandbox"
+
+
+@dataclass(frozen=True)
+class FeedRow:
+    kind: str
+    object_id: str
+    ts: datetime
+
+
+@dataclass(frozen=True)
+class FeedCursor:
+    """Position after which the next page starts (the last row of the previous page)."""
+
+    ts: datetime
+    kind: str
+    object_id: str
+
+    def encode(self) -> str:
+        raw = json.dumps([self.ts.isoformat(), self.kind, self.object_id])
+        return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+    @classmethod
+    def decode(cls, value: str) -> "FeedCursor":
+        try:
+            padded = value + "=" * (-len(value) % 4)
+            ts, kind, object_id = json.loads(base64.urlsafe_b64decode(padded))
+            return cls(ts=datetime.fromisoformat(ts), kind=str(kind), object_id=str(object_id))
+        except (binascii.Error, ValueError, TypeError) as exc:
+            raise ValueError("Invalid cursor") from exc
+
+
+class _Count(Func):
+    """``COUNT(*)`` usable inside a correlated subquery (no GROUP BY is added)."""
+
+    function = "COUNT"
+    template = "%(function)s(*)"
+    output_field = IntegerField()
+
+
+def _ordinal(base: QuerySet, field: str) -> Subquery:
+    """1-based position of the outer row among ``base`` ordered by ``field``."""
+    older = (
+        base.filter(**{f"{field}__lte": OuterRef(field)})
+        .order_by()
+        .annotate(n=_Count())
+        .values("n")
+    )
+    return Subquery(older, output_field=IntegerField())
+
+
+def merge_request_id(request_id: str, metadata_mr: dict[str, Any]) -> str:
+    if metadata_mr.get("id"):
+        return str(metadata_mr["id"])
+    source_branch = str(metadata_mr.get("source_branch", "") or "")
+    raw_identifier = metadata_mr.get("ref") or f"{request_id}:{source_branch}"
+    return hashlib.sha256(str(raw_identifier).encode("utf-8")).hexdigest()[:16]
+
+
+def legacy_run_id(request_id: str) -> str:
+    return hashlib.sha256(f"{request_id}:execution".encode("utf-8")).hexdigest()[:16]
+
+
+class ActivityFeed:
+    def __init__(
+        self,
+        *,
+        user,
+        request_tenants: Iterable[str],
+        session_tenants: Iterable[str] | None,
+    ) -> None:
+        self.requests = RequestRecord.objects.filter(
+            user=user, tenant_id__in=list(request_tenants)
+        ).order_by()
+        sessions = SandboxSession.objects.filter(user=user).order_by()
+        if session_tenants is not None:
+            sessions = sessions.filter(workspace__uid__in=list(session_tenants))
+        self.sessions = sessions
+
+    # Sources -----------------------------------------------------------------
+
+    def _sources(self) -> dict[str, QuerySet]:
+        has_runs = Exists(RunRecord.objects.filter(request_id=OuterRef("pk")))
+        runs = (
+            RunRecord.objects.filter(request__in=self.requests.values("pk"))
+            .order_by()
+            .annotate(ts=Coalesce("started_at", "finished_at"))
+            .filter(ts__isnull=False)
+        )
+        legacy_runs = (
+            self.requests.filter(metadata__has_key="execution")
+            .exclude(metadata__execution={})
+            .annotate(has_runs=has_runs)
+            .filter(has_runs=False)
+            .annotate(ts=F("created_at"))
+        )
+        merges = (
+            self.requests.filter(metadata__has_key="mr")
+            .exclude(metadata__mr={})
+            .annotate(ts=F("updated_at"))
+        )
+        return {
+            REQUEST: self.requests.annotate(ts=F("created_at")),
+            RUN: runs,
+            LEGACY_RUN: legacy_runs,
+            MERGE: merges,
+            SANDBOX: self.sessions.annotate(
+                ts=Coalesce("updated_at", "created_at", output_field=DateTimeField())
+            ),
+        }
+
+    def summary(self) -> dict[str, int]:
+        counts = {kind: query.count() for kind, query in self._sources().items()}
+        summary = {
+            "requests": counts[REQUEST],
+            "runs": counts[RUN] + counts[LEGACY_RUN],
+            "merges": counts[MERGE],
+            "sandboxes": counts[SANDBOX],
+        }
+        summary["total"] = sum(summary.values())
+        return summary
+
+    def rows(
+        self, *, limit: int, after: FeedCursor | None = None, offset: int = 0
+    ) -> list[FeedRow]:
+        """Up to ``limit`` rows, newest first, after ``after`` (or skipping ``offset``)."""
+        branches = []
+        for kind, query in self._sources().items():
+            query = query.annotate(
+                kind=Value(kind, output_field=CharField()),
+                object_id=Cast("pk", output_field=CharField()),
+            )
+            if after is not None:
+                # (ts, kind, object_id) < cursor, with kind fixed for this branch.
+                if kind < after.kind:
+                    query = query.filter(ts__lte=after.ts)
+                elif kind == after.kind:
+                    query = query.filter(
+                        Q(ts__lt=after.ts) | Q(ts=after.ts, object_id__lt=after.object_id)
+                    )
+                else:
+                    query = query.filter(ts__lt=after.ts)
+            branches.append(query.values("kind", "object_id", "ts"))
+        combined = branches[0].union(*branches[1:], all=True).order_by(
+            "-ts", "-kind", "-object_id"
+        )
+        return [
+            FeedRow(kind=row["kind"], object_id=row["object_id"], ts=row["ts"])
+            for row in combined[offset : offset + limit]
+        ]
+
+    # Rendering ---------------------------------------------------------------
+
+    def render(self, rows: list[FeedRow]) -> list[dict[str, object]]:
+        ids: dict[str, list[str]] = {}
+        for row in rows:
+            ids.setdefault(row.kind, []).append(row.object_id)
+        rendered: dict[tuple[str, str], dict[str, object]] = {}
+        for kind, object_ids in ids.items():
+            renderer = getattr(self, f"_render_{kind}")
+            for object_id, event in renderer(object_ids):
+                rendered[(kind, object_id)] = event
+        events = []
+        for row in rows:
+            event = rendered.get((row.kind, row.object_id))
+            if event is None:
+                continue
+            event["timestamp"] = row.ts.isoformat()
+            events.append(event)
+        return events
+
+    def _by_object_id(self, query: QuerySet, object_ids: list[str]) -> QuerySet:
+        # Match on the same text form the union produced (UUID formatting is backend-specific).
+        return query.annotate(object_id=Cast("pk", output_field=CharField())).filter(
+            object_id__in=object_ids
+        )
+
+    def _render_request(self, object_ids: list[str]):
+        records = (
+            self._by_object_id(self.requests, object_ids)
+            .annotate(ordinal=_ordinal(self.requests, "created_at"))
+            .values("pk", "object_id", "ordinal", "payload__title", "metadata__project__repository")
+        )
+        for record in records:
+            request_id = str(record["pk"])
+            repository_name = record["metadata__project__repository"]
+            yield record["object_id"], {
+                "id": f"request-{request_id}",
+                "type": "Request",
+                "title": record["payload__title"] or "New automation request",
+                "description": (
+                    f"Captured for {repository_name}"
+                    if repository_name
+                    else "Request captured in AstraForge."
+                ),
+                "href": f"/app/requests/{request_id}/run",
+                "consumption": {"kind": "request", "ordinal": record["ordinal"]},
+            }
+
+    def _render_run_event(
+        self, run_id: str, request_id: str, status: object, request_title: object
+    ) -> dict[str, object]:
+        status_text = str(status or "queued").lower()
+        return {
+            "id": f"run-{run_id}",
+            "type": "Run",
+            "title": f"Run {status_text}",
+            "description": (
+                f'Automation for "{request_title}"'
+                if request_title
+                else "Automation run kicked off."
+            ),
+            "href": f"/app/requests/{request_id}/run",
+        }
+
+    def _render_run(self, object_ids: list[str]):
+        records = RunRecord.objects.filter(pk__in=object_ids).values(
+            "pk", "status", "request_id", "request__payload__title"
+        )
+        for record in records:
+            yield record["pk"], self._render_run_event(
+                record["pk"],
+                str(record["request_id"]),
+                record["status"],
+                record["request__payload__title"],
+            )
+
+    def _render_run_legacy(self, object_ids: list[str]):
+        records = self._by_object_id(self.requests, object_ids).values(
+            "pk", "object_id", "state", "payload__title"
+        )
+        for record in records:
+            request_id = str(record["pk"])
+            yield record["object_id"], self._render_run_event(
+                legacy_run_id(request_id), request_id, record["state"], record["payload__title"]
+            )
+
+    def _render_merge(self, object_ids: list[str]):
+        records = self._by_object_id(self.requests, object_ids).values(
+            "pk", "object_id", "payload__title", "metadata__mr"
+        )
+        for record in records:
+            request_id = str(record["pk"])
+            metadata_mr = record["metadata__mr"] or {}
+            target_branch = str(metadata_mr.get("target_branch") or "")
+            yield record["object_id"], {
+                "id": f"merge-{merge_request_id(request_id, metadata_mr)}",
+                "type": "Merge",
+                "title": str(
+                    metadata_mr.get("title") or record["payload__title"] or "Merge request opened"
+                ),
+                "description": (
+                    f"Targeting {target_branch}"
+                    if target_branch
+                    else "Merge request created by AstraForge."
+                ),
+                "href": f"/app/requests/{request_id}/run",
+            }
+
+    def _render_sandbox(self, object_ids: list[str]):
+        sessions = self._by_object_id(self.sessions, object_ids).annotate(
+            ordinal=_ordinal(self.sessions, "created_at")
+        )
+        for session in sessions:
+            yield session.object_id, {
+                "id": f"sandbox-{session.id}",
+                "type": "Sandbox",
+                "title": f"Sandbox {session.status}",
+                "description": f"Mode: {session.mode}",
+                "consumption": {
+                    "kind": "sandbox",
+                    "ordinal": session.ordinal,
+                    "cpu_seconds": session.cpu_seconds,
+                    "storage_bytes": session.storage_bytes,
+                },
+            }
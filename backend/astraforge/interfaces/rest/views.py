@@ -6,7 +6,6 @@ import hashlib
 import json
 import os
 from pathlib import Path
-from datetime import datetime
 
 import logging
 
@@ -14,7 +13,6 @@ from django.conf import settings
 from django.contrib.auth import authenticate, login, logout
 
 from django.utils import timezone
-from django.utils.dateparse import parse_datetime
 from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import ensure_csrf_cookie
 from rest_framework import mixins, status, viewsets
@@ -42,6 +40,11 @@ from astraforge.computer_use.trace import read_timeline_items
 from astraforge.domain.models.request import Attachment, Request, RequestPayload
 from astraforge.integrations.models import RepositoryLink
 from astraforge.interfaces.rest import serializers
+from astraforge.interfaces.rest.activity import (
+    ActivityFeed,
+    FeedCursor,
+    merge_request_id,
+)
 from astraforge.interfaces.rest.renderers import EventStreamRenderer
 from astraforge.quotas.models import WorkspaceQuotaLedger
 from astraforge.quotas.services import QuotaExceeded, get_quota_service
@@ -118,6 +121,22 @@ def _serialize_user(user, *, access: UserAccess | None = None) -> dict[str, obje
     }
 
 
+def _get_pagination(request) -> tuple[int, int]:
+    def parse_int(value: object, default: int) -> int:
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return default
+
+    page = max(parse_int(request.query_params.get("page"), 1), 1)
+    page_size = parse_int(request.query_params.get("page_size"), 25)
+    if page_size < 1:
+        page_size = 25
+    if page_size > 100:
+        page_size = 100
+    return page, page_size
+
+
 class RequestViewSet(
     mixins.CreateModelMixin,
     mixins.RetrieveModelMixin,
@@ -164,18 +183,23 @@ class RequestViewSet(
         tenant_id = request.query_params.get("tenant_id")
         if tenant_id and tenant_id not in allowed_uids:
             raise PermissionDenied("You do not have access to this workspace.")
-        items = repository.list(user_id=str(request.user.id))
-        if allowed_uids:
-            items = [
-                item
-                for item in items
-                if item.tenant_id in allowed_uids
-                and (not tenant_id or item.tenant_id == tenant_id)
-            ]
+        if not allowed_uids:
+            return Response([])
+        filters = {
+            "user_id": str(request.user.id),
+            "tenant_ids": [tenant_id] if tenant_id else allowed_uids,
+        }
+        headers = {}
+        if "page" in request.query_params or "page_size" in request.query_params:
+            page, page_size = _get_pagination(request)
+            items = repository.list_summaries(
+                **filters, offset=(page - 1) * page_size, limit=page_size
+            )
+            headers["X-Total-Count"] = str(repository.count(**filters))
         else:
-            items = []
-        serializer = self.get_serializer(items, many=True)
-        return Response(serializer.data)
+            items = repository.list_summaries(**filters)
+        serializer = serializers.RequestSummarySerializer(items, many=True)
+        return Response(serializer.data, headers=headers)
 
     @action(detail=True, methods=["post"], url_path="execute")
     def execute(self, request, id=None):
@@ -204,7 +228,8 @@ class RequestViewSet(
             if reasoning_effort:
                 llm_config["reasoning_effort"] = reasoning_effort
             request_obj.metadata["llm"] = llm_config
-            repository.save(request_obj)
+            # Only the llm key: a run in progress may be writing other metadata keys.
+            repository.update(request_obj, metadata_keys=["llm"])
         app_tasks.execute_request_task.delay(request_id)
         return Response({"status": "queued"}, status=status.HTTP_202_ACCEPTED)
 
@@ -278,7 +303,6 @@ class ChatViewSet(mixins.CreateModelMixin, viewsets.GenericViewSet):
             if request_obj.tenant_id not in allowed_uids:
                 raise PermissionDenied("You do not have access to this workspace.")
 
-        messages = list(request_obj.metadata.get("chat_messages", []))
         new_message = {
             "role": "user",
             "message": message_content,
@@ -286,12 +310,7 @@ class ChatViewSet(mixins.CreateModelMixin, viewsets.GenericViewSet):
         }
         if attachments_data:
             new_message["attachments"] = attachments_data
-        messages.append(new_message)
-        request_obj.metadata["chat_messages"] = messages
-        try:
-            repository.save(request_obj)
-        except PermissionError as exc:
-            raise PermissionDenied(str(exc)) from exc
+        repository.append_metadata(request_obj, "chat_messages", new_message)
         app_tasks.execute_request_task.delay(request_id)
         run_log_payload = {
             "type": "user_message",
@@ -584,261 +603,62 @@ class ComputerUseRunViewSet(viewsets.ViewSet):
         }
 
 
-def _coerce_datetime(value: object) -> datetime | None:
-    if isinstance(value, datetime):
-        parsed = value
-    elif isinstance(value, str):
-        parsed = parse_datetime(value)
-        if parsed is None:
-            try:
-                parsed = datetime.fromisoformat(value)
-            except ValueError:
-                return None
-    else:
-        return None
-    if timezone.is_naive(parsed):
-        parsed = timezone.make_aware(parsed, timezone.get_default_timezone())
-    return parsed
-
-
 class ActivityLogViewSet(viewsets.ViewSet):
     permission_classes = [IsAuthenticated]
 
     def list(self, request):
-        user_id = str(request.user.id)
         allowed_uids = Workspace.allowed_uids_for_user(request.user)
         tenant_id = request.query_params.get("tenant_id")
         if tenant_id and tenant_id not in allowed_uids:
             raise PermissionDenied("You do not have access to this workspace.")
 
-        requests = repository.list(user_id=user_id)
-        if allowed_uids:
-            requests = [
-                item
-                for item in requests
-                if item.tenant_id in allowed_uids
-                and (not tenant_id or item.tenant_id == tenant_id)
-            ]
+        if tenant_id:
+            request_tenants: list[str] = [tenant_id]
+            session_tenants: list[str] | None = [tenant_id]
         else:
-            requests = []
-
-        request_ordinals = self._build_request_ordinals(requests)
-        runs = self._collect_runs(requests)
-        merge_requests = self._collect_merge_requests(requests)
-        sessions = self._collect_sandbox_sessions(request.user, allowed_uids, tenant_id)
-        sandbox_ordinals = self._build_sandbox_ordinals(sessions)
-
-        events: list[dict[str, object]] = []
-        summary = {
-            "total": 0,
-            "requests": 0,
-            "runs": 0,
-            "merges": 0,
-            "sandboxes": 0,
-        }
-
-        def add_event(
-            event_type: str, timestamp_value: object, payload: dict[str, object]
-        ) -> None:
-            parsed = _coerce_datetime(timestamp_value)
-            if not parsed:
-                return
-            payload["timestamp"] = parsed.isoformat()
-            payload["_sort_key"] = parsed
-            payload["type"] = event_type
-            events.append(payload)
-            if event_type == "Request":
-                summary["requests"] += 1
-            elif event_type == "Run":
-                summary["runs"] += 1
-            elif event_type == "Merge":
-                summary["merges"] += 1
-            elif event_type == "Sandbox":
-                summary["sandboxes"] += 1
-
-        for request_obj in requests:
-            created_at = request_obj.created_at
-            if not created_at:
-                continue
-            project_meta = request_obj.metadata.get("project") or {}
-            repository_name = (
-                project_meta.get("repository")
-                if isinstance(project_meta, dict)
-                else None
-            )
-            add_event(
-                "Request",
-                created_at,
-                {
-                    "id": f"request-{request_obj.id}",
-                    "title": request_obj.payload.title or "New automation request",
-                    "description": (
-                        f"Captured for {repository_name}"
-                        if repository_name
-                        else "Request captured in AstraForge."
-                    ),
-                    "href": f"/app/requests/{request_obj.id}/run",
-                    "consumption": {
-                        "kind": "request",
-                        "ordinal": request_ordinals.get(str(request_obj.id)),
-                    },
-                },
-            )
-
-        for run in runs:
-            timestamp = run.get("started_at") or run.get("finished_at")
-            if not timestamp:
-                continue
-            status = str(run.get("status") or "queued").lower()
-            request_title = str(run.get("request_title") or "")
-            description = (
-                f'Automation for "{request_title}"'
-                if request_title
-                else "Automation run kicked off."
-            )
-            add_event(
-                "Run",
-                timestamp,
-                {
-                    "id": f"run-{run.get('id')}",
-                    "title": f"Run {status}",
-                    "description": description,
-                    "href": f"/app/requests/{run.get('request_id')}/run",
-                },
-            )
-
-        for mr in merge_requests:
-            created_at = mr.get("created_at")
-            if not created_at:
-                continue
-            target_branch = str(mr.get("target_branch") or "")
-            description = (
-                f"Targeting {target_branch}"
-                if target_branch
-                else "Merge request created by AstraForge."
-            )
-            add_event(
-                "Merge",
-                created_at,
-                {
-                    "id": f"merge-{mr.get('id')}",
-                    "title": str(mr.get("title") or "Merge request opened"),
-                    "description": description,
-                    "href": f"/app/requests/{mr.get('request_id')}/run",
-                },
-            )
-
-        for session in sessions:
-            timestamp = session.updated_at or session.created_at
-            if not timestamp:
-                continue
-            add_event(
-                "Sandbox",
-                timestamp,
-                {
-                    "id": f"sandbox-{session.id}",
-                    "title": f"Sandbox {session.status}",
-                    "description": f"Mode: {session.mode}",
-                    "consumption": {
-                        "kind": "sandbox",
-                        "ordinal": sandbox_ordinals.get(str(session.id)),
-                        "cpu_seconds": session.cpu_seconds,
-                        "storage_bytes": session.storage_bytes,
-                    },
-                },
-            )
+            request_tenants = list(allowed_uids)
+            session_tenants = list(allowed_uids) if allowed_uids else None
+        feed = ActivityFeed(
+            user=request.user,
+            request_tenants=request_tenants,
+            session_tenants=session_tenants,
+        )
 
-        events.sort(key=lambda item: item["_sort_key"], reverse=True)
-        for event in events:
-            event.pop("_sort_key", None)
-        summary["total"] = len(events)
-
-        page, page_size = self._get_pagination(request)
-        start = (page - 1) * page_size
-        end = start + page_size
-        paged = events[start:end]
-        next_page = page + 1 if end < len(events) else None
-        prev_page = page - 1 if page > 1 else None
-        serializer = serializers.ActivityEventSerializer(paged, many=True)
+        page, page_size = _get_pagination(request)
+        raw_cursor = request.query_params.get("cursor")
+        cursor = None
+        if raw_cursor:
+            try:
+                cursor = FeedCursor.decode(raw_cursor)
+            except ValueError as exc:
+                raise ValidationError({"cursor": "Invalid cursor."}) from exc
+        # One extra row tells whether another page follows.
+        rows = feed.rows(
+            limit=page_size + 1,
+            after=cursor,
+            offset=0 if cursor else (page - 1) * page_size,
+        )
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        summary = feed.summary()
+        serializer = serializers.ActivityEventSerializer(feed.render(rows), many=True)
+        next_cursor = None
+        if has_more and rows:
+            last = rows[-1]
+            next_cursor = FeedCursor(ts=last.ts, kind=last.kind, object_id=last.object_id).encode()
         return Response(
             {
-                "count": len(events),
+                "count": summary["total"],
                 "page": page,
                 "page_size": page_size,
-                "next_page": next_page,
-                "previous_page": prev_page,
+                "next_page": page + 1 if has_more and not cursor else None,
+                "previous_page": page - 1 if page > 1 and not cursor else None,
+                "next_cursor": next_cursor,
                 "results": serializer.data,
                 "summary": summary,
             }
         )
 
-    def _build_request_ordinals(self, requests: list[Request]) -> dict[str, int]:
-        ordered = sorted(requests, key=lambda item: item.created_at or timezone.now())
-        return {str(item.id): index + 1 for index, item in enumerate(ordered)}
-
-    def _collect_runs(self, requests: list[Request]) -> list[dict[str, object]]:
-        items: list[dict[str, object]] = []
-        run_view = RunViewSet()
-        for request_obj in requests:
-            runs_meta = list(request_obj.metadata.get("runs", []) or [])
-            if not runs_meta:
-                fallback = run_view._fallback_run(request_obj)
-                if fallback is not None:
-                    runs_meta = [fallback]
-            for run in runs_meta:
-                entry = run_view._build_run_entry(request_obj, run, include_events=False)
-                if entry is not None:
-                    items.append(entry)
-        return items
-
-    def _collect_merge_requests(self, requests: list[Request]) -> list[dict[str, object]]:
-        items: list[dict[str, object]] = []
-        merge_view = MergeRequestViewSet()
-        for request_obj in requests:
-            metadata_mr = request_obj.metadata.get("mr") or {}
-            if not metadata_mr:
-                continue
-            entry = merge_view._build_entry(request_obj, metadata_mr)
-            items.append(entry)
-        return items
-
-    def _collect_sandbox_sessions(
-        self,
-        user,
-        allowed_uids: list[str],
-        tenant_id: str | None,
-    ) -> list[SandboxSession]:
-        sessions = SandboxSession.objects.filter(user=user)
-        if tenant_id:
-            sessions = sessions.filter(workspace__uid=tenant_id)
-        elif allowed_uids:
-            sessions = sessions.filter(workspace__uid__in=allowed_uids)
-        return list(sessions)
-
-    def _build_sandbox_ordinals(
-        self, sessions: list[SandboxSession]
-    ) -> dict[str, int]:
-        ordered = sorted(
-            (session for session in sessions if session.created_at or session.updated_at),
-            key=lambda item: item.created_at or item.updated_at or timezone.now(),
-        )
-        return {str(item.id): index + 1 for index, item in enumerate(ordered)}
-
-    @staticmethod
-    def _get_pagination(request) -> tuple[int, int]:
-        def parse_int(value: object, default: int) -> int:
-            try:
-                return int(value)
-            except (TypeError, ValueError):
-                return default
-
-        page = max(parse_int(request.query_params.get("page"), 1), 1)
-        page_size = parse_int(request.query_params.get("page_size"), 25)
-        if page_size < 1:
-            page_size = 25
-        if page_size > 100:
-            page_size = 100
-        return page, page_size
 
 
 class RunViewSet(viewsets.ViewSet):
@@ -851,22 +671,23 @@ class RunViewSet(viewsets.ViewSet):
 
     def retrieve(self, request, pk=None):
         run_id = str(pk) if pk is not None else ""
-        runs = self._collect_runs(include_events=True, user_id=str(request.user.id))
-        for run in runs:
-            if run["id"] == run_id:
-                serializer = serializers.RunDetailSerializer(run)
-                return Response(serializer.data)
-        raise NotFound("Run not found")
+        user_id = str(request.user.id)
+        try:
+            request_obj, run = repository.get_run(run_id, user_id=user_id)
+        except KeyError as exc:
+            raise NotFound("Run not found") from exc
+        entry = self._build_run_entry(request_obj, run, include_events=True)
+        serializer = serializers.RunDetailSerializer(entry)
+        return Response(serializer.data)
 
     def _collect_runs(self, *, include_events: bool, user_id: str) -> list[dict[str, object]]:
         items: list[dict[str, object]] = []
-        for request_obj in repository.list(user_id=user_id):
-            runs_meta = list(request_obj.metadata.get("runs", []) or [])
-            if not runs_meta:
-                fallback = self._fallback_run(request_obj)
-                if fallback is not None:
-                    runs_meta = [fallback]
-            for run in runs_meta:
+        requests = repository.list(user_id=user_id)
+        stored_runs = repository.list_runs(
+            [item.id for item in requests], include_events=include_events
+        )
+        for request_obj in requests:
+            for run in stored_runs.get(str(request_obj.id), []):
                 entry = self._build_run_entry(
                     request_obj, run, include_events=include_events
                 )
@@ -875,107 +696,6 @@ class RunViewSet(viewsets.ViewSet):
         items.sort(key=lambda entry: entry.get("started_at") or "", reverse=True)
         return items
 
-    def _fallback_run(self, request_obj):
-        execution = request_obj.metadata.get("execution") or {}
-        if not execution:
-            return None
-        diff_text = execution.get("diff") or ""
-        created_at = getattr(request_obj, "created_at", None)
-        finished_at = getattr(request_obj, "updated_at", None)
-        workspace_meta = request_obj.metadata.get("workspace") or {}
-        execution_errors = request_obj.metadata.get("execution_errors") or []
-        diff_preview = ""
-        if diff_text:
-            preview_lines = diff_text.splitlines()
-            diff_preview = "\n".join(preview_lines[:8])
-            if len(preview_lines) > 8:
-                diff_preview += "\n…"
-        events: list[dict[str, object]] = [
-            {
-                "type": "status",
-                "stage": "execution",
-                "message": "Run metadata generated from stored execution artifacts.",
-                "request_id": str(request_obj.id),
-            }
-        ]
-        if workspace_meta:
-            workspace_message = (
-                f"Workspace {workspace_meta.get('mode', 'workspace')} "
-                f"at {workspace_meta.get('path', '/workspace')} "
-                f"(ref={workspace_meta.get('ref', 'unknown')})"
-            )
-            events.append(
-                {
-                    "type": "status",
-                    "stage": "workspace",
-                    "message": workspace_message,
-                    "request_id": str(request_obj.id),
-                }
-            )
-        if execution.get("reports"):
-            events.append(
-                {
-                    "type": "status",
-                    "stage": "codex",
-                    "message": "Execution reports available; see run details for full payload.",
-                    "request_id": str(request_obj.id),
-                }
-            )
-        if diff_preview:
-            events.append(
-                {
-                    "type": "log",
-                    "stage": "diff",
-                    "message": diff_preview,
-                    "request_id": str(request_obj.id),
-                }
-            )
-        status_value = (
-            request_obj.state.value
-            if hasattr(request_obj.state, "value")
-            else str(request_obj.state)
-        )
-        if execution_errors:
-            events.append(
-                {
-                    "type": "error",
-                    "stage": "execution",
-                    "message": execution_errors[-1].get("output")
-                    or execution_errors[-1].get("message")
-                    or "Execution reported errors; inspect run metadata.",
-                    "request_id": str(request_obj.id),
-                }
-            )
-            events.append(
-                {
-                    "type": "error",
-                    "stage": "failed",
-                    "message": "Run finished with errors.",
-                    "request_id": str(request_obj.id),
-                }
-            )
-        else:
-            events.append(
-                {
-                    "type": "completed",
-                    "stage": "execution",
-                    "message": "Run completed. Diff available below.",
-                    "request_id": str(request_obj.id),
-                }
-            )
-        return {
-            "id": hashlib.sha256(
-                f"{request_obj.id}:execution".encode("utf-8")
-            ).hexdigest()[:16],
-            "status": status_value,
-            "started_at": created_at.isoformat() if created_at else None,
-            "finished_at": finished_at.isoformat() if finished_at else None,
-            "diff": diff_text,
-            "reports": execution.get("reports") or {},
-            "artifacts": execution.get("artifacts") or {},
-            "events": events,
-        }
-
     def _build_run_entry(
         self,
         request_obj,
@@ -998,7 +718,7 @@ class RunViewSet(viewsets.ViewSet):
             "status": run.get("status", "unknown"),
             "started_at": run.get("started_at"),
             "finished_at": run.get("finished_at"),
-            "diff_size": len(diff_text),
+            "diff_size": run.get("diff_size", len(diff_text)),
         }
         if not include_events:
             return base
@@ -1060,19 +780,15 @@ class MergeRequestViewSet(viewsets.ViewSet):
         metadata_mr: dict[str, object],
     ) -> dict[str, object]:
         ref_value = metadata_mr.get("ref")
-        source_branch = str(metadata_mr.get("source_branch", "") or "")
-        raw_identifier = ref_value or f"{request_obj.id}:{source_branch}"
-        if metadata_mr.get("id"):
-            mr_id = str(metadata_mr.get("id"))
-        else:
-            mr_id = hashlib.sha256(str(raw_identifier).encode("utf-8")).hexdigest()[:16]
+        mr_id = merge_request_id(str(request_obj.id), metadata_mr)
         ref = str(ref_value or "")
         diff_source = metadata_mr.get("diff") or ""
         if not diff_source:
             execution_meta = request_obj.metadata.get("execution") or {}
             diff_source = execution_meta.get("diff") or ""
         if not diff_source:
-            for run in request_obj.metadata.get("runs", []) or []:
+            request_runs = repository.list_runs([request_obj.id], include_events=True)
+            for run in request_runs.get(str(request_obj.id), []):
                 diff_text = run.get("diff")
                 if diff_text:
                     diff_source = diff_text
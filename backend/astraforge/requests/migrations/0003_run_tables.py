@@ -0,0 +1,61 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('requests', '0002_requestrecord_user'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RunRecord',
+            fields=[
+                ('id', models.CharField(editable=False, max_length=64, primary_key=True, serialize=False)),
+                ('status', models.CharField(default='running', max_length=32)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('diff', models.TextField(blank=True, default='')),
+                ('reports', models.JSONField(blank=True, default=dict)),
+                ('artifacts', models.JSONField(blank=True, default=dict)),
+                ('error', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('request', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='runs', to='requests.requestrecord')),
+            ],
+            options={
+                'db_table': 'astraforge_runs',
+                'ordering': ['-started_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='RunEventRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('type', models.CharField(blank=True, max_length=64)),
+                ('payload', models.JSONField(default=dict)),
+                ('created_at', models.DateTimeField()),
+                ('request', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='run_events', to='requests.requestrecord')),
+                ('run', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='events', to='requests.runrecord')),
+            ],
+            options={
+                'db_table': 'astraforge_run_events',
+                'ordering': ['id'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='runrecord',
+            index=models.Index(fields=['request', 'started_at'], name='astraforge__request_629fd0_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='runeventrecord',
+            index=models.Index(fields=['run', 'id'], name='astraforge__run_id_8ea888_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='runeventrecord',
+            index=models.Index(fields=['request', 'created_at'], name='astraforge__request_e298f7_idx'),
+        ),
+    ]
@@ -0,0 +1,253 @@
+from __future__ import annotations
+
+import hashlib
+from datetime import datetime, timezone as dt_timezone
+
+from django.db import migrations
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+
+def _parse(value) -> datetime | None:
+    if not isinstance(value, str) or not value:
+        return None
+    parsed = parse_datetime(value)
+    if parsed is not None and timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed, dt_timezone.utc)
+    return parsed
+
+
+def _run_id(request_id, run: dict) -> str:
+    # Same derivation the runs API used for legacy runs without an id, so URLs keep working.
+    if run.get("id"):
+        return str(run["id"])[:64]
+    return hashlib.sha256(f"{request_id}:{run.get('started_at')}".encode("utf-8")).hexdigest()[:16]
+
+
+def _legacy_run_id(request_id) -> str:
+    # Id the runs API derived for requests executed before runs were recorded.
+    return hashlib.sha256(f"{request_id}:execution".encode("utf-8")).hexdigest()[:16]
+
+
+def _legacy_execution_events(record, execution: dict) -> list[dict]:
+    """Rebuild the event log the runs API synthesized from ``metadata.execution``."""
+    request_id = str(record.id)
+    metadata = record.metadata or {}
+    events: list[dict] = [
+        {
+            "type": "status",
+            "stage": "execution",
+            "message": "Run metadata generated from stored execution artifacts.",
+            "request_id": request_id,
+        }
+    ]
+    workspace_meta = metadata.get("workspace") or {}
+    if workspace_meta:
+        events.append(
+            {
+                "type": "status",
+                "stage": "workspace",
+                "message": (
+                    f"Workspace {workspace_meta.get('mode', 'workspace')} "
+                    f"at {workspace_meta.get('path', '/workspace')} "
+                    f"(ref={workspace_meta.get('ref', 'unknown')})"
+                ),
+                "request_id": request_id,
+            }
+        )
+    if execution.get("reports"):
+        events.append(
+            {
+                "type": "status",
+                "stage": "codex",
+                "message": "Execution reports available; see run details for full payload.",
+                "request_id": request_id,
+            }
+        )
+    preview_lines = (execution.get("diff") or "").splitlines()
+    if preview_lines:
+        diff_preview = "\n".join(preview_lines[:8])
+        if len(preview_lines) > 8:
+            diff_preview += "\n…"
+        events.append({"type": "log", "stage": "diff", "message": diff_preview, "request_id": request_id})
+    execution_errors = [entry for entry in metadata.get("execution_errors") or [] if isinstance(entry, dict)]
+    if execution_errors:
+        events.append(
+            {
+                "type": "error",
+                "stage": "execution",
+                "message": execution_errors[-1].get("output")
+                or execution_errors[-1].get("message")
+                or "Execution reported errors; inspect run metadata.",
+                "request_id": request_id,
+            }
+        )
+        events.append(
+            {"type": "error", "stage": "failed", "message": "Run finished with errors.", "request_id": request_id}
+        )
+    else:
+        events.append(
+            {
+                "type": "completed",
+                "stage": "execution",
+                "message": "Run completed. Diff available below.",
+                "request_id": request_id,
+            }
+        )
+    return events
+
+
+def _fold_final_messages(metadata: dict, runs: list) -> None:
+    """Keep assistant replies that were previously only derived from ``runs`` at read time."""
+    messages = metadata.get("chat_messages")
+    messages = list(messages) if isinstance(messages, list) else []
+    seen = {
+        (str(entry.get("role", "")).lower(), str(entry.get("message", "")).strip())
+        for entry in messages
+        if isinstance(entry, dict)
+    }
+    added = False
+    for run in runs:
+        artifacts = run.get("artifacts") if isinstance(run, dict) else None
+        final_message = artifacts.get("final_message") if isinstance(artifacts, dict) else None
+        if not isinstance(final_message, str) or not final_message.strip():
+            continue
+        if ("assistant", final_message.strip()) in seen:
+            continue
+        messages.append(
+            {
+                "role": "assistant",
+                "message": final_message.strip(),
+                "created_at": run.get("finished_at") or run.get("started_at"),
+                "run_id": run.get("id"),
+            }
+        )
+        seen.add(("assistant", final_message.strip()))
+        added = True
+    if added:
+        metadata["chat_messages"] = messages
+
+
+def move_runs_to_tables(apps, schema_editor):
+    RequestRecord = apps.get_model("requests", "RequestRecord")
+    RunRecord = apps.get_model("requests", "RunRecord")
+    RunEventRecord = apps.get_model("requests", "RunEventRecord")
+
+    records = RequestRecord.objects.filter(metadata__has_key="runs").only("id", "metadata", "created_at")
+    for record in records.iterator(chunk_size=50):
+        metadata = dict(record.metadata or {})
+        runs = [run for run in metadata.pop("runs", None) or [] if isinstance(run, dict)]
+        for run in runs:
+            run_id = _run_id(record.id, run)
+            if RunRecord.objects.filter(id=run_id).exists():
+                continue
+            started_at = _parse(run.get("started_at"))
+            RunRecord.objects.create(
+                id=run_id,
+                request_id=record.id,
+                status=str(run.get("status") or "unknown")[:32],
+                started_at=started_at,
+                finished_at=_parse(run.get("finished_at")),
+                diff=run.get("diff") or "",
+                reports=run.get("reports") or {},
+                artifacts=run.get("artifacts") or {},
+                error=str(run.get("error") or ""),
+            )
+            fallback_time = started_at or record.created_at
+            RunEventRecord.objects.bulk_create(
+                [
+                    RunEventRecord(
+                        run_id=run_id,
+                        request_id=record.id,
+                        type=str(event.get("type") or "")[:64],
+                        payload=event,
+                        created_at=_parse(event.get("created_at")) or fallback_time,
+                    )
+                    for event in run.get("events") or []
+                    if isinstance(event, dict)
+                ],
+                batch_size=500,
+            )
+        _fold_final_messages(metadata, runs)
+        # queryset.update() leaves updated_at untouched; it still dates MRs and activity.
+        RequestRecord.objects.filter(id=record.id).update(metadata=metadata)
+
+    # Requests executed before runs were recorded only carry ``metadata.execution``;
+    # give them a stored run under the id the API already served them as.
+    legacy = (
+        RequestRecord.objects.filter(metadata__has_key="execution")
+        .exclude(metadata__execution={})
+        .exclude(id__in=RunRecord.objects.values("request_id"))
+        .only("id", "metadata", "state", "created_at", "updated_at")
+    )
+    for record in legacy.iterator(chunk_size=50):
+        execution = (record.metadata or {}).get("execution")
+        if not isinstance(execution, dict) or not execution:
+            continue
+        run_id = _legacy_run_id(record.id)
+        if RunRecord.objects.filter(id=run_id).exists():
+            continue
+        RunRecord.objects.create(
+            id=run_id,
+            request_id=record.id,
+            status=str(record.state or "unknown")[:32],
+            started_at=record.created_at,
+            finished_at=record.updated_at,
+            diff=execution.get("diff") or "",
+            reports=execution.get("reports") or {},
+            artifacts=execution.get("artifacts") or {},
+        )
+        RunEventRecord.objects.bulk_create(
+            [
+                RunEventRecord(
+                    run_id=run_id,
+                    request_id=record.id,
+                    type=event["type"],
+                    payload=event,
+                    created_at=record.created_at,
+                )
+                for event in _legacy_execution_events(record, execution)
+            ]
+        )
+
+
+def move_runs_to_metadata(apps, schema_editor):
+    RequestRecord = apps.get_model("requests", "RequestRecord")
+    RunRecord = apps.get_model("requests", "RunRecord")
+    RunEventRecord = apps.get_model("requests", "RunEventRecord")
+
+    request_ids = RunRecord.objects.values_list("request_id", flat=True).distinct()
+    for record in RequestRecord.objects.filter(id__in=request_ids).iterator(chunk_size=50):
+        runs = []
+        for run in RunRecord.objects.filter(request_id=record.id).order_by("started_at", "created_at"):
+            runs.append(
+                {
+                    "id": run.id,
+                    "request_id": str(record.id),
+                    "status": run.status,
+                    "started_at": run.started_at.isoformat() if run.started_at else None,
+                    "finished_at": run.finished_at.isoformat() if run.finished_at else None,
+                    "events": list(
+                        RunEventRecord.objects.filter(run_id=run.id)
+                        .order_by("id")
+                        .values_list("payload", flat=True)
+                    ),
+                    "diff": run.diff or None,
+                    "reports": run.reports,
+                    "artifacts": run.artifacts,
+                    **({"error": run.error} if run.error else {}),
+                }
+            )
+        metadata = dict(record.metadata or {})
+        metadata["runs"] = runs
+        RequestRecord.objects.filter(id=record.id).update(metadata=metadata)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("requests", "0003_run_tables"),
+    ]
+
+    operations = [
+        migrations.RunPython(move_runs_to_tables, move_runs_to_metadata),
+    ]
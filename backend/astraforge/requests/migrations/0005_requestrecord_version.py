@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('requests', '0004_move_runs_out_of_metadata'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='requestrecord',
+            name='version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -22,6 +22,8 @@ class RequestRecord(models.Model):
     state = models.CharField(max_length=32)
     artifacts = models.JSONField(default=dict, blank=True)
     metadata = models.JSONField(default=dict, blank=True)
+    # Incremented by every repository write; full saves compare it (optimistic locking).
+    version = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -31,3 +33,59 @@ class RequestRecord(models.Model):
 
     def __str__(self) -> str:  # pragma: no cover - debugging helper
         return f"RequestRecord(id={self.id}, state={self.state})"
+
+
+class RunRecord(models.Model):
+    """One execution of a request; its event log lives in ``RunEventRecord``."""
+
+    # Run ids are uuid4 strings for new runs; legacy runs may carry derived hashes.
+    id = models.CharField(primary_key=True, max_length=64, editable=False)
+    request = models.ForeignKey(
+        RequestRecord,
+        on_delete=models.CASCADE,
+        related_name="runs",
+    )
+    status = models.CharField(max_length=32, default="running")
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    diff = models.TextField(blank=True, default="")
+    reports = models.JSONField(default=dict, blank=True)
+    artifacts = models.JSONField(default=dict, blank=True)
+    error = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "astraforge_runs"
+        ordering = ["-started_at"]
+        indexes = [
+            models.Index(fields=["request", "started_at"]),
+        ]
+
+    def __str__(self) -> str:  # pragma: no cover - debugging helper
+        return f"RunRecord(id={self.id}, status={self.status})"
+
+
+class RunEventRecord(models.Model):
+    """Append-only event streamed during a run; ``payload`` is the event as published."""
+
+    run = models.ForeignKey(RunRecord, on_delete=models.CASCADE, related_name="events")
+    request = models.ForeignKey(
+        RequestRecord,
+        on_delete=models.CASCADE,
+        related_name="run_events",
+    )
+    type = models.CharField(max_length=64, blank=True)
+    payload = models.JSONField(default=dict)
+    created_at = models.DateTimeField()
+
+    class Meta:
+        db_table = "astraforge_run_events"
+        ordering = ["id"]
+        indexes = [
+            models.Index(fields=["run", "id"]),
+            models.Index(fields=["request", "created_at"]),
+        ]
+
+    def __str__(self) -> str:  # pragma: no cover - debugging helper
+        return f"RunEventRecord(run={self.run_id}, type={self.type})"
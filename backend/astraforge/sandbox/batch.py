@@ -0,0 +1,225 @@
+"""Run an ordered list of sandbox operations for ``POST /sandbox/sessions/<id>/batch/``.
+
+Every operation goes through the orchestrator, so with the exec agent enabled the whole
+batch shares one multiplexed channel. Runs of consecutive ``read``/``stat`` operations
+are independent of each other and may execute concurrently; ``exec``, ``write`` and
+``edit`` are barriers that always run alone and in order.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import shlex
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Iterator, Mapping, Sequence
+
+from django.db import connection
+
+from astraforge.sandbox import fs_commands
+from astraforge.sandbox.models import SandboxSession
+from astraforge.sandbox.services import SandboxOrchestrator, SandboxProvisionError
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_MAX_OPS = 64
+DEFAULT_BATCH_CONCURRENCY = 4
+READ_ONLY_OPS = frozenset({"read", "stat"})
+
+
+def batch_max_ops() -> int:
+    try:
+        return max(1, int(os.getenv("SANDBOX_BATCH_MAX_OPS", str(DEFAULT_BATCH_MAX_OPS))))
+    except ValueError:
+        return DEFAULT_BATCH_MAX_OPS
+
+
+def batch_concurrency() -> int:
+    try:
+        return max(1, int(os.getenv("SANDBOX_BATCH_CONCURRENCY", str(DEFAULT_BATCH_CONCURRENCY))))
+    except ValueError:
+        return DEFAULT_BATCH_CONCURRENCY
+
+
+def _groups(operations: Sequence[Mapping[str, Any]], parallel: bool) -> Iterator[list[int]]:
+    """Yield operation indexes; a group holds more than one index only for parallel reads."""
+    pending: list[int] = []
+    for index, operation in enumerate(operations):
+        if parallel and operation["op"] in READ_ONLY_OPS:
+            pending.append(index)
+            continue
+        if pending:
+            yield pending
+            pending = []
+        yield [index]
+    if pending:
+        yield pending
+
+
+class BatchRunner:
+    def __init__(self, orchestrator: SandboxOrchestrator, session: SandboxSession) -> None:
+        self.orchestrator = orchestrator
+        self.session = session
+
+    def run(
+        self,
+        operations: Sequence[Mapping[str, Any]],
+        *,
+        parallel: bool = False,
+        stop_on_error: bool = False,
+    ) -> list[dict[str, Any]]:
+        results: list[dict[str, Any]] = []
+        failed = False
+        for group in _groups(operations, parallel):
+            if failed and stop_on_error:
+                results.extend(
+                    {"index": index, "op": operations[index]["op"], "ok": False, "skipped": True}
+                    for index in group
+                )
+                continue
+            if len(group) == 1:
+                group_results = [self._run_one(group[0], operations[group[0]])]
+            else:
+                group_results = self._run_parallel(group, operations)
+            failed = failed or any(not result["ok"] for result in group_results)
+            results.extend(group_results)
+        return results
+
+    def _run_parallel(
+        self, group: list[int], operations: Sequence[Mapping[str, Any]]
+    ) -> list[dict[str, Any]]:
+        def _task(index: int) -> dict[str, Any]:
+            try:
+                return self._run_one(index, operations[index])
+            finally:
+                connection.close()
+
+        workers = min(batch_concurrency(), len(group))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="sandbox-batch") as pool:
+            return list(pool.map(_task, group))
+
+    def _run_one(self, index: int, operation: Mapping[str, Any]) -> dict[str, Any]:
+        op = operation["op"]
+        started = time.monotonic()
+        try:
+            payload = getattr(self, f"_{op}")(operation)
+        except SandboxProvisionError as exc:
+            payload = {"ok": False, "error": str(exc)}
+        except Exception as exc:  # noqa: BLE001
+            # One broken operation must not discard the results of the others.
+            logger.warning(
+                "Sandbox batch operation failed",
+                exc_info=True,
+                extra={"session_id": str(self.session.id), "index": index, "op": op},
+            )
+            payload = {"ok": False, "error": str(exc) or exc.__class__.__name__}
+        return {
+            "index": index,
+            "op": op,
+            **payload,
+            "duration_sec": round(time.monotonic() - started, 3),
+        }
+
+    def _exec(self, operation: Mapping[str, Any]) -> dict[str, Any]:
+        result = self.orchestrator.execute(
+            self.session,
+            operation["command"],
+            cwd=operation.get("cwd") or None,
+            timeout_sec=operation.get("timeout_sec"),
+        )
+        return {
+            "ok": result.exit_code == 0,
+            "exit_code": result.exit_code,
+            "stdout": result.stdout,
+            "stderr": result.stderr,
+        }
+
+    def _read(self, operation: Mapping[str, Any]) -> dict[str, Any]:
+        path = operation["path"]
+        offset = max(int(operation.get("offset") or 0), 0)
+        limit = int(operation.get("limit") or 2000)
+        max_bytes = int(operation.get("max_bytes") or fs_commands.read_max_bytes())
+        result = self.orchestrator.execute(
+            self.session, fs_commands.ranged_read_command(path, offset, limit, max_bytes)
+        )
+        parsed = fs_commands.split_ranged_read(result.stdout or "") if result.exit_code == 0 else None
+        if parsed is None:
+            return {"ok": False, "error": f"File '{path}' not found"}
+        body, total = parsed
+        if total and offset >= total:
+            return {
+                "ok": False,
+                "error": f"Line offset {offset} exceeds file length ({total} lines)",
+                "total_lines": total,
+            }
+        lines, truncated = fs_commands.read_window(body, max_bytes)
+        return {
+            "ok": True,
+            "content": "\n".join(lines),
+            "offset": offset,
+            "lines": len(lines),
+            "total_lines": total,
+            "truncated": truncated,
+        }
+
+    def _write(self, operation: Mapping[str, Any]) -> dict[str, Any]:
+        path = operation["path"]
+        if not operation.get("overwrite", True):
+            check = self.orchestrator.execute(self.session, f"test ! -e {shlex.quote(path)}")
+            if check.exit_code != 0:
+                return {"ok": False, "error": f"File '{path}' already exists"}
+        result = self.orchestrator.upload_bytes(self.session, path, operation["content"])
+        payload: dict[str, Any] = {"ok": result.exit_code == 0, "exit_code": result.exit_code}
+        if result.exit_code != 0:
+            payload["error"] = (result.stderr or result.stdout or "").strip() or "write failed"
+        return payload
+
+    def _edit(self, operation: Mapping[str, Any]) -> dict[str, Any]:
+        result = self.orchestrator.edit_file(
+            self.session,
+            operation["path"],
+            operation["old_string"],
+            operation["new_string"],
+            bool(operation.get("replace_all")),
+        )
+        data = fs_commands.parse_edit_status(result.stdout or "")
+        status = data.get("status") or "error"
+        payload: dict[str, Any] = {"ok": status == "ok", "status": status}
+        if "occurrences" in data:
+            payload["occurrences"] = int(data["occurrences"] or 0)
+        if status == "missing":
+            payload["error"] = f"File '{operation['path']}' not found"
+        elif status == "binary":
+            payload["error"] = f"File '{operation['path']}' is not valid UTF-8 text"
+        elif status == "mismatch":
+            payload["error"] = f"old_string matched {payload.get('occurrences', 0)} times"
+        elif status != "ok":
+            payload["error"] = data.get("message") or (result.stderr or "").strip() or "edit failed"
+        return payload
+
+    def _stat(self, operation: Mapping[str, Any]) -> dict[str, Any]:
+        result = self.orchestrator.execute(self.session, fs_commands.stat_command(operation["path"]))
+        info = fs_commands.parse_stat_output(result.stdout or "") if result.exit_code == 0 else None
+        if info is None:
+            return {"ok": True, "exists": False}
+        return {"ok": True, "exists": True, **info}
+
+
+def run_batch(
+    orchestrator: SandboxOrchestrator,
+    session: SandboxSession,
+    operations: Sequence[Mapping[str, Any]],
+    *,
+    parallel: bool = False,
+    stop_on_error: bool = False,
+) -> list[dict[str, Any]]:
+    """Execute ``operations`` in order and return one result dict per operation."""
+    results = BatchRunner(orchestrator, session).run(
+        operations, parallel=parallel, stop_on_error=stop_on_error
+    )
+    logger.debug(
+        "Sandbox batch finished",
+        extra={"session_id": str(session.id), "operations": len(operations), "parallel": parallel},
+    )
+    return results
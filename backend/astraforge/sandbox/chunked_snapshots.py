@@ -0,0 +1,250 @@
+"""Content-addressed ("chunked") sandbox snapshots.
+
+Files are split into fixed-size chunks identified by their SHA-256 digest. New
+chunks are appended to pack objects in S3 and a manifest maps every file to its
+chunk digests and every digest to ``[pack_key, offset, length]``. A snapshot only
+stores the chunks the previous manifest of the session did not already hold, so
+re-snapshotting a mostly unchanged workspace uploads a few packs plus a small
+manifest instead of the whole tree.
+
+Restores never stage an archive: the manifest is replayed as a tar stream that
+is piped straight into ``tar -x`` inside the sandbox.
+"""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import posixpath
+import shlex
+import struct
+import tarfile
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Iterable, Iterator
+
+MANIFEST_VERSION = 1
+DEFAULT_CHUNK_BYTES = 4 * 1024 * 1024
+DEFAULT_PACK_BYTES = 16 * 1024 * 1024
+
+_TOOL_PATH = Path(__file__).with_name("snapshot_tool.py")
+_TOOL_DELIMITER = "__ASTRAFORGE_SNAPSHOT_TOOL__"
+_LENGTH = struct.Struct(">Q")
+_BLOCK = tarfile.BLOCKSIZE
+
+
+class ChunkedSnapshotError(RuntimeError):
+    """Raised when a chunked snapshot cannot be captured or replayed."""
+
+
+def tool_script(args: Iterable[str]) -> str:
+    """Return a shell snippet that runs the snapshot tool inside the sandbox."""
+    source = _TOOL_PATH.read_text(encoding="utf-8")
+    rendered = " ".join(shlex.quote(arg) for arg in args)
+    return f"python3 - {rendered} <<'{_TOOL_DELIMITER}'\n{source}\n{_TOOL_DELIMITER}"
+
+
+def scan_script(args: Iterable[str], stderr_path: str) -> str:
+    """Run the snapshot tool with stderr kept out of its JSON-lines stdout.
+
+    Exec transports merge the two streams, so warnings go to ``stderr_path`` and
+    are only printed (for the error message) when the tool fails.
+    """
+    err = shlex.quote(stderr_path)
+    return (
+        f"mkdir -p {shlex.quote(posixpath.dirname(stderr_path) or '/')}\n"
+        f"{{ {tool_script(args)}\n}} 2>{err}\n"
+        "rc=$?\n"
+        f'[ "$rc" -eq 0 ] || cat {err}\n'
+        f"rm -f {err}\n"
+        'exit "$rc"'
+    )
+
+
+def parse_scan_output(stdout: str) -> list[dict]:
+    entries = []
+    for line in stdout.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            entries.append(json.loads(line))
+        except ValueError as exc:
+            raise ChunkedSnapshotError(f"Invalid snapshot scan output: {line[:200]}") from exc
+    return entries
+
+
+def encode_manifest(manifest: dict) -> bytes:
+    return gzip.compress(json.dumps(manifest, separators=(",", ":")).encode("utf-8"), mtime=0)
+
+
+def decode_manifest(payload: bytes) -> dict:
+    try:
+        manifest = json.loads(gzip.decompress(payload).decode("utf-8"))
+    except (OSError, ValueError) as exc:
+        raise ChunkedSnapshotError("Snapshot manifest is corrupted") from exc
+    if manifest.get("version") != MANIFEST_VERSION:
+        raise ChunkedSnapshotError(f"Unsupported snapshot manifest version {manifest.get('version')}")
+    return manifest
+
+
+@dataclass
+class PackWriter:
+    """Accumulate chunks into pack objects and upload each pack once it is full."""
+
+    put_object: Callable[[str, bytes], None]
+    key_prefix: str
+    target_bytes: int = DEFAULT_PACK_BYTES
+    locations: dict[str, list] = field(default_factory=dict)
+    pack_keys: list[str] = field(default_factory=list)
+    stored_bytes: int = 0
+    _buffer: bytearray = field(default_factory=bytearray)
+    _pending: dict[str, tuple[int, int]] = field(default_factory=dict)
+
+    def add(self, digest: str, data: bytes) -> None:
+        if digest in self.locations or digest in self._pending:
+            return
+        self._pending[digest] = (len(self._buffer), len(data))
+        self._buffer.extend(data)
+        if len(self._buffer) >= self.target_bytes:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self._pending:
+            return
+        key = f"{self.key_prefix.rstrip('/')}/{uuid.uuid4().hex}.pack"
+        self.put_object(key, bytes(self._buffer))
+        for digest, (offset, length) in self._pending.items():
+            self.locations[digest] = [key, offset, length]
+        self.pack_keys.append(key)
+        self.stored_bytes += len(self._buffer)
+        self._buffer = bytearray()
+        self._pending = {}
+
+
+class _FrameReader:
+    """Read ``>Q``-length-prefixed frames from an iterator of byte chunks."""
+
+    def __init__(self, chunks: Iterable[bytes]) -> None:
+        self._chunks = iter(chunks)
+        self._buffer = bytearray()
+
+    def _read_exact(self, size: int) -> bytes:
+        while len(self._buffer) < size:
+            try:
+                self._buffer.extend(next(self._chunks))
+            except StopIteration:
+                raise ChunkedSnapshotError("Snapshot pack stream ended early") from None
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return data
+
+    def read_frame(self) -> bytes:
+        (length,) = _LENGTH.unpack(self._read_exact(_LENGTH.size))
+        return self._read_exact(length) if length else b""
+
+
+def missing_chunk_requests(
+    entries: list[dict],
+    known: dict[str, list],
+) -> list[tuple[int, int]]:
+    """Return ``(entry_index, chunk_index)`` for the first use of each unknown digest."""
+    requests: list[tuple[int, int]] = []
+    requested: set[str] = set()
+    for entry_index, entry in enumerate(entries):
+        if entry.get("t") != "f":
+            continue
+        for chunk_index, digest in enumerate(entry.get("c") or []):
+            if digest in known or digest in requested:
+                continue
+            requested.add(digest)
+            requests.append((entry_index, chunk_index))
+    return requests
+
+
+def store_pack_stream(
+    entries: list[dict],
+    requests: list[tuple[int, int]],
+    stream: Iterable[bytes],
+    writer: PackWriter,
+) -> None:
+    """Hash the requested slices streamed out of the sandbox and add them to packs.
+
+    A slice whose digest no longer matches the scan (the file changed in between)
+    is stored under its actual digest and the entry is updated to point at it.
+    """
+    reader = _FrameReader(stream)
+    for entry_index, chunk_index in requests:
+        data = reader.read_frame()
+        digest = hashlib.sha256(data).hexdigest()
+        entries[entry_index]["c"][chunk_index] = digest
+        writer.add(digest, data)
+
+
+def pack_request_lines(entries: list[dict], requests: list[tuple[int, int]], chunk_size: int) -> bytes:
+    lines = [
+        json.dumps([entries[entry_index]["p"], chunk_index * chunk_size, chunk_size])
+        for entry_index, chunk_index in requests
+    ]
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+class PackCache:
+    """Small LRU of downloaded packs used while replaying a manifest."""
+
+    def __init__(self, get_object: Callable[[str], bytes], *, max_packs: int = 4) -> None:
+        self._get_object = get_object
+        self._max_packs = max(1, max_packs)
+        self._packs: OrderedDict[str, bytes] = OrderedDict()
+
+    def read(self, location: list) -> bytes:
+        key, offset, length = location
+        pack = self._packs.get(key)
+        if pack is None:
+            pack = self._get_object(key)
+            self._packs[key] = pack
+            while len(self._packs) > self._max_packs:
+                self._packs.popitem(last=False)
+        else:
+            self._packs.move_to_end(key)
+        return pack[offset : offset + length]
+
+
+def _tar_header(entry: dict, size: int) -> bytes:
+    info = tarfile.TarInfo(entry["p"].lstrip("/") or ".")
+    info.mode = int(entry.get("m", 0o644))
+    info.mtime = int(entry.get("mt", 0))
+    kind = entry.get("t")
+    if kind == "d":
+        info.type = tarfile.DIRTYPE
+    elif kind == "l":
+        info.type = tarfile.SYMTYPE
+        info.linkname = entry.get("l", "")
+    else:
+        info.type = tarfile.REGTYPE
+        info.size = size
+    return info.tobuf(format=tarfile.PAX_FORMAT, encoding="utf-8", errors="surrogateescape")
+
+
+def iter_tar_stream(manifest: dict, read_chunk: Callable[[list], bytes]) -> Iterator[bytes]:
+    """Yield an uncompressed tar stream rebuilding every manifest entry."""
+    locations = manifest.get("chunks") or {}
+    for entry in manifest.get("entries") or []:
+        digests = (entry.get("c") or []) if entry.get("t") == "f" else []
+        try:
+            size = sum(int(locations[digest][2]) for digest in digests)
+        except KeyError as exc:
+            raise ChunkedSnapshotError(f"Snapshot manifest is missing chunk {exc.args[0]}") from None
+        yield _tar_header(entry, size)
+        for digest in digests:
+            data = read_chunk(locations[digest])
+            if hashlib.sha256(data).hexdigest() != digest:
+                raise ChunkedSnapshotError(f"Snapshot chunk {digest} failed verification")
+            yield data
+        remainder = size % _BLOCK
+        if remainder:
+            yield b"\0" * (_BLOCK - remainder)
+    yield b"\0" * (_BLOCK * 2)
@@ -1,6 +1,5 @@
 from __future__ import annotations
 
-import json
 import logging
 import os
 import re
@@ -14,7 +13,10 @@ from deepagents.backends.utils import (
     format_content_with_line_numbers,
     perform_string_replacement,
 )
+from langchain.agents.middleware import AgentMiddleware
+from langchain_core.messages import ToolMessage
 
+from astraforge.sandbox import fs_commands, session_cache
 from astraforge.sandbox.models import SandboxSession, SandboxSnapshot
 from astraforge.sandbox.services import SandboxOrchestrator, SandboxProvisionError
 
@@ -27,6 +29,57 @@ except Exception:  # noqa: BLE001
     HttpSandboxBackend = None
 
 
+def _format_ranged_read(stdout: str, file_path: str, offset: int, max_bytes: int) -> tuple[str, bool]:
+    """Turn ``fs_commands.ranged_read_command`` output into numbered lines; the flag marks errors."""
+    parsed = fs_commands.split_ranged_read(stdout)
+    if parsed is None:
+        return f"Error: File '{file_path}' not found", True
+    body, total = parsed
+    if total == 0:
+        return check_empty_content(""), False
+    start_idx = offset if offset > 0 else 0
+    if start_idx >= total:
+        return f"Error: Line offset {offset} exceeds file length ({total} lines)", True
+
+    lines, truncated = fs_commands.read_window(body, max_bytes)
+    content = format_content_with_line_numbers(lines, start_line=start_idx + 1)
+    end_idx = start_idx + len(lines)
+    if truncated:
+        content += (
+            f"\n[Output capped at {max_bytes} bytes; file has {total} lines. "
+            f"Continue with offset={end_idx}.]"
+        )
+    elif start_idx > 0 or end_idx < total:
+        content += f"\n[Lines {start_idx + 1}-{end_idx} of {total}.]"
+    return content, False
+
+
+def _parse_inplace_edit(
+    stdout: str, file_path: str, old_string: str, new_string: str, replace_all: bool
+) -> tuple[int | None, str | None]:
+    """Return ``(occurrences, None)`` on success or ``(None, error)`` for the LLM."""
+    data = fs_commands.parse_edit_status(stdout)
+    status = data.get("status")
+    if status == "ok":
+        return int(data.get("occurrences") or 0), None
+    if status == "missing":
+        return None, f"Error: File '{file_path}' not found"
+    if status == "binary":
+        return None, f"Error: File '{file_path}' is not valid UTF-8 text"
+    if status == "mismatch":
+        # Reuse the upstream wording for not-found/ambiguous matches; the sandbox only
+        # reports the count, so synthesize content with exactly that many occurrences.
+        occurrences = int(data.get("occurrences") or 0)
+        replacement = perform_string_replacement(
+            old_string * occurrences, old_string, new_string, replace_all
+        )
+        if isinstance(replacement, str):
+            return None, replacement
+        return None, f"Error: String not found in file: '{old_string}'"
+    message = data.get("message")
+    return None, f"Edit failed: {message or (stdout or '').strip() or 'unknown error'}"
+
+
 class _SandboxBackend(BackendProtocol):
     """DeepAgents filesystem backend that shells into AstraForge sandboxes.
 
@@ -99,12 +152,14 @@ class _SandboxBackend(BackendProtocol):
         session_id = configurable.get("sandbox_session_id")
         if not session_id:
             raise RuntimeError("sandbox_session_id missing from runtime config")
-        try:
-            session = SandboxSession.objects.get(id=session_id)
-        except SandboxSession.DoesNotExist as exc:
-            raise RuntimeError(f"Sandbox session {session_id} not found") from exc
-
-        session = self._ensure_ready(session)
+        session = session_cache.get(session_id)
+        if session is None:
+            try:
+                session = SandboxSession.objects.get(id=session_id)
+            except SandboxSession.DoesNotExist as exc:
+                raise RuntimeError(f"Sandbox session {session_id} not found") from exc
+            session = self._ensure_ready(session)
+            session_cache.put(session)
         # Mirror the HTTP backend: align root to the session's workspace path.
         self._workspace_root = session.workspace_path or self.root_dir
         return session
@@ -121,8 +176,17 @@ class _SandboxBackend(BackendProtocol):
         try:
             return self.orchestrator.execute(session, command, cwd=cwd)
         except SandboxProvisionError as exc:
+            session_cache.invalidate(session.id)
             raise RuntimeError(str(exc)) from exc
 
+    def _index_query(self, session: SandboxSession, request: dict[str, Any]) -> dict[str, Any] | None:
+        """Answer from the in-sandbox workspace index when enabled; ``None`` means fall back."""
+        if not fs_commands.workspace_index_enabled():
+            return None
+        root = self._workspace_root or self.root_dir
+        result = self._shell(session, fs_commands.index_query_command(request, root))
+        return fs_commands.parse_index_response(result.exit_code, result.stdout or "")
+
     def _log_llm_error(self, message: str) -> None:
         try:
             self._log.error("backend response to llm: %s", message)
@@ -163,6 +227,9 @@ class _SandboxBackend(BackendProtocol):
 
         session = self._session()
         target = self._abs_path(path or self.root_dir)
+        indexed = self._index_query(session, {"op": "ls", "path": target})
+        if indexed is not None:
+            return [FileInfo(**item) for item in indexed.get("entries") or []]
         result = self._shell(
             session,
             f"ls -la --time-style=+%Y-%m-%dT%H:%M:%SZ {shlex.quote(target)}",
@@ -205,33 +272,27 @@ class _SandboxBackend(BackendProtocol):
 
         session = self._session()
         target = self._abs_path(file_path)
-        result = self._shell(session, f"cat {shlex.quote(target)}")
+        max_bytes = fs_commands.read_max_bytes()
+        # Slice the requested window inside the sandbox so transfer size tracks the page, not the file.
+        command = fs_commands.ranged_read_command(target, max(offset, 0), limit, max_bytes)
+        result = self._shell(session, command)
         if int(result.exit_code) != 0:
             msg = f"Error: File '{file_path}' not found"
             self._log_llm_error(msg)
             return msg
-        content = result.stdout or ""
-        empty_msg = check_empty_content(content)
-        if empty_msg:
-            return empty_msg
-
-        lines = content.splitlines()
-        start_idx = offset if offset > 0 else 0
-        end_idx = min(start_idx + limit, len(lines))
-
-        if start_idx >= len(lines):
-            msg = f"Error: Line offset {offset} exceeds file length ({len(lines)} lines)"
-            self._log_llm_error(msg)
-            return msg
-
-        selected = lines[start_idx:end_idx]
-        return format_content_with_line_numbers(selected, start_line=start_idx + 1)
+        content, failed = _format_ranged_read(result.stdout or "", file_path, offset, max_bytes)
+        if failed:
+            self._log_llm_error(content)
+        return content
 
     def grep_raw(
         self,
         pattern: str,
         path: str | None = None,
         glob: str | None = None,
+        *,
+        max_matches: int | None = None,
+        max_bytes: int | None = None,
     ) -> list[GrepMatch] | str:
         if self._http_backend is not None:
             return self._http_backend.grep_raw(pattern, path=path, glob=glob)
@@ -245,12 +306,44 @@ class _SandboxBackend(BackendProtocol):
 
         session = self._session()
         base = self._abs_path(path or self.root_dir)
+        max_matches = max_matches or fs_commands.grep_max_matches()
+        max_bytes = max_bytes or fs_commands.grep_max_bytes()
+
+        indexed = self._index_query(
+            session,
+            {
+                "op": "grep",
+                "path": base,
+                "pattern": pattern,
+                "glob": glob,
+                "max_matches": max_matches,
+                "max_bytes": max_bytes,
+                "max_filesize": fs_commands.grep_max_filesize(),
+            },
+        )
+        if indexed is not None:
+            output = fs_commands.GrepOutput(
+                matches=indexed.get("matches") or [],
+                exit_code=0,
+                truncated=bool(indexed.get("truncated")),
+            )
+            return self._budgeted_matches(output, max_matches, max_bytes)
 
-        rg_matches = self._ripgrep_search(session, pattern, base, glob)
+        rg_matches = self._ripgrep_search(session, pattern, base, glob, max_matches, max_bytes)
         if rg_matches is not None:
             return rg_matches
 
-        return self._grep_fallback(session, pattern, base, glob)
+        return self._grep_fallback(session, pattern, base, glob, max_matches, max_bytes)
+
+    def _budgeted_matches(
+        self, output: fs_commands.GrepOutput, max_matches: int, max_bytes: int
+    ) -> list[GrepMatch]:
+        matches = [GrepMatch(**item) for item in output.matches]
+        if not output.truncated:
+            return fs_commands.GrepResults(matches)
+        notice = fs_commands.grep_truncation_notice(max_matches, max_bytes)
+        fs_commands.report_grep_notice(notice)
+        return fs_commands.GrepResults(matches, truncated=True, notice=notice)
 
     def _ripgrep_search(
         self,
@@ -258,32 +351,23 @@ class _SandboxBackend(BackendProtocol):
         pattern: str,
         base: str,
         glob: str | None,
+        max_matches: int,
+        max_bytes: int,
     ) -> list[GrepMatch] | None:
-        parts = ["rg", "--json"]
-        if glob:
-            parts.extend(["--glob", glob])
-        parts.extend(["--", pattern, base])
-        cmd = " ".join(shlex.quote(p) for p in parts)
+        cmd = fs_commands.ripgrep_command(
+            pattern,
+            base,
+            glob,
+            max_matches=max_matches,
+            max_bytes=max_bytes,
+            max_filesize=fs_commands.grep_max_filesize(),
+        )
         result = self._shell(session, cmd)
-        if int(result.exit_code) not in (0, 1):
+        output = fs_commands.parse_grep_output(result.stdout or "", max_matches=max_matches)
+        # A missing trailer means the budget cut the stream, so rg was running fine.
+        if output.exit_code not in (None, 0, 1):
             return None
-
-        matches: list[GrepMatch] = []
-        for line in (result.stdout or "").splitlines():
-            try:
-                data = json.loads(line)
-            except json.JSONDecodeError:
-                continue
-            if data.get("type") != "match":
-                continue
-            pdata = data.get("data", {})
-            ftext = pdata.get("path", {}).get("text")
-            line_no = pdata.get("line_number")
-            text = (pdata.get("lines", {}) or {}).get("text", "").rstrip("\n")
-            if not ftext or line_no is None:
-                continue
-            matches.append(GrepMatch(path=ftext, line=int(line_no), text=text))
-        return matches
+        return self._budgeted_matches(output, max_matches, max_bytes)
 
     def _grep_fallback(
         self,
@@ -291,34 +375,24 @@ class _SandboxBackend(BackendProtocol):
         pattern: str,
         base: str,
         glob: str | None,
+        max_matches: int,
+        max_bytes: int,
     ) -> list[GrepMatch] | str:
-        parts = ["grep", "-RIn"]
-        if glob:
-            parts.append(f"--include={glob}")
-        parts.extend([pattern, base])
-        cmd = " ".join(shlex.quote(p) for p in parts)
+        cmd = fs_commands.grep_command(
+            pattern, base, glob, max_matches=max_matches, max_bytes=max_bytes
+        )
         result = self._shell(session, cmd)
-        exit_code = int(result.exit_code)
         stdout = result.stdout or ""
-        if exit_code == 2:
+        output = fs_commands.parse_grep_output(stdout, max_matches=max_matches)
+        if output.exit_code == 2 and not output.matches:
             msg = f"Invalid regex pattern: {pattern}"
             self._log_llm_error(msg)
             return msg
-        if exit_code not in (0, 1):
+        if output.exit_code not in (None, 0, 1, 2):
             msg = f"grep error: {stdout.strip()}"
             self._log_llm_error(msg)
             return msg
-        if not stdout.strip():
-            return []
-        matches: list[GrepMatch] = []
-        for line in stdout.splitlines():
-            try:
-                path_part, line_part, text = line.split(":", 2)
-                lineno = int(line_part)
-            except ValueError:
-                continue
-            matches.append(GrepMatch(path=path_part, line=lineno, text=text))
-        return matches
+        return self._budgeted_matches(output, max_matches, max_bytes)
 
     def glob_info(self, pattern: str, path: str = "/") -> List[FileInfo]:
         if self._http_backend is not None:
@@ -327,48 +401,23 @@ class _SandboxBackend(BackendProtocol):
         session = self._session()
         base = self._abs_path(path or self.root_dir)
         search_pattern = pattern.lstrip("/") if pattern.startswith("/") else pattern
-        cmd = f"""python - <<'PY'
-import json
-from datetime import datetime
-from pathlib import Path
-
-base = Path({base!r})
-pattern = {search_pattern!r}
-
-if not base.exists() or not base.is_dir():
-    print("[]")
-    raise SystemExit(0)
-
-results = []
-for matched in base.rglob(pattern):
-    try:
-        is_file = matched.is_file()
-    except OSError:
-        continue
-    if not is_file:
-        continue
-    try:
-        st = matched.stat()
-        results.append({{
-            "path": str(matched),
-            "is_dir": False,
-            "size": int(st.st_size),
-            "modified_at": datetime.fromtimestamp(st.st_mtime).isoformat(),
-        }})
-    except OSError:
-        results.append({{"path": str(matched), "is_dir": False}})
-
-results.sort(key=lambda item: item.get("path", ""))
-print(json.dumps(results))
-PY"""
+        max_results = fs_commands.glob_max_results()
+        indexed = self._index_query(
+            session,
+            {"op": "glob", "path": base, "pattern": search_pattern, "max_results": max_results},
+        )
+        if indexed is not None:
+            return [FileInfo(**item) for item in indexed.get("files") or []]
+        cmd = fs_commands.glob_command(
+            base,
+            search_pattern,
+            ignore=fs_commands.glob_ignore(),
+            max_results=max_results,
+        )
         result = self._shell(session, cmd)
         if int(result.exit_code) != 0:
             return []
-        try:
-            parsed = json.loads(result.stdout or "[]")
-        except json.JSONDecodeError:
-            return []
-        return [FileInfo(**item) for item in parsed if isinstance(item, dict)]
+        return [FileInfo(**item) for item in fs_commands.parse_glob_output(result.stdout or "")]
 
     def write(self, file_path: str, content: str) -> WriteResult:
         if self._http_backend is not None:
@@ -418,24 +467,49 @@ PY"""
 
         target = self._abs_path(file_path)
         session = self._session()
-        raw = self._shell(session, f"cat {shlex.quote(target)}")
-        if int(raw.exit_code) != 0:
-            return EditResult(error=f"Error: File '{file_path}' not found")
-
-        replacement = perform_string_replacement(
-            raw.stdout or "", old_string, new_string, replace_all
+        # Ship only the strings; the sandbox rewrites the file so latency is independent of its size.
+        try:
+            result = self.orchestrator.edit_file(
+                session, target, old_string, new_string, replace_all
+            )
+        except SandboxProvisionError as exc:
+            session_cache.invalidate(session.id)
+            raise RuntimeError(str(exc)) from exc
+        occurrences, error = _parse_inplace_edit(
+            result.stdout or "", file_path, old_string, new_string, replace_all
         )
-        if isinstance(replacement, str):
-            return EditResult(error=replacement)
-        updated, occurrences = replacement
+        if error is not None:
+            self._log_llm_error(error)
+            return EditResult(error=error)
+        return EditResult(path=target, files_update=None, occurrences=occurrences)
 
-        # Overwrite existing file contents directly; edits by definition target existing files.
-        result = self.orchestrator.upload_bytes(session, target, updated.encode("utf-8"))
-        if int(result.exit_code) != 0:
-            message = result.stdout or result.stderr or "unknown error"
-            self._log_llm_error(f"Edit failed: {message}")
-            return EditResult(error=f"Edit failed: {message}")
-        return EditResult(path=target, files_update=None, occurrences=int(occurrences))
+
+def _with_grep_notices(result, notices: list[str]):
+    if not notices or not isinstance(result, ToolMessage) or not isinstance(result.content, str):
+        return result
+    return result.model_copy(update={"content": "\n\n".join([result.content, *notices])})
+
+
+class GrepNoticeMiddleware(AgentMiddleware):
+    """Append grep truncation notices to the text the ``grep`` tool returns.
+
+    The deepagents grep tool formats ``grep_raw`` results with ``format_grep_matches``,
+    which only sees the matches, so a capped search would otherwise read as complete.
+    """
+
+    def wrap_tool_call(self, request, handler):
+        if request.tool_call.get("name") != "grep":
+            return handler(request)
+        with fs_commands.collect_grep_notices() as notices:
+            result = handler(request)
+        return _with_grep_notices(result, notices)
+
+    async def awrap_tool_call(self, request, handler):
+        if request.tool_call.get("name") != "grep":
+            return await handler(request)
+        with fs_commands.collect_grep_notices() as notices:
+            result = await handler(request)
+        return _with_grep_notices(result, notices)
 
 
 class PolicyWrapper(BackendProtocol):
@@ -482,11 +556,11 @@ class PolicyWrapper(BackendProtocol):
         return self.inner.read(file_path, offset=offset, limit=limit)
 
     def grep_raw(
-        self, pattern: str, path: str | None = None, glob: str | None = None
+        self, pattern: str, path: str | None = None, glob: str | None = None, **budget: Any
     ) -> list[GrepMatch] | str:
         if self._deny(path):
             return self._error(path)
-        return self.inner.grep_raw(pattern, path, glob)
+        return self.inner.grep_raw(pattern, path, glob, **budget)
 
     def glob_info(self, pattern: str, path: str = "/") -> List[FileInfo]:
         if self._deny(path):
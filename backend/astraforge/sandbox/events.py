@@ -0,0 +1,73 @@
+"""Sandbox session status notifications over Redis pub/sub.
+
+Asynchronous provisioning publishes every status transition on a per-session
+channel so SSE clients can wait on an event instead of polling the session.
+Publishing is best effort: the database row stays the source of truth and
+subscribers re-read it whenever they (re)connect.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+
+import redis
+from django.conf import settings
+
+from astraforge.sandbox.models import SandboxSession
+
+logger = logging.getLogger(__name__)
+
+
+def session_channel(session_id) -> str:
+    return f"sandbox_session_status_{session_id}"
+
+
+def session_status_payload(session: SandboxSession) -> dict:
+    metadata = session.metadata or {}
+    return {
+        "id": str(session.id),
+        "status": session.status,
+        "workspace_path": session.workspace_path,
+        "error_message": session.error_message,
+        "terminated_reason": metadata.get("terminated_reason"),
+    }
+
+
+def _client() -> "redis.Redis":
+    return redis.from_url(settings.REDIS_URL, socket_connect_timeout=2)
+
+
+def publish_session_status(session: SandboxSession) -> None:
+    try:
+        _client().publish(session_channel(session.id), json.dumps(session_status_payload(session)))
+    except redis.RedisError as exc:
+        logger.debug(
+            "Failed to publish sandbox status",
+            extra={"session_id": str(session.id), "error": str(exc)},
+        )
+
+
+def subscribe_session_status(session_id):
+    """Return a pub/sub handle subscribed to the session channel, or None without Redis."""
+    try:
+        pubsub = _client().pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(session_channel(session_id))
+    except redis.RedisError as exc:
+        logger.debug(
+            "Sandbox status subscription unavailable",
+            extra={"session_id": str(session_id), "error": str(exc)},
+        )
+        return None
+    return pubsub
+
+
+def subscribe_all_session_statuses():
+    """Pattern subscription to every session's status channel, or None without Redis."""
+    try:
+        pubsub = _client().pubsub(ignore_subscribe_messages=True)
+        pubsub.psubscribe(session_channel("*"))
+    except redis.RedisError as exc:
+        logger.debug("Sandbox status subscription unavailable", extra={"error": str(exc)})
+        return None
+    return pubsub
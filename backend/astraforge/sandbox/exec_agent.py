@@ -0,0 +1,528 @@
+"""Host-side client for the persistent in-sandbox exec agent.
+
+The agent (``sandbox/exec_agent.py``, installed in the sandbox image as
+``astraforge-exec-agent``) speaks a small framed protocol over the stdio of one
+long-lived ``docker exec -i``/``kubectl exec -i`` process. Each command gets a
+request id so many commands can share the same channel without paying an exec
+spawn per call.
+
+Agents that advertise ``flow_control`` in their hello get credit-based flow
+control per request: the host grants ``OUTPUT_WINDOW`` bytes of output and
+returns credit as the consumer reads it, and the agent returns stdin credit as
+the command drains its input. A slow consumer of a streamed download therefore
+stalls only its own command instead of buffering its whole output in memory.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import queue
+import struct
+import subprocess
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Iterable, Iterator, Sequence
+
+from astraforge.domain.models.workspace import CommandResult
+
+logger = logging.getLogger(__name__)
+
+PROTOCOL_VERSION = 1
+HEADER = struct.Struct(">BII")
+CHUNK_SIZE = 64 * 1024
+CREDIT_FORMAT = struct.Struct(">I")
+OUTPUT_WINDOW = 1024 * 1024
+
+HELLO = 1
+EXEC = 2
+STDIN = 3
+STDIN_EOF = 4
+STDOUT = 5
+STDERR = 6
+EXIT = 7
+CANCEL = 8
+CREDIT = 9
+
+_CLOSED = object()
+
+
+class ExecAgentError(RuntimeError):
+    """Raised when the exec channel breaks while a command is in flight."""
+
+
+class ExecAgentUnavailable(ExecAgentError):
+    """Raised when a command could not be sent; callers may safely fall back."""
+
+
+class ExecAgentTimeout(ExecAgentError):
+    """Raised when one command overran its wait; the channel itself is still usable."""
+
+
+def exec_agent_enabled() -> bool:
+    return os.getenv("SANDBOX_EXEC_AGENT", "0").lower() in {"1", "true", "yes", "on"}
+
+
+def exec_agent_command() -> list[str]:
+    raw = os.getenv("SANDBOX_EXEC_AGENT_COMMAND", "astraforge-exec-agent --attach")
+    return raw.split()
+
+
+def _normalize_text(raw: bytes) -> str:
+    # Mirror CommandRunner's text-mode pipes (UTF-8 with universal newlines).
+    text = raw.decode("utf-8", errors="replace")
+    return text.replace("\r\n", "\n").replace("\r", "\n")
+
+
+@dataclass
+class _Exit:
+    exit_code: int
+    error: str = ""
+
+
+class ExecAgentProcess:
+    """Handle for one command running over an :class:`ExecAgentChannel`."""
+
+    def __init__(
+        self,
+        channel: "ExecAgentChannel",
+        request_id: int,
+        *,
+        output_window: int = 0,
+        stdin_window: int = 0,
+    ) -> None:
+        self._channel = channel
+        self.request_id = request_id
+        # Holds at most ``output_window`` unread bytes when the agent honors credits.
+        self._events: queue.Queue = queue.Queue()
+        self._exit: _Exit | None = None
+        self._output_window = output_window
+        self._unacked = 0
+        self._stdin_window = stdin_window
+        self._stdin_credit = stdin_window
+        self._stdin_cond = threading.Condition()
+        self._finished = False
+
+    # stdin -----------------------------------------------------------------
+
+    def write(self, data: bytes) -> bool:
+        """Send ``data`` to the command's stdin; False once the command has exited."""
+        size = min(CHUNK_SIZE, self._stdin_window) if self._stdin_window else CHUNK_SIZE
+        for offset in range(0, len(data), size):
+            piece = data[offset : offset + size]
+            if not self._take_stdin_credit(len(piece)):
+                return False
+            self._channel._send(STDIN, self.request_id, piece)
+        return True
+
+    def close_stdin(self) -> None:
+        self._channel._send(STDIN_EOF, self.request_id)
+
+    def cancel(self) -> None:
+        try:
+            self._channel._send(CANCEL, self.request_id)
+        except ExecAgentError:
+            pass
+
+    # output ----------------------------------------------------------------
+
+    def iter_output(self, *, timeout: float | None = None) -> Iterator[tuple[int, bytes]]:
+        """Yield ``(frame_type, chunk)`` pairs until the command exits."""
+        deadline = time.monotonic() + timeout if timeout else None
+        while self._exit is None:
+            remaining = None
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.cancel()
+                    raise ExecAgentTimeout("Timed out waiting for sandbox command output")
+            try:
+                event = self._events.get(timeout=remaining)
+            except queue.Empty:
+                continue
+            if event is _CLOSED:
+                raise ExecAgentError("Sandbox exec channel closed while command was running")
+            kind, payload = event
+            if kind == EXIT:
+                self._exit = payload
+                break
+            self._ack(len(payload))
+            yield kind, payload
+
+    def wait(self, *, timeout: float | None = None) -> int:
+        for _ in self.iter_output(timeout=timeout):
+            pass
+        assert self._exit is not None
+        return self._exit.exit_code
+
+    @property
+    def error(self) -> str:
+        return self._exit.error if self._exit else ""
+
+    def _ack(self, size: int) -> None:
+        if not self._output_window:
+            return
+        self._unacked += size
+        if self._unacked < self._output_window // 4:
+            return
+        credit, self._unacked = self._unacked, 0
+        try:
+            self._channel._send(CREDIT, self.request_id, CREDIT_FORMAT.pack(credit))
+        except ExecAgentError:
+            pass
+
+    def _take_stdin_credit(self, size: int) -> bool:
+        with self._stdin_cond:
+            if not self._stdin_window:
+                return not self._finished
+            while self._stdin_credit < size and not self._finished:
+                self._stdin_cond.wait()
+            if self._finished:
+                return False
+            self._stdin_credit -= size
+            return True
+
+    def _grant_stdin(self, size: int) -> None:
+        with self._stdin_cond:
+            self._stdin_credit += size
+            self._stdin_cond.notify_all()
+
+    def _finish(self) -> None:
+        with self._stdin_cond:
+            self._finished = True
+            self._stdin_cond.notify_all()
+
+    def _deliver(self, kind: int, payload) -> None:
+        if kind == EXIT:
+            self._finish()
+        self._events.put((kind, payload))
+
+    def _close(self) -> None:
+        self._finish()
+        self._events.put(_CLOSED)
+
+
+class ExecAgentChannel:
+    """One attached exec process multiplexing commands for a sandbox."""
+
+    def __init__(
+        self,
+        argv: Sequence[str],
+        *,
+        connect_timeout: float = 5.0,
+        popen: Callable[..., subprocess.Popen] = subprocess.Popen,
+    ) -> None:
+        self.argv = list(argv)
+        self.connect_timeout = connect_timeout
+        self._popen = popen
+        self._process: subprocess.Popen | None = None
+        self._write_lock = threading.Lock()
+        self._state_lock = threading.Lock()
+        self._next_id = 1
+        self._pending: dict[int, ExecAgentProcess] = {}
+        self._hello = threading.Event()
+        self._closed = False
+        self._flow_control = False
+        self._stdin_window = 0
+
+    @property
+    def alive(self) -> bool:
+        return (
+            not self._closed
+            and self._process is not None
+            and self._process.poll() is None
+        )
+
+    def start(self) -> bool:
+        """Spawn the attached process and complete the protocol handshake."""
+        try:
+            self._process = self._popen(
+                self.argv,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                bufsize=0,
+            )
+        except OSError as exc:
+            logger.info("Exec agent could not be started: %s", exc)
+            self._closed = True
+            return False
+        threading.Thread(target=self._read_loop, daemon=True).start()
+        try:
+            self._send(HELLO, 0, json.dumps({"version": PROTOCOL_VERSION}).encode("utf-8"))
+        except ExecAgentError:
+            self.close()
+            return False
+        if not self._hello.wait(self.connect_timeout) or self._closed:
+            self.close()
+            return False
+        return True
+
+    def open(
+        self,
+        argv: Sequence[str],
+        *,
+        cwd: str | None = None,
+        stdin: bool = False,
+        merge_stderr: bool = True,
+        env: dict[str, str] | None = None,
+    ) -> ExecAgentProcess:
+        with self._state_lock:
+            if not self.alive:
+                raise ExecAgentUnavailable("Sandbox exec channel is not connected")
+            request_id = self._next_id
+            self._next_id += 1
+            if self._flow_control:
+                handle = ExecAgentProcess(
+                    self,
+                    request_id,
+                    output_window=OUTPUT_WINDOW,
+                    stdin_window=self._stdin_window,
+                )
+            else:
+                handle = ExecAgentProcess(self, request_id)
+            self._pending[request_id] = handle
+        spec = {
+            "argv": list(argv),
+            "cwd": cwd,
+            "stdin": stdin,
+            "merge_stderr": merge_stderr,
+            "env": env or {},
+        }
+        if self._flow_control:
+            spec["window"] = OUTPUT_WINDOW
+        try:
+            self._send(EXEC, request_id, json.dumps(spec).encode("utf-8"))
+        except ExecAgentError as exc:
+            with self._state_lock:
+                self._pending.pop(request_id, None)
+            raise ExecAgentUnavailable(str(exc)) from exc
+        return handle
+
+    def run(
+        self,
+        argv: Sequence[str],
+        *,
+        input_chunks: Iterable[bytes] | None = None,
+        timeout: float | None = None,
+    ) -> CommandResult:
+        """Run ``argv`` to completion, returning output like ``CommandRunner``."""
+        handle = self.open(argv, stdin=input_chunks is not None)
+        feed_errors: list[BaseException] = []
+        feeder = None
+        if input_chunks is not None:
+            # Feed stdin alongside reading output: with flow control, a command that
+            # writes before draining its input would otherwise stall both windows.
+            feeder = threading.Thread(
+                target=self._feed_stdin, args=(handle, input_chunks, feed_errors), daemon=True
+            )
+            feeder.start()
+        output = bytearray()
+        for _kind, chunk in handle.iter_output(timeout=timeout):
+            output.extend(chunk)
+        exit_code = handle.wait()
+        if feeder is not None:
+            feeder.join()
+        if feed_errors:
+            raise feed_errors[0]
+        stdout = _normalize_text(bytes(output))
+        if handle.error and not stdout:
+            stdout = handle.error
+        return CommandResult(exit_code=exit_code, stdout=stdout, stderr="")
+
+    def close(self) -> None:
+        self._closed = True
+        process = self._process
+        if process is not None:
+            try:
+                if process.stdin:
+                    process.stdin.close()
+            except OSError:
+                pass
+            if process.poll() is None:
+                try:
+                    process.terminate()
+                    process.wait(timeout=2)
+                except Exception:  # noqa: BLE001
+                    process.kill()
+        self._fail_pending()
+
+    # internals ---------------------------------------------------------------
+
+    def _feed_stdin(
+        self,
+        handle: ExecAgentProcess,
+        chunks: Iterable[bytes],
+        errors: list[BaseException],
+    ) -> None:
+        try:
+            for chunk in chunks:
+                if chunk and not handle.write(chunk):
+                    return
+            handle.close_stdin()
+        except BaseException as exc:  # noqa: BLE001 - re-raised by run()
+            errors.append(exc)
+            handle.cancel()
+
+    def _send(self, kind: int, request_id: int, payload: bytes = b"") -> None:
+        process = self._process
+        if self._closed or process is None or process.stdin is None:
+            raise ExecAgentError("Sandbox exec channel is closed")
+        frame = HEADER.pack(kind, request_id, len(payload)) + payload
+        with self._write_lock:
+            try:
+                process.stdin.write(frame)
+                process.stdin.flush()
+            except (BrokenPipeError, OSError, ValueError) as exc:
+                self._closed = True
+                raise ExecAgentError(f"Sandbox exec channel write failed: {exc}") from exc
+
+    def _read_exact(self, stream, size: int) -> bytes | None:
+        data = bytearray()
+        while len(data) < size:
+            chunk = stream.read(size - len(data))
+            if not chunk:
+                return None
+            data.extend(chunk)
+        return bytes(data)
+
+    def _read_loop(self) -> None:
+        process = self._process
+        assert process is not None and process.stdout is not None
+        stream = process.stdout
+        try:
+            while True:
+                header = self._read_exact(stream, HEADER.size)
+                if header is None:
+                    break
+                kind, request_id, length = HEADER.unpack(header)
+                payload = self._read_exact(stream, length) if length else b""
+                if payload is None:
+                    break
+                if kind == HELLO:
+                    self._on_hello(payload)
+                    continue
+                with self._state_lock:
+                    handle = self._pending.get(request_id)
+                    if kind == EXIT:
+                        self._pending.pop(request_id, None)
+                if handle is None:
+                    continue
+                if kind == CREDIT:
+                    if length == CREDIT_FORMAT.size:
+                        handle._grant_stdin(CREDIT_FORMAT.unpack(payload)[0])
+                    continue
+                if kind == EXIT:
+                    try:
+                        body = json.loads(payload.decode("utf-8"))
+                    except ValueError:
+                        body = {}
+                    handle._deliver(
+                        EXIT,
+                        _Exit(
+                            exit_code=int(body.get("exit_code", 1)),
+                            error=str(body.get("error") or ""),
+                        ),
+                    )
+                else:
+                    handle._deliver(kind, payload)
+        except (OSError, ValueError):
+            pass
+        finally:
+            self._closed = True
+            self._hello.set()
+            self._fail_pending()
+
+    def _on_hello(self, payload: bytes) -> None:
+        try:
+            body = json.loads(payload.decode("utf-8")) if payload else {}
+        except ValueError:
+            body = {}
+        if isinstance(body, dict) and body.get("flow_control"):
+            try:
+                self._stdin_window = max(0, int(body.get("stdin_window") or 0))
+            except (TypeError, ValueError):
+                self._stdin_window = 0
+            self._flow_control = True
+        self._hello.set()
+
+    def _fail_pending(self) -> None:
+        with self._state_lock:
+            pending = list(self._pending.values())
+            self._pending.clear()
+        for handle in pending:
+            handle._close()
+
+
+class ExecAgentPool:
+    """Process-wide cache of exec channels keyed by sandbox ref."""
+
+    def __init__(self, *, retry_after_sec: float | None = None) -> None:
+        self._channels: dict[str, ExecAgentChannel] = {}
+        self._unavailable_until: dict[str, float] = {}
+        self._key_locks: dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        if retry_after_sec is None:
+            try:
+                retry_after_sec = float(os.getenv("SANDBOX_EXEC_AGENT_RETRY_SEC", "60"))
+            except ValueError:
+                retry_after_sec = 60.0
+        self.retry_after_sec = retry_after_sec
+
+    def acquire(
+        self,
+        key: str,
+        argv_factory: Callable[[], Sequence[str]],
+        *,
+        channel_factory: Callable[[Sequence[str]], ExecAgentChannel] = ExecAgentChannel,
+    ) -> ExecAgentChannel | None:
+        with self._lock:
+            channel = self._cached(key)
+            if channel is not None:
+                return channel
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        # The HELLO handshake can take seconds; only callers for the same sandbox wait on it.
+        with key_lock:
+            with self._lock:
+                channel = self._cached(key)
+                if channel is not None:
+                    return channel
+                blocked_until = self._unavailable_until.get(key)
+                if blocked_until and blocked_until > time.monotonic():
+                    return None
+            channel = channel_factory(argv_factory())
+            started = channel.start()
+            with self._lock:
+                if not started:
+                    self._unavailable_until[key] = time.monotonic() + self.retry_after_sec
+                    logger.info("Exec agent unavailable for %s; using per-command exec", key)
+                    return None
+                self._unavailable_until.pop(key, None)
+                self._channels[key] = channel
+            return channel
+
+    def _cached(self, key: str) -> ExecAgentChannel | None:
+        # Caller holds ``self._lock``.
+        channel = self._channels.get(key)
+        if channel is not None and channel.alive:
+            return channel
+        if channel is not None:
+            self._channels.pop(key, None)
+        return None
+
+    def get(self, key: str) -> ExecAgentChannel | None:
+        """Return an already-connected channel without spawning a new one."""
+        with self._lock:
+            channel = self._channels.get(key)
+        if channel is not None and channel.alive:
+            return channel
+        return None
+
+    def discard(self, key: str) -> None:
+        with self._lock:
+            channel = self._channels.pop(key, None)
+            self._unavailable_until.pop(key, None)
+        if channel is not None:
+            channel.close()
@@ -0,0 +1,497 @@
+"""Shell snippets the agent filesystem tools run inside a sandbox.
+
+Kept free of Django imports so benchmarks can build the exact same commands.
+"""
+
+from __future__ import annotations
+
+import base64
+import json
+import os
+import shlex
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Iterator
+
+DEFAULT_READ_MAX_BYTES = 262144
+_READ_TRAILER = "__ASTRAFORGE_READ_TOTAL__"
+DEFAULT_GLOB_IGNORE = (".git", "node_modules", "__pycache__", ".venv")
+DEFAULT_GLOB_MAX_RESULTS = 5000
+DEFAULT_GREP_MAX_MATCHES = 1000
+DEFAULT_GREP_MAX_BYTES = 512 * 1024
+DEFAULT_GREP_MAX_FILESIZE = "10M"
+# Long (e.g. minified) lines are previewed rather than blowing the byte budget.
+GREP_MAX_COLUMNS = 1000
+_GREP_EXIT_MARKER = "__ASTRAFORGE_GREP_EXIT__"
+DEFAULT_WORKSPACE_INDEX_COMMAND = "astraforge-workspace-index"
+# Raw old+new string bytes shipped inside the edit script; base64 keeps it well under 128 KiB.
+INPLACE_EDIT_INLINE_MAX_BYTES = 64 * 1024
+
+
+def glob_ignore() -> tuple[str, ...]:
+    raw = os.getenv("SANDBOX_GLOB_IGNORE")
+    if raw is None:
+        return DEFAULT_GLOB_IGNORE
+    return tuple(name.strip() for name in raw.split(",") if name.strip())
+
+
+def glob_max_results() -> int:
+    try:
+        return max(1, int(os.getenv("SANDBOX_GLOB_MAX_RESULTS", str(DEFAULT_GLOB_MAX_RESULTS))))
+    except ValueError:
+        return DEFAULT_GLOB_MAX_RESULTS
+
+
+def grep_max_matches() -> int:
+    try:
+        return max(1, int(os.getenv("SANDBOX_GREP_MAX_MATCHES", str(DEFAULT_GREP_MAX_MATCHES))))
+    except ValueError:
+        return DEFAULT_GREP_MAX_MATCHES
+
+
+def grep_max_bytes() -> int:
+    try:
+        return max(1024, int(os.getenv("SANDBOX_GREP_MAX_BYTES", str(DEFAULT_GREP_MAX_BYTES))))
+    except ValueError:
+        return DEFAULT_GREP_MAX_BYTES
+
+
+def grep_max_filesize() -> str:
+    return os.getenv("SANDBOX_GREP_MAX_FILESIZE", DEFAULT_GREP_MAX_FILESIZE).strip()
+
+
+def read_max_bytes() -> int:
+    try:
+        return max(1024, int(os.getenv("SANDBOX_READ_MAX_BYTES", str(DEFAULT_READ_MAX_BYTES))))
+    except ValueError:
+        return DEFAULT_READ_MAX_BYTES
+
+
+def ranged_read_command(target: str, start: int, limit: int, max_bytes: int) -> str:
+    """Shell snippet printing lines ``start+1 .. start+limit`` (at most ``max_bytes + 1``
+    bytes of them) followed by a trailer with the file's total line count."""
+    first = start + 1
+    last = start + max(limit, 1)
+    quoted = shlex.quote(target)
+    return (
+        f"[ -f {quoted} ] || exit 1; "
+        f"total=$(wc -l < {quoted}); "
+        f'[ -n "$(tail -c 1 {quoted})" ] && total=$((total + 1)); '
+        f"sed -n '{first},{last}p;{last}q' {quoted} | head -c {max_bytes + 1}; "
+        f"printf '\\n{_READ_TRAILER} %s\\n' \"$total\""
+    )
+
+
+def split_ranged_read(stdout: str) -> tuple[str, int] | None:
+    """Split :func:`ranged_read_command` output into ``(window, total_lines)``.
+
+    ``None`` means the file was missing or the trailer was lost.
+    """
+    body, marker, trailer = stdout.rpartition(f"{_READ_TRAILER} ")
+    if not marker:
+        return None
+    try:
+        total = int(trailer.strip())
+    except ValueError:
+        return None
+    return (body[:-1] if body.endswith("\n") else body), total
+
+
+def read_window(body: str, max_bytes: int) -> tuple[list[str], bool]:
+    """Lines of a ranged-read window that fit in ``max_bytes``; the flag marks a capped window."""
+    raw = body.encode("utf-8")
+    if len(raw) <= max_bytes:
+        return body.splitlines(), False
+    lines = raw[:max_bytes].decode("utf-8", errors="ignore").splitlines()
+    if len(lines) > 1:
+        # The byte cap cut the last line short; it is re-read on the next page.
+        lines = lines[:-1]
+    return lines, True
+
+
+def stat_command(target: str) -> str:
+    """Print ``size mtime type`` for ``target`` (exit 1 when it does not exist)."""
+    return f"stat -c '%s %Y %F' -- {shlex.quote(target)} 2>/dev/null || exit 1"
+
+
+def parse_stat_output(stdout: str) -> dict[str, Any] | None:
+    parts = (stdout or "").strip().split(" ", 2)
+    if len(parts) != 3:
+        return None
+    size, mtime, kind = parts
+    try:
+        modified = datetime.fromtimestamp(int(mtime), tz=timezone.utc).isoformat()
+        return {"size": int(size), "modified_at": modified, "type": kind, "is_dir": kind == "directory"}
+    except (ValueError, OverflowError, OSError):
+        return None
+
+
+def inplace_edit_payload(old_string: str, new_string: str) -> bytes | None:
+    """JSON file contents for an edit too large to inline, or None when it fits.
+
+    The inline script is a single exec argument, which Linux caps at 128 KiB
+    (MAX_ARG_STRLEN); larger edits upload this payload first.
+    """
+    size = len(old_string.encode("utf-8")) + len(new_string.encode("utf-8"))
+    if size <= INPLACE_EDIT_INLINE_MAX_BYTES:
+        return None
+    return json.dumps({"old": old_string, "new": new_string}).encode("utf-8")
+
+
+def inplace_edit_payload_path() -> str:
+    return f"/tmp/.astraforge-edit-{uuid.uuid4().hex}.json"
+
+
+def inplace_edit_command(
+    target: str,
+    old_string: str,
+    new_string: str,
+    replace_all: bool,
+    *,
+    payload_path: str | None = None,
+) -> str:
+    """Python snippet that performs the replacement inside the sandbox and swaps the file
+    in atomically, printing a JSON status with the occurrence count.
+
+    With ``payload_path`` the strings are read (and the file removed) from an
+    :func:`inplace_edit_payload` upload instead of being embedded in the script.
+    """
+    if payload_path is None:
+        old_b64 = base64.b64encode(old_string.encode("utf-8")).decode("ascii")
+        new_b64 = base64.b64encode(new_string.encode("utf-8")).decode("ascii")
+        load = (
+            f"old = base64.b64decode({old_b64!r}).decode(\"utf-8\")\n"
+            f"new = base64.b64decode({new_b64!r}).decode(\"utf-8\")"
+        )
+    else:
+        load = (
+            "try:\n"
+            f"    with open({payload_path!r}, encoding=\"utf-8\") as fh:\n"
+            "        strings = json.load(fh)\n"
+            "finally:\n"
+            f"    os.unlink({payload_path!r})\n"
+            "old, new = strings[\"old\"], strings[\"new\"]"
+        )
+    return f"""python - <<'PY'
+import base64
+import json
+import os
+import tempfile
+
+path = {target!r}
+{load}
+replace_all = {bool(replace_all)!r}
+
+try:
+    with open(path, encoding="utf-8", newline="") as fh:
+        content = fh.read()
+except UnicodeDecodeError:
+    print(json.dumps({{"status": "binary"}}))
+    raise SystemExit(0)
+except OSError:
+    print(json.dumps({{"status": "missing"}}))
+    raise SystemExit(0)
+
+occurrences = content.count(old)
+if occurrences == 0 and "\\r\\n" in content and "\\n" in old and "\\r\\n" not in old:
+    # Tools send LF strings; match them against CRLF files and keep the file's endings.
+    old = old.replace("\\n", "\\r\\n")
+    new = new.replace("\\r\\n", "\\n").replace("\\n", "\\r\\n")
+    occurrences = content.count(old)
+if occurrences == 0 or (occurrences > 1 and not replace_all):
+    print(json.dumps({{"status": "mismatch", "occurrences": occurrences}}))
+    raise SystemExit(0)
+
+fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=".astraforge-edit-")
+try:
+    with os.fdopen(fd, "w", encoding="utf-8", newline="") as fh:
+        fh.write(content.replace(old, new))
+    os.chmod(tmp, os.stat(path).st_mode & 0o7777)
+    os.replace(tmp, path)
+except OSError as exc:
+    try:
+        os.unlink(tmp)
+    except OSError:
+        pass
+    print(json.dumps({{"status": "error", "message": str(exc)}}))
+    raise SystemExit(1)
+print(json.dumps({{"status": "ok", "occurrences": occurrences}}))
+PY"""
+
+
+def parse_edit_status(stdout: str) -> dict[str, Any]:
+    """Decode the JSON status line printed by :func:`inplace_edit_command`."""
+    try:
+        data = json.loads((stdout or "").strip().splitlines()[-1])
+    except (IndexError, json.JSONDecodeError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def workspace_index_enabled() -> bool:
+    return os.getenv("SANDBOX_WORKSPACE_INDEX", "0").lower() in {"1", "true", "yes", "on"}
+
+
+def python_glob_command(base: str, pattern: str, ignore: tuple[str, ...], max_results: int) -> str:
+    """``Path.rglob`` walk used when neither ``rg`` nor ``fd`` is installed."""
+    return f"""python - <<'PY'
+from pathlib import Path
+
+base = Path({base!r})
+pattern = {pattern!r}
+ignore = set({list(ignore)!r})
+remaining = {max_results!r}
+
+if not base.exists() or not base.is_dir():
+    raise SystemExit(0)
+
+for matched in base.rglob(pattern):
+    if ignore.intersection(matched.relative_to(base).parts):
+        continue
+    try:
+        if not matched.is_file():
+            continue
+        st = matched.stat()
+    except OSError:
+        continue
+    print(st.st_size, int(st.st_mtime), matched)
+    remaining -= 1
+    if remaining <= 0:
+        break
+PY"""
+
+
+def glob_command(
+    base: str,
+    pattern: str,
+    *,
+    ignore: tuple[str, ...] = DEFAULT_GLOB_IGNORE,
+    max_results: int = DEFAULT_GLOB_MAX_RESULTS,
+) -> str:
+    """List files under ``base`` matching ``pattern`` as ``<size> <mtime> <path>`` lines.
+
+    Prefers ``rg --files`` (honours ``.gitignore``), then ``fd`` for patterns without a
+    ``/``, and otherwise falls back to :func:`python_glob_command`. Matching follows
+    ``Path.rglob``: the pattern may match at any depth below ``base``.
+    """
+    quoted_base = shlex.quote(base)
+    rg_glob = pattern if pattern.startswith("**") else f"**/{pattern}"
+    rg = ["rg", "--files", "--hidden", "--no-messages", "--glob", rg_glob]
+    for name in ignore:
+        rg.extend(["--glob", f"!{name}"])
+    rg_cmd = " ".join(shlex.quote(part) for part in rg) + f" -- {quoted_base}"
+
+    fd_cmd = ""
+    if "/" not in pattern:
+        fd = ["--type", "f", "--hidden", "--glob", "--max-results", str(max_results)]
+        for name in ignore:
+            fd.extend(["--exclude", name])
+        fd_args = " ".join(shlex.quote(part) for part in fd)
+        fd_cmd = (
+            'elif fd_bin=$(command -v fdfind || command -v fd); then '
+            f'list_files() {{ "$fd_bin" {fd_args} -- {shlex.quote(pattern)} {quoted_base}; }}; '
+        )
+
+    return (
+        f"[ -d {quoted_base} ] || exit 0; "
+        "if command -v rg >/dev/null 2>&1; then "
+        f"list_files() {{ {rg_cmd}; }}; "
+        f"{fd_cmd}"
+        "else\n"
+        f"{python_glob_command(base, pattern, ignore, max_results)}\n"
+        "exit $?; fi; "
+        f"list_files | head -n {int(max_results)} | tr '\\n' '\\0' "
+        "| xargs -0 -r stat -c '%s %Y %n' 2>/dev/null; exit 0"
+    )
+
+
+def parse_glob_output(stdout: str) -> list[dict[str, Any]]:
+    """Parse :func:`glob_command` output into ``FileInfo``-shaped dicts sorted by path."""
+    results: list[dict[str, Any]] = []
+    for line in stdout.splitlines():
+        parts = line.split(" ", 2)
+        if len(parts) != 3:
+            continue
+        size, mtime, path = parts
+        try:
+            modified = datetime.fromtimestamp(int(mtime), tz=timezone.utc).isoformat()
+            results.append(
+                {"path": path, "is_dir": False, "size": int(size), "modified_at": modified}
+            )
+        except (ValueError, OverflowError, OSError):
+            results.append({"path": path, "is_dir": False})
+    results.sort(key=lambda item: item.get("path", ""))
+    return results
+
+
+def _budgeted(search: list[str], max_matches: int, max_bytes: int) -> str:
+    """Pipe ``search`` through ``head`` so the budget is enforced inside the sandbox.
+
+    ``head`` closing the pipe stops the search early. The exit-code trailer only
+    survives when the output was not cut, which is the only case it matters.
+    """
+    command = " ".join(shlex.quote(part) for part in search)
+    return (
+        f"{{ {command} 2>/dev/null; echo {_GREP_EXIT_MARKER} $?; }} "
+        f"| head -n {int(max_matches) + 2} | head -c {int(max_bytes) + 1}"
+    )
+
+
+def ripgrep_command(
+    pattern: str,
+    base: str,
+    glob: str | None,
+    *,
+    max_matches: int,
+    max_bytes: int,
+    max_filesize: str | None = DEFAULT_GREP_MAX_FILESIZE,
+) -> str:
+    """``rg`` emitting ``path\\0line:text`` records, capped by matches and bytes."""
+    parts = [
+        "rg",
+        "--line-number",
+        "--with-filename",
+        "--no-heading",
+        "--null",
+        "--color",
+        "never",
+        "--max-count",
+        str(max_matches + 1),
+        "--max-columns",
+        str(GREP_MAX_COLUMNS),
+        "--max-columns-preview",
+    ]
+    if max_filesize:
+        parts.extend(["--max-filesize", max_filesize])
+    if glob:
+        parts.extend(["--glob", glob])
+    parts.extend(["-e", pattern, "--", base])
+    return _budgeted(parts, max_matches, max_bytes)
+
+
+def grep_command(
+    pattern: str,
+    base: str,
+    glob: str | None,
+    *,
+    max_matches: int,
+    max_bytes: int,
+) -> str:
+    """``grep -R`` fallback with the same record format and budget as :func:`ripgrep_command`."""
+    parts = ["grep", "-RInZ", "--max-count", str(max_matches + 1)]
+    if glob:
+        parts.append(f"--include={glob}")
+    parts.extend(["-e", pattern, "--", base])
+    return _budgeted(parts, max_matches, max_bytes)
+
+
+@dataclass
+class GrepOutput:
+    matches: list[dict[str, Any]]
+    exit_code: int | None
+    truncated: bool
+
+
+def parse_grep_output(stdout: str, *, max_matches: int) -> GrepOutput:
+    """Parse :func:`ripgrep_command`/:func:`grep_command` output record by record."""
+    # No trailer means ``head`` cut the stream: by lines (detected below) or by bytes.
+    truncated = bool(stdout) and _GREP_EXIT_MARKER not in stdout
+    end = len(stdout)
+    if truncated and not stdout.endswith("\n"):
+        # The byte cap cut the final record short; drop it.
+        end = stdout.rfind("\n") + 1
+    matches: list[dict[str, Any]] = []
+    exit_code: int | None = None
+    pos = 0
+    while pos < end:
+        newline = stdout.find("\n", pos, end)
+        line = stdout[pos:newline if newline != -1 else end]
+        pos = end if newline == -1 else newline + 1
+        if line.startswith(_GREP_EXIT_MARKER):
+            try:
+                exit_code = int(line[len(_GREP_EXIT_MARKER):].strip())
+            except ValueError:
+                pass
+            continue
+        path, sep, rest = line.partition("\0")
+        line_no, colon, text = rest.partition(":")
+        if not sep or not colon:
+            continue
+        try:
+            number = int(line_no)
+        except ValueError:
+            continue
+        if len(matches) >= max_matches:
+            truncated = True
+            break
+        matches.append({"path": path, "line": number, "text": text.rstrip("\r")})
+    return GrepOutput(matches=matches, exit_code=exit_code, truncated=truncated)
+
+
+def grep_truncation_notice(max_matches: int, max_bytes: int) -> str:
+    return (
+        f"Search stopped at {max_matches} matches or {max_bytes} bytes of output; "
+        "refine the pattern or narrow path/glob to see the rest."
+    )
+
+
+_GREP_NOTICES: ContextVar[list[str] | None] = ContextVar("astraforge_grep_notices", default=None)
+
+
+@contextmanager
+def collect_grep_notices() -> Iterator[list[str]]:
+    """Collect the truncation notices of the grep searches run inside the block."""
+    notices: list[str] = []
+    token = _GREP_NOTICES.set(notices)
+    try:
+        yield notices
+    finally:
+        _GREP_NOTICES.reset(token)
+
+
+def report_grep_notice(notice: str) -> None:
+    notices = _GREP_NOTICES.get()
+    if notices is not None and notice not in notices:
+        notices.append(notice)
+
+
+class GrepResults(list):
+    """Grep matches plus whether the budget cut the search short.
+
+    Truncation travels beside the matches instead of as a pseudo-match, which the
+    deepagents ``files_with_matches``/``count`` modes would list as a real file.
+    """
+
+    def __init__(self, matches=(), *, truncated: bool = False, notice: str = "") -> None:
+        super().__init__(matches)
+        self.truncated = truncated
+        self.notice = notice
+
+
+def index_query_command(request: dict[str, Any], root: str) -> str:
+    """Ask the in-sandbox workspace index (``sandbox/workspace_index.py``) one question.
+
+    ``--spawn`` starts the daemon when it is not running yet (e.g. Kubernetes pods that
+    bypass ``entrypoint.sh``); that call still falls back to the regular command.
+    """
+    binary = os.getenv("SANDBOX_WORKSPACE_INDEX_COMMAND", DEFAULT_WORKSPACE_INDEX_COMMAND)
+    return (
+        f"{binary} --spawn --root {shlex.quote(root)} "
+        f"query {shlex.quote(json.dumps(request))} 2>/dev/null"
+    )
+
+
+def parse_index_response(exit_code: int, stdout: str) -> dict[str, Any] | None:
+    """Return the index answer, or ``None`` when the caller should run its fallback."""
+    if int(exit_code) != 0:
+        return None
+    try:
+        data = json.loads(stdout or "")
+    except json.JSONDecodeError:
+        return None
+    if not isinstance(data, dict) or data.get("fallback") or data.get("error"):
+        return None
+    return data
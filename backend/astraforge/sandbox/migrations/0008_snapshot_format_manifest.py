@@ -0,0 +1,24 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("sandbox", "0007_rename_sandbox_art_session_idx_sandbox_san_session_03337c_idx_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="sandboxsnapshot",
+            name="format",
+            field=models.CharField(
+                choices=[("archive", "Archive"), ("chunked", "Chunked")],
+                default="archive",
+                max_length=16,
+            ),
+        ),
+        migrations.AddField(
+            model_name="sandboxsnapshot",
+            name="manifest",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,24 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("sandbox", "0008_snapshot_format_manifest"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="sandboxsnapshot",
+            name="codec",
+            field=models.CharField(
+                choices=[
+                    ("gzip", "gzip"),
+                    ("pigz", "pigz (parallel gzip)"),
+                    ("zstd", "zstd"),
+                    ("none", "Uncompressed"),
+                ],
+                default="gzip",
+                max_length=16,
+            ),
+        ),
+    ]
@@ -0,0 +1,54 @@
+import uuid
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("sandbox", "0009_snapshot_codec"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SandboxWarmContainer",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4, editable=False, primary_key=True, serialize=False
+                    ),
+                ),
+                (
+                    "mode",
+                    models.CharField(
+                        choices=[("docker", "Docker"), ("k8s", "Kubernetes")], max_length=12
+                    ),
+                ),
+                ("image", models.CharField(max_length=255)),
+                ("cpu", models.CharField(blank=True, max_length=32)),
+                ("memory", models.CharField(blank=True, max_length=32)),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[("warming", "Warming"), ("ready", "Ready")],
+                        default="warming",
+                        max_length=16,
+                    ),
+                ),
+                ("ref", models.CharField(blank=True, max_length=128)),
+                ("control_endpoint", models.CharField(blank=True, max_length=255)),
+                ("workspace_path", models.CharField(default="/workspace", max_length=255)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("ready_at", models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                "ordering": ["created_at"],
+                "indexes": [
+                    models.Index(
+                        fields=["mode", "image", "cpu", "memory", "status"],
+                        name="sandbox_san_mode_b576cd_idx",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("sandbox", "0010_warm_pool"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="sandboxsession",
+            name="reaper_lease_until",
+            field=models.DateTimeField(
+                blank=True,
+                help_text="Set while a reaper sweep owns this session; expires if the sweep dies",
+                null=True,
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="sandboxsession",
+            index=models.Index(fields=["status", "expires_at"], name="sandbox_san_status_e5a115_idx"),
+        ),
+    ]
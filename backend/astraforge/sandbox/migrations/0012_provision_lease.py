@@ -0,0 +1,19 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("sandbox", "0011_reaper_lease"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="sandboxsession",
+            name="provision_lease_until",
+            field=models.DateTimeField(
+                blank=True,
+                help_text="Set while a worker provisions this session; expires if the worker dies",
+                null=True,
+            ),
+        ),
+    ]
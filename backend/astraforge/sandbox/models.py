@@ -8,6 +8,7 @@ from django.db import models
 from django.utils import timezone
 
 from astraforge.accounts.models import Workspace
+from astraforge.infrastructure.activity import ActivityBuffer
 
 
 class SandboxSession(models.Model):
@@ -57,6 +58,16 @@ class SandboxSession(models.Model):
     last_heartbeat_at = models.DateTimeField(null=True, blank=True)
     last_activity_at = models.DateTimeField(null=True, blank=True)
     expires_at = models.DateTimeField(null=True, blank=True)
+    reaper_lease_until = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="Set while a reaper sweep owns this session; expires if the sweep dies",
+    )
+    provision_lease_until = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="Set while a worker provisions this session; expires if the worker dies",
+    )
     artifact_base_url = models.CharField(max_length=255, blank=True)
     error_message = models.TextField(blank=True)
     metadata = models.JSONField(default=dict, blank=True)
@@ -70,6 +81,7 @@ class SandboxSession(models.Model):
         indexes = [
             models.Index(fields=["status"]),
             models.Index(fields=["mode"]),
+            models.Index(fields=["status", "expires_at"]),
         ]
 
     def save(self, *args, **kwargs):  # pragma: no cover - trivial
@@ -86,13 +98,30 @@ class SandboxSession(models.Model):
         now = timezone.now()
         self.last_activity_at = now
         self.last_heartbeat_at = now
+        if SESSION_ACTIVITY.record(self.pk, now):
+            return
         self.save(update_fields=["last_activity_at", "last_heartbeat_at", "updated_at"])
 
     def __str__(self) -> str:  # pragma: no cover - debug helper
         return f"SandboxSession(id={self.id}, mode={self.mode}, status={self.status})"
 
 
+SESSION_ACTIVITY = ActivityBuffer(
+    "activity:sandbox_session", SandboxSession, ["last_activity_at", "last_heartbeat_at"]
+)
+
+
 class SandboxSnapshot(models.Model):
+    class Format(models.TextChoices):
+        ARCHIVE = "archive", "Archive"
+        CHUNKED = "chunked", "Chunked"
+
+    class Codec(models.TextChoices):
+        GZIP = "gzip", "gzip"
+        PIGZ = "pigz", "pigz (parallel gzip)"
+        ZSTD = "zstd", "zstd"
+        NONE = "none", "Uncompressed"
+
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     session = models.ForeignKey(
         SandboxSession, on_delete=models.CASCADE, related_name="snapshots"
@@ -103,6 +132,9 @@ class SandboxSnapshot(models.Model):
     size_bytes = models.BigIntegerField(default=0)
     include_paths = models.JSONField(default=list, blank=True)
     exclude_paths = models.JSONField(default=list, blank=True)
+    format = models.CharField(max_length=16, choices=Format.choices, default=Format.ARCHIVE)
+    codec = models.CharField(max_length=16, choices=Codec.choices, default=Codec.GZIP)
+    manifest = models.JSONField(default=dict, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
@@ -137,3 +169,32 @@ class SandboxArtifact(models.Model):
 
     def __str__(self) -> str:  # pragma: no cover - debug helper
         return f"SandboxArtifact(id={self.id}, session={self.session_id}, filename={self.filename})"
+
+
+class SandboxWarmContainer(models.Model):
+    """A pre-provisioned sandbox waiting in the warm pool for a session to claim it."""
+
+    class Status(models.TextChoices):
+        WARMING = "warming", "Warming"
+        READY = "ready", "Ready"
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    mode = models.CharField(max_length=12, choices=SandboxSession.Mode.choices)
+    image = models.CharField(max_length=255)
+    cpu = models.CharField(max_length=32, blank=True)
+    memory = models.CharField(max_length=32, blank=True)
+    status = models.CharField(max_length=16, choices=Status.choices, default=Status.WARMING)
+    ref = models.CharField(max_length=128, blank=True)
+    control_endpoint = models.CharField(max_length=255, blank=True)
+    workspace_path = models.CharField(max_length=255, default="/workspace")
+    created_at = models.DateTimeField(auto_now_add=True)
+    ready_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["created_at"]
+        indexes = [
+            models.Index(fields=["mode", "image", "cpu", "memory", "status"]),
+        ]
+
+    def __str__(self) -> str:  # pragma: no cover - debug helper
+        return f"SandboxWarmContainer(id={self.id}, mode={self.mode}, status={self.status})"
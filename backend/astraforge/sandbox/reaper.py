@@ -1,20 +1,83 @@
 from __future__ import annotations
 
-from datetime import timedelta
 import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from datetime import timedelta
+from typing import Any
+
+from django.db import connection
+from django.db.models import DateTimeField, F, Func, Q
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 
-from astraforge.sandbox.models import SandboxSession
+from astraforge.infrastructure.activity import flush_interval
+from astraforge.sandbox.models import SESSION_ACTIVITY, SandboxSession
 from astraforge.sandbox.services import SandboxOrchestrator
 
 logger = logging.getLogger(__name__)
 
+# Upper bounds (seconds) of the cumulative timing histogram buckets in a sweep summary.
+HISTOGRAM_BUCKETS = (1, 5, 15, 60, 300)
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, "") or default)
+    except ValueError:
+        return default
+
+
+class _PlusSeconds(Func):
+    """``datetime + integer seconds`` for a per-row interval column."""
+
+    output_field = DateTimeField()
+    arity = 2
+
+    def as_sql(self, compiler, connection, **extra_context):
+        lhs, lhs_params = compiler.compile(self.source_expressions[0])
+        rhs, rhs_params = compiler.compile(self.source_expressions[1])
+        return f"({lhs} + ({rhs}) * INTERVAL '1 second')", [*lhs_params, *rhs_params]
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        lhs, lhs_params = compiler.compile(self.source_expressions[0])
+        rhs, rhs_params = compiler.compile(self.source_expressions[1])
+        # Same text layout Django stores datetimes in, so comparisons stay lexical.
+        sql = f"strftime('%%Y-%%m-%%d %%H:%%M:%%f', {lhs}, '+' || ({rhs}) || ' seconds')"
+        return sql, [*lhs_params, *rhs_params]
+
+
+def _histogram(samples: list[float]) -> dict[str, Any]:
+    buckets = {str(bound): sum(1 for value in samples if value <= bound) for bound in HISTOGRAM_BUCKETS}
+    buckets["+Inf"] = len(samples)
+    return {
+        "buckets": buckets,
+        "count": len(samples),
+        "sum": round(sum(samples), 3),
+        "max": round(max(samples), 3) if samples else 0.0,
+    }
+
 
 class SandboxReaper:
-    """Identifies and terminates stale sandbox sessions."""
+    """Identifies and terminates stale sandbox sessions.
+
+    Stale sessions are selected in SQL, claimed with a short database lease so
+    concurrent sweeps (several beat or worker instances) never reap the same
+    session twice, and snapshotted/terminated on a bounded thread pool. A
+    snapshot that exceeds its timeout does not block termination; removing the
+    container aborts it.
+    """
 
     def __init__(self, orchestrator: SandboxOrchestrator | None = None) -> None:
         self.orchestrator = orchestrator or SandboxOrchestrator()
+        self.concurrency = max(1, _env_int("SANDBOX_REAP_CONCURRENCY", 4))
+        self.batch_size = max(1, _env_int("SANDBOX_REAP_BATCH_SIZE", 200))
+        self.snapshot_timeout = max(1, _env_int("SANDBOX_REAP_SNAPSHOT_TIMEOUT_SEC", 300))
+        self.lease_sec = max(self.snapshot_timeout * 2, _env_int("SANDBOX_REAP_LEASE_SEC", 900))
+        # Buffered activity can lag the database by up to one flush interval.
+        self.idle_grace_sec = flush_interval()
 
     def _termination_reason(self, session: SandboxSession, now):
         if session.max_lifetime_sec:
@@ -24,28 +87,116 @@ class SandboxReaper:
 
         last_seen = session.last_activity_at or session.last_heartbeat_at or session.created_at
         if session.idle_timeout_sec and last_seen:
-            idle_deadline = last_seen + timedelta(seconds=session.idle_timeout_sec)
+            idle_deadline = last_seen + timedelta(seconds=session.idle_timeout_sec + self.idle_grace_sec)
             if idle_deadline <= now:
                 return "idle_timeout"
         return None
 
-    def reap(self, *, now=None) -> dict[str, int]:
-        now = now or timezone.now()
-        terminated = 0
-        candidates = list(SandboxSession.objects.filter(status=SandboxSession.Status.READY))
-        for session in candidates:
-            reason = self._termination_reason(session, now)
-            if not reason:
-                continue
+    def _stale_queryset(self, now):
+        """READY sessions past their idle or lifetime deadline and not leased by another sweep."""
+        last_seen = Coalesce("last_activity_at", "last_heartbeat_at", "created_at")
+        expired = Q(max_lifetime_sec__gt=0) & (
+            Q(expires_at__lte=now)
+            | Q(expires_at__isnull=True, lifetime_deadline__lte=now)
+        )
+        idle = Q(idle_timeout_sec__gt=0, idle_deadline__lte=now)
+        return (
+            SandboxSession.objects.filter(status=SandboxSession.Status.READY)
+            .filter(Q(reaper_lease_until__isnull=True) | Q(reaper_lease_until__lte=now))
+            .annotate(
+                idle_deadline=_PlusSeconds(last_seen, F("idle_timeout_sec") + self.idle_grace_sec),
+                lifetime_deadline=_PlusSeconds(F("created_at"), F("max_lifetime_sec")),
+            )
+            .filter(expired | idle)
+        )
+
+    def _claim(self, session: SandboxSession, now) -> bool:
+        lease_until = now + timedelta(seconds=self.lease_sec)
+        claimed = self._stale_queryset(now).filter(pk=session.pk).update(reaper_lease_until=lease_until)
+        return claimed == 1
+
+    def _snapshot(self, session_id, reason: str) -> None:
+        try:
+            # A private instance: a timed-out snapshot keeps running after terminate()
+            # and must not share (and later re-save) the reaping thread's model object.
+            session = SandboxSession.objects.get(pk=session_id)
+            self.orchestrator.create_snapshot(session, label=f"auto-{reason}")
+        except Exception as exc:  # noqa: BLE001
+            logger.warning(
+                "Failed to snapshot sandbox before reap",
+                extra={"id": str(session_id), "reason": reason, "error": str(exc)},
+                exc_info=True,
+            )
+        finally:
+            connection.close()
+
+    def _reap_one(self, session: SandboxSession, reason: str, snapshots: ThreadPoolExecutor) -> dict:
+        timings: dict[str, Any] = {"timed_out": False}
+        try:
             logger.info("Terminating stale sandbox session", extra={"id": str(session.id), "reason": reason})
+            started = time.monotonic()
+            future = snapshots.submit(self._snapshot, session.pk, reason)
             try:
-                self.orchestrator.create_snapshot(session, label=f"auto-{reason}")
-            except Exception as exc:  # noqa: BLE001
+                future.result(timeout=self.snapshot_timeout)
+            except FutureTimeout:
+                timings["timed_out"] = True
                 logger.warning(
-                    "Failed to snapshot sandbox before reap",
-                    extra={"id": str(session.id), "reason": reason, "error": str(exc)},
-                    exc_info=True,
+                    "Sandbox snapshot timed out before reap; terminating anyway",
+                    extra={"id": str(session.id), "timeout": self.snapshot_timeout},
                 )
+            timings["snapshot"] = time.monotonic() - started
+            started = time.monotonic()
+            # Re-read the row so terminate() sees what the snapshot already recorded.
+            session = SandboxSession.objects.get(pk=session.pk)
             self.orchestrator.terminate(session, reason=reason)
-            terminated += 1
-        return {"checked": len(candidates), "terminated": terminated}
+            timings["terminate"] = time.monotonic() - started
+            timings["terminated"] = True
+        except Exception as exc:  # noqa: BLE001
+            # The lease expires, so a later sweep retries this session.
+            logger.warning(
+                "Failed to reap sandbox session",
+                extra={"id": str(session.id), "reason": reason, "error": str(exc)},
+                exc_info=True,
+            )
+            timings["terminated"] = False
+        finally:
+            connection.close()
+        return timings
+
+    def reap(self, *, now=None) -> dict[str, Any]:
+        now = now or timezone.now()
+        sweep_started = time.monotonic()
+        SESSION_ACTIVITY.flush()
+        checked = SandboxSession.objects.filter(status=SandboxSession.Status.READY).count()
+        candidates = list(self._stale_queryset(now).order_by("created_at")[: self.batch_size])
+        work = []
+        for session in candidates:
+            reason = self._termination_reason(session, now)
+            if reason and self._claim(session, now):
+                work.append((session, reason))
+
+        results: list[dict] = []
+        if work:
+            workers = min(self.concurrency, len(work))
+            snapshots = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="sandbox-reap-snapshot")
+            try:
+                with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="sandbox-reap") as pool:
+                    futures = [pool.submit(self._reap_one, session, reason, snapshots) for session, reason in work]
+                    results = [future.result() for future in futures]
+            finally:
+                # Timed-out snapshots are abandoned; terminating their sandbox makes them fail fast.
+                snapshots.shutdown(wait=False, cancel_futures=True)
+
+        return {
+            "checked": checked,
+            "stale": len(candidates),
+            "claimed": len(work),
+            "terminated": sum(1 for result in results if result.get("terminated")),
+            "failed": sum(1 for result in results if not result.get("terminated")),
+            "snapshot_timeouts": sum(1 for result in results if result.get("timed_out")),
+            "duration_sec": round(time.monotonic() - sweep_started, 3),
+            "histograms": {
+                "snapshot_sec": _histogram([r["snapshot"] for r in results if "snapshot" in r]),
+                "terminate_sec": _histogram([r["terminate"] for r in results if "terminate" in r]),
+            },
+        }
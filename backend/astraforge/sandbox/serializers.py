@@ -9,6 +9,7 @@ from rest_framework import serializers
 
 from astraforge.accounts.models import Workspace
 from astraforge.quotas.services import QuotaExceeded, get_quota_service
+from astraforge.sandbox.batch import batch_max_ops
 from astraforge.sandbox.models import SandboxArtifact, SandboxSession, SandboxSnapshot
 
 
@@ -68,6 +69,9 @@ class SandboxSnapshotSerializer(serializers.ModelSerializer):
             "size_bytes",
             "include_paths",
             "exclude_paths",
+            "format",
+            "codec",
+            "manifest",
             "created_at",
         ]
         read_only_fields = fields
@@ -207,3 +211,60 @@ class SandboxSnapshotCreateSerializer(serializers.Serializer):
     exclude_paths = serializers.ListField(
         child=serializers.CharField(), required=False, allow_empty=True
     )
+
+
+class SandboxBatchOperationSerializer(serializers.Serializer):
+    _REQUIRED = {
+        "exec": ("command",),
+        "read": ("path",),
+        "write": ("path", "content"),
+        "edit": ("path", "old_string", "new_string"),
+        "stat": ("path",),
+    }
+
+    op = serializers.ChoiceField(choices=sorted(_REQUIRED))
+    command = serializers.JSONField(required=False)
+    cwd = serializers.CharField(required=False, allow_blank=True)
+    timeout_sec = serializers.IntegerField(required=False, min_value=1)
+    path = serializers.CharField(required=False)
+    offset = serializers.IntegerField(required=False, min_value=0, default=0)
+    limit = serializers.IntegerField(required=False, min_value=1, default=2000)
+    max_bytes = serializers.IntegerField(required=False, min_value=1024)
+    content = serializers.CharField(required=False, allow_blank=True, trim_whitespace=False)
+    encoding = serializers.ChoiceField(choices=["utf-8", "base64"], default="utf-8")
+    overwrite = serializers.BooleanField(required=False, default=True)
+    old_string = serializers.CharField(required=False, trim_whitespace=False)
+    new_string = serializers.CharField(required=False, allow_blank=True, trim_whitespace=False)
+    replace_all = serializers.BooleanField(required=False, default=False)
+
+    def validate_command(self, value: Any) -> Any:
+        return SandboxExecSerializer().validate_command(value)
+
+    def validate(self, attrs):
+        missing = [name for name in self._REQUIRED[attrs["op"]] if name not in attrs]
+        if missing:
+            raise serializers.ValidationError(
+                {name: f"Required for op '{attrs['op']}'" for name in missing}
+            )
+        if attrs["op"] == "write":
+            content = attrs["content"]
+            if attrs.get("encoding") == "base64":
+                try:
+                    attrs["content"] = base64.b64decode(content)
+                except (binascii.Error, ValueError) as exc:
+                    raise serializers.ValidationError({"content": "Invalid base64 content"}) from exc
+            else:
+                attrs["content"] = content.encode("utf-8")
+        return attrs
+
+
+class SandboxBatchSerializer(serializers.Serializer):
+    operations = SandboxBatchOperationSerializer(many=True, allow_empty=False)
+    parallel = serializers.BooleanField(required=False, default=False)
+    stop_on_error = serializers.BooleanField(required=False, default=False)
+
+    def validate_operations(self, value):
+        limit = batch_max_ops()
+        if len(value) > limit:
+            raise serializers.ValidationError(f"At most {limit} operations per batch")
+        return value
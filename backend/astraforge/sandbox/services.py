@@ -8,13 +8,16 @@ import re
 import shlex
 import subprocess
 import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
 from dataclasses import dataclass
+from datetime import timedelta
 from pathlib import Path
-from typing import Optional, Sequence
+from typing import BinaryIO, Iterable, Iterator, Optional, Sequence, Union
 
 import boto3
 from botocore.config import Config
 from botocore.exceptions import BotoCoreError, ClientError
+from django.db.models import F
 from django.utils import timezone
 from kubernetes.stream import stream as k8s_stream
 
@@ -24,13 +27,70 @@ from astraforge.infrastructure.cpu_usage import (
     parse_cpu_usage_payload,
 )
 from astraforge.infrastructure.provisioners import k8s as k8s_provisioner
+from astraforge.infrastructure.repositories.db import _JSONKeyUpdate
 from astraforge.infrastructure.workspaces.codex import CommandRunner
 from astraforge.quotas.services import get_quota_service
-from astraforge.sandbox.models import SandboxArtifact, SandboxSession, SandboxSnapshot
+from astraforge.sandbox import fs_commands, session_cache
+from astraforge.sandbox.chunked_snapshots import (
+    DEFAULT_CHUNK_BYTES,
+    DEFAULT_PACK_BYTES,
+    MANIFEST_VERSION,
+    ChunkedSnapshotError,
+    PackCache,
+    PackWriter,
+    decode_manifest,
+    encode_manifest,
+    iter_tar_stream,
+    missing_chunk_requests,
+    pack_request_lines,
+    parse_scan_output,
+    scan_script,
+    store_pack_stream,
+    tool_script,
+)
+from astraforge.sandbox.exec_agent import (
+    STDERR as EXEC_STDERR,
+    ExecAgentChannel,
+    ExecAgentError,
+    ExecAgentPool,
+    ExecAgentTimeout,
+    ExecAgentUnavailable,
+    exec_agent_command,
+    exec_agent_enabled,
+)
+from astraforge.sandbox.models import (
+    SESSION_ACTIVITY,
+    SandboxArtifact,
+    SandboxSession,
+    SandboxSnapshot,
+    SandboxWarmContainer,
+)
+from astraforge.sandbox.snapshot_codecs import (
+    SnapshotCodec,
+    configured_codec,
+    configured_level,
+    configured_threads,
+    detect_codec,
+    get_codec,
+)
+from astraforge.sandbox.warm_pool import (
+    WarmPoolProfile,
+    acquire_refill_lock,
+    claim_warm_container,
+    configured_profiles,
+    profile_for,
+    record_hit,
+    record_miss,
+    release_refill_lock,
+)
 
 
 logger = logging.getLogger(__name__)
 
+# Exec channels outlive individual orchestrator instances so every view, task
+# and backend in the process shares one attached stream per sandbox.
+_EXEC_AGENTS = ExecAgentPool()
+
 
 class SandboxProvisionError(RuntimeError):
     """Raised when a sandbox cannot be provisioned or controlled."""
@@ -45,6 +105,13 @@ def _env_flag(name: str, default: str | None = None) -> bool:
     return value.lower() in {"1", "true", "yes", "on"}
 
 
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, "") or default)
+    except ValueError:
+        return default
+
+
 def _render_command(command: str | Sequence[str]) -> str:
     if isinstance(command, (list, tuple)):
         return shlex.join(str(part) for part in command)
@@ -63,6 +130,81 @@ def _safe_volume_suffix(raw: str) -> str:
     return sanitized.lower()
 
 
+UploadContent = Union[bytes, bytearray, memoryview, BinaryIO, Iterable[bytes]]
+
+UPLOAD_CHUNK_SIZE = 256 * 1024
+
+# Enough leading bytes to recognise gzip, zstd and plain ustar archives.
+_CODEC_SNIFF_BYTES = 512
+
+# (sandbox ref, binary) -> whether the binary exists inside that sandbox.
+_BINARY_SUPPORT: dict[tuple[str, str], bool] = {}
+
+# Never trust ownership, permissions or directory metadata coming from an archive.
+_TAR_EXTRACT_FLAGS = (
+    "--no-same-owner",
+    "--no-same-permissions",
+    "--no-overwrite-dir",
+    "-m",
+    "--warning=no-unknown-keyword",
+)
+
+
+def _iter_upload_chunks(content: UploadContent, chunk_size: int = UPLOAD_CHUNK_SIZE) -> Iterator[bytes]:
+    """Yield ``content`` as bounded byte chunks without copying whole payloads."""
+    if isinstance(content, (bytes, bytearray, memoryview)):
+        view = memoryview(content)
+        for offset in range(0, len(view), chunk_size):
+            yield bytes(view[offset : offset + chunk_size])
+        return
+    if hasattr(content, "read"):
+        while True:
+            chunk = content.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+    for chunk in content:
+        if chunk:
+            yield bytes(chunk)
+
+
+def _tar_mode(operation: str, flags: list[str]) -> list[str]:
+    """Render ``tar`` mode flags, keeping the classic ``-czf``/``-xzf`` spelling for gzip."""
+    if flags == ["-z"]:
+        return [f"-{operation}zf"]
+    return [*flags, f"-{operation}f"]
+
+
+def _peek_chunks(chunks: Iterable[bytes], size: int) -> tuple[bytes, Iterator[bytes]]:
+    """Read at least ``size`` leading bytes and return them with an equivalent iterator."""
+    iterator = iter(chunks)
+    head = bytearray()
+    for chunk in iterator:
+        head.extend(chunk)
+        if len(head) >= size:
+            break
+    header = bytes(head)
+
+    def _chain() -> Iterator[bytes]:
+        if header:
+            yield header
+        yield from iterator
+
+    return header, _chain()
+
+
+def _iter_body_chunks(body, chunk_size: int) -> Iterator[bytes]:
+    """Yield an S3 ``StreamingBody`` (or any binary stream) in bounded chunks."""
+    try:
+        while True:
+            chunk = body.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+    finally:
+        body.close()
+
+
 @dataclass
 class SandboxRuntime:
     ref: str
@@ -84,6 +226,16 @@ class SandboxOrchestrator:
             os.getenv("SANDBOX_S3_USE_SSL", "1").lower() not in {"0", "false", "no"}
         )
         self._snapshot_base_dir = os.getenv("SANDBOX_SNAPSHOT_DIR", "").rstrip("/")
+        self._snapshot_format = (
+            os.getenv("SANDBOX_SNAPSHOT_FORMAT", SandboxSnapshot.Format.ARCHIVE).strip().lower()
+        )
+        self._snapshot_chunk_bytes = _env_int("SANDBOX_SNAPSHOT_CHUNK_BYTES", DEFAULT_CHUNK_BYTES)
+        self._snapshot_pack_bytes = _env_int("SANDBOX_SNAPSHOT_PACK_BYTES", DEFAULT_PACK_BYTES)
+        # S3 rejects multipart parts below 5 MiB (except the last one).
+        self._s3_part_bytes = _env_int("SANDBOX_S3_PART_BYTES", 8 * 1024 * 1024)
+        self._s3_upload_concurrency = max(1, _env_int("SANDBOX_S3_UPLOAD_CONCURRENCY", 4))
+        self._warm_pool_max_age_sec = max(60, _env_int("SANDBOX_WARM_POOL_MAX_AGE_SEC", 6 * 3600))
+        self._warm_pool_lock_sec = max(60, _env_int("SANDBOX_WARM_POOL_LOCK_SEC", 900))
 
     def _snapshot_dir(self, session: SandboxSession) -> str:
         """Return a per-session snapshot directory outside the workspace."""
@@ -92,12 +244,14 @@ class SandboxOrchestrator:
         return f"/tmp/astraforge-snapshots/{session.id}"
 
     def provision(self, session: SandboxSession) -> SandboxSession:
-        if session.mode == SandboxSession.Mode.DOCKER:
-            runtime = self._spawn_docker(session)
-        elif session.mode == SandboxSession.Mode.KUBERNETES:
-            runtime = self._spawn_kubernetes(session)
-        else:  # pragma: no cover - guarded by serializer
-            raise SandboxProvisionError(f"Unsupported sandbox mode {session.mode}")
+        runtime = self._claim_warm_runtime(session)
+        if runtime is None:
+            if session.mode == SandboxSession.Mode.DOCKER:
+                runtime = self._spawn_docker(session)
+            elif session.mode == SandboxSession.Mode.KUBERNETES:
+                runtime = self._spawn_kubernetes(session)
+            else:  # pragma: no cover - guarded by serializer
+                raise SandboxProvisionError(f"Unsupported sandbox mode {session.mode}")
 
         session.ref = runtime.ref
         session.control_endpoint = runtime.control_endpoint
@@ -119,6 +273,192 @@ class SandboxOrchestrator:
         )
         return session
 
+    # warm pool ----------------------------------------------------
+
+    def refill_warm_pool(self) -> dict[str, int]:
+        """Top every configured warm pool profile back up to its target size."""
+        profiles = configured_profiles()
+        summary = {"profiles": len(profiles), "started": 0, "failed": 0, "retired": 0, "skipped": 0}
+        if not profiles and not SandboxWarmContainer.objects.exists():
+            return summary
+        if not acquire_refill_lock(self._warm_pool_lock_sec):
+            summary["skipped"] = 1
+            return summary
+        try:
+            summary["retired"] = self._retire_warm_containers(profiles)
+            for profile in profiles:
+                pooled = SandboxWarmContainer.objects.filter(**profile.lookup()).count()
+                for _ in range(max(profile.size - pooled, 0)):
+                    if self._start_warm_container(profile):
+                        summary["started"] += 1
+                    else:
+                        summary["failed"] += 1
+        finally:
+            release_refill_lock()
+        return summary
+
+    def _claim_warm_runtime(self, session: SandboxSession) -> SandboxRuntime | None:
+        # Only fresh sessions without a per-session volume can take a pooled container;
+        # re-provisioned sessions adopt their own container in ``_spawn_docker``.
+        if session.ref:
+            return None
+        if session.mode == SandboxSession.Mode.DOCKER and self._workspace_volume_mount(session):
+            return None
+        profile = profile_for(session)
+        if profile is None:
+            return None
+        metadata = dict(session.metadata or {})
+        for _ in range(3):
+            warm = claim_warm_container(profile)
+            if warm is None:
+                break
+            runtime = self._adopt_warm_container(session, warm)
+            if runtime is not None:
+                record_hit(profile)
+                metadata["warm_pool"] = "hit"
+                session.metadata = metadata
+                self._log.info(
+                    "Sandbox provisioned from warm pool",
+                    extra={"session_id": str(session.id), "profile": profile.label, "ref": runtime.ref},
+                )
+                return runtime
+        record_miss(profile)
+        metadata["warm_pool"] = "miss"
+        session.metadata = metadata
+        self._log.info(
+            "Sandbox warm pool miss",
+            extra={"session_id": str(session.id), "profile": profile.label},
+        )
+        return None
+
+    def _adopt_warm_container(
+        self, session: SandboxSession, warm: SandboxWarmContainer
+    ) -> SandboxRuntime | None:
+        """Hand a claimed warm container to ``session``; discard it if it went away."""
+        if warm.mode == SandboxSession.Mode.DOCKER:
+            # Docker labels are immutable, so the container is renamed to the name
+            # ``_spawn_docker``/``terminate`` expect for the session instead.
+            ident = f"sandbox-{session.id}"
+            renamed = self.runner.run(
+                ["docker", "rename", self._extract_ref(warm.ref), ident], allow_failure=True
+            )
+            running = renamed.exit_code == 0 and self._ensure_container_active(ident)[0]
+            if not running:
+                target = ident if renamed.exit_code == 0 else self._extract_ref(warm.ref)
+                self.runner.run(["docker", "rm", "-f", target], allow_failure=True)
+                return None
+            ref = f"docker://{ident}"
+            return SandboxRuntime(ref=ref, control_endpoint=ref, workspace_path=warm.workspace_path)
+        provisioner = self._k8s()
+        try:
+            provisioner.label(
+                warm.ref,
+                {"astraforge.dev/pool": "claimed", "astraforge.dev/session": str(session.id)},
+            )
+        except Exception as exc:  # noqa: BLE001
+            self._log.warning(
+                "Discarding unusable warm sandbox pod",
+                extra={"ref": warm.ref, "error": str(exc)},
+            )
+            self._remove_warm_runtime(warm)
+            return None
+        return SandboxRuntime(
+            ref=warm.ref, control_endpoint=warm.control_endpoint, workspace_path=warm.workspace_path
+        )
+
+    def _start_warm_container(self, profile: WarmPoolProfile) -> bool:
+        warm = SandboxWarmContainer.objects.create(**profile.lookup())
+        try:
+            if warm.mode == SandboxSession.Mode.DOCKER:
+                runtime = self._spawn_warm_docker(warm)
+            else:
+                runtime = self._spawn_warm_kubernetes(warm)
+        except Exception as exc:  # noqa: BLE001
+            self._log.warning(
+                "Failed to start warm sandbox",
+                extra={"profile": profile.label, "error": str(exc)},
+            )
+            warm.delete()
+            return False
+        warm.ref = runtime.ref
+        warm.control_endpoint = runtime.control_endpoint
+        warm.workspace_path = runtime.workspace_path
+        warm.status = SandboxWarmContainer.Status.READY
+        warm.ready_at = timezone.now()
+        warm.save(update_fields=["ref", "control_endpoint", "workspace_path", "status", "ready_at"])
+        return True
+
+    def _spawn_warm_docker(self, warm: SandboxWarmContainer) -> SandboxRuntime:
+        ident = f"sandbox-warm-{warm.id.hex[:12]}"
+        workspace_path = "/workspace"
+        args = self._docker_run_args(
+            ident,
+            image=warm.image,
+            cpu=warm.cpu,
+            memory=warm.memory,
+            labels=["--label", "astraforge.sandbox.pool=warm"],
+            mount=None,
+            workspace_path=workspace_path,
+        )
+        try:
+            self.runner.run(args, allow_failure=False)
+        except subprocess.CalledProcessError as exc:
+            raise SandboxProvisionError(
+                f"Failed to start warm Docker sandbox: {str(exc.output or exc).strip()}"
+            ) from exc
+        running, detail = self._ensure_container_active(ident)
+        if not running:
+            self.runner.run(["docker", "rm", "-f", ident], allow_failure=True)
+            raise SandboxProvisionError(
+                f"Warm Docker sandbox is not running: {detail or 'unknown state'}"
+            )
+        ref = f"docker://{ident}"
+        return SandboxRuntime(ref=ref, control_endpoint=ref, workspace_path=workspace_path)
+
+    def _spawn_warm_kubernetes(self, warm: SandboxWarmContainer) -> SandboxRuntime:
+        provisioner = self._k8s()
+        provisioner.image = warm.image or getattr(provisioner, "image", "")
+        ref = provisioner.spawn(repo=f"warm-{warm.id.hex[:12]}", toolchain="sandbox")
+        provisioner.label(ref, {"astraforge.dev/pool": "warm"})
+        workspace_path = getattr(provisioner, "volume_mount_path", "/workspaces")
+        return SandboxRuntime(ref=ref, control_endpoint=ref, workspace_path=workspace_path)
+
+    def _retire_warm_containers(self, profiles: list[WarmPoolProfile]) -> int:
+        """Drop pooled containers that are too old or no longer match a profile."""
+        now = timezone.now()
+        stale_before = now - timedelta(seconds=self._warm_pool_max_age_sec)
+        # A WARMING row this old belongs to a refill run that died mid-spawn.
+        abandoned_before = now - timedelta(seconds=self._warm_pool_lock_sec)
+        retired = 0
+        for warm in list(SandboxWarmContainer.objects.all()):
+            configured = any(profile.size and profile.matches(warm) for profile in profiles)
+            if warm.status == SandboxWarmContainer.Status.WARMING:
+                expired = warm.created_at <= abandoned_before
+            else:
+                expired = not configured or (warm.ready_at or warm.created_at) <= stale_before
+            if not expired:
+                continue
+            # Deleting the row first keeps a concurrent claim from handing it out.
+            deleted, _ = SandboxWarmContainer.objects.filter(pk=warm.pk).delete()
+            if deleted:
+                self._remove_warm_runtime(warm)
+                retired += 1
+        return retired
+
+    def _remove_warm_runtime(self, warm: SandboxWarmContainer) -> None:
+        if not warm.ref:
+            return
+        try:
+            if warm.mode == SandboxSession.Mode.DOCKER:
+                self.runner.run(["docker", "rm", "-f", self._extract_ref(warm.ref)], allow_failure=True)
+            else:
+                self._k8s().cleanup(warm.ref)
+        except Exception as exc:  # noqa: BLE001
+            self._log.warning(
+                "Failed to remove warm sandbox",
+                extra={"ref": warm.ref, "error": str(exc)},
+            )
+
     def execute(
         self,
         session: SandboxSession,
@@ -138,12 +478,55 @@ class SandboxOrchestrator:
                 rendered = f"timeout {timeout_value} {rendered}"
             except (ValueError, TypeError):
                 pass
-        wrapped = self._wrap_exec(session, rendered, workdir=workdir)
-        result = self.runner.run(wrapped, allow_failure=True)
+        result = self._run_via_exec_agent(session, rendered, workdir=workdir, timeout_sec=timeout_sec)
+        if result is None:
+            wrapped = self._wrap_exec(session, rendered, workdir=workdir)
+            result = self.runner.run(wrapped, allow_failure=True)
+        session.mark_activity()
+        return result
+
+    def upload(self, session: SandboxSession, path: str, content: UploadContent):
+        """Write ``content`` to ``path`` inside the sandbox with a single streamed exec.
+
+        Raw bytes are piped through the exec's stdin into a temporary sibling file
+        that is renamed over ``path`` once complete, so readers never observe a
+        partially written file. ``content`` may be bytes, a binary file-like object
+        or an iterable of byte chunks; only one chunk is held in memory at a time.
+        """
+        if session.status != SandboxSession.Status.READY:
+            raise SandboxProvisionError("Sandbox is not ready for execution")
+        target = path.rstrip("/") or path
+        directory = os.path.dirname(target) or "/"
+        temp_path = f"{directory.rstrip('/')}/.{os.path.basename(target)}.upload-{uuid.uuid4().hex[:12]}"
+        script = (
+            f"mkdir -p {shlex.quote(directory)} && "
+            f"cat > {shlex.quote(temp_path)} && "
+            f"mv -f {shlex.quote(temp_path)} {shlex.quote(target)} "
+            f"|| {{ rc=$?; rm -f {shlex.quote(temp_path)}; exit $rc; }}"
+        )
+        chunks = _iter_upload_chunks(content)
+        result = self._run_with_input(session, script, chunks)
+        if result is None:
+            return self._upload_base64_chunks(session, target, b"".join(chunks))
         session.mark_activity()
         return result
 
-    def upload(self, session: SandboxSession, path: str, content: bytes):
+    def _run_with_input(self, session: SandboxSession, script: str, chunks: Iterable[bytes]):
+        """Run ``script`` in the sandbox with ``chunks`` streamed to its stdin.
+
+        Returns None when neither the exec agent nor the runner can stream stdin.
+        """
+        result = self._run_via_exec_agent(session, script, workdir=None, input_chunks=chunks)
+        if result is None:
+            run_with_input = getattr(self.runner, "run_with_input", None)
+            if run_with_input is None:
+                return None
+            wrapped = self._exec_prefix(session, interactive=True) + ["sh", "-c", script]
+            result = run_with_input(wrapped, chunks, allow_failure=True)
+        return result
+
+    def _upload_base64_chunks(self, session: SandboxSession, path: str, content: bytes):
+        """Legacy upload path for runners that cannot stream stdin."""
         directory = os.path.dirname(path.rstrip("/")) or "/"
         encoded = base64.b64encode(content).decode("ascii")
         # Avoid exceeding OS argument limits by chunking the payload.
@@ -166,9 +549,37 @@ class SandboxOrchestrator:
                 return result
         return result
 
-    def upload_bytes(self, session: SandboxSession, path: str, content: bytes):
+    def upload_bytes(self, session: SandboxSession, path: str, content: UploadContent):
         return self.upload(session, path, content)
 
+    def edit_file(
+        self,
+        session: SandboxSession,
+        path: str,
+        old_string: str,
+        new_string: str,
+        replace_all: bool = False,
+    ):
+        """Replace ``old_string`` in ``path`` inside the sandbox.
+
+        The result's stdout carries the JSON status of
+        :func:`fs_commands.inplace_edit_command`. Strings too large for a single
+        exec argument are uploaded as a payload file first.
+        """
+        payload = fs_commands.inplace_edit_payload(old_string, new_string)
+        payload_path = None
+        if payload is not None:
+            payload_path = fs_commands.inplace_edit_payload_path()
+            uploaded = self.upload_bytes(session, payload_path, payload)
+            if uploaded.exit_code != 0:
+                return uploaded
+        return self.execute(
+            session,
+            fs_commands.inplace_edit_command(
+                path, old_string, new_string, replace_all, payload_path=payload_path
+            ),
+        )
+
     def create_snapshot(
         self,
         session: SandboxSession,
@@ -179,17 +590,41 @@ class SandboxOrchestrator:
     ) -> SandboxSnapshot:
         include_paths = include_paths or [session.workspace_path]
         exclude_paths = exclude_paths or []
+        if self._snapshot_format == SandboxSnapshot.Format.CHUNKED and self._s3_client():
+            try:
+                return self._create_chunked_snapshot(
+                    session,
+                    label=label,
+                    include_paths=include_paths,
+                    exclude_paths=exclude_paths,
+                )
+            except (ChunkedSnapshotError, SandboxProvisionError) as exc:
+                self._log.warning(
+                    "Chunked snapshot failed; falling back to a full archive",
+                    extra={"session_id": str(session.id), "error": str(exc)},
+                )
+        codec = self._snapshot_codec(session)
+        if self._s3_client() and self._can_stream_output(session):
+            try:
+                return self._create_streamed_snapshot(
+                    session,
+                    label=label,
+                    include_paths=include_paths,
+                    exclude_paths=exclude_paths,
+                    codec=codec,
+                )
+            except SandboxProvisionError as exc:
+                self._log.warning(
+                    "Streaming snapshot to object storage failed; falling back to a staged archive",
+                    extra={"session_id": str(session.id), "error": str(exc)},
+                )
         snapshot_id = uuid.uuid4()
         archive_dir = self._snapshot_dir(session)
-        archive_path = f"{archive_dir}/{snapshot_id}.tar.gz"
-        include = " ".join(shlex.quote(path) for path in include_paths)
-        excludes = list(exclude_paths) if exclude_paths is not None else []
-        excludes.append(archive_dir)
-        exclude_clause = " ".join(f"--exclude={shlex.quote(pattern)}" for pattern in excludes)
-        command = (
-            f"mkdir -p {shlex.quote(archive_dir)} && "
-            f"tar -czf {shlex.quote(archive_path)} {exclude_clause} {include}"
-        ).strip()
+        archive_path = f"{archive_dir}/{snapshot_id}{codec.extension}"
+        archive_command = self._archive_command(
+            session, include_paths, exclude_paths, target=archive_path, codec=codec
+        )
+        command = f"mkdir -p {shlex.quote(archive_dir)} && {archive_command}"
         self._log.info(
             "Creating sandbox snapshot",
             extra={
@@ -199,6 +634,7 @@ class SandboxOrchestrator:
                 "include_paths": include_paths,
                 "exclude_paths": exclude_paths,
                 "archive_path": archive_path,
+                "codec": codec.name,
             },
         )
         try:
@@ -219,6 +655,7 @@ class SandboxOrchestrator:
                 include_paths=include_paths,
                 exclude_paths=exclude_paths,
                 archive_path=archive_path,
+                codec=codec.name,
             )
             if session.workspace and size_bytes:
                 get_quota_service().record_storage_usage(session.workspace, size_bytes)
@@ -268,16 +705,172 @@ class SandboxOrchestrator:
             )
             raise
 
+    def _read_archive_header(self, session: SandboxSession, archive_path: str) -> bytes:
+        """Return the first bytes of an archive inside the sandbox for codec detection."""
+        result = self.execute(
+            session, f"head -c {_CODEC_SNIFF_BYTES} {shlex.quote(archive_path)} | od -An -v -tx1"
+        )
+        if result.exit_code != 0:
+            return b""
+        try:
+            return bytes.fromhex("".join((result.stdout or "").split()))
+        except ValueError:
+            return b""
+
+    def _archive_command(
+        self,
+        session: SandboxSession,
+        include_paths: list[str],
+        exclude_paths: list[str],
+        *,
+        target: str,
+        codec: SnapshotCodec,
+    ) -> str:
+        include = " ".join(shlex.quote(path) for path in include_paths)
+        excludes = [*exclude_paths, self._snapshot_dir(session)]
+        exclude_clause = " ".join(f"--exclude={shlex.quote(pattern)}" for pattern in excludes)
+        flags = codec.compress_flags(level=configured_level(), threads=configured_threads())
+        tar = " ".join(["tar", *_tar_mode("c", flags), shlex.quote(target)])
+        return f"{tar} {exclude_clause} {include}".strip()
+
+    def _snapshot_codec(self, session: SandboxSession) -> SnapshotCodec:
+        """Resolve the session (``metadata.snapshot_codec``) or deployment codec.
+
+        Codecs needing an optional binary fall back when it is missing in the sandbox.
+        """
+        requested = (session.metadata or {}).get("snapshot_codec") or configured_codec()
+        codec = get_codec(str(requested))
+        while codec.binary and codec.fallback and not self._sandbox_has_binary(session, codec.binary):
+            codec = get_codec(codec.fallback)
+        return codec
+
+    def _sandbox_has_binary(self, session: SandboxSession, binary: str) -> bool:
+        key = (session.ref or str(session.id), binary)
+        if key not in _BINARY_SUPPORT:
+            result = self.execute(session, f"command -v {shlex.quote(binary)} >/dev/null 2>&1")
+            _BINARY_SUPPORT[key] = result.exit_code == 0
+        return _BINARY_SUPPORT[key]
+
+    def _create_streamed_snapshot(
+        self,
+        session: SandboxSession,
+        *,
+        label: str,
+        include_paths: list[str],
+        exclude_paths: list[str],
+        codec: SnapshotCodec,
+    ) -> SandboxSnapshot:
+        """Pipe ``tar`` stdout straight into an S3 multipart upload (no staged archive)."""
+        snapshot_id = uuid.uuid4()
+        key = self._snapshot_object_key(session, snapshot_id, codec)
+        command = self._archive_command(session, include_paths, exclude_paths, target="-", codec=codec)
+        self._log.info(
+            "Streaming sandbox snapshot to object storage",
+            extra={
+                "session_id": str(session.id),
+                "snapshot_id": str(snapshot_id),
+                "label": label,
+                "include_paths": include_paths,
+                "exclude_paths": exclude_paths,
+                "key": key,
+                "codec": codec.name,
+            },
+        )
+        stream = self._stream_command(session, command, failure="Snapshot failed")
+        size_bytes = self._stream_to_s3(key, stream, content_type=codec.content_type)
+        snapshot = SandboxSnapshot.objects.create(
+            id=snapshot_id,
+            session=session,
+            label=label,
+            s3_key=key,
+            size_bytes=size_bytes,
+            include_paths=include_paths,
+            exclude_paths=exclude_paths,
+            codec=codec.name,
+        )
+        if session.workspace and size_bytes:
+            get_quota_service().record_storage_usage(session.workspace, size_bytes)
+            self._increment_session_storage(session, size_bytes)
+        self._record_latest_snapshot(session, snapshot.id)
+        session.mark_activity()
+        self._log.info(
+            "Sandbox snapshot created",
+            extra={
+                "session_id": str(session.id),
+                "snapshot_id": str(snapshot.id),
+                "size_bytes": size_bytes,
+                "s3_bucket": self._s3_bucket,
+                "s3_key": key,
+            },
+        )
+        return snapshot
+
+    def _can_stream_output(self, session: SandboxSession) -> bool:
+        return self._exec_agent(session) is not None or hasattr(self.runner, "iter_output")
+
+    def _can_stream_input(self, session: SandboxSession) -> bool:
+        return self._exec_agent(session) is not None or hasattr(self.runner, "run_with_input")
+
     def restore_snapshot(self, session: SandboxSession, snapshot: SandboxSnapshot):
         """Extract a snapshot archive back into the sandbox workspace."""
+        restored = self._extract_snapshot(session, snapshot)
+        self._rebuild_workspace_index(session)
+        return restored
+
+    def _extract_snapshot(self, session: SandboxSession, snapshot: SandboxSnapshot):
+        if snapshot.format == SandboxSnapshot.Format.CHUNKED:
+            return self._restore_chunked_snapshot(session, snapshot)
         if not snapshot.archive_path and not snapshot.s3_key:
             raise SandboxProvisionError("Snapshot archive path is missing")
 
+        workspace_root = (session.workspace_path or "/workspace").rstrip("/") or "/workspace"
+        include_paths = snapshot.include_paths or []
+        base_dir = "/"
+        strip_components = 0
+        if len(include_paths) == 1:
+            included = str(include_paths[0] or "").rstrip("/") or workspace_root
+            if os.path.abspath(included) == os.path.abspath(workspace_root):
+                base_dir = workspace_root
+                parts = [part for part in Path(workspace_root).parts if part not in {"", "/"}]
+                strip_components = len(parts)
+
+        def _extract_command(source: str, codec: SnapshotCodec) -> str:
+            command_parts = [
+                "tar",
+                *_tar_mode("x", codec.extract_flags()),
+                shlex.quote(source),
+                "-C",
+                shlex.quote(base_dir),
+                *_TAR_EXTRACT_FLAGS,
+            ]
+            if strip_components:
+                command_parts.append(f"--strip-components={strip_components}")
+            return " ".join(command_parts)
+
         archive_path = snapshot.archive_path or f"{self._snapshot_dir(session)}/{snapshot.id}.tar.gz"
-        # Prefer S3 when a bucket is configured; fall back to an existing local archive inside the sandbox.
-        content = None
         download_attempted = False
-        if snapshot.s3_key and self._s3_client():
+        # Prefer S3 when a bucket is configured, piping the object straight into tar when
+        # the transport can stream stdin; fall back to an existing local archive inside the sandbox.
+        if snapshot.s3_key and self._s3_client() and self._can_stream_input(session):
+            download_attempted = True
+            body = self._open_snapshot_stream(snapshot)
+            if body is not None:
+                header, chunks = _peek_chunks(_iter_body_chunks(body, self._s3_part_bytes), _CODEC_SNIFF_BYTES)
+                codec = detect_codec(header, snapshot.codec)
+                result = self._run_with_input(session, _extract_command("-", codec), chunks)
+                if result is not None:
+                    if result.exit_code != 0:
+                        message = (result.stdout or result.stderr or "").strip() or "Snapshot restore failed"
+                        raise SandboxProvisionError(message)
+                    self._record_latest_snapshot(session, snapshot.id)
+                    session.mark_activity()
+                    return snapshot
+                body.close()
+                # Streaming became unavailable (e.g. the exec agent dropped): the object
+                # was never consumed, so use the buffered download below instead.
+                download_attempted = False
+        content = None
+        if snapshot.s3_key and self._s3_client() and not download_attempted:
             download_attempted = True
             content = self._download_snapshot_from_s3(snapshot)
         if content:
@@ -292,37 +885,174 @@ class SandboxOrchestrator:
                 message = "Snapshot archive is unavailable in remote storage"
             raise SandboxProvisionError(message)
 
-        workspace_root = (session.workspace_path or "/workspace").rstrip("/") or "/workspace"
-        include_paths = snapshot.include_paths or []
-        base_dir = "/"
-        strip_components = 0
-        if len(include_paths) == 1:
-            included = str(include_paths[0] or "").rstrip("/") or workspace_root
-            if os.path.abspath(included) == os.path.abspath(workspace_root):
-                base_dir = workspace_root
-                parts = [part for part in Path(workspace_root).parts if part not in {"", "/"}]
-                strip_components = len(parts)
+        codec = detect_codec(self._read_archive_header(session, archive_path), snapshot.codec)
+        result = self.execute(session, _extract_command(archive_path, codec), cwd=session.workspace_path)
+        if result.exit_code != 0:
+            message = (result.stdout or result.stderr or "").strip() or "Snapshot restore failed"
+            raise SandboxProvisionError(message)
+
+        self._record_latest_snapshot(session, snapshot.id)
+        session.mark_activity()
+        return snapshot
+
+    # chunked snapshots ---------------------------------------------
 
-        command_parts = [
-            "tar",
-            "-xzf",
-            shlex.quote(archive_path),
-            "-C",
-            shlex.quote(base_dir),
-            "--no-same-owner",
-            "--no-same-permissions",
-            "--no-overwrite-dir",
-            "-m",
-            "--warning=no-unknown-keyword",
+    def _create_chunked_snapshot(
+        self,
+        session: SandboxSession,
+        *,
+        label: str,
+        include_paths: list[str],
+        exclude_paths: list[str],
+    ) -> SandboxSnapshot:
+        """Snapshot the workspace as content-addressed chunks, storing only new ones."""
+        snapshot_id = uuid.uuid4()
+        snapshot_dir = self._snapshot_dir(session)
+        chunk_size = self._snapshot_chunk_bytes
+        scan_args = [
+            "scan",
+            *include_paths,
+            "--chunk-size",
+            str(chunk_size),
+            "--cache",
+            f"{snapshot_dir}/chunk-cache.json",
+            "--exclude",
+            snapshot_dir,
         ]
-        if strip_components:
-            command_parts.append(f"--strip-components={strip_components}")
-        command = " ".join(command_parts)
-        result = self.execute(session, command, cwd=session.workspace_path)
+        for pattern in exclude_paths:
+            scan_args.extend(["--exclude", pattern])
+        scan = self.execute(session, scan_script(scan_args, f"{snapshot_dir}/{snapshot_id}.scan-errors"))
+        if scan.exit_code != 0:
+            raise ChunkedSnapshotError(f"Snapshot scan failed: {(scan.stdout or '').strip()[:500]}")
+        entries = parse_scan_output(scan.stdout or "")
+
+        known = self._previous_chunk_index(session)
+        writer = PackWriter(
+            put_object=lambda key, body: self._put_snapshot_object(key, body),
+            key_prefix=f"snapshots/{session.id}/packs",
+            target_bytes=self._snapshot_pack_bytes,
+        )
+        request_path = f"{snapshot_dir}/{snapshot_id}.requests"
+        # Files edited between the scan and the pack step come back with new digests;
+        # a couple of extra rounds pick up chunks other entries still reference.
+        for _attempt in range(3):
+            requests = missing_chunk_requests(entries, {**known, **writer.locations})
+            if not requests:
+                break
+            upload = self.upload(session, request_path, pack_request_lines(entries, requests, chunk_size))
+            if upload.exit_code != 0:
+                raise ChunkedSnapshotError(f"Snapshot pack request failed: {(upload.stdout or '').strip()}")
+            try:
+                stream = self._stream_command(
+                    session, tool_script(["pack", request_path]), failure="Snapshot pack failed"
+                )
+                store_pack_stream(entries, requests, stream, writer)
+            finally:
+                self.execute(session, f"rm -f {shlex.quote(request_path)}")
+            writer.flush()
+        else:
+            if missing_chunk_requests(entries, {**known, **writer.locations}):
+                raise ChunkedSnapshotError("Workspace kept changing while it was being snapshotted")
+
+        available = {**known, **writer.locations}
+        referenced = {
+            digest for entry in entries if entry.get("t") == "f" for digest in entry.get("c") or []
+        }
+        manifest = {
+            "version": MANIFEST_VERSION,
+            "chunk_size": chunk_size,
+            "entries": entries,
+            "chunks": {digest: available[digest] for digest in referenced},
+        }
+        manifest_key = f"snapshots/{session.id}/{snapshot_id}.manifest.json.gz"
+        payload = encode_manifest(manifest)
+        self._put_snapshot_object(manifest_key, payload, content_type="application/gzip")
+        stored_bytes = writer.stored_bytes + len(payload)
+        summary = {
+            "version": MANIFEST_VERSION,
+            "chunk_size": chunk_size,
+            "entries": len(entries),
+            "chunks": len(referenced),
+            "new_chunks": len(writer.locations),
+            "packs": writer.pack_keys,
+            "logical_bytes": sum(int(entry.get("s") or 0) for entry in entries),
+            "stored_bytes": stored_bytes,
+        }
+        snapshot = SandboxSnapshot.objects.create(
+            id=snapshot_id,
+            session=session,
+            label=label,
+            s3_key=manifest_key,
+            size_bytes=stored_bytes,
+            include_paths=include_paths,
+            exclude_paths=exclude_paths,
+            format=SandboxSnapshot.Format.CHUNKED,
+            codec=SandboxSnapshot.Codec.NONE,
+            manifest=summary,
+        )
+        if session.workspace and stored_bytes:
+            get_quota_service().record_storage_usage(session.workspace, stored_bytes)
+            self._increment_session_storage(session, stored_bytes)
+        self._record_latest_snapshot(session, snapshot.id)
+        session.mark_activity()
+        self._log.info(
+            "Sandbox chunked snapshot created",
+            extra={
+                "session_id": str(session.id),
+                "snapshot_id": str(snapshot.id),
+                "s3_key": manifest_key,
+                **{key: value for key, value in summary.items() if key != "packs"},
+            },
+        )
+        return snapshot
+
+    def _previous_chunk_index(self, session: SandboxSession) -> dict[str, list]:
+        """Return the chunk locations already stored by the session's last chunked snapshot."""
+        previous = (
+            SandboxSnapshot.objects.filter(session=session, format=SandboxSnapshot.Format.CHUNKED)
+            .exclude(s3_key="")
+            .order_by("-created_at")
+            .only("id", "s3_key")
+            .first()
+        )
+        if previous is None:
+            return {}
+        try:
+            manifest = decode_manifest(self._get_snapshot_object(previous.s3_key))
+        except (ChunkedSnapshotError, SandboxProvisionError) as exc:
+            self._log.warning(
+                "Previous snapshot manifest unavailable; uploading all chunks",
+                extra={"session_id": str(session.id), "snapshot_id": str(previous.id), "error": str(exc)},
+            )
+            return {}
+        return manifest.get("chunks") or {}
+
+    def _restore_chunked_snapshot(self, session: SandboxSession, snapshot: SandboxSnapshot):
+        if not snapshot.s3_key or not self._s3_client():
+            raise SandboxProvisionError("Chunked snapshots require object storage to restore")
+        try:
+            manifest = decode_manifest(self._get_snapshot_object(snapshot.s3_key))
+        except ChunkedSnapshotError as exc:
+            raise SandboxProvisionError(str(exc)) from exc
+        packs = PackCache(self._get_snapshot_object)
+        stream = iter_tar_stream(manifest, packs.read)
+        extract = " ".join(["tar", "-xf", "-", "-C", "/", *_TAR_EXTRACT_FLAGS])
+        try:
+            result = self._run_with_input(session, extract, stream)
+            if result is None:
+                archive_path = f"{self._snapshot_dir(session)}/{snapshot.id}.tar"
+                upload = self.upload(session, archive_path, stream)
+                if int(upload.exit_code) != 0:
+                    message = (upload.stdout or upload.stderr or "").strip() or "Snapshot upload failed"
+                    raise SandboxProvisionError(message)
+                quoted = shlex.quote(archive_path)
+                extract_file = " ".join(["tar", "-xf", quoted, "-C", "/", *_TAR_EXTRACT_FLAGS])
+                result = self.execute(session, f"{extract_file}; rc=$?; rm -f {quoted}; exit $rc")
+        except ChunkedSnapshotError as exc:
+            raise SandboxProvisionError(str(exc)) from exc
         if result.exit_code != 0:
             message = (result.stdout or result.stderr or "").strip() or "Snapshot restore failed"
             raise SandboxProvisionError(message)
-
         self._record_latest_snapshot(session, snapshot.id)
         session.mark_activity()
         return snapshot
@@ -335,15 +1065,7 @@ class SandboxOrchestrator:
         filename: str,
         content_type: str = "",
     ) -> SandboxArtifact:
-        base64_cmd = f"base64 < {shlex.quote(path)}"
-        result = self.execute(session, base64_cmd)
-        if result.exit_code != 0:
-            raise SandboxProvisionError(
-                f"Failed to read file {path}: {(result.stdout or '').strip()}"
-            )
-        raw_b64 = (result.stdout or "").strip()
-        content = base64.b64decode(raw_b64.encode("ascii")) if raw_b64 else b""
-        size_bytes = len(content)
+        size_bytes = self.stat_file(session, path)
         storage_path = path
         download_url = self._build_download_url(session, storage_path)
         artifact = SandboxArtifact.objects.create(
@@ -360,6 +1082,100 @@ class SandboxOrchestrator:
         session.mark_activity()
         return artifact
 
+    def stat_file(self, session: SandboxSession, path: str) -> int:
+        """Return the size in bytes of a readable regular file inside the sandbox."""
+        quoted = shlex.quote(path)
+        result = self.execute(session, f"test -f {quoted} && test -r {quoted} && stat -c %s {quoted}")
+        output = (result.stdout or "").strip()
+        if result.exit_code != 0:
+            raise SandboxProvisionError(f"Failed to read file {path}: {output or 'not a readable file'}")
+        try:
+            return int(output.splitlines()[-1]) if output else 0
+        except ValueError as exc:
+            raise SandboxProvisionError(f"Failed to stat file {path}: {output}") from exc
+
+    def stream_file(
+        self,
+        session: SandboxSession,
+        path: str,
+        *,
+        offset: int = 0,
+        length: int | None = None,
+    ) -> Iterator[bytes]:
+        """Return an iterator over the raw bytes of ``path`` (or a byte range of it).
+
+        Bytes are piped straight out of the sandbox in bounded chunks, so memory use
+        does not depend on the file size. Errors are raised as
+        ``SandboxProvisionError`` while iterating.
+        """
+        if session.status != SandboxSession.Status.READY:
+            raise SandboxProvisionError("Sandbox is not ready for execution")
+        quoted = shlex.quote(path)
+        if offset <= 0 and length is None:
+            script = f"cat -- {quoted}"
+        else:
+            script = f"tail -c +{max(offset, 0) + 1} -- {quoted}"
+            if length is not None:
+                script += f" | head -c {max(length, 0)}"
+        session.mark_activity()
+        return self._stream_command(session, script, failure=f"Failed to read file {path}")
+
+    def _stream_command(self, session: SandboxSession, script: str, *, failure: str) -> Iterator[bytes]:
+        """Yield the raw stdout of ``script``; errors are raised as ``SandboxProvisionError(failure: ...)``."""
+        channel = self._exec_agent(session)
+        if channel is not None:
+            try:
+                handle = channel.open(["sh", "-c", script], merge_stderr=False)
+            except ExecAgentUnavailable:
+                _EXEC_AGENTS.discard(session.ref)
+            else:
+                yield from self._stream_exec_agent(session, handle, failure=failure)
+                return
+        iter_output = getattr(self.runner, "iter_output", None)
+        if iter_output is None:
+            # Runners without binary stdout support fall back to a buffered base64 read.
+            # Spool first: ``script | base64`` would report base64's status, not the read's.
+            spooled = (
+                'tmp=$(mktemp) || exit 1; '
+                f'{{ {script}; }} > "$tmp" && base64 "$tmp"; rc=$?; rm -f "$tmp"; exit $rc'
+            )
+            result = self.execute(session, spooled)
+            if result.exit_code != 0:
+                message = (result.stdout or result.stderr or "").strip() or "read failed"
+                raise SandboxProvisionError(f"{failure}: {message}")
+            raw_b64 = (result.stdout or "").replace("\n", "").strip()
+            try:
+                content = base64.b64decode(raw_b64.encode("ascii")) if raw_b64 else b""
+            except Exception as exc:  # noqa: BLE001
+                raise SandboxProvisionError(f"{failure}: invalid base64 output") from exc
+            if content:
+                yield content
+            return
+        try:
+            yield from iter_output(self._exec_prefix(session) + ["sh", "-c", script])
+        except subprocess.CalledProcessError as exc:
+            message = (exc.stderr or "").strip() or f"exit code {exc.returncode}"
+            raise SandboxProvisionError(f"{failure}: {message}") from exc
+
+    def _stream_exec_agent(self, session: SandboxSession, handle, *, failure: str) -> Iterator[bytes]:
+        errors = bytearray()
+        try:
+            for kind, chunk in handle.iter_output():
+                if kind == EXEC_STDERR:
+                    errors.extend(chunk[: 4096 - len(errors)])
+                else:
+                    yield chunk
+            exit_code = handle.wait()
+        except ExecAgentError as exc:
+            _EXEC_AGENTS.discard(session.ref)
+            raise SandboxProvisionError(f"Sandbox exec channel failed: {exc}") from exc
+        except GeneratorExit:
+            handle.cancel()
+            raise
+        if exit_code != 0:
+            message = errors.decode("utf-8", errors="replace").strip() or handle.error
+            raise SandboxProvisionError(f"{failure}: {message or f'exit code {exit_code}'}")
+
     def list_artifacts(self, session: SandboxSession):
         return session.artifacts.all()
 
@@ -367,6 +1183,7 @@ class SandboxOrchestrator:
         return session.snapshots.all()
 
     def terminate(self, session: SandboxSession, *, reason: str | None = None):
+        session_cache.invalidate(session.id)
         if session.status == SandboxSession.Status.TERMINATED:
             return
 
@@ -394,6 +1211,17 @@ class SandboxOrchestrator:
         elif session.mode == SandboxSession.Mode.KUBERNETES:
             provisioner = self._k8s()
             provisioner.cleanup(session.ref)
+        if session.ref:
+            _EXEC_AGENTS.discard(session.ref)
+
+        fields = ["status", "cpu_seconds", "updated_at"]
+        pending_activity = SESSION_ACTIVITY.take(session.pk)
+        if pending_activity and (
+            not session.last_activity_at or pending_activity > session.last_activity_at
+        ):
+            session.last_activity_at = pending_activity
+            session.last_heartbeat_at = pending_activity
+            fields += ["last_activity_at", "last_heartbeat_at"]
 
         started = session.created_at or timezone.now()
         ended = session.last_activity_at or timezone.now()
@@ -405,7 +1233,6 @@ class SandboxOrchestrator:
         )
         session.status = SandboxSession.Status.TERMINATED
         session.cpu_seconds = max(0.0, duration)
-        fields = ["status", "cpu_seconds", "updated_at"]
         if reason:
             fields.append("metadata")
         session.save(update_fields=fields)
@@ -464,15 +1291,17 @@ class SandboxOrchestrator:
                 args.extend(["--label", f"{key}={value}"])
         return args
 
-    def _spawn_docker(self, session: SandboxSession) -> SandboxRuntime:
-        ident = f"sandbox-{session.id}"
-        workspace_path = session.workspace_path or "/workspace"
-        adopted = self._try_adopt_existing_container(
-            ident, workspace_path, session_id=str(session.id)
-        )
-        if adopted:
-            return adopted
-
+    def _docker_run_args(
+        self,
+        ident: str,
+        *,
+        image: str,
+        cpu: str,
+        memory: str,
+        labels: list[str],
+        mount: str | None,
+        workspace_path: str,
+    ) -> list[str]:
         args = [
             "docker",
             "run",
@@ -486,21 +1315,39 @@ class SandboxOrchestrator:
         args.extend(self._docker_host_gateway_args())
         args.extend(self._docker_security_args())
         args.extend(self._docker_user_args())
-        args.extend(self._docker_label_args(session))
-        mount = self._workspace_volume_mount(session)
+        args.extend(labels)
         if not mount and _env_flag("SANDBOX_DOCKER_READ_ONLY", "1"):
             # World-writable workspace tmpfs so the non-root sandbox user can write.
             mount = f"type=tmpfs,target={workspace_path},tmpfs-mode=1777"
         if mount:
             args.extend(["--mount", mount])
-        if session.cpu:
-            args.extend(["--cpus", session.cpu])
-        if session.memory:
-            args.extend(["-m", session.memory])
+        if cpu:
+            args.extend(["--cpus", cpu])
+        if memory:
+            args.extend(["-m", memory])
 
         # Use the image's CMD (entrypoint.sh) instead of overriding with sleep infinity
-        args.append(session.image)
-        # args.extend([session.image, "sleep", "infinity"]) 
+        args.append(image)
+        return args
+
+    def _spawn_docker(self, session: SandboxSession) -> SandboxRuntime:
+        ident = f"sandbox-{session.id}"
+        workspace_path = session.workspace_path or "/workspace"
+        adopted = self._try_adopt_existing_container(
+            ident, workspace_path, session_id=str(session.id)
+        )
+        if adopted:
+            return adopted
+
+        args = self._docker_run_args(
+            ident,
+            image=session.image,
+            cpu=session.cpu,
+            memory=session.memory,
+            labels=self._docker_label_args(session),
+            mount=self._workspace_volume_mount(session),
+            workspace_path=workspace_path,
+        )
 
         try:
             self.runner.run(args, allow_failure=False)
@@ -576,24 +1423,82 @@ class SandboxOrchestrator:
         )
 
     def _wrap_exec(self, session: SandboxSession, payload: str, *, workdir: Optional[str]):
-        mode, identifier = self._split_ref(session.ref)
-        script = payload
+        return self._exec_prefix(session) + ["sh", "-c", self._shell_script(payload, workdir)]
+
+    def _shell_script(self, payload: str, workdir: Optional[str]) -> str:
         if workdir:
-            script = f"cd {shlex.quote(workdir)} && {payload}"
+            return f"cd {shlex.quote(workdir)} && {payload}"
+        return payload
+
+    def _exec_prefix(self, session: SandboxSession, *, interactive: bool = False) -> list[str]:
+        """Return the ``docker exec``/``kubectl exec`` argv up to the in-sandbox command."""
+        mode, identifier = self._split_ref(session.ref)
         if mode == SandboxSession.Mode.DOCKER:
             user = os.getenv("SANDBOX_DOCKER_USER", "").strip()
             base = ["docker", "exec"]
+            if interactive:
+                base.append("-i")
             if user:
                 base.extend(["--user", user])
             base.append(identifier)
         else:
             namespace, pod = self._split_k8s_identifier(identifier)
             base = ["kubectl", "exec"]
+            if interactive:
+                base.append("-i")
             if namespace:
                 base.extend(["-n", namespace])
             base.append(pod)
             base.append("--")
-        return base + ["sh", "-c", script]
+        return base
+
+    # exec agent -------------------------------------------------------
+
+    def _exec_agent(self, session: SandboxSession) -> ExecAgentChannel | None:
+        """Return the shared exec channel for a sandbox, or None to use per-command exec."""
+        if not exec_agent_enabled() or getattr(self.runner, "dry_run", True):
+            return None
+        if not session.ref:
+            return None
+        return _EXEC_AGENTS.acquire(
+            session.ref,
+            lambda: self._exec_prefix(session, interactive=True) + exec_agent_command(),
+        )
+
+    def _run_via_exec_agent(
+        self,
+        session: SandboxSession,
+        payload: str,
+        *,
+        workdir: Optional[str],
+        timeout_sec: int | None = None,
+        input_chunks: Iterable[bytes] | None = None,
+    ):
+        channel = self._exec_agent(session)
+        if channel is None:
+            return None
+        wait_timeout = None
+        if timeout_sec:
+            try:
+                # The in-sandbox `timeout` wrapper enforces the limit; this only guards the channel.
+                wait_timeout = float(timeout_sec) + 30.0
+            except (TypeError, ValueError):
+                wait_timeout = None
+        try:
+            return channel.run(
+                ["sh", "-c", self._shell_script(payload, workdir)],
+                input_chunks=input_chunks,
+                timeout=wait_timeout,
+            )
+        except ExecAgentUnavailable:
+            _EXEC_AGENTS.discard(session.ref)
+            return None
+        except ExecAgentTimeout as exc:
+            # Only this command was cancelled; other requests keep sharing the channel.
+            raise SandboxProvisionError(f"Sandbox command failed: {exc}") from exc
+        except ExecAgentError as exc:
+            _EXEC_AGENTS.discard(session.ref)
+            raise SandboxProvisionError(f"Sandbox exec channel failed: {exc}") from exc
 
     def _split_ref(self, ref: str) -> tuple[str, str]:
         if "://" in ref:
@@ -645,13 +1550,34 @@ class SandboxOrchestrator:
 
         return f"type=volume,source={volume},target={workspace_path}"
 
+    def _rebuild_workspace_index(self, session: SandboxSession) -> None:
+        """Re-scan the in-sandbox workspace index after a restore rewrote the tree."""
+        if not fs_commands.workspace_index_enabled():
+            return
+        root = session.workspace_path or "/workspace"
+        command = f"{fs_commands.index_query_command({'op': 'rebuild'}, root)} >/dev/null || true"
+        try:
+            self.execute(session, command)
+        except SandboxProvisionError as exc:
+            self._log.warning(
+                "Failed to rebuild workspace index",
+                extra={"session_id": str(session.id), "error": str(exc)},
+            )
+
     def _record_latest_snapshot(self, session: SandboxSession, snapshot_id: uuid.UUID) -> None:
         """Persist the latest snapshot pointer on the session for easy restore."""
+        value = str(snapshot_id)
         try:
+            # Set only this key in the stored document: keys written meanwhile (for example a
+            # concurrent terminate's ``terminated_reason``) survive, and so does metadata the
+            # caller changed on ``session`` but has not saved yet.
+            SandboxSession.objects.filter(pk=session.pk).update(
+                metadata=_JSONKeyUpdate(F("metadata"), "latest_snapshot_id", value),
+                updated_at=timezone.now(),
+            )
             metadata = dict(session.metadata or {})
-            metadata["latest_snapshot_id"] = str(snapshot_id)
+            metadata["latest_snapshot_id"] = value
             session.metadata = metadata
-            session.save(update_fields=["metadata", "updated_at"])
         except Exception as exc:  # noqa: BLE001
             # Do not block snapshot/restore flows if metadata save fails.
             self._log.warning(
@@ -672,9 +1598,10 @@ class SandboxOrchestrator:
             return None
         payload: str | None = None
         try:
-            if mode == SandboxSession.Mode.DOCKER:
+            payload = self._collect_exec_agent_cpu_payload(session.ref)
+            if not payload and mode == SandboxSession.Mode.DOCKER:
                 payload = self._collect_docker_cpu_payload(identifier)
-            elif mode in {SandboxSession.Mode.KUBERNETES, "kubernetes"}:
+            elif not payload and mode in {SandboxSession.Mode.KUBERNETES, "kubernetes"}:
                 payload = self._collect_k8s_cpu_payload(identifier)
         except Exception as exc:  # noqa: BLE001
             self._log.warning(
@@ -717,6 +1644,19 @@ class SandboxOrchestrator:
         )
         return seconds
 
+    def _collect_exec_agent_cpu_payload(self, ref: str) -> str | None:
+        """Probe CPU usage over an already-open exec channel, if there is one."""
+        channel = _EXEC_AGENTS.get(ref)
+        if channel is None:
+            return None
+        try:
+            result = channel.run(["sh", "-c", self._cpu_probe_script()], timeout=30)
+        except ExecAgentError:
+            return None
+        if result.exit_code == 0 and result.stdout:
+            return result.stdout
+        return None
+
     def _collect_docker_cpu_payload(self, identifier: str) -> str | None:
         if not identifier:
             return None
@@ -829,20 +1769,142 @@ class SandboxOrchestrator:
         )
         return self._s3_client_cached
 
-    def _snapshot_object_key(self, session: SandboxSession, snapshot_id: uuid.UUID) -> str:
-        return f"snapshots/{session.id}/{snapshot_id}.tar.gz"
+    def _snapshot_object_key(
+        self,
+        session: SandboxSession,
+        snapshot_id: uuid.UUID,
+        codec: SnapshotCodec | None = None,
+    ) -> str:
+        extension = codec.extension if codec else ".tar.gz"
+        return f"snapshots/{session.id}/{snapshot_id}{extension}"
+
+    def _put_snapshot_object(
+        self, key: str, body: bytes, *, content_type: str = "application/octet-stream"
+    ) -> None:
+        client = self._s3_client()
+        if not client:
+            raise SandboxProvisionError("Object storage is not configured")
+        try:
+            client.put_object(Bucket=self._s3_bucket, Key=key, Body=body, ContentType=content_type)
+        except (BotoCoreError, ClientError) as exc:
+            raise SandboxProvisionError(f"Snapshot upload failed: {exc}") from exc
 
-    def _read_file_from_sandbox(self, session: SandboxSession, path: str) -> bytes:
-        base64_cmd = f"base64 < {shlex.quote(path)}"
-        result = self.execute(session, base64_cmd)
-        if result.exit_code != 0:
-            message = (result.stdout or result.stderr or "").strip() or "Snapshot read failed"
-            raise SandboxProvisionError(message)
-        raw_b64 = (result.stdout or "").replace("\n", "").strip()
+    def _get_snapshot_object(self, key: str) -> bytes:
+        client = self._s3_client()
+        if not client:
+            raise SandboxProvisionError("Object storage is not configured")
         try:
-            return base64.b64decode(raw_b64.encode("ascii")) if raw_b64 else b""
-        except Exception as exc:  # noqa: BLE001
-            raise SandboxProvisionError("Unable to decode snapshot archive") from exc
+            response = client.get_object(Bucket=self._s3_bucket, Key=key)
+            body = response.get("Body")
+            return body.read() if body else b""
+        except (BotoCoreError, ClientError) as exc:
+            raise SandboxProvisionError(f"Snapshot download failed: {exc}") from exc
+
+    def _stream_to_s3(
+        self, key: str, chunks: Iterable[bytes], *, content_type: str = "application/octet-stream"
+    ) -> int:
+        """Upload a byte stream to S3, returning its size.
+
+        Streams larger than one part become a multipart upload with at most
+        ``SANDBOX_S3_UPLOAD_CONCURRENCY`` parts in flight, so memory stays bounded
+        to a few part buffers. Failed uploads are aborted.
+        """
+        client = self._s3_client()
+        if not client:
+            raise SandboxProvisionError("Object storage is not configured")
+        part_size = max(self._s3_part_bytes, 1)
+        buffer = bytearray()
+        total = 0
+        upload_id: str | None = None
+        in_flight: list[tuple[int, Future]] = []
+        parts: list[dict] = []
+        executor = ThreadPoolExecutor(max_workers=self._s3_upload_concurrency)
+
+        def _send(body: bytes) -> None:
+            nonlocal upload_id
+            if upload_id is None:
+                upload_id = client.create_multipart_upload(
+                    Bucket=self._s3_bucket, Key=key, ContentType=content_type
+                )["UploadId"]
+            number = len(parts) + len(in_flight) + 1
+            in_flight.append(
+                (
+                    number,
+                    executor.submit(
+                        client.upload_part,
+                        Bucket=self._s3_bucket,
+                        Key=key,
+                        UploadId=upload_id,
+                        PartNumber=number,
+                        Body=body,
+                    ),
+                )
+            )
+            while len(in_flight) >= self._s3_upload_concurrency:
+                _collect()
+
+        def _collect() -> None:
+            number, future = in_flight.pop(0)
+            parts.append({"PartNumber": number, "ETag": future.result()["ETag"]})
+
+        try:
+            for chunk in chunks:
+                buffer.extend(chunk)
+                total += len(chunk)
+                while len(buffer) >= part_size:
+                    _send(bytes(buffer[:part_size]))
+                    del buffer[:part_size]
+            if upload_id is None:
+                client.put_object(
+                    Bucket=self._s3_bucket, Key=key, Body=bytes(buffer), ContentType=content_type
+                )
+                return total
+            if buffer:
+                _send(bytes(buffer))
+            while in_flight:
+                _collect()
+            client.complete_multipart_upload(
+                Bucket=self._s3_bucket,
+                Key=key,
+                UploadId=upload_id,
+                MultipartUpload={"Parts": parts},
+            )
+            return total
+        except BaseException as exc:
+            if upload_id is not None:
+                for _number, future in in_flight:
+                    future.cancel()
+                try:
+                    client.abort_multipart_upload(Bucket=self._s3_bucket, Key=key, UploadId=upload_id)
+                except (BotoCoreError, ClientError):
+                    pass
+            if isinstance(exc, (BotoCoreError, ClientError)):
+                raise SandboxProvisionError(f"Snapshot upload failed: {exc}") from exc
+            raise
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def _open_snapshot_stream(self, snapshot: SandboxSnapshot):
+        """Return the S3 body for a snapshot without reading it, or None if unavailable."""
+        client = self._s3_client()
+        if not client or not snapshot.s3_key:
+            return None
+        try:
+            return client.get_object(Bucket=self._s3_bucket, Key=snapshot.s3_key)["Body"]
+        except (BotoCoreError, ClientError, KeyError) as exc:
+            self._log.warning(
+                "Snapshot download failed; falling back to existing archive if present",
+                extra={
+                    "snapshot_id": str(snapshot.id),
+                    "bucket": self._s3_bucket,
+                    "key": snapshot.s3_key,
+                    "error": str(exc),
+                },
+            )
+            return None
+
+    def _read_file_from_sandbox(self, session: SandboxSession, path: str) -> bytes:
+        return b"".join(self.stream_file(session, path))
 
     def _upload_snapshot_to_s3(
         self,
@@ -855,14 +1917,15 @@ class SandboxOrchestrator:
             return
 
         content = self._read_file_from_sandbox(session, archive_path)
-        key = snapshot.s3_key or self._snapshot_object_key(session, snapshot.id)
+        codec = get_codec(snapshot.codec)
+        key = snapshot.s3_key or self._snapshot_object_key(session, snapshot.id, codec)
 
         try:
             client.put_object(
                 Bucket=self._s3_bucket,
                 Key=key,
                 Body=content,
-                ContentType="application/gzip",
+                ContentType=codec.content_type,
             )
         except (BotoCoreError, ClientError) as exc:
             raise SandboxProvisionError(f"Snapshot upload failed: {exc}") from exc
@@ -0,0 +1,118 @@
+"""Process-local cache of ready sandbox sessions for the agent tool-call path.
+
+Every DeepAgents filesystem call used to re-read its ``SandboxSession`` row and
+re-check readiness. Ready sessions are cached here for
+``SANDBOX_SESSION_CACHE_SEC`` seconds (default 15, ``0`` disables), so a burst
+of tool calls touches the database at most once per interval. Entries are
+dropped when an exec against the session fails and whenever its row is saved
+with a non-ready status (see ``signals``). Saves in other processes (the
+reaper, API workers) reach this one through the session status channel, which
+a background thread follows while anything is cached; without Redis those
+entries simply expire.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+import time
+
+import redis
+
+from astraforge.sandbox.events import subscribe_all_session_statuses
+from astraforge.sandbox.models import SandboxSession
+
+logger = logging.getLogger(__name__)
+
+_LISTENER_RETRY_SEC = 30.0
+
+_lock = threading.Lock()
+_entries: dict[str, tuple[float, SandboxSession]] = {}
+_listener: threading.Thread | None = None
+_listener_retry_at = 0.0
+
+
+def ttl() -> float:
+    try:
+        return max(0.0, float(os.getenv("SANDBOX_SESSION_CACHE_SEC", "15")))
+    except ValueError:
+        return 15.0
+
+
+def get(session_id) -> SandboxSession | None:
+    key = str(session_id)
+    with _lock:
+        entry = _entries.get(key)
+        if entry is None:
+            return None
+        expires_at, session = entry
+        if expires_at <= time.monotonic():
+            _entries.pop(key, None)
+            return None
+        return session
+
+
+def put(session: SandboxSession) -> None:
+    lifetime = ttl()
+    if not lifetime or session.status != SandboxSession.Status.READY:
+        return
+    now = time.monotonic()
+    with _lock:
+        for key in [key for key, (expires_at, _) in _entries.items() if expires_at <= now]:
+            del _entries[key]
+        _entries[str(session.id)] = (now + lifetime, session)
+    _ensure_listener()
+
+
+def invalidate(session_id) -> None:
+    with _lock:
+        _entries.pop(str(session_id), None)
+
+
+def clear() -> None:
+    with _lock:
+        _entries.clear()
+
+
+def handle_status_message(message) -> None:
+    """Drop the cached session named by a status channel message unless it is ready."""
+    if not message or message.get("type") not in {"message", "pmessage"}:
+        return
+    raw = message.get("data")
+    try:
+        payload = json.loads(raw.decode("utf-8") if isinstance(raw, bytes) else raw)
+    except (TypeError, ValueError):
+        return
+    if not isinstance(payload, dict) or not payload.get("id"):
+        return
+    if payload.get("status") != SandboxSession.Status.READY:
+        invalidate(payload["id"])
+
+
+def _ensure_listener() -> None:
+    global _listener
+    with _lock:
+        if _listener is not None and _listener.is_alive():
+            return
+        if time.monotonic() < _listener_retry_at:
+            return
+        _listener = threading.Thread(target=_listen, name="sandbox-session-cache", daemon=True)
+        _listener.start()
+
+
+def _listen() -> None:
+    global _listener_retry_at
+    pubsub = subscribe_all_session_statuses()
+    if pubsub is None:
+        _listener_retry_at = time.monotonic() + _LISTENER_RETRY_SEC
+        return
+    try:
+        for message in pubsub.listen():
+            handle_status_message(message)
+    except redis.RedisError as exc:
+        logger.debug("Sandbox session cache listener stopped", extra={"error": str(exc)})
+        _listener_retry_at = time.monotonic() + _LISTENER_RETRY_SEC
+    finally:
+        pubsub.close()
@@ -0,0 +1,20 @@
+from __future__ import annotations
+
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from astraforge.sandbox import session_cache
+from astraforge.sandbox.events import publish_session_status
+from astraforge.sandbox.models import SandboxSession
+
+
+@receiver(post_save, sender=SandboxSession)
+def drop_cached_session(sender, instance, created, update_fields=None, **kwargs):
+    """Stop the tool-call session cache from serving a session that is no longer ready."""
+    if created or instance.status == SandboxSession.Status.READY:
+        return
+    if update_fields is not None and "status" not in update_fields:
+        return
+    session_cache.invalidate(instance.id)
+    # Other processes drop their cached copy when they see this on the status channel.
+    publish_session_status(instance)
@@ -0,0 +1,109 @@
+"""Compression codecs for archive snapshots.
+
+Each codec describes how ``tar`` compresses a snapshot inside the sandbox and how
+to extract it again. ``zstd`` and ``pigz`` are optional binaries; callers probe
+for them and fall back to the codec named in ``fallback``.
+"""
+
+from __future__ import annotations
+
+import os
+import shlex
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class SnapshotCodec:
+    name: str
+    extension: str
+    content_type: str
+    magic: bytes
+    binary: str | None = None
+    fallback: str | None = None
+
+    def compress_flags(self, *, level: int | None = None, threads: int = 0) -> list[str]:
+        """Return the ``tar`` flags that select this codec when creating an archive."""
+        if self.name == "gzip":
+            return ["-z"]
+        if self.name == "none":
+            return []
+        program = [self.binary or self.name]
+        if self.name == "zstd":
+            program.append(f"-T{max(threads, 0)}")
+            if level is not None:
+                program.append(f"-{level}" if level <= 19 else f"--ultra -{level}")
+        elif self.name == "pigz":
+            if threads > 0:
+                program.append(f"-p{threads}")
+            if level is not None:
+                program.append(f"-{min(max(level, 1), 9)}")
+        return [f"--use-compress-program={shlex.quote(' '.join(program))}"]
+
+    def extract_flags(self) -> list[str]:
+        """Return the ``tar`` flags that decompress this codec on extraction."""
+        if self.name == "gzip":
+            return ["-z"]
+        if self.name == "none":
+            return []
+        return [f"--use-compress-program={self.binary or self.name}"]
+
+
+CODECS: dict[str, SnapshotCodec] = {
+    "gzip": SnapshotCodec(
+        name="gzip", extension=".tar.gz", content_type="application/gzip", magic=b"\x1f\x8b"
+    ),
+    "pigz": SnapshotCodec(
+        name="pigz",
+        extension=".tar.gz",
+        content_type="application/gzip",
+        magic=b"\x1f\x8b",
+        binary="pigz",
+        fallback="gzip",
+    ),
+    "zstd": SnapshotCodec(
+        name="zstd",
+        extension=".tar.zst",
+        content_type="application/zstd",
+        magic=b"\x28\xb5\x2f\xfd",
+        binary="zstd",
+        fallback="gzip",
+    ),
+    "none": SnapshotCodec(name="none", extension=".tar", content_type="application/x-tar", magic=b""),
+}
+
+DEFAULT_CODEC = "gzip"
+
+
+def get_codec(name: str | None) -> SnapshotCodec:
+    return CODECS.get((name or "").strip().lower(), CODECS[DEFAULT_CODEC])
+
+
+def detect_codec(header: bytes, hint: str | None = None) -> SnapshotCodec:
+    """Pick the codec from an archive's leading bytes, falling back to ``hint``."""
+    if header.startswith(CODECS["zstd"].magic):
+        return CODECS["zstd"]
+    if header.startswith(CODECS["gzip"].magic):
+        # pigz output is plain gzip; keep a recorded pigz hint for parallel decompression.
+        return CODECS["pigz"] if hint == "pigz" else CODECS["gzip"]
+    if len(header) >= 262 and header[257:262] == b"ustar":
+        return CODECS["none"]
+    return get_codec(hint)
+
+
+def configured_codec() -> str:
+    return os.getenv("SANDBOX_SNAPSHOT_CODEC", DEFAULT_CODEC).strip().lower() or DEFAULT_CODEC
+
+
+def configured_level() -> int | None:
+    raw = os.getenv("SANDBOX_SNAPSHOT_CODEC_LEVEL", "").strip()
+    try:
+        return int(raw) if raw else None
+    except ValueError:
+        return None
+
+
+def configured_threads() -> int:
+    try:
+        return max(int(os.getenv("SANDBOX_SNAPSHOT_CODEC_THREADS", "0") or 0), 0)
+    except ValueError:
+        return 0
@@ -0,0 +1,177 @@
+"""In-sandbox helper for content-addressed (chunked) snapshots.
+
+The orchestrator pipes this file to ``python3 -`` inside the sandbox, so it
+must only use the standard library and stay compatible with the Python shipped
+in sandbox images. It is never imported by the backend at runtime.
+
+Commands:
+
+- ``scan``: walk the include paths and print one JSON line per entry. Regular
+  files carry the SHA-256 digests of their fixed-size chunks. Digests are cached
+  by ``(size, mtime_ns, inode)`` so unchanged files are not re-read.
+- ``pack``: read ``[path, offset, length]`` JSON lines from a request file and
+  write each slice to stdout as an 8-byte big-endian length followed by the bytes
+  actually read (shorter when the file shrank since the scan).
+"""
+
+from __future__ import annotations
+
+import argparse
+import fnmatch
+import hashlib
+import json
+import os
+import stat
+import struct
+import sys
+
+LENGTH = struct.Struct(">Q")
+
+
+def _excluded(path: str, root: str, patterns: list[str]) -> bool:
+    relative = os.path.relpath(path, root)
+    name = os.path.basename(path)
+    for pattern in patterns:
+        stripped = pattern.rstrip("/")
+        if path == stripped or path.startswith(stripped + "/"):
+            return True
+        if fnmatch.fnmatch(path, pattern) or fnmatch.fnmatch(relative, pattern) or fnmatch.fnmatch(name, pattern):
+            return True
+    return False
+
+
+def _chunk_digests(path: str, chunk_size: int) -> list[str]:
+    digests = []
+    with open(path, "rb") as handle:
+        while True:
+            block = handle.read(chunk_size)
+            if not block:
+                break
+            digests.append(hashlib.sha256(block).hexdigest())
+    return digests
+
+
+def _load_cache(path: str | None) -> dict:
+    if not path:
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as handle:
+            return json.load(handle)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_cache(path: str | None, cache: dict) -> None:
+    if not path:
+        return
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as handle:
+            json.dump(cache, handle, separators=(",", ":"))
+        os.replace(temp_path, path)
+    except OSError:
+        pass
+
+
+def _walk(root: str, patterns: list[str]):
+    if _excluded(root, root, patterns):
+        return
+    yield root
+    try:
+        st = os.lstat(root)
+    except OSError:
+        return
+    if not stat.S_ISDIR(st.st_mode):
+        return
+    for current, dirs, files in os.walk(root):
+        dirs[:] = sorted(d for d in dirs if not _excluded(os.path.join(current, d), root, patterns))
+        for name in sorted(dirs + files):
+            path = os.path.join(current, name)
+            if name in files and _excluded(path, root, patterns):
+                continue
+            yield path
+
+
+def scan(paths: list[str], patterns: list[str], chunk_size: int, cache_path: str | None) -> int:
+    previous = _load_cache(cache_path)
+    cache: dict = {}
+    out = sys.stdout
+    seen: set[str] = set()
+    for root in paths:
+        root = os.path.abspath(root)
+        for path in _walk(root, patterns):
+            if path in seen:
+                continue
+            seen.add(path)
+            try:
+                st = os.lstat(path)
+            except OSError:
+                continue
+            entry = {"p": path, "m": stat.S_IMODE(st.st_mode), "mt": int(st.st_mtime)}
+            if stat.S_ISDIR(st.st_mode):
+                entry["t"] = "d"
+            elif stat.S_ISLNK(st.st_mode):
+                entry["t"] = "l"
+                entry["l"] = os.readlink(path)
+            elif stat.S_ISREG(st.st_mode):
+                key = [st.st_size, st.st_mtime_ns, st.st_ino, chunk_size]
+                cached = previous.get(path)
+                if cached and cached[:4] == key:
+                    digests = cached[4]
+                else:
+                    try:
+                        digests = _chunk_digests(path, chunk_size)
+                    except OSError:
+                        continue
+                cache[path] = key + [digests]
+                entry["t"] = "f"
+                entry["s"] = st.st_size
+                entry["c"] = digests
+            else:
+                continue
+            out.write(json.dumps(entry, separators=(",", ":")))
+            out.write("\n")
+    out.flush()
+    _save_cache(cache_path, cache)
+    return 0
+
+
+def pack(request_path: str) -> int:
+    out = sys.stdout.buffer
+    with open(request_path, "r", encoding="utf-8") as requests:
+        for line in requests:
+            if not line.strip():
+                continue
+            path, offset, length = json.loads(line)
+            data = b""
+            try:
+                with open(path, "rb") as handle:
+                    handle.seek(offset)
+                    data = handle.read(length)
+            except OSError:
+                pass
+            out.write(LENGTH.pack(len(data)))
+            out.write(data)
+    out.flush()
+    return 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="astraforge-snapshot-tool")
+    sub = parser.add_subparsers(dest="command", required=True)
+    scan_parser = sub.add_parser("scan")
+    scan_parser.add_argument("paths", nargs="+")
+    scan_parser.add_argument("--exclude", action="append", default=[])
+    scan_parser.add_argument("--chunk-size", type=int, default=4 * 1024 * 1024)
+    scan_parser.add_argument("--cache")
+    pack_parser = sub.add_parser("pack")
+    pack_parser.add_argument("requests")
+    args = parser.parse_args(argv)
+    if args.command == "scan":
+        return scan(args.paths, args.exclude, args.chunk_size, args.cache)
+    return pack(args.requests)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,13 +2,84 @@
 
 from __future__ import annotations
 
+import logging
+from datetime import timedelta
+
 from celery import shared_task
+from django.db.models import Q
+from django.utils import timezone
 
+from astraforge.infrastructure.activity import flush_all
+from astraforge.sandbox.events import publish_session_status
+from astraforge.sandbox.models import SandboxSession, SandboxSnapshot
 from astraforge.sandbox.reaper import SandboxReaper
+from astraforge.sandbox.services import SandboxOrchestrator, _env_int
+
+logger = logging.getLogger(__name__)
 
 
 @shared_task
-def reap_sandboxes() -> dict[str, int]:
+def reap_sandboxes() -> dict:
     """Terminate sandbox sessions that exceeded idle or lifetime limits."""
     reaper = SandboxReaper()
     return reaper.reap()
+
+
+@shared_task
+def flush_activity() -> dict[str, int]:
+    """Write buffered session activity and API key usage timestamps to the database."""
+    return flush_all()
+
+
+@shared_task
+def refill_warm_pool() -> dict[str, int]:
+    """Keep the configured number of pre-provisioned sandboxes ready per profile."""
+    return SandboxOrchestrator().refill_warm_pool()
+
+
+@shared_task
+def provision_sandbox_session(session_id: str, restore_snapshot_id: str | None = None) -> str:
+    """Provision (and optionally restore) a session created with ``status=starting``."""
+    session = SandboxSession.objects.filter(id=session_id).first()
+    if session is None or session.status != SandboxSession.Status.STARTING:
+        # Already provisioned (e.g. by a re-enqueued duplicate): never restore twice.
+        return "skipped"
+    if not _claim_provisioning(session):
+        # A redelivered or duplicate task: another worker is already provisioning.
+        return "skipped"
+    snapshot = None
+    if restore_snapshot_id:
+        snapshot = SandboxSnapshot.objects.filter(id=restore_snapshot_id).first()
+    orchestrator = SandboxOrchestrator()
+    try:
+        orchestrator.provision(session)
+        if snapshot:
+            orchestrator.restore_snapshot(session, snapshot)
+    except Exception as exc:  # noqa: BLE001
+        logger.warning(
+            "Asynchronous sandbox provisioning failed",
+            extra={"session_id": session_id, "error": str(exc)},
+        )
+        session.error_message = str(exc)
+        if session.status == SandboxSession.Status.READY:
+            # Provisioned but the restore failed: same outcome as the synchronous path.
+            session.save(update_fields=["error_message", "updated_at"])
+            orchestrator.terminate(session, reason="restore_failed")
+        else:
+            session.status = SandboxSession.Status.FAILED
+            session.save(update_fields=["status", "error_message", "updated_at"])
+    finally:
+        SandboxSession.objects.filter(pk=session.pk).update(provision_lease_until=None)
+    publish_session_status(session)
+    return session.status
+
+
+def _claim_provisioning(session: SandboxSession) -> bool:
+    now = timezone.now()
+    lease_sec = max(1, _env_int("SANDBOX_PROVISION_LEASE_SEC", 900))
+    claimed = (
+        SandboxSession.objects.filter(pk=session.pk, status=SandboxSession.Status.STARTING)
+        .filter(Q(provision_lease_until__isnull=True) | Q(provision_lease_until__lte=now))
+        .update(provision_lease_until=now + timedelta(seconds=lease_sec))
+    )
+    return claimed == 1
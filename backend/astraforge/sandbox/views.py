@@ -1,20 +1,30 @@
 from __future__ import annotations
 
 import base64
+import json
 import logging
-import shlex
+import os
 import time
+from datetime import timedelta
 
-from django.http import HttpResponse
+import redis
+from django.db.models import Q
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils import timezone
 from rest_framework import mixins, status, viewsets
 from rest_framework.decorators import action
 from rest_framework.parsers import BaseParser
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 
+from astraforge.interfaces.rest.renderers import EventStreamRenderer
+from astraforge.sandbox.batch import run_batch
+from astraforge.sandbox.events import session_status_payload, subscribe_session_status
 from astraforge.sandbox.models import SandboxSession, SandboxSnapshot
 from astraforge.sandbox.serializers import (
     SandboxArtifactSerializer,
+    SandboxBatchSerializer,
     SandboxExecSerializer,
     SandboxFileExportSerializer,
     SandboxSessionCreateSerializer,
@@ -23,7 +33,9 @@ from astraforge.sandbox.serializers import (
     SandboxSnapshotSerializer,
     SandboxUploadSerializer,
 )
-from astraforge.sandbox.services import SandboxOrchestrator, SandboxProvisionError
+from astraforge.sandbox.services import SandboxOrchestrator, SandboxProvisionError, _env_int
+from astraforge.sandbox.tasks import provision_sandbox_session
+from astraforge.sandbox.warm_pool import pool_metrics
 
 
 # 1x1 transparent PNG placeholder to avoid broken images until
@@ -34,12 +46,75 @@ _PLACEHOLDER_PNG = base64.b64decode(
 
 logger = logging.getLogger(__name__)
 
+_EVENTS_DEFAULT_TIMEOUT = 120.0
+_EVENTS_MAX_TIMEOUT = 600.0
+_EVENTS_HEARTBEAT_SEC = 15.0
+_EVENTS_RECHECK_SEC = 5.0
+
+
+def _parse_byte_range(header: str | None, size: int) -> tuple[int, int] | None:
+    """Parse a single ``Range: bytes=`` header into an inclusive ``(start, end)``.
+
+    Returns None when the header is absent, malformed or asks for several ranges
+    (the full body is served instead) and raises ValueError when unsatisfiable.
+    """
+    if not header:
+        return None
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, sep, last = spec.strip().partition("-")
+    if not sep or not (first or last):
+        return None
+    if (first and not first.isdigit()) or (last and not last.isdigit()):
+        return None
+    if first:
+        start = int(first)
+        end = int(last) if last else size - 1
+        if last and end < start:
+            return None
+    else:
+        suffix = int(last)
+        if suffix == 0:
+            raise ValueError("empty suffix range")
+        start, end = max(size - suffix, 0), size - 1
+    if start >= size:
+        raise ValueError("range not satisfiable")
+    return start, min(end, size - 1)
+
+
+def _sse_frame(event: str, payload: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+
+class RawStreamParser(BaseParser):
+    """Hand the request body stream to the view without buffering it."""
 
-class RawBytesParser(BaseParser):
     media_type = "*/*"
 
     def parse(self, stream, media_type=None, parser_context=None):
-        return stream.read()
+        return stream
+
+
+def _raw_upload_stream(request):
+    """Return a readable stream over the upload body, or None if it can't be read.
+
+    DRF treats a missing Content-Length as an empty body, so chunked uploads
+    (generators, non-seekable files) never reach the parser. Fall back to the
+    server's own body stream: ASGI requests are already spooled in full and
+    WSGI servers that decode chunked bodies flag ``wsgi.input_terminated``.
+    """
+    if hasattr(request.data, "read"):
+        return request.data
+    django_request = request._request
+    meta = django_request.META
+    if meta.get("CONTENT_LENGTH") or meta.get("HTTP_CONTENT_LENGTH"):
+        return b""
+    if "wsgi.input" not in meta:
+        return django_request
+    if meta.get("wsgi.input_terminated"):
+        return meta["wsgi.input"]
+    return None
 
 
 class SandboxSessionViewSet(
@@ -75,6 +150,8 @@ class SandboxSessionViewSet(
             existing_session = SandboxSession.objects.filter(id=requested_id, user=request.user).first()
         session = existing_session or create_serializer.save()
         created = existing_session is None
+        if session.status != SandboxSession.Status.READY and self._wants_async(request):
+            return self._provision_async(session, restore_snapshot, created=created)
         try:
             if session.status != SandboxSession.Status.READY:
                 self.orchestrator.provision(session)
@@ -93,12 +170,134 @@ class SandboxSessionViewSet(
         status_code = status.HTTP_201_CREATED if created else status.HTTP_200_OK
         return Response(output.data, status=status_code, headers=headers)
 
+    def _wants_async(self, request) -> bool:
+        prefer = request.headers.get("Prefer", "")
+        if "respond-async" in prefer.lower():
+            return True
+        return os.getenv("SANDBOX_ASYNC_PROVISIONING", "0").lower() in {"1", "true", "yes", "on"}
+
+    def _provision_async(self, session: SandboxSession, restore_snapshot, *, created: bool) -> Response:
+        """Return ``status=starting`` right away and provision in a Celery task."""
+        # Only the request that moves the session into ``starting`` enqueues provisioning;
+        # repeated POSTs while it is starting just report its progress.
+        now = timezone.now()
+        moved = (
+            SandboxSession.objects.filter(pk=session.pk)
+            .exclude(status=SandboxSession.Status.STARTING)
+            .update(
+                status=SandboxSession.Status.STARTING,
+                error_message="",
+                provision_lease_until=None,
+                updated_at=now,
+            )
+        )
+        # Unless the task was lost: nobody claimed it within the grace period, or the
+        # worker holding the lease died. One request wins this update and re-enqueues.
+        requeued = 0
+        if not moved:
+            requeue_sec = max(1, _env_int("SANDBOX_PROVISION_REQUEUE_SEC", 60))
+            unclaimed = Q(
+                provision_lease_until__isnull=True,
+                updated_at__lte=now - timedelta(seconds=requeue_sec),
+            )
+            requeued = (
+                SandboxSession.objects.filter(pk=session.pk, status=SandboxSession.Status.STARTING)
+                .filter(unclaimed | Q(provision_lease_until__lte=now))
+                .update(provision_lease_until=None, updated_at=now)
+            )
+        if created or moved or requeued:
+            restore_id = str(restore_snapshot.id) if restore_snapshot else None
+            try:
+                provision_sandbox_session.delay(str(session.id), restore_id)
+            except Exception as exc:  # noqa: BLE001
+                # Broker unavailable: provision inline rather than leaving the session stuck.
+                logger.warning(
+                    "Failed to enqueue sandbox provisioning; provisioning inline",
+                    extra={"session_id": str(session.id), "error": str(exc)},
+                )
+                provision_sandbox_session(str(session.id), restore_id)
+        session.refresh_from_db()
+        output = SandboxSessionSerializer(session)
+        headers = {"Location": str(session.id)}
+        if session.status == SandboxSession.Status.STARTING:
+            status_code = status.HTTP_202_ACCEPTED
+        else:
+            status_code = status.HTTP_201_CREATED if created else status.HTTP_200_OK
+        return Response(output.data, status=status_code, headers=headers)
+
+    @action(
+        detail=True,
+        methods=["get"],
+        url_path="events",
+        renderer_classes=[EventStreamRenderer, JSONRenderer],
+    )
+    def events(self, request, pk=None):
+        """Server-sent events with the session status until it leaves ``starting``."""
+        session = self.get_object()
+        try:
+            timeout = float(request.query_params.get("timeout", _EVENTS_DEFAULT_TIMEOUT))
+        except ValueError:
+            timeout = _EVENTS_DEFAULT_TIMEOUT
+        timeout = min(max(timeout, 1.0), _EVENTS_MAX_TIMEOUT)
+
+        def event_stream():
+            # Subscribe before reading the row so a transition in between is not missed.
+            pubsub = subscribe_session_status(session.id)
+            deadline = time.monotonic() + timeout
+            try:
+                session.refresh_from_db()
+                payload = session_status_payload(session)
+                yield _sse_frame("status", payload)
+                last_sent = last_checked = time.monotonic()
+                while payload["status"] == SandboxSession.Status.STARTING:
+                    if time.monotonic() >= deadline:
+                        yield _sse_frame("timeout", payload)
+                        return
+                    message = None
+                    if pubsub is not None:
+                        try:
+                            message = pubsub.get_message(timeout=1.0)
+                        except redis.RedisError:
+                            pubsub = None
+                    else:
+                        time.sleep(1.0)
+                    recheck = 1.0 if pubsub is None else _EVENTS_RECHECK_SEC
+                    if message and message.get("type") == "message":
+                        raw = message["data"]
+                        payload = json.loads(raw.decode("utf-8") if isinstance(raw, bytes) else raw)
+                    elif time.monotonic() - last_checked >= recheck:
+                        # Safety net for missed publishes (e.g. Redis restarted mid-provision).
+                        session.refresh_from_db()
+                        payload = session_status_payload(session)
+                        last_checked = time.monotonic()
+                    if payload["status"] != SandboxSession.Status.STARTING:
+                        yield _sse_frame("status", payload)
+                    elif time.monotonic() - last_sent >= _EVENTS_HEARTBEAT_SEC:
+                        yield ": heartbeat\n\n"
+                        last_sent = time.monotonic()
+            finally:
+                if pubsub is not None:
+                    try:
+                        pubsub.close()
+                    except redis.RedisError:
+                        pass
+
+        response = StreamingHttpResponse(event_stream(), content_type="text/event-stream")
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"
+        return response
+
     def destroy(self, request, *args, **kwargs):
         session = self.get_object()
         self._capture_latest_snapshot(session, label="auto-stop")
         self.orchestrator.terminate(session)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+    @action(detail=False, methods=["get"], url_path="warm-pool", permission_classes=[IsAdminUser])
+    def warm_pool(self, request):
+        """Warm pool occupancy and hit/miss counters per configured profile."""
+        return Response({"profiles": pool_metrics()})
+
     @action(detail=True, methods=["post"], url_path="stop")
     def stop(self, request, pk=None):
         return self.destroy(request, pk=pk)
@@ -136,6 +335,26 @@ class SandboxSessionViewSet(
             }
         )
 
+    @action(detail=True, methods=["post"], url_path="batch")
+    def batch(self, request, pk=None):
+        """Run several exec/read/write/edit/stat operations in one round trip."""
+        session, error = self._get_ready_session_or_response(self.get_object())
+        if error:
+            return error
+        serializer = SandboxBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        start = time.monotonic()
+        results = run_batch(
+            self.orchestrator,
+            session,
+            serializer.validated_data["operations"],
+            parallel=serializer.validated_data["parallel"],
+            stop_on_error=serializer.validated_data["stop_on_error"],
+        )
+        return Response(
+            {"results": results, "duration_sec": round(time.monotonic() - start, 3)}
+        )
+
     @action(detail=True, methods=["post"], url_path="upload")
     def upload(self, request, pk=None):
         session, error = self._get_ready_session_or_response(self.get_object())
@@ -160,7 +379,7 @@ class SandboxSessionViewSet(
             status=status.HTTP_200_OK,
         )
 
-    @action(detail=True, methods=["post"], url_path="files/upload", parser_classes=[RawBytesParser])
+    @action(detail=True, methods=["post"], url_path="files/upload", parser_classes=[RawStreamParser])
     def files_upload(self, request, pk=None):
         session, error = self._get_ready_session_or_response(self.get_object())
         if error:
@@ -170,10 +389,12 @@ class SandboxSessionViewSet(
             path = request.data.get("path")
         if not path:
             return Response({"detail": "path is required"}, status=status.HTTP_400_BAD_REQUEST)
-        if isinstance(request.data, (bytes, bytearray)):
-            content = bytes(request.data)
-        else:
-            content = request.body or b""
+        content = _raw_upload_stream(request)
+        if content is None:
+            return Response(
+                {"detail": "Content-Length is required for uploads on this server"},
+                status=status.HTTP_411_LENGTH_REQUIRED,
+            )
         try:
             result = self.orchestrator.upload_bytes(session, path, content)
         except SandboxProvisionError as exc:
@@ -212,20 +433,33 @@ class SandboxSessionViewSet(
         if not path:
             return Response({"detail": "path is required"}, status=status.HTTP_400_BAD_REQUEST)
         filename = request.query_params.get("filename") or path.rsplit("/", 1)[-1] or "download"
-        base64_cmd = f"base64 < {shlex.quote(path)}"
         try:
-            result = self.orchestrator.execute(session, base64_cmd)
+            size = self.orchestrator.stat_file(session, path)
         except SandboxProvisionError as exc:
             return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
-        if result.exit_code != 0:
-            message = (result.stdout or result.stderr or "").strip() or "Failed to read file"
-            return Response({"detail": message}, status=status.HTTP_400_BAD_REQUEST)
-        raw_b64 = (result.stdout or "").strip()
         try:
-            content = base64.b64decode(raw_b64.encode("ascii")) if raw_b64 else b""
-        except Exception:
-            content = b""
-        response = HttpResponse(content, content_type="application/octet-stream")
+            byte_range = _parse_byte_range(request.headers.get("Range"), size)
+        except ValueError:
+            response = HttpResponse(status=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+            response["Content-Range"] = f"bytes */{size}"
+            return response
+        start, end = byte_range or (0, size - 1)
+        length = max(end - start + 1, 0)
+        chunks = self.orchestrator.stream_file(
+            session,
+            path,
+            offset=start,
+            length=length if byte_range else None,
+        )
+        response = StreamingHttpResponse(
+            chunks,
+            status=status.HTTP_206_PARTIAL_CONTENT if byte_range else status.HTTP_200_OK,
+            content_type="application/octet-stream",
+        )
+        response["Content-Length"] = str(length)
+        response["Accept-Ranges"] = "bytes"
+        if byte_range:
+            response["Content-Range"] = f"bytes {start}-{end}/{size}"
         response["Content-Disposition"] = f'attachment; filename="{filename}"'
         return response
 
@@ -305,6 +539,12 @@ class SandboxSessionViewSet(
     def _get_ready_session_or_response(
         self, session: SandboxSession
     ) -> tuple[SandboxSession | None, Response | None]:
+        if session.status == SandboxSession.Status.STARTING:
+            # Provisioning is owned by the task holding the lease; clients wait and retry.
+            return None, Response(
+                {"detail": "Sandbox is starting and not ready yet"},
+                status=status.HTTP_409_CONFLICT,
+            )
         try:
             return self._ensure_session_ready(session), None
         except SandboxProvisionError as exc:
@@ -0,0 +1,172 @@
+"""Warm pool of pre-provisioned sandboxes.
+
+Profiles come from ``SANDBOX_WARM_POOL``, a JSON list such as::
+
+    [{"mode": "docker", "image": "astraforge/sandbox:latest", "cpu": "1", "memory": "2g", "size": 3}]
+
+The refill task keeps ``size`` containers per profile ready; ``provision`` hands
+one to a new session whose mode/image/cpu/memory match. Hits and misses are
+counted in the Django cache so every process reports the same totals when the
+cache is shared (e.g. Redis).
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+from dataclasses import dataclass
+
+from django.core.cache import cache
+from django.db import transaction
+
+from astraforge.sandbox.models import SandboxSession, SandboxWarmContainer
+
+logger = logging.getLogger(__name__)
+
+_METRIC_TIMEOUT = None  # counters never expire
+_REFILL_LOCK_KEY = "sandbox:warm-pool:refill-lock"
+
+
+@dataclass(frozen=True)
+class WarmPoolProfile:
+    mode: str
+    image: str
+    cpu: str = ""
+    memory: str = ""
+    size: int = 1
+
+    @property
+    def label(self) -> str:
+        return "/".join(part or "-" for part in (self.mode, self.image, self.cpu, self.memory))
+
+    @property
+    def cache_key(self) -> str:
+        return hashlib.sha1(self.label.encode("utf-8")).hexdigest()[:16]
+
+    def lookup(self) -> dict[str, str]:
+        return {"mode": self.mode, "image": self.image, "cpu": self.cpu, "memory": self.memory}
+
+    def matches(self, sandbox: SandboxSession | SandboxWarmContainer) -> bool:
+        return (
+            sandbox.mode == self.mode
+            and sandbox.image == self.image
+            and (sandbox.cpu or "") == self.cpu
+            and (sandbox.memory or "") == self.memory
+        )
+
+
+def configured_profiles() -> list[WarmPoolProfile]:
+    raw = os.getenv("SANDBOX_WARM_POOL", "").strip()
+    if not raw:
+        return []
+    try:
+        items = json.loads(raw)
+    except ValueError:
+        logger.warning("Ignoring invalid SANDBOX_WARM_POOL configuration")
+        return []
+    if isinstance(items, dict):
+        items = [items]
+    profiles: list[WarmPoolProfile] = []
+    for item in items if isinstance(items, list) else []:
+        if not isinstance(item, dict):
+            continue
+        mode = str(item.get("mode") or SandboxSession.Mode.DOCKER)
+        image = str(item.get("image") or "").strip()
+        if mode not in SandboxSession.Mode.values or not image:
+            continue
+        try:
+            size = max(int(item.get("size", 1)), 0)
+        except (TypeError, ValueError):
+            size = 1
+        profiles.append(
+            WarmPoolProfile(
+                mode=mode,
+                image=image,
+                cpu=str(item.get("cpu") or ""),
+                memory=str(item.get("memory") or ""),
+                size=size,
+            )
+        )
+    return profiles
+
+
+def profile_for(session: SandboxSession) -> WarmPoolProfile | None:
+    for profile in configured_profiles():
+        if profile.size and profile.matches(session):
+            return profile
+    return None
+
+
+def claim_warm_container(profile: WarmPoolProfile) -> SandboxWarmContainer | None:
+    """Atomically take the oldest ready container of ``profile`` out of the pool."""
+    while True:
+        with transaction.atomic():
+            warm = (
+                SandboxWarmContainer.objects.select_for_update(skip_locked=True)
+                .filter(status=SandboxWarmContainer.Status.READY, **profile.lookup())
+                .order_by("created_at")
+                .first()
+            )
+            if warm is None:
+                return None
+            # Backends without row locks (SQLite) rely on the delete count instead.
+            deleted, _ = SandboxWarmContainer.objects.filter(pk=warm.pk).delete()
+        if deleted:
+            return warm
+
+
+def _metric_key(profile: WarmPoolProfile, name: str) -> str:
+    return f"sandbox:warm-pool:{profile.cache_key}:{name}"
+
+
+def _increment(key: str) -> None:
+    if cache.add(key, 1, timeout=_METRIC_TIMEOUT):
+        return
+    try:
+        cache.incr(key)
+    except ValueError:  # evicted between add and incr
+        cache.set(key, 1, timeout=_METRIC_TIMEOUT)
+
+
+def record_hit(profile: WarmPoolProfile) -> None:
+    _increment(_metric_key(profile, "hits"))
+
+
+def record_miss(profile: WarmPoolProfile) -> None:
+    _increment(_metric_key(profile, "misses"))
+
+
+def acquire_refill_lock(timeout: int) -> bool:
+    """Keep overlapping beat runs from provisioning the same deficit twice."""
+    return cache.add(_REFILL_LOCK_KEY, 1, timeout=timeout)
+
+
+def release_refill_lock() -> None:
+    cache.delete(_REFILL_LOCK_KEY)
+
+
+def pool_metrics() -> list[dict]:
+    metrics = []
+    for profile in configured_profiles():
+        counts = {
+            status: SandboxWarmContainer.objects.filter(status=status, **profile.lookup()).count()
+            for status in SandboxWarmContainer.Status.values
+        }
+        hits = int(cache.get(_metric_key(profile, "hits")) or 0)
+        misses = int(cache.get(_metric_key(profile, "misses")) or 0)
+        total = hits + misses
+        metrics.append(
+            {
+                "profile": profile.label,
+                **profile.lookup(),
+                "size": profile.size,
+                "ready": counts[SandboxWarmContainer.Status.READY],
+                "warming": counts[SandboxWarmContainer.Status.WARMING],
+                "hits": hits,
+                "misses": misses,
+                "hit_rate": round(hits / total, 4) if total else None,
+            }
+        )
+    return metrics
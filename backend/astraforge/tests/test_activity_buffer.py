@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+from datetime import timedelta
+
+import fakeredis
+import pytest
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+
+from astraforge.accounts.models import API_KEY_ACTIVITY, ApiKey
+from astraforge.domain.models.workspace import CommandResult
+from astraforge.infrastructure.activity import flush_all
+from astraforge.sandbox.models import SESSION_ACTIVITY, SandboxSession
+from astraforge.sandbox.services import SandboxOrchestrator
+
+pytestmark = pytest.mark.django_db
+
+
+class _NoopRunner:
+    def run(self, command, *, cwd=None, env=None, stream=None, allow_failure=False):
+        return CommandResult(exit_code=0, stdout="", stderr="")
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    client = fakeredis.FakeRedis()
+    monkeypatch.setattr(SESSION_ACTIVITY, "client", client)
+    monkeypatch.setattr(API_KEY_ACTIVITY, "client", client)
+    return client
+
+
+def _create_session(user, **overrides) -> SandboxSession:
+    defaults = {
+        "mode": SandboxSession.Mode.DOCKER,
+        "image": "astraforge/codex-cli:latest",
+        "status": SandboxSession.Status.READY,
+        "ref": "docker://sandbox-activity",
+        "workspace_path": "/workspace",
+    }
+    defaults.update(overrides)
+    return SandboxSession.objects.create(user=user, **defaults)
+
+
+def test_session_activity_is_buffered_until_flush(fake_redis):
+    user = get_user_model().objects.create_user(username="activity", password="pass12345")
+    session = _create_session(user)
+    stale = timezone.now() - timedelta(minutes=10)
+    SandboxSession.objects.filter(pk=session.pk).update(last_activity_at=stale)
+
+    for _ in range(3):
+        session.mark_activity()
+
+    stored = SandboxSession.objects.get(pk=session.pk)
+    assert stored.last_activity_at == stale
+    assert fake_redis.zcard(SESSION_ACTIVITY.key) == 1
+
+    assert flush_all()[SESSION_ACTIVITY.key] == 1
+
+    stored.refresh_from_db()
+    assert abs((stored.last_activity_at - session.last_activity_at).total_seconds()) < 0.01
+    assert stored.last_heartbeat_at == stored.last_activity_at
+    assert fake_redis.zcard(SESSION_ACTIVITY.key) == 0
+
+
+def test_terminate_persists_pending_activity(fake_redis):
+    user = get_user_model().objects.create_user(username="activity-stop", password="pass12345")
+    session = _create_session(user)
+    session.mark_activity()
+    pending = session.last_activity_at
+    fresh = SandboxSession.objects.get(pk=session.pk)
+    assert fresh.last_activity_at is None
+
+    SandboxOrchestrator(runner=_NoopRunner()).terminate(fresh, reason="user")
+
+    fresh.refresh_from_db()
+    assert fresh.status == SandboxSession.Status.TERMINATED
+    assert abs((fresh.last_activity_at - pending).total_seconds()) < 0.01
+    assert fake_redis.zcard(SESSION_ACTIVITY.key) == 0
+
+
+def test_api_key_usage_is_buffered(fake_redis):
+    user = get_user_model().objects.create_user(username="activity-key", password="pass12345")
+    api_key, _ = ApiKey.create_key(user=user, name="agent")
+
+    api_key.mark_used()
+
+    assert ApiKey.objects.get(pk=api_key.pk).last_used_at is None
+    flush_all()
+    assert ApiKey.objects.get(pk=api_key.pk).last_used_at is not None
+
+
+def test_mark_activity_writes_through_when_buffering_is_disabled(settings):
+    settings.ACTIVITY_FLUSH_INTERVAL_SEC = 0
+    user = get_user_model().objects.create_user(username="activity-direct", password="pass12345")
+    session = _create_session(user)
+
+    session.mark_activity()
+
+    assert SandboxSession.objects.get(pk=session.pk).last_activity_at is not None
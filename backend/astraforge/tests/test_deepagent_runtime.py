@@ -3,6 +3,7 @@ from __future__ import annotations
 from django.test import override_settings
 
 from astraforge.infrastructure.ai import deepagent_runtime
+from astraforge.sandbox.deepagent_backend import GrepNoticeMiddleware
 
 
 def test_get_deep_agent_registers_slide_subagent(monkeypatch):
@@ -18,13 +19,21 @@ def test_get_deep_agent_registers_slide_subagent(monkeypatch):
         return object()
 
     def fake_create_deep_agent(
-        *, model, backend, system_prompt, tools=None, subagents=None, checkpointer=None
+        *,
+        model,
+        backend,
+        system_prompt,
+        tools=None,
+        subagents=None,
+        middleware=(),
+        checkpointer=None,
     ):
         captured["model"] = model
         captured["backend"] = backend
         captured["system_prompt"] = system_prompt
         captured["tools"] = tools
         captured["subagents"] = subagents
+        captured["middleware"] = middleware
         captured["checkpointer"] = checkpointer
 
         class _DummyAgent:
@@ -44,6 +53,10 @@ def test_get_deep_agent_registers_slide_subagent(monkeypatch):
     assert isinstance(subagents, list) and subagents
     names = [s.get("name") for s in subagents if isinstance(s, dict)]
     assert "slide-deck-builder" in names
+    # Capped grep searches tell the agent (and the slide subagent) to refine the pattern.
+    assert any(isinstance(m, GrepNoticeMiddleware) for m in captured["middleware"])
+    slide = next(s for s in subagents if s.get("name") == "slide-deck-builder")
+    assert any(isinstance(m, GrepNoticeMiddleware) for m in slide["middleware"])
 
     # Optional checkpointer is threaded through when available.
     assert captured.get("checkpointer") is not None
@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import pytest
+
+from astraforge.application.use_cases import StaleRequestError, SubmitMergeRequest
+from astraforge.domain.models.request import Request, RequestPayload, RequestState
+from astraforge.domain.models.spec import MergeRequestProposal
+from astraforge.infrastructure.repositories.db import DjangoRequestRepository
+from astraforge.requests.models import RequestRecord
+
+pytestmark = pytest.mark.django_db
+
+
+def _request(request_id: str, metadata: dict | None = None) -> Request:
+    return Request(
+        id=request_id,
+        user_id="",
+        tenant_id="tenant",
+        source="direct_user",
+        sender="user@example.com",
+        payload=RequestPayload(title="Concurrency", description="desc", context={}),
+        metadata=metadata or {},
+    )
+
+
+def test_partial_updates_do_not_clobber_concurrent_writers():
+    repo = DjangoRequestRepository()
+    request_id = "0b8f3c52-6f1e-4f7d-9a55-5d0e2a7c9b31"
+    repo.save(_request(request_id, {"chat_messages": [{"role": "user", "message": "go"}]}))
+    task_copy = repo.get(request_id)
+    view_copy = repo.get(request_id)
+
+    task_copy.transition(RequestState.EXECUTING)
+    task_copy.metadata["workspace"] = {"path": "/workspace"}
+    repo.update(task_copy, fields=["state"], metadata_keys=["workspace"])
+    view_copy.metadata["llm"] = {"provider": "openai"}
+    repo.update(view_copy, metadata_keys=["llm"])
+    repo.append_metadata(view_copy, "chat_messages", {"role": "user", "message": "more"})
+    repo.append_metadata(task_copy, "chat_messages", {"role": "assistant", "message": "done"})
+    del task_copy.metadata["workspace"]
+    repo.update(task_copy, metadata_keys=["workspace"])
+
+    record = RequestRecord.objects.get(id=request_id)
+    assert record.state == RequestState.EXECUTING.value
+    assert record.metadata["llm"] == {"provider": "openai"}
+    assert "workspace" not in record.metadata
+    assert [entry["message"] for entry in record.metadata["chat_messages"]] == ["go", "more", "done"]
+    assert record.version == 6
+
+    with pytest.raises(StaleRequestError):
+        repo.save(task_copy)
+    fresh = repo.get(request_id)
+    fresh.payload.title = "Renamed"
+    repo.save(fresh)
+    assert fresh.version == 7
+    assert repo.get(request_id).payload.title == "Renamed"
+
+
+def test_partial_update_keeps_version_in_sync_without_concurrent_writers():
+    repo = DjangoRequestRepository()
+    request_id = "5f0d9e7a-2c41-4b8e-8e3a-0f6d1c2b7a90"
+    repo.save(_request(request_id))
+    request = repo.get(request_id)
+
+    request.metadata["llm"] = {"provider": "ollama"}
+    repo.update(request, metadata_keys=["llm"])
+    repo.append_metadata(request, "chat_messages", {"role": "user", "message": "hi"})
+    request.payload.title = "Saved after partial writes"
+    repo.save(request)
+
+    assert request.version == RequestRecord.objects.get(id=request_id).version == 4
+
+
+class _Composer:
+    def compose(self, request, outcome):
+        return MergeRequestProposal(
+            title="Add feature",
+            description="body",
+            target_branch="main",
+            source_branch="astraforge/feature",
+        )
+
+
+class _ChattyVCS:
+    """Opens the MR while the user posts a chat message on the same request."""
+
+    def __init__(self, repo: DjangoRequestRepository, request_id: str) -> None:
+        self.repo = repo
+        self.request_id = request_id
+
+    def open_mr(self, **kwargs):
+        view_copy = self.repo.get(self.request_id)
+        self.repo.append_metadata(
+            view_copy, "chat_messages", {"role": "user", "message": "any update?"}
+        )
+        return "mr-42"
+
+
+def test_submit_merge_request_survives_concurrent_chat_append():
+    repo = DjangoRequestRepository()
+    request_id = "9a1c7e24-3b6d-4f0a-b2e8-6c5d4a3f1e07"
+    request = _request(
+        request_id,
+        {"project": {"repository": "org/project"}, "execution": {"diff": "diff"}},
+    )
+    request.state = RequestState.PATCH_READY
+    repo.save(request)
+
+    use_case = SubmitMergeRequest(
+        repository=repo, composer=_Composer(), vcs=_ChattyVCS(repo, request_id)
+    )
+    assert use_case(request_id) == "mr-42"
+
+    record = RequestRecord.objects.get(id=request_id)
+    assert record.state == RequestState.MR_OPENED.value
+    assert record.metadata["mr"]["ref"] == "mr-42"
+    assert record.metadata["chat_messages"] == [{"role": "user", "message": "any update?"}]
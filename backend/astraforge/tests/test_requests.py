@@ -1,3 +1,5 @@
+import hashlib
+import importlib
 import uuid
 from datetime import timedelta
 
@@ -15,6 +17,8 @@ from astraforge.domain.models.workspace import ExecutionOutcome, WorkspaceContex
 from astraforge.infrastructure.repositories.memory import InMemoryRequestRepository
 from astraforge.integrations.models import RepositoryLink
 from astraforge.quotas.services import get_quota_service
+from astraforge.requests.models import RequestRecord, RunRecord
+from astraforge.sandbox.models import SandboxSession
 
 pytestmark = pytest.mark.django_db
 
@@ -340,7 +344,8 @@ def test_execute_request_runs_workspace():
         for event in run_log.events
     )
     assert operator.prepared and operator.executed and operator.teardown_called
-    runs_meta = stored.metadata.get("runs")
+    assert "runs" not in stored.metadata
+    runs_meta = repo.list_runs(["req-2"], include_events=True).get("req-2")
     assert runs_meta and len(runs_meta) == 1
     run_entry = runs_meta[0]
     assert run_entry["status"] == "completed"
@@ -393,7 +398,7 @@ def test_execute_request_uses_history_when_final_message_missing():
         and entry.get("message") == HISTORY_ONLY_ASSISTANT
         for entry in messages
     )
-    run_entry = stored.metadata["runs"][0]
+    run_entry = repo.list_runs(["req-history-only"], include_events=True)["req-history-only"][0]
     assert run_entry["artifacts"]["final_message"] == HISTORY_ONLY_ASSISTANT
     assert any(
         event.get("type") == "assistant_message" and event.get("message") == HISTORY_ONLY_ASSISTANT
@@ -436,7 +441,8 @@ def test_run_viewset_returns_run_history(api_client, user, monkeypatch):
     runs = run_list.json()
     assert any(item["request_id"] == "req-api-run" for item in runs)
 
-    run_entry = repo.get("req-api-run").metadata["runs"][0]
+    run_entry = repo.list_runs(["req-api-run"])["req-api-run"][0]
+    assert run_entry["diff_size"] == len("diff") and "events" not in run_entry
     detail = api_client.get(reverse("run-detail", args=[run_entry["id"]]))
     assert detail.status_code == 200
     payload = detail.json()
@@ -449,14 +455,56 @@ def test_run_viewset_returns_run_history(api_client, user, monkeypatch):
     assert payload["artifacts"]["branch"].startswith("astraforge/")
 
 
-def test_run_viewset_falls_back_to_execution_metadata(api_client, user, monkeypatch):
+def test_run_detail_loads_only_the_owning_request(api_client, user, monkeypatch):
     repo = InMemoryRequestRepository()
     monkeypatch.setattr("astraforge.bootstrap.repository", repo, raising=False)
     monkeypatch.setattr("astraforge.interfaces.rest.views.repository", repo, raising=False)
 
+    payload = RequestPayload(title="Indexed", description="desc", context={})
+    repo.save(
+        Request(
+            id="req-indexed-run",
+            user_id=str(user.id),
+            tenant_id="tenant",
+            source="direct_user",
+            sender="user@example.com",
+            payload=payload,
+            metadata={"project": {"repository": "org/project", "branch": "main"}},
+        )
+    )
+    ExecuteRequest(
+        repository=repo,
+        workspace_operator=_StubWorkspaceOperator(),
+        run_log=_StubRunLog(),
+    )(request_id="req-indexed-run")
+    run_id = repo.list_runs(["req-indexed-run"])["req-indexed-run"][0]["id"]
+
+    def _no_scan(**kwargs):
+        raise AssertionError("run detail must not list every request")
+
+    monkeypatch.setattr(repo, "list", _no_scan)
+    detail = api_client.get(reverse("run-detail", args=[run_id]))
+    assert detail.status_code == 200
+    assert detail.json()["request_id"] == "req-indexed-run"
+    assert detail.json()["events"]
+
+    other = get_user_model().objects.create_user(username="other", password="pass12345")
+    api_client.force_authenticate(user=other)
+    monkeypatch.setattr(repo, "list", lambda **kwargs: [])
+    assert api_client.get(reverse("run-detail", args=[run_id])).status_code == 404
+
+
+def test_runs_api_serves_legacy_execution_migrated_to_a_stored_run(api_client, user, monkeypatch):
+    from django.apps import apps
+
+    from astraforge.infrastructure.repositories.db import DjangoRequestRepository
+
+    migration = importlib.import_module("astraforge.requests.migrations.0004_move_runs_out_of_metadata")
+    repo = DjangoRequestRepository()
+    monkeypatch.setattr("astraforge.interfaces.rest.views.repository", repo)
     payload = RequestPayload(title="Legacy run", description="desc", context={})
     request = Request(
-        id="req-fallback-run",
+        id=str(uuid.uuid4()),
         user_id=str(user.id),
         tenant_id="tenant",
         source="direct_user",
@@ -472,23 +520,23 @@ def test_run_viewset_falls_back_to_execution_metadata(api_client, user, monkeypa
     )
     repo.save(request)
 
-    run_list = api_client.get(reverse("run-list"))
-    assert run_list.status_code == 200
-    runs = run_list.json()
-    assert any(item["request_id"] == "req-fallback-run" for item in runs)
+    migration.move_runs_to_tables(apps, None)
 
-    fallback_id = next(item["id"] for item in runs if item["request_id"] == "req-fallback-run")
-    detail = api_client.get(reverse("run-detail", args=[fallback_id]))
+    legacy_id = hashlib.sha256(f"{request.id}:execution".encode()).hexdigest()[:16]
+    runs = api_client.get(reverse("run-list")).json()
+    assert [item["id"] for item in runs if item["request_id"] == request.id] == [legacy_id]
+
+    # Unknown ids are answered by the primary-key lookup alone.
+    monkeypatch.setattr(repo, "list", lambda **_kw: pytest.fail("retrieve scanned requests"))
+    detail = api_client.get(reverse("run-detail", args=[legacy_id]))
     assert detail.status_code == 200
     payload = detail.json()
     assert payload["diff"] == "diff"
-    assert payload["events"]
     assert payload["reports"] == {"status": "completed"}
-    assert payload.get("artifacts") in ({}, None) or "branch" not in payload.get("artifacts", {})
-    assert payload["events"][0]["request_id"] == "req-fallback-run"
-    assert payload["events"][0]["run_id"] == fallback_id
-    stages = {event.get("stage") for event in payload["events"]}
-    assert "diff" in stages
+    assert payload["events"][0]["request_id"] == request.id
+    assert payload["events"][0]["run_id"] == legacy_id
+    assert "diff" in {event.get("stage") for event in payload["events"]}
+    assert api_client.get(reverse("run-detail", args=["missing-run"])).status_code == 404
 
 
 def test_request_detail_includes_final_assistant_message(api_client, user, monkeypatch):
@@ -513,19 +561,13 @@ def test_request_detail_includes_final_assistant_message(api_client, user, monke
                     "role": "user",
                     "message": "Please run Codex",
                     "created_at": "2024-01-01T00:00:00Z",
-                }
-            ],
-            "runs": [
+                },
+                # ExecuteRequest records the run's final message in the chat itself.
                 {
-                    "id": "run-chat-1",
-                    "status": "completed",
-                    "started_at": "2024-01-01T00:00:00Z",
-                    "finished_at": "2024-01-01T00:05:00Z",
-                    "events": [],
-                    "artifacts": {
-                        "final_message": "Execution finished with success."
-                    },
-                }
+                    "role": "assistant",
+                    "message": "Execution finished with success.",
+                    "created_at": "2024-01-01T00:05:00Z",
+                },
             ],
         },
     )
@@ -542,6 +584,7 @@ def test_request_detail_includes_final_assistant_message(api_client, user, monke
         and entry.get("message") == "Execution finished with success."
         for entry in messages
     )
+    assert "runs" not in metadata
 
 
 def test_merge_request_viewset_returns_merge_requests(api_client, user, monkeypatch):
@@ -585,29 +628,27 @@ def test_merge_request_viewset_returns_merge_requests(api_client, user, monkeypa
     assert mr_payload["target_branch"] == "main"
 
 
-def test_activity_logs_paginate_results(api_client, user, monkeypatch):
-    repo = InMemoryRequestRepository()
-    monkeypatch.setattr("astraforge.bootstrap.repository", repo, raising=False)
-    monkeypatch.setattr("astraforge.interfaces.rest.views.repository", repo, raising=False)
+def _activity_request(user, workspace, created_at, **metadata) -> RequestRecord:
+    record = RequestRecord.objects.create(
+        user=user,
+        tenant_id=workspace.uid,
+        source="direct_user",
+        sender="user@example.com",
+        payload={"title": f"Request at {created_at:%H:%M}"},
+        state="PATCH_READY",
+        metadata={"project": {"repository": "org/project"}, **metadata},
+    )
+    RequestRecord.objects.filter(id=record.id).update(created_at=created_at, updated_at=created_at)
+    record.refresh_from_db()
+    return record
+
 
+def test_activity_logs_paginate_results(api_client, user):
     workspace = Workspace.ensure_default_for_user(user)
     now = timezone.now()
-    for index in range(3):
-        repo.save(
-            Request(
-                id=f"req-activity-{index}",
-                user_id=str(user.id),
-                tenant_id=workspace.uid,
-                source="direct_user",
-                sender="user@example.com",
-                payload=RequestPayload(
-                    title=f"Request {index}", description="desc", context={}
-                ),
-                created_at=now - timedelta(minutes=index),
-                updated_at=now - timedelta(minutes=index),
-                metadata={"project": {"repository": "org/project"}},
-            )
-        )
+    records = [
+        _activity_request(user, workspace, now - timedelta(minutes=index)) for index in range(3)
+    ]
 
     response = api_client.get(reverse("activity-log-list"), {"page_size": 2})
 
@@ -618,4 +659,86 @@ def test_activity_logs_paginate_results(api_client, user, monkeypatch):
     assert payload["summary"]["requests"] == 3
     assert payload["next_page"] == 2
     assert len(payload["results"]) == 2
-    assert payload["results"][0]["id"] == "request-req-activity-0"
+    assert payload["results"][0]["id"] == f"request-{records[0].id}"
+    assert payload["results"][0]["consumption"]["ordinal"] == 3
+    assert payload["next_cursor"]
+
+
+def test_activity_cursor_walks_every_source_once(api_client, user):
+    workspace = Workspace.ensure_default_for_user(user)
+    now = timezone.now()
+    executed = _activity_request(
+        user,
+        workspace,
+        now - timedelta(minutes=10),
+        mr={"title": "Add retries", "target_branch": "main", "ref": "mr-1"},
+    )
+    RunRecord.objects.create(
+        id="run-activity", request=executed, status="completed", started_at=now - timedelta(minutes=9)
+    )
+    legacy = _activity_request(user, workspace, now - timedelta(minutes=5), execution={"diff": "d"})
+    SandboxSession.objects.create(
+        user=user,
+        workspace=workspace,
+        mode=SandboxSession.Mode.DOCKER,
+        image="astraforge/codex-cli:latest",
+    )
+    other_workspace = Workspace.objects.create(uid="other-ws", name="Other")
+    _activity_request(user, other_workspace, now)
+
+    seen: list[str] = []
+    params: dict[str, object] = {"page_size": 2}
+    while True:
+        payload = api_client.get(reverse("activity-log-list"), params).json()
+        seen.extend(item["id"] for item in payload["results"])
+        if not payload["next_cursor"]:
+            break
+        params = {"page_size": 2, "cursor": payload["next_cursor"]}
+
+    assert payload["summary"] == {
+        "total": 6,
+        "requests": 2,
+        "runs": 2,
+        "merges": 1,
+        "sandboxes": 1,
+    }
+    assert len(seen) == len(set(seen)) == 6
+    assert seen[0].startswith("sandbox-")
+    assert f"run-{hashlib.sha256(f'{legacy.id}:execution'.encode()).hexdigest()[:16]}" in seen
+    assert "run-run-activity" in seen
+    assert any(item.startswith("merge-") for item in seen)
+
+    bad = api_client.get(reverse("activity-log-list"), {"cursor": "not-a-cursor"})
+    assert bad.status_code == 400
+
+
+def test_request_list_returns_paginated_summaries(api_client, user, monkeypatch):
+    from astraforge.infrastructure.repositories.db import DjangoRequestRepository
+
+    monkeypatch.setattr("astraforge.interfaces.rest.views.repository", DjangoRequestRepository())
+    workspace = Workspace.ensure_default_for_user(user)
+    now = timezone.now()
+    records = [
+        _activity_request(
+            user,
+            workspace,
+            now - timedelta(minutes=index),
+            chat_messages=[{"role": "user", "message": "x" * 1000}],
+        )
+        for index in range(3)
+    ]
+    other_workspace = Workspace.objects.create(uid="other-ws", name="Other")
+    _activity_request(user, other_workspace, now)
+
+    response = api_client.get(reverse("request-list"), {"page": 2, "page_size": 2})
+
+    assert response.status_code == 200
+    assert response["X-Total-Count"] == "3"
+    payload = response.json()
+    assert [item["id"] for item in payload] == [str(records[2].id)]
+    assert payload[0]["payload"]["title"] == records[2].payload["title"]
+    assert payload[0]["project"] == {"repository": "org/project"}
+    assert "metadata" not in payload[0]
+
+    everything = api_client.get(reverse("request-list")).json()
+    assert [item["id"] for item in everything] == [str(record.id) for record in records]
@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import importlib
+
+import pytest
+from django.apps import apps
+
+from astraforge.domain.models.request import Request, RequestPayload
+from astraforge.infrastructure.repositories.db import DjangoRequestRepository
+from astraforge.requests.models import RequestRecord, RunEventRecord, RunRecord
+
+pytestmark = pytest.mark.django_db
+
+
+def _request(request_id: str, metadata: dict | None = None) -> Request:
+    return Request(
+        id=request_id,
+        user_id="",
+        tenant_id="tenant",
+        source="direct_user",
+        sender="user@example.com",
+        payload=RequestPayload(title="Runs", description="desc", context={}),
+        metadata=metadata or {},
+    )
+
+
+def test_runs_and_events_are_stored_outside_request_metadata():
+    repo = DjangoRequestRepository()
+    request = _request("6d5b6a0e-8f57-4a43-9d49-1c4a3b0f2a11", {"project": {"repository": "org/p"}})
+    repo.save(request)
+    repo.create_run(request.id, {"id": "run-1", "status": "running", "started_at": "2024-01-01T00:00:00+00:00"})
+    for index in range(3):
+        repo.append_run_event(
+            request.id,
+            "run-1",
+            {"type": "log", "message": f"line {index}", "created_at": "2024-01-01T00:00:01+00:00"},
+        )
+    repo.update_run("run-1", status="completed", finished_at="2024-01-01T00:05:00+00:00", diff="diff")
+
+    summary = repo.list_runs([request.id])[request.id][0]
+    assert summary["status"] == "completed"
+    assert summary["diff_size"] == len("diff")
+    assert "events" not in summary and "diff" not in summary
+
+    detail = repo.list_runs([request.id], include_events=True)[request.id][0]
+    assert [event["message"] for event in detail["events"]] == ["line 0", "line 1", "line 2"]
+    assert detail["diff"] == "diff"
+    assert detail["finished_at"].startswith("2024-01-01T00:05:00")
+    assert "runs" not in RequestRecord.objects.get(id=request.id).metadata
+
+    owner, run = repo.get_run("run-1")
+    assert owner.id == request.id
+    assert len(run["events"]) == 3
+    with pytest.raises(KeyError):
+        repo.get_run("run-1", user_id="999")
+
+
+def test_migration_moves_run_blobs_into_tables():
+    migration = importlib.import_module("astraforge.requests.migrations.0004_move_runs_out_of_metadata")
+    repo = DjangoRequestRepository()
+    request = _request(
+        "0e1d0f59-5c76-4f0f-8a8c-0d8f5a4f7c22",
+        {
+            "chat_messages": [{"role": "user", "message": "go"}],
+            "runs": [
+                {
+                    "id": "legacy-run",
+                    "status": "completed",
+                    "started_at": "2024-01-01T00:00:00+00:00",
+                    "finished_at": "2024-01-01T00:05:00+00:00",
+                    "events": [{"type": "status", "message": "started"}, {"type": "completed"}],
+                    "diff": "diff",
+                    "artifacts": {"final_message": "All done."},
+                }
+            ],
+        },
+    )
+    repo.save(request)
+    updated_at = RequestRecord.objects.get(id=request.id).updated_at
+
+    migration.move_runs_to_tables(apps, None)
+
+    record = RequestRecord.objects.get(id=request.id)
+    assert "runs" not in record.metadata
+    assert record.updated_at == updated_at
+    assert record.metadata["chat_messages"][-1]["message"] == "All done."
+    run = RunRecord.objects.get(id="legacy-run")
+    assert run.diff == "diff" and run.status == "completed"
+    assert list(RunEventRecord.objects.filter(run=run).values_list("type", flat=True)) == [
+        "status",
+        "completed",
+    ]
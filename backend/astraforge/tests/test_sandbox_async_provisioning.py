@@ -0,0 +1,283 @@
+from __future__ import annotations
+
+import json
+import uuid
+from datetime import timedelta
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from astraforge.sandbox import tasks as sandbox_tasks
+from astraforge.sandbox import views as sandbox_views
+from astraforge.sandbox.models import SandboxSession, SandboxSnapshot
+from astraforge.sandbox.services import SandboxOrchestrator, SandboxProvisionError
+from astraforge.sandbox.views import SandboxSessionViewSet
+
+pytestmark = pytest.mark.django_db
+
+
+def _create_session(user, **overrides) -> SandboxSession:
+    defaults = {
+        "mode": SandboxSession.Mode.DOCKER,
+        "image": "astraforge/codex-cli:latest",
+        "status": SandboxSession.Status.TERMINATED,
+        "workspace_path": "/workspace",
+        "metadata": {},
+    }
+    defaults.update(overrides)
+    return SandboxSession.objects.create(user=user, **defaults)
+
+
+def _fake_provision(self, session):
+    session.status = SandboxSession.Status.READY
+    session.ref = "docker://sandbox-async"
+    session.save(update_fields=["status", "ref", "updated_at"])
+    return session
+
+
+def test_create_with_prefer_respond_async_returns_starting(monkeypatch):
+    user = get_user_model().objects.create_user(username="async-create", password="pass12345")
+    session = _create_session(user)
+    queued: list[tuple] = []
+    monkeypatch.setattr(
+        sandbox_tasks.provision_sandbox_session, "delay", lambda *args: queued.append(args)
+    )
+    factory = APIRequestFactory()
+    request = factory.post(
+        "/api/sandbox/sessions/",
+        {"id": str(session.id)},
+        format="json",
+        HTTP_PREFER="respond-async",
+    )
+    force_authenticate(request, user=user)
+
+    response = SandboxSessionViewSet.as_view({"post": "create"})(request)
+
+    assert response.status_code == status.HTTP_202_ACCEPTED
+    assert response.data["status"] == SandboxSession.Status.STARTING
+    assert queued == [(str(session.id), None)]
+
+
+def test_repeat_async_create_for_starting_session_does_not_enqueue_again(monkeypatch):
+    user = get_user_model().objects.create_user(username="async-repeat", password="pass12345")
+    session = _create_session(user)
+    queued: list[tuple] = []
+    monkeypatch.setattr(
+        sandbox_tasks.provision_sandbox_session, "delay", lambda *args: queued.append(args)
+    )
+    view = SandboxSessionViewSet.as_view({"post": "create"})
+
+    for _ in range(2):
+        request = APIRequestFactory().post(
+            "/api/sandbox/sessions/",
+            {"id": str(session.id)},
+            format="json",
+            HTTP_PREFER="respond-async",
+        )
+        force_authenticate(request, user=user)
+        response = view(request)
+        assert response.status_code == status.HTTP_202_ACCEPTED
+
+    assert queued == [(str(session.id), None)]
+
+
+def test_repeat_async_create_requeues_provisioning_that_was_never_claimed(monkeypatch):
+    user = get_user_model().objects.create_user(username="async-lost", password="pass12345")
+    session = _create_session(user, status=SandboxSession.Status.STARTING)
+    # The first task message was lost: no worker took the lease within the grace period.
+    SandboxSession.objects.filter(pk=session.pk).update(
+        updated_at=timezone.now() - timedelta(minutes=5)
+    )
+    queued: list[tuple] = []
+    monkeypatch.setattr(
+        sandbox_tasks.provision_sandbox_session, "delay", lambda *args: queued.append(args)
+    )
+    view = SandboxSessionViewSet.as_view({"post": "create"})
+
+    for _ in range(2):
+        request = APIRequestFactory().post(
+            "/api/sandbox/sessions/",
+            {"id": str(session.id)},
+            format="json",
+            HTTP_PREFER="respond-async",
+        )
+        force_authenticate(request, user=user)
+        assert view(request).status_code == status.HTTP_202_ACCEPTED
+
+    assert queued == [(str(session.id), None)]
+
+
+def test_repeat_async_create_requeues_provisioning_when_the_lease_expired(monkeypatch):
+    user = get_user_model().objects.create_user(username="async-expired", password="pass12345")
+    session = _create_session(
+        user,
+        status=SandboxSession.Status.STARTING,
+        provision_lease_until=timezone.now() - timedelta(seconds=1),
+    )
+    queued: list[tuple] = []
+    monkeypatch.setattr(
+        sandbox_tasks.provision_sandbox_session, "delay", lambda *args: queued.append(args)
+    )
+    request = APIRequestFactory().post(
+        "/api/sandbox/sessions/",
+        {"id": str(session.id)},
+        format="json",
+        HTTP_PREFER="respond-async",
+    )
+    force_authenticate(request, user=user)
+
+    response = SandboxSessionViewSet.as_view({"post": "create"})(request)
+
+    assert response.status_code == status.HTTP_202_ACCEPTED
+    assert queued == [(str(session.id), None)]
+
+
+def test_provision_task_skips_a_session_that_is_already_ready(monkeypatch):
+    user = get_user_model().objects.create_user(username="async-dup", password="pass12345")
+    session = _create_session(user, status=SandboxSession.Status.READY)
+    snapshot = SandboxSnapshot.objects.create(id=uuid.uuid4(), session=session, label="once")
+
+    def _unexpected(*_args):
+        raise AssertionError("a duplicate task must not provision or restore again")
+
+    monkeypatch.setattr(SandboxOrchestrator, "provision", _unexpected)
+    monkeypatch.setattr(SandboxOrchestrator, "restore_snapshot", _unexpected)
+
+    assert sandbox_tasks.provision_sandbox_session(str(session.id), str(snapshot.id)) == "skipped"
+
+
+def test_session_actions_on_a_starting_session_report_not_ready(monkeypatch):
+    user = get_user_model().objects.create_user(username="async-busy", password="pass12345")
+    session = _create_session(user, status=SandboxSession.Status.STARTING)
+
+    def _unexpected(*_args):
+        raise AssertionError("the provisioning task owns a starting session")
+
+    monkeypatch.setattr(SandboxOrchestrator, "provision", _unexpected)
+    request = APIRequestFactory().post(
+        f"/api/sandbox/sessions/{session.id}/shell/", {"command": "ls"}, format="json"
+    )
+    force_authenticate(request, user=user)
+
+    response = SandboxSessionViewSet.as_view({"post": "shell"})(request, pk=str(session.id))
+
+    assert response.status_code == status.HTTP_409_CONFLICT
+    assert "not ready" in response.data["detail"]
+
+
+def test_provision_task_skips_when_another_worker_owns_provisioning(monkeypatch):
+    user = get_user_model().objects.create_user(username="async-owned", password="pass12345")
+    session = _create_session(user, status=SandboxSession.Status.STARTING)
+    provisioned: list[str] = []
+
+    def _provision_once(self, target):
+        provisioned.append(str(target.id))
+        # A duplicate task delivered while this one is still provisioning.
+        assert sandbox_tasks.provision_sandbox_session(str(target.id)) == "skipped"
+        return _fake_provision(self, target)
+
+    monkeypatch.setattr(SandboxOrchestrator, "provision", _provision_once)
+    monkeypatch.setattr(sandbox_tasks, "publish_session_status", lambda s: None)
+
+    assert sandbox_tasks.provision_sandbox_session(str(session.id)) == SandboxSession.Status.READY
+
+    session.refresh_from_db()
+    assert provisioned == [str(session.id)]
+    assert session.provision_lease_until is None
+
+
+def test_provision_task_marks_ready_and_publishes(monkeypatch):
+    user = get_user_model().objects.create_user(username="async-task", password="pass12345")
+    session = _create_session(user, status=SandboxSession.Status.STARTING)
+    published: list[str] = []
+    monkeypatch.setattr(SandboxOrchestrator, "provision", _fake_provision)
+    monkeypatch.setattr(
+        sandbox_tasks, "publish_session_status", lambda s: published.append(s.status)
+    )
+
+    result = sandbox_tasks.provision_sandbox_session(str(session.id))
+
+    session.refresh_from_db()
+    assert result == SandboxSession.Status.READY
+    assert session.status == SandboxSession.Status.READY
+    assert published == [SandboxSession.Status.READY]
+
+
+def test_provision_task_terminates_session_when_restore_fails(monkeypatch):
+    user = get_user_model().objects.create_user(username="async-restore", password="pass12345")
+    session = _create_session(user, status=SandboxSession.Status.STARTING)
+    snapshot = SandboxSnapshot.objects.create(id=uuid.uuid4(), session=session, label="bad")
+
+    def _fail_restore(self, _session, _snapshot):
+        raise SandboxProvisionError("tar: invalid compressed data")
+
+    monkeypatch.setattr(SandboxOrchestrator, "provision", _fake_provision)
+    monkeypatch.setattr(SandboxOrchestrator, "restore_snapshot", _fail_restore)
+    monkeypatch.setattr(SandboxOrchestrator, "_sample_cpu_usage_seconds", lambda self, s: None)
+    monkeypatch.setattr(sandbox_tasks, "publish_session_status", lambda s: None)
+
+    sandbox_tasks.provision_sandbox_session(str(session.id), str(snapshot.id))
+
+    session.refresh_from_db()
+    assert session.status == SandboxSession.Status.TERMINATED
+    assert session.metadata["terminated_reason"] == "restore_failed"
+    assert "invalid compressed data" in session.error_message
+
+
+class _FakePubSub:
+    def __init__(self, messages):
+        self._messages = list(messages)
+        self.closed = False
+
+    def get_message(self, timeout=None):
+        return self._messages.pop(0) if self._messages else None
+
+    def close(self):
+        self.closed = True
+
+
+def _read_events(user, session) -> list[tuple[str, dict]]:
+    factory = APIRequestFactory()
+    request = factory.get(f"/api/sandbox/sessions/{session.id}/events/", HTTP_ACCEPT="text/event-stream")
+    force_authenticate(request, user=user)
+    response = SandboxSessionViewSet.as_view(
+        {"get": "events"}, **SandboxSessionViewSet.events.kwargs
+    )(request, pk=str(session.id))
+    assert response.status_code == status.HTTP_200_OK
+    assert response["Content-Type"] == "text/event-stream"
+    body = b"".join(response.streaming_content).decode("utf-8")
+    events = []
+    for frame in body.split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in frame.splitlines() if not line.startswith(":"))
+        if "event" in lines:
+            events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def test_events_stream_waits_for_published_readiness(monkeypatch):
+    user = get_user_model().objects.create_user(username="async-events", password="pass12345")
+    session = _create_session(user, status=SandboxSession.Status.STARTING)
+    ready = {"id": str(session.id), "status": "ready", "workspace_path": "/workspace"}
+    pubsub = _FakePubSub([None, {"type": "message", "data": json.dumps(ready).encode("utf-8")}])
+    monkeypatch.setattr(sandbox_views, "subscribe_session_status", lambda _id: pubsub)
+
+    events = _read_events(user, session)
+
+    assert [event for event, _ in events] == ["status", "status"]
+    assert events[0][1]["status"] == "starting"
+    assert events[1][1]["status"] == "ready"
+    assert pubsub.closed is True
+
+
+def test_events_stream_ends_immediately_for_ready_session(monkeypatch):
+    user = get_user_model().objects.create_user(username="async-ready", password="pass12345")
+    session = _create_session(user, status=SandboxSession.Status.READY)
+    monkeypatch.setattr(sandbox_views, "subscribe_session_status", lambda _id: None)
+
+    events = _read_events(user, session)
+
+    assert events == [("status", events[0][1])]
+    assert events[0][1]["status"] == "ready"
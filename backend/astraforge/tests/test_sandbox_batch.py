@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import subprocess
+import threading
+from pathlib import Path
+
+import pytest
+from django.contrib.auth import get_user_model
+from rest_framework import status
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from astraforge.domain.models.workspace import CommandResult
+from astraforge.sandbox.models import SandboxSession
+from astraforge.sandbox.services import SandboxOrchestrator
+from astraforge.sandbox.views import SandboxSessionViewSet
+
+pytestmark = pytest.mark.django_db
+
+
+class _LocalShellOrchestrator:
+    """Runs batch operations in a local shell and records which threads issued them."""
+
+    def __init__(self) -> None:
+        self.threads: set[str] = set()
+        self.commands: list[str] = []
+
+    def execute(self, session, command, *, cwd=None, timeout_sec=None):
+        self.threads.add(threading.current_thread().name)
+        self.commands.append(command)
+        completed = subprocess.run(
+            ["sh", "-c", command], capture_output=True, text=True, cwd=cwd, check=False
+        )
+        return CommandResult(
+            exit_code=completed.returncode, stdout=completed.stdout, stderr=completed.stderr
+        )
+
+    def upload_bytes(self, session, path, content):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        Path(path).write_bytes(content)
+        return CommandResult(exit_code=0, stdout="", stderr="")
+
+    edit_file = SandboxOrchestrator.edit_file
+
+
+@pytest.fixture
+def call_batch(tmp_path, monkeypatch):
+    user = get_user_model().objects.create_user(username="batcher", password="pass12345")
+    session = SandboxSession.objects.create(
+        user=user,
+        mode=SandboxSession.Mode.DOCKER,
+        image="astraforge/codex-cli:latest",
+        status=SandboxSession.Status.READY,
+        ref="docker://sandbox-batch",
+        workspace_path=str(tmp_path),
+    )
+    orchestrator = _LocalShellOrchestrator()
+    monkeypatch.setattr(SandboxSessionViewSet, "orchestrator", orchestrator)
+    view = SandboxSessionViewSet.as_view({"post": "batch"})
+
+    def _call(body: dict):
+        request = APIRequestFactory().post(
+            f"/api/sandbox/sessions/{session.id}/batch/", body, format="json"
+        )
+        force_authenticate(request, user=user)
+        return view(request, pk=str(session.id))
+
+    _call.orchestrator = orchestrator
+    return _call
+
+
+def test_batch_runs_operations_in_order_and_reads_in_parallel(call_batch, tmp_path):
+    target = tmp_path / "src" / "app.py"
+    response = call_batch(
+        {
+            "parallel": True,
+            "operations": [
+                {"op": "write", "path": str(target), "content": "one\ntwo\nthree\n"},
+                {"op": "edit", "path": str(target), "old_string": "two", "new_string": "2"},
+                {"op": "read", "path": str(target), "offset": 1, "limit": 1},
+                {"op": "read", "path": str(tmp_path / "missing.py")},
+                {"op": "stat", "path": str(target)},
+                {"op": "stat", "path": str(tmp_path / "missing.py")},
+                {"op": "exec", "command": "pwd", "cwd": str(tmp_path)},
+            ],
+        }
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    results = response.data["results"]
+    assert [r["index"] for r in results] == list(range(7))
+    assert [r["ok"] for r in results] == [True, True, True, False, True, True, True]
+    assert results[1]["occurrences"] == 1
+    assert results[2]["content"] == "2"
+    assert results[2]["total_lines"] == 3
+    assert results[2]["truncated"] is False
+    assert "not found" in results[3]["error"]
+    assert results[4]["exists"] is True and results[4]["size"] == len("one\n2\nthree\n")
+    assert results[4]["is_dir"] is False
+    assert results[5]["ok"] is True and results[5]["exists"] is False
+    assert results[6]["stdout"].strip() == str(tmp_path)
+    assert any(name.startswith("sandbox-batch") for name in call_batch.orchestrator.threads)
+
+
+def test_batch_stops_after_first_failure_when_requested(call_batch, tmp_path):
+    response = call_batch(
+        {
+            "stop_on_error": True,
+            "operations": [
+                {"op": "exec", "command": "exit 3"},
+                {"op": "write", "path": str(tmp_path / "never.txt"), "content": "x"},
+            ],
+        }
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    first, second = response.data["results"]
+    assert first["ok"] is False and first["exit_code"] == 3
+    assert second["skipped"] is True
+    assert not (tmp_path / "never.txt").exists()
+
+
+def test_batch_reports_unexpected_operation_errors_per_operation(call_batch, tmp_path, monkeypatch):
+    orchestrator = call_batch.orchestrator
+    local_execute = orchestrator.execute
+
+    def _execute(session, command, *, cwd=None, timeout_sec=None):
+        if command == "explode":
+            raise subprocess.CalledProcessError(1, ["docker", "exec"])
+        return local_execute(session, command, cwd=cwd, timeout_sec=timeout_sec)
+
+    def _upload_bytes(session, path, content):
+        raise RuntimeError("disk full")
+
+    monkeypatch.setattr(orchestrator, "execute", _execute)
+    monkeypatch.setattr(orchestrator, "upload_bytes", _upload_bytes)
+    response = call_batch(
+        {
+            "operations": [
+                {"op": "exec", "command": "echo before"},
+                {"op": "exec", "command": "explode"},
+                {"op": "write", "path": str(tmp_path / "a.txt"), "content": "x"},
+                {"op": "exec", "command": "echo after"},
+            ],
+        }
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    results = response.data["results"]
+    assert [r["ok"] for r in results] == [True, False, False, True]
+    assert results[0]["stdout"] == "before\n"
+    assert "returned non-zero exit status 1" in results[1]["error"]
+    assert results[2]["error"] == "disk full"
+    assert results[3]["stdout"] == "after\n"
+
+
+def test_batch_validates_required_fields_per_operation(call_batch, monkeypatch):
+    response = call_batch({"operations": [{"op": "edit", "path": "/workspace/a.py"}]})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert "old_string" in str(response.data)
+
+    monkeypatch.setenv("SANDBOX_BATCH_MAX_OPS", "1")
+    response = call_batch({"operations": [{"op": "stat", "path": "/a"}, {"op": "stat", "path": "/b"}]})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert call_batch.orchestrator.commands == []
@@ -0,0 +1,283 @@
+from __future__ import annotations
+
+import json
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+from deepagents.middleware.filesystem import FilesystemMiddleware
+from django.contrib.auth import get_user_model
+from langchain.agents import create_agent
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from astraforge.domain.models.workspace import CommandResult
+from astraforge.sandbox import deepagent_backend, fs_commands, session_cache
+from astraforge.sandbox.models import SandboxSession
+from astraforge.sandbox.services import SandboxOrchestrator
+
+pytestmark = pytest.mark.django_db
+
+INDEX_PATH = Path(__file__).resolve().parents[3] / "sandbox" / "workspace_index.py"
+
+
+class _LocalShellOrchestrator:
+    """Runs backend commands in a local shell so the in-sandbox scripts are exercised."""
+
+    def __init__(self) -> None:
+        self.stdout_bytes: list[int] = []
+        self.longest_command = 0
+
+    def execute(self, session, command, *, cwd=None):
+        completed = subprocess.run(
+            ["sh", "-c", command], capture_output=True, text=True, cwd=cwd, check=False
+        )
+        self.stdout_bytes.append(len(completed.stdout.encode("utf-8")))
+        self.longest_command = max(self.longest_command, len(command))
+        return CommandResult(
+            exit_code=completed.returncode, stdout=completed.stdout, stderr=completed.stderr
+        )
+
+    def upload_bytes(self, session, path, content):
+        Path(path).write_bytes(content)
+        return CommandResult(exit_code=0, stdout="", stderr="")
+
+    edit_file = SandboxOrchestrator.edit_file
+
+
+@pytest.fixture
+def backend(tmp_path):
+    session_cache.clear()
+    user = get_user_model().objects.create_user(username="fs-agent", password="pass12345")
+    session = SandboxSession.objects.create(
+        user=user,
+        mode=SandboxSession.Mode.DOCKER,
+        image="astraforge/codex-cli:latest",
+        status=SandboxSession.Status.READY,
+        ref="docker://sandbox-fs",
+        workspace_path=str(tmp_path),
+    )
+    rt = type("RT", (), {"config": {"configurable": {"sandbox_session_id": str(session.id)}}})()
+    instance = deepagent_backend._SandboxBackend(rt, root_dir=str(tmp_path))
+    instance.orchestrator = _LocalShellOrchestrator()
+    yield instance
+    session_cache.clear()
+
+
+def test_read_transfers_only_the_requested_window(backend, tmp_path):
+    big = tmp_path / "big.log"
+    big.write_text("".join(f"line {i}\n" for i in range(1, 50_001)))
+
+    page = backend.read(str(big), offset=100, limit=3)
+
+    assert page.splitlines() == [
+        "   101\tline 101",
+        "   102\tline 102",
+        "   103\tline 103",
+        "[Lines 101-103 of 50000.]",
+    ]
+    assert backend.orchestrator.stdout_bytes[-1] < 200
+    assert "exceeds file length (50000 lines)" in backend.read(str(big), offset=50_000)
+
+
+def test_read_caps_bytes_and_points_at_next_offset(backend, tmp_path, monkeypatch):
+    monkeypatch.setenv("SANDBOX_READ_MAX_BYTES", "1024")
+    wide = tmp_path / "wide.txt"
+    wide.write_text("".join(f"{i:04d}" + "x" * 96 + "\n" for i in range(100)))
+
+    page = backend.read(str(wide))
+
+    lines = page.splitlines()
+    assert len(lines) == 11
+    assert lines[-1].endswith("file has 100 lines. Continue with offset=10.]")
+    assert backend.read(str(wide), offset=10, limit=1).splitlines()[0].endswith("0010" + "x" * 96)
+
+
+def test_read_handles_missing_empty_and_unterminated_files(backend, tmp_path):
+    (tmp_path / "empty.txt").write_text("")
+    (tmp_path / "tail.txt").write_text("one\ntwo")
+
+    missing = str(tmp_path / "missing.txt")
+    assert backend.read(missing) == f"Error: File '{missing}' not found"
+    assert "empty contents" in backend.read(str(tmp_path / "empty.txt"))
+    assert backend.read(str(tmp_path / "tail.txt")).splitlines() == ["     1\tone", "     2\ttwo"]
+
+
+def test_edit_replaces_inside_sandbox_without_shipping_the_file(backend, tmp_path):
+    target = tmp_path / "gen.py"
+    target.write_text("VALUE = 1\n" + "# filler\n" * 20_000 + "VALUE = 1\n")
+
+    ambiguous = backend.edit(str(target), "VALUE = 1", "VALUE = 2")
+    assert ambiguous.error and "2 times" in ambiguous.error
+
+    result = backend.edit(str(target), "VALUE = 1", "VALUE = 2", replace_all=True)
+
+    assert result.error is None
+    assert result.occurrences == 2
+    assert target.read_text().count("VALUE = 2") == 2
+    assert max(backend.orchestrator.stdout_bytes) < 200
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["gen.py"]
+
+
+def test_edit_reports_missing_file_and_string(backend, tmp_path):
+    (tmp_path / "a.txt").write_text("one\r\ntwo\n")
+
+    missing = backend.edit(str(tmp_path / "nope.txt"), "one", "1")
+    assert missing.error == f"Error: File '{tmp_path / 'nope.txt'}' not found"
+    assert "not found" in backend.edit(str(tmp_path / "a.txt"), "three", "3").error
+
+    assert backend.edit(str(tmp_path / "a.txt"), "two", "2").occurrences == 1
+    assert (tmp_path / "a.txt").read_bytes() == b"one\r\n2\n"
+
+
+def test_glob_skips_ignored_trees_and_caps_results(backend, tmp_path, monkeypatch):
+    for rel in ["a.py", "src/b.py", "src/c.txt", "pkg/src/d.py", "node_modules/x/e.py"]:
+        target = tmp_path / rel
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_text("x" * 3)
+
+    infos = backend.glob_info("*.py", path=str(tmp_path))
+
+    assert [info["path"] for info in infos] == [
+        str(tmp_path / "a.py"),
+        str(tmp_path / "pkg/src/d.py"),
+        str(tmp_path / "src/b.py"),
+    ]
+    assert infos[0]["size"] == 3 and infos[0]["modified_at"]
+    assert [i["path"] for i in backend.glob_info("src/*.py", path=str(tmp_path))] == [
+        str(tmp_path / "pkg/src/d.py"),
+        str(tmp_path / "src/b.py"),
+    ]
+
+    monkeypatch.setenv("SANDBOX_GLOB_MAX_RESULTS", "2")
+    assert len(backend.glob_info("*.py", path=str(tmp_path))) == 2
+    assert backend.glob_info("*.py", path=str(tmp_path / "missing")) == []
+
+
+def test_grep_enforces_budget_and_reports_truncation(backend, tmp_path):
+    (tmp_path / "a:b.log").write_text("".join(f"hit {i}\n" for i in range(5_000)))
+    (tmp_path / "c.py").write_text("value = 'hit'\n")
+
+    capped = backend.grep_raw("hit", path=str(tmp_path), max_matches=20)
+
+    assert len(capped) == 20
+    assert {m["path"] for m in capped} == {str(tmp_path / "a:b.log")}
+    assert capped.truncated is True
+    assert "refine the pattern" in capped.notice
+    assert backend.orchestrator.stdout_bytes[-1] < 4096
+
+    only_py = backend.grep_raw("hit", path=str(tmp_path), glob="*.py")
+    assert only_py == [{"path": str(tmp_path / "c.py"), "line": 1, "text": "value = 'hit'"}]
+    assert only_py.truncated is False
+
+    by_bytes = backend.grep_raw("hit", path=str(tmp_path), max_bytes=1024)
+    assert by_bytes.truncated is True
+    assert all(m["text"].startswith("hit ") for m in by_bytes)
+    assert backend.grep_raw("nothing-here", path=str(tmp_path)) == []
+
+
+class _ToolCallingFakeModel(GenericFakeChatModel):
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+
+def test_grep_tool_output_carries_the_truncation_notice(backend, tmp_path, monkeypatch):
+    monkeypatch.setenv("SANDBOX_GREP_MAX_MATCHES", "20")
+    (tmp_path / "app.log").write_text("".join(f"hit {i}\n" for i in range(500)))
+    (tmp_path / "small.py").write_text("hit = 1\n")
+    replies = [
+        AIMessage(
+            content="",
+            tool_calls=[{"name": "grep", "args": {"pattern": "hit", "path": str(tmp_path)}, "id": "capped"}],
+        ),
+        AIMessage(
+            content="",
+            tool_calls=[
+                {"name": "grep", "args": {"pattern": "hit", "path": str(tmp_path), "glob": "*.py"}, "id": "full"}
+            ],
+        ),
+        AIMessage(content="done"),
+    ]
+    model = _ToolCallingFakeModel(messages=iter(replies))
+    backend._session()  # tools run on a worker thread that cannot see the test transaction
+    agent = create_agent(
+        model,
+        middleware=[
+            FilesystemMiddleware(backend=lambda _rt: backend),
+            deepagent_backend.GrepNoticeMiddleware(),
+        ],
+    )
+
+    result = agent.invoke({"messages": [HumanMessage(content="find hits")]})
+
+    outputs = {m.tool_call_id: m.content for m in result["messages"] if isinstance(m, ToolMessage)}
+    assert outputs["capped"].startswith(str(tmp_path / "app.log"))
+    assert outputs["capped"].endswith(fs_commands.grep_truncation_notice(20, fs_commands.grep_max_bytes()))
+    assert outputs["full"] == str(tmp_path / "small.py")
+
+
+@pytest.mark.skipif(not INDEX_PATH.exists(), reason="sandbox index not checked out")
+def test_filesystem_tools_use_workspace_index_when_enabled(backend, tmp_path, monkeypatch):
+    (tmp_path / "src").mkdir()
+    (tmp_path / "src" / "app.py").write_text("token = 1\n")
+    socket_path = str(tmp_path.parent / f"{tmp_path.name}.sock")
+    monkeypatch.setenv("SANDBOX_WORKSPACE_INDEX", "1")
+    monkeypatch.setenv("SANDBOX_WORKSPACE_INDEX_COMMAND", f"{sys.executable} {INDEX_PATH}")
+    monkeypatch.setenv("ASTRAFORGE_WORKSPACE_INDEX_SOCKET", socket_path)
+    monkeypatch.setenv("ASTRAFORGE_WORKSPACE_INDEX_TRIGRAMS", "1")
+    daemon = subprocess.Popen(
+        [sys.executable, str(INDEX_PATH), "--serve", "--socket", socket_path, "--root", str(tmp_path)]
+    )
+    try:
+        deadline = time.monotonic() + 10
+        while True:
+            status = subprocess.run(
+                [sys.executable, str(INDEX_PATH), "--socket", socket_path, "query", '{"op": "status"}'],
+                capture_output=True,
+                text=True,
+                check=False,
+            )
+            if status.returncode == 0 and json.loads(status.stdout)["ready"]:
+                break
+            assert time.monotonic() < deadline
+            time.sleep(0.05)
+
+        calls = backend.orchestrator.stdout_bytes
+        before = len(calls)
+        assert [i["path"] for i in backend.glob_info("*.py", path=str(tmp_path))] == [
+            str(tmp_path / "src" / "app.py")
+        ]
+        assert [i["path"] for i in backend.ls_info(str(tmp_path))] == [str(tmp_path / "src")]
+        assert backend.grep_raw("token", path=str(tmp_path)) == [
+            {"path": str(tmp_path / "src" / "app.py"), "line": 1, "text": "token = 1"}
+        ]
+        # One exec per call: every answer came from the index, not a rescan.
+        assert len(calls) - before == 3
+    finally:
+        daemon.kill()
+        daemon.wait()
+
+
+def test_edit_matches_lf_strings_against_crlf_files(backend, tmp_path):
+    target = tmp_path / "win.txt"
+    target.write_bytes(b"first\r\nsecond\r\nthird\r\n")
+
+    result = backend.edit(str(target), "first\nsecond", "1st\n2nd")
+
+    assert result.occurrences == 1
+    assert target.read_bytes() == b"1st\r\n2nd\r\nthird\r\n"
+
+
+def test_edit_uploads_strings_too_large_for_one_exec_argument(backend, tmp_path):
+    target = tmp_path / "data.txt"
+    old = "x" * 200_000
+    target.write_text(f"head\n{old}\ntail\n")
+
+    result = backend.edit(str(target), old, "y" * 150_000)
+
+    assert result.error is None
+    assert target.read_text() == "head\n" + "y" * 150_000 + "\ntail\n"
+    assert backend.orchestrator.longest_command < 8192
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["data.txt"]
@@ -0,0 +1,285 @@
+from __future__ import annotations
+
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+from django.contrib.auth import get_user_model
+
+from astraforge.domain.models.workspace import CommandResult
+from astraforge.sandbox import exec_agent, services
+from astraforge.sandbox.exec_agent import ExecAgentChannel, ExecAgentPool
+from astraforge.sandbox.models import SandboxSession
+from astraforge.sandbox.services import SandboxOrchestrator
+
+AGENT_PATH = Path(__file__).resolve().parents[3] / "sandbox" / "exec_agent.py"
+
+pytestmark = pytest.mark.skipif(not AGENT_PATH.exists(), reason="sandbox agent not checked out")
+
+
+@pytest.fixture
+def channel():
+    chan = ExecAgentChannel([sys.executable, str(AGENT_PATH), "--stdio"])
+    assert chan.start()
+    yield chan
+    chan.close()
+
+
+def test_channel_runs_commands_with_exit_code_and_merged_output(channel):
+    result = channel.run(["sh", "-c", "echo out; echo err >&2; exit 3"])
+
+    assert result.exit_code == 3
+    assert "out\n" in result.stdout
+    assert "err\n" in result.stdout
+    assert result.stderr == ""
+
+
+def test_channel_honors_cwd_and_reuses_process(channel, tmp_path):
+    pid = channel._process.pid
+
+    first = channel.run(["sh", "-c", f"cd {tmp_path} && pwd"])
+    second = channel.run(["sh", "-c", "echo again"])
+
+    assert first.stdout.strip() == str(tmp_path)
+    assert second.stdout == "again\n"
+    assert channel._process.pid == pid
+
+
+def test_channel_streams_stdin(channel):
+    payload = [b"a" * 100_000, b"b" * 10]
+
+    result = channel.run(["sh", "-c", "wc -c"], input_chunks=payload)
+
+    assert result.exit_code == 0
+    assert result.stdout.strip() == "100010"
+
+
+def test_slow_consumer_bounds_buffered_output(channel):
+    handle = channel.open(["sh", "-c", "head -c 20000000 /dev/zero"])
+    output = handle.iter_output(timeout=10)
+    received = len(next(output)[1])
+    time.sleep(0.5)
+
+    buffered = sum(len(payload) for _kind, payload in list(handle._events.queue))
+    assert 0 < buffered <= exec_agent.OUTPUT_WINDOW
+    received += sum(len(chunk) for _kind, chunk in output)
+    assert handle.wait() == 0
+    assert received == 20_000_000
+
+
+def test_channel_streams_stdin_to_command_that_writes_first(channel):
+    size = 3 * exec_agent.OUTPUT_WINDOW
+    payload = [b"x" * exec_agent.CHUNK_SIZE] * (size // exec_agent.CHUNK_SIZE)
+
+    result = channel.run(["sh", "-c", f"head -c {size} /dev/zero | tr '\\0' y; wc -c"], input_chunks=payload)
+
+    assert result.exit_code == 0
+    assert result.stdout.endswith(f"{size}\n")
+    assert result.stdout.count("y") == size
+
+
+def test_channel_multiplexes_concurrent_commands(channel):
+    results: dict[int, CommandResult] = {}
+
+    def _run(index: int) -> None:
+        results[index] = channel.run(["sh", "-c", f"sleep 0.2; echo {index}"])
+
+    threads = [threading.Thread(target=_run, args=(i,)) for i in range(5)]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert time.monotonic() - started < 0.9
+    assert {i: r.stdout.strip() for i, r in results.items()} == {i: str(i) for i in range(5)}
+
+
+def test_exit_waits_for_the_stderr_tail(channel):
+    # The command exits at once while a child keeps writing stderr for a while.
+    script = "(sleep 1.5; echo tail >&2) >/dev/null & exit 0"
+    handle = channel.open(["sh", "-c", script], merge_stderr=False)
+
+    frames = list(handle.iter_output(timeout=10))
+
+    assert handle.wait() == 0
+    assert (exec_agent.STDERR, b"tail\n") in frames
+
+
+def test_command_timeout_cancels_only_that_request(channel):
+    slow = channel.open(["sh", "-c", "sleep 0.5; echo late"])
+    with pytest.raises(exec_agent.ExecAgentTimeout):
+        channel.run(["sh", "-c", "sleep 30"], timeout=0.2)
+
+    assert channel.alive
+    assert channel.run(["sh", "-c", "echo still-here"]).stdout == "still-here\n"
+    assert b"".join(chunk for _kind, chunk in slow.iter_output(timeout=5)) == b"late\n"
+
+
+def test_attach_bridges_to_running_daemon(tmp_path):
+    socket_path = tmp_path / "agent.sock"
+    daemon = subprocess.Popen([sys.executable, str(AGENT_PATH), "--serve", "--socket", str(socket_path)])
+    try:
+        for _ in range(50):
+            if socket_path.exists():
+                break
+            time.sleep(0.05)
+        chan = ExecAgentChannel(
+            [sys.executable, str(AGENT_PATH), "--attach", "--socket", str(socket_path)]
+        )
+        assert chan.start()
+        result = chan.run(["sh", "-c", "echo via-daemon"])
+        chan.close()
+    finally:
+        daemon.kill()
+        daemon.wait()
+
+    assert result.stdout == "via-daemon\n"
+
+
+def test_pool_remembers_unavailable_agents():
+    pool = ExecAgentPool(retry_after_sec=60)
+    attempts: list[list[str]] = []
+
+    def _argv():
+        argv = ["/nonexistent/astraforge-exec-agent"]
+        attempts.append(argv)
+        return argv
+
+    assert pool.acquire("docker://sandbox-x", _argv) is None
+    assert pool.acquire("docker://sandbox-x", _argv) is None
+    assert len(attempts) == 1
+
+
+def test_pool_handshake_does_not_block_other_sandboxes():
+    pool = ExecAgentPool(retry_after_sec=60)
+    release = threading.Event()
+
+    class _SlowChannel:
+        alive = True
+
+        def __init__(self, argv):
+            self.argv = argv
+
+        def start(self):
+            if self.argv == ["slow"]:
+                release.wait(5)
+            return True
+
+    slow = threading.Thread(
+        target=pool.acquire,
+        args=("docker://slow", lambda: ["slow"]),
+        kwargs={"channel_factory": _SlowChannel},
+    )
+    slow.start()
+    try:
+        time.sleep(0.05)
+        started = time.monotonic()
+        fast = pool.acquire("docker://fast", lambda: ["fast"], channel_factory=_SlowChannel)
+        assert fast is not None
+        assert time.monotonic() - started < 1
+    finally:
+        release.set()
+        slow.join()
+    assert pool.get("docker://slow") is not None
+
+
+class _LiveRunner:
+    dry_run = False
+
+    def __init__(self) -> None:
+        self.calls: list[list[str]] = []
+
+    def run(self, command, *, cwd=None, env=None, stream=None, allow_failure=False):
+        self.calls.append(list(command))
+        return CommandResult(exit_code=0, stdout="", stderr="")
+
+
+@pytest.mark.django_db
+def test_execute_uses_exec_agent_when_enabled(monkeypatch, tmp_path):
+    user = get_user_model().objects.create_user(username="agent-user", password="pass12345")
+    session = SandboxSession.objects.create(
+        user=user,
+        mode=SandboxSession.Mode.DOCKER,
+        image="astraforge/sandbox:latest",
+        status=SandboxSession.Status.READY,
+        ref="docker://sandbox-agent",
+        workspace_path=str(tmp_path),
+    )
+    monkeypatch.setenv("SANDBOX_EXEC_AGENT", "1")
+    monkeypatch.setenv("SANDBOX_EXEC_AGENT_COMMAND", f"{AGENT_PATH} --stdio")
+    pool = ExecAgentPool()
+    monkeypatch.setattr(services, "_EXEC_AGENTS", pool)
+    runner = _LiveRunner()
+    orchestrator = SandboxOrchestrator(runner=runner)
+    # Drop the docker exec prefix so the agent runs locally.
+    monkeypatch.setattr(orchestrator, "_exec_prefix", lambda *_a, **_k: [sys.executable])
+
+    first = orchestrator.execute(session, "pwd")
+    second = orchestrator.execute(session, ["sh", "-c", "exit 4"], timeout_sec=5)
+
+    assert first.stdout.strip() == str(tmp_path)
+    assert second.exit_code == 4
+    assert runner.calls == []
+    orchestrator.terminate(session)
+    assert pool.get("docker://sandbox-agent") is None
+
+
+@pytest.mark.django_db
+def test_execute_timeout_keeps_the_shared_exec_channel(monkeypatch, tmp_path):
+    user = get_user_model().objects.create_user(username="agent-timeout", password="pass12345")
+    session = SandboxSession.objects.create(
+        user=user,
+        mode=SandboxSession.Mode.DOCKER,
+        image="astraforge/sandbox:latest",
+        status=SandboxSession.Status.READY,
+        ref="docker://sandbox-agent-timeout",
+        workspace_path=str(tmp_path),
+    )
+
+    class _TimedOutChannel:
+        def run(self, argv, *, input_chunks=None, timeout=None):
+            raise exec_agent.ExecAgentTimeout("Timed out waiting for sandbox command output")
+
+    discarded: list[str] = []
+    pool = ExecAgentPool()
+    monkeypatch.setattr(pool, "discard", discarded.append)
+    monkeypatch.setattr(services, "_EXEC_AGENTS", pool)
+    orchestrator = SandboxOrchestrator(runner=_LiveRunner())
+    monkeypatch.setattr(orchestrator, "_exec_agent", lambda _session: _TimedOutChannel())
+
+    with pytest.raises(services.SandboxProvisionError, match="Timed out"):
+        orchestrator.execute(session, "sleep 600", timeout_sec=1)
+
+    assert discarded == []
+
+
+@pytest.mark.django_db
+def test_stream_file_uses_exec_agent_when_enabled(monkeypatch, tmp_path):
+    user = get_user_model().objects.create_user(username="agent-reader", password="pass12345")
+    session = SandboxSession.objects.create(
+        user=user,
+        mode=SandboxSession.Mode.DOCKER,
+        image="astraforge/sandbox:latest",
+        status=SandboxSession.Status.READY,
+        ref="docker://sandbox-agent-read",
+        workspace_path=str(tmp_path),
+    )
+    monkeypatch.setenv("SANDBOX_EXEC_AGENT", "1")
+    monkeypatch.setenv("SANDBOX_EXEC_AGENT_COMMAND", f"{AGENT_PATH} --stdio")
+    monkeypatch.setattr(services, "_EXEC_AGENTS", ExecAgentPool())
+    orchestrator = SandboxOrchestrator(runner=_LiveRunner())
+    monkeypatch.setattr(orchestrator, "_exec_prefix", lambda *_a, **_k: [sys.executable])
+    payload = bytes(range(256)) * 1024
+    target = tmp_path / "blob.bin"
+    target.write_bytes(payload)
+
+    streamed = b"".join(orchestrator.stream_file(session, str(target), offset=5, length=300_000))
+
+    assert streamed == payload[5:300_005]
+    with pytest.raises(services.SandboxProvisionError):
+        b"".join(orchestrator.stream_file(session, str(tmp_path / "missing")))
+    orchestrator.terminate(session)
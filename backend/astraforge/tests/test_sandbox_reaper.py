@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import threading
+import uuid
 from datetime import timedelta
 
 import pytest
@@ -11,7 +13,8 @@ from astraforge.sandbox.models import SandboxSession
 from astraforge.sandbox.reaper import SandboxReaper
 from astraforge.sandbox.services import SandboxOrchestrator
 
-pytestmark = pytest.mark.django_db
+# Reaper workers run on threads with their own connections, so rows must be committed.
+pytestmark = pytest.mark.django_db(transaction=True)
 
 
 class _RunnerSpy:
@@ -51,7 +54,7 @@ def test_reaper_terminates_idle_sessions():
     result = reaper.reap(now=timezone.now())
 
     session.refresh_from_db()
-    assert result == {"checked": 1, "terminated": 1}
+    assert (result["checked"], result["claimed"], result["terminated"]) == (1, 1, 1)
     assert session.status == SandboxSession.Status.TERMINATED
     assert session.metadata.get("terminated_reason") == "idle_timeout"
     assert session.metadata.get("latest_snapshot_id")
@@ -71,7 +74,7 @@ def test_reaper_skips_recent_sessions():
     result = reaper.reap(now=timezone.now())
 
     session.refresh_from_db()
-    assert result == {"checked": 1, "terminated": 0}
+    assert (result["checked"], result["stale"], result["terminated"]) == (1, 0, 0)
     assert session.status == SandboxSession.Status.READY
     assert session.metadata.get("terminated_reason") is None
     assert runner.commands == []
@@ -93,8 +96,67 @@ def test_reaper_enforces_max_lifetime():
     result = reaper.reap(now=timezone.now())
 
     session.refresh_from_db()
-    assert result == {"checked": 1, "terminated": 1}
+    assert (result["checked"], result["claimed"], result["terminated"]) == (1, 1, 1)
     assert session.status == SandboxSession.Status.TERMINATED
     assert session.metadata.get("terminated_reason") == "max_lifetime"
     assert session.metadata.get("latest_snapshot_id")
     assert any("tar" in " ".join(cmd) for cmd in runner.commands)
+
+
+def test_reaper_skips_sessions_leased_by_another_sweep():
+    user = get_user_model().objects.create_user(username="sandboxer4", password="pass12345")
+    now = timezone.now()
+    session = _create_session(
+        user,
+        last_activity_at=now - timedelta(minutes=10),
+        reaper_lease_until=now + timedelta(minutes=5),
+    )
+
+    runner = _RunnerSpy()
+    reaper = SandboxReaper(orchestrator=SandboxOrchestrator(runner=runner))
+
+    result = reaper.reap(now=now)
+
+    session.refresh_from_db()
+    assert (result["stale"], result["claimed"], result["terminated"]) == (0, 0, 0)
+    assert session.status == SandboxSession.Status.READY
+    assert runner.commands == []
+
+    result = reaper.reap(now=now + timedelta(minutes=6))
+
+    session.refresh_from_db()
+    assert result["terminated"] == 1
+    assert session.status == SandboxSession.Status.TERMINATED
+
+
+def test_reaper_terminates_when_snapshot_times_out(monkeypatch):
+    monkeypatch.setenv("SANDBOX_REAP_SNAPSHOT_TIMEOUT_SEC", "1")
+    user = get_user_model().objects.create_user(username="sandboxer5", password="pass12345")
+    session = _create_session(user, last_activity_at=timezone.now() - timedelta(minutes=10))
+    release = threading.Event()
+    finished = threading.Event()
+    snapshot_id = uuid.uuid4()
+
+    def _hanging_snapshot(self, snapshot_session, *, label=None):
+        release.wait(timeout=10)
+        # The abandoned snapshot finishes after terminate() and records its pointer.
+        self._record_latest_snapshot(snapshot_session, snapshot_id)
+        finished.set()
+
+    monkeypatch.setattr(SandboxOrchestrator, "create_snapshot", _hanging_snapshot)
+    runner = _RunnerSpy()
+    reaper = SandboxReaper(orchestrator=SandboxOrchestrator(runner=runner))
+
+    try:
+        result = reaper.reap(now=timezone.now())
+    finally:
+        release.set()
+    assert finished.wait(timeout=10)
+
+    session.refresh_from_db()
+    assert (result["snapshot_timeouts"], result["terminated"]) == (1, 1)
+    assert result["histograms"]["snapshot_sec"]["buckets"]["5"] == 1
+    assert session.status == SandboxSession.Status.TERMINATED
+    assert session.metadata["terminated_reason"] == "idle_timeout"
+    assert session.metadata["latest_snapshot_id"] == str(snapshot_id)
+    assert any(cmd[:3] == ["docker", "rm", "-f"] for cmd in runner.commands)
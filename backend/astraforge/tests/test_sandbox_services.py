@@ -1,14 +1,19 @@
 from __future__ import annotations
 
+import io
 import subprocess
 import uuid
 
 import pytest
 from django.contrib.auth import get_user_model
+from rest_framework import status
+from rest_framework.test import APIRequestFactory, force_authenticate
 
 from astraforge.domain.models.workspace import CommandResult
+from astraforge.infrastructure.workspaces.codex import CommandRunner
 from astraforge.sandbox.models import SandboxSession, SandboxSnapshot
 from astraforge.sandbox.services import SandboxOrchestrator, SandboxProvisionError
+from astraforge.sandbox.views import SandboxSessionViewSet
 
 pytestmark = pytest.mark.django_db
 
@@ -338,3 +343,217 @@ def test_spawn_docker_accepts_non_json_inspect_state():
 
     assert runtime.ref.startswith("docker://sandbox-")
     assert not any(call[:2] == ["docker", "start"] for call in runner.calls)
+
+
+class _StreamingRunnerSpy:
+    def __init__(self) -> None:
+        self.calls: list[list[str]] = []
+        self.received = b""
+        self.chunk_sizes: list[int] = []
+
+    def run(self, command, *, cwd=None, env=None, stream=None, allow_failure=False):
+        self.calls.append(list(command))
+        return CommandResult(exit_code=0, stdout="", stderr="")
+
+    def run_with_input(self, command, chunks, *, allow_failure=False):
+        self.calls.append(list(command))
+        for chunk in chunks:
+            self.chunk_sizes.append(len(chunk))
+            self.received += chunk
+        return CommandResult(exit_code=0, stdout="", stderr="")
+
+
+def test_upload_streams_raw_bytes_in_single_exec():
+    user = get_user_model().objects.create_user(username="streamer", password="pass12345")
+    session = _create_session(user, ref="docker://sandbox-test")
+    runner = _StreamingRunnerSpy()
+    orchestrator = SandboxOrchestrator(runner=runner)
+    payload = bytes(range(256)) * 4096  # 1 MiB including NUL bytes
+
+    result = orchestrator.upload(session, "/workspace/data/blob.bin", io.BytesIO(payload))
+
+    assert result.exit_code == 0
+    assert len(runner.calls) == 1
+    command = runner.calls[0]
+    assert command[:4] == ["docker", "exec", "-i", "sandbox-test"]
+    script = command[-1]
+    assert "cat > /workspace/data/.blob.bin.upload-" in script
+    assert "mv -f /workspace/data/.blob.bin.upload-" in script
+    assert "base64" not in script
+    assert runner.received == payload
+    assert max(runner.chunk_sizes) <= 256 * 1024
+
+
+def test_upload_writes_file_atomically_via_command_runner(monkeypatch, tmp_path):
+    user = get_user_model().objects.create_user(username="atomic", password="pass12345")
+    session = _create_session(user)
+    orchestrator = SandboxOrchestrator(runner=CommandRunner(dry_run=False))
+    # Run the upload script locally instead of through docker exec.
+    monkeypatch.setattr(orchestrator, "_exec_prefix", lambda *_a, **_k: [])
+    target = tmp_path / "nested" / "file.bin"
+    payload = b"\x00\xffbinary\r\n" * 50_000
+
+    result = orchestrator.upload_bytes(session, str(target), iter([payload[:1000], payload[1000:]]))
+
+    assert result.exit_code == 0
+    assert target.read_bytes() == payload
+    assert [p.name for p in target.parent.iterdir()] == ["file.bin"]
+
+
+def test_files_upload_view_streams_request_body(monkeypatch):
+    user = get_user_model().objects.create_user(username="uploader", password="pass12345")
+    session = _create_session(user)
+    received = {}
+
+    class _OrchestratorStub:
+        def upload_bytes(self, _session, path, content):
+            received["path"] = path
+            received["streamed"] = hasattr(content, "read")
+            received["content"] = content.read()
+            return CommandResult(exit_code=0, stdout="", stderr="")
+
+    monkeypatch.setattr(SandboxSessionViewSet, "orchestrator", _OrchestratorStub())
+    factory = APIRequestFactory()
+    request = factory.post(
+        f"/api/sandbox/sessions/{session.id}/files/upload/?path=/workspace/out.bin",
+        data=b"\x00raw-bytes",
+        content_type="application/octet-stream",
+    )
+    force_authenticate(request, user=user)
+
+    response = SandboxSessionViewSet.as_view(
+        {"post": "files_upload"}, **SandboxSessionViewSet.files_upload.kwargs
+    )(request, pk=str(session.id))
+
+    assert response.status_code == status.HTTP_200_OK
+    assert received == {"path": "/workspace/out.bin", "streamed": True, "content": b"\x00raw-bytes"}
+
+
+def test_files_upload_view_reads_chunked_body_without_content_length(monkeypatch, tmp_path):
+    user = get_user_model().objects.create_user(username="chunked", password="pass12345")
+    session = _create_session(user)
+    orchestrator = SandboxOrchestrator(runner=CommandRunner(dry_run=False))
+    monkeypatch.setattr(orchestrator, "_exec_prefix", lambda *_a, **_k: [])
+    monkeypatch.setattr(SandboxSessionViewSet, "orchestrator", orchestrator)
+    target = tmp_path / "chunked.bin"
+    parts = [b"\x00first-", b"second-" * 10_000, b"third\xff"]
+
+    class _DecodedChunkedInput(io.RawIOBase):
+        """Mimics a server's de-chunked wsgi.input fed by a generator."""
+
+        def __init__(self, chunks):
+            self._chunks = iter(chunks)
+            self._pending = b""
+
+        def readable(self):
+            return True
+
+        def readinto(self, buffer):
+            while not self._pending:
+                self._pending = next(self._chunks, None)
+                if self._pending is None:
+                    return 0
+            size = min(len(buffer), len(self._pending))
+            buffer[:size] = self._pending[:size]
+            self._pending = self._pending[size:]
+            return size
+
+    factory = APIRequestFactory()
+    request = factory.post(
+        f"/api/sandbox/sessions/{session.id}/files/upload/?path={target}",
+        content_type="application/octet-stream",
+    )
+    request.META.pop("CONTENT_LENGTH", None)
+    request.META["HTTP_TRANSFER_ENCODING"] = "chunked"
+    request.META["wsgi.input"] = io.BufferedReader(_DecodedChunkedInput(chunk for chunk in parts))
+    request.META["wsgi.input_terminated"] = True
+    force_authenticate(request, user=user)
+
+    response = SandboxSessionViewSet.as_view(
+        {"post": "files_upload"}, **SandboxSessionViewSet.files_upload.kwargs
+    )(request, pk=str(session.id))
+
+    assert response.status_code == status.HTTP_200_OK
+    assert target.read_bytes() == b"".join(parts)
+
+
+def _local_orchestrator(monkeypatch) -> SandboxOrchestrator:
+    orchestrator = SandboxOrchestrator(runner=CommandRunner(dry_run=False))
+    # Run sandbox commands locally instead of through docker exec.
+    monkeypatch.setattr(orchestrator, "_exec_prefix", lambda *_a, **_k: [])
+    monkeypatch.setattr(orchestrator, "_wrap_exec", lambda _s, cmd, workdir=None: ["sh", "-c", cmd])
+    return orchestrator
+
+
+def test_stream_file_yields_raw_bytes_and_ranges(monkeypatch, tmp_path):
+    user = get_user_model().objects.create_user(username="reader", password="pass12345")
+    session = _create_session(user)
+    orchestrator = _local_orchestrator(monkeypatch)
+    payload = bytes(range(256)) * 2048
+    target = tmp_path / "artifact.bin"
+    target.write_bytes(payload)
+
+    assert orchestrator.stat_file(session, str(target)) == len(payload)
+    assert b"".join(orchestrator.stream_file(session, str(target))) == payload
+    sliced = orchestrator.stream_file(session, str(target), offset=1000, length=70_000)
+    assert b"".join(sliced) == payload[1000:71_000]
+    with pytest.raises(SandboxProvisionError):
+        orchestrator.stat_file(session, str(tmp_path / "missing.bin"))
+
+
+class _BufferedLocalRunner:
+    """Runs commands locally but, like older runners, has no ``iter_output``."""
+
+    dry_run = False
+
+    def run(self, command, *, cwd=None, env=None, stream=None, allow_failure=False):
+        completed = subprocess.run(command, capture_output=True, text=True, check=False)
+        return CommandResult(
+            exit_code=completed.returncode, stdout=completed.stdout, stderr=completed.stderr
+        )
+
+
+def test_stream_file_base64_fallback_raises_when_the_read_fails(monkeypatch, tmp_path):
+    user = get_user_model().objects.create_user(username="b64-reader", password="pass12345")
+    session = _create_session(user)
+    orchestrator = SandboxOrchestrator(runner=_BufferedLocalRunner())
+    monkeypatch.setattr(orchestrator, "_wrap_exec", lambda _s, cmd, workdir=None: ["sh", "-c", cmd])
+    target = tmp_path / "present.bin"
+    target.write_bytes(b"\x00binary\xff")
+
+    assert b"".join(orchestrator.stream_file(session, str(target))) == b"\x00binary\xff"
+    with pytest.raises(SandboxProvisionError, match="Failed to read file"):
+        b"".join(orchestrator.stream_file(session, str(tmp_path / "missing.bin")))
+
+
+def _get_file_content(session, user, path, **headers):
+    factory = APIRequestFactory()
+    request = factory.get(
+        f"/api/sandbox/sessions/{session.id}/files/content/", {"path": path}, **headers
+    )
+    force_authenticate(request, user=user)
+    return SandboxSessionViewSet.as_view({"get": "files_content"})(request, pk=str(session.id))
+
+
+def test_files_content_streams_with_range_support(monkeypatch, tmp_path):
+    user = get_user_model().objects.create_user(username="downloader", password="pass12345")
+    session = _create_session(user)
+    monkeypatch.setattr(SandboxSessionViewSet, "orchestrator", _local_orchestrator(monkeypatch))
+    payload = b"\x00\x01binary-content\xff" * 1000
+    target = tmp_path / "download.bin"
+    target.write_bytes(payload)
+
+    full = _get_file_content(session, user, str(target))
+    partial = _get_file_content(session, user, str(target), HTTP_RANGE="bytes=10-19")
+    suffix = _get_file_content(session, user, str(target), HTTP_RANGE="bytes=-5")
+    unsatisfiable = _get_file_content(session, user, str(target), HTTP_RANGE=f"bytes={len(payload)}-")
+
+    assert full.status_code == status.HTTP_200_OK
+    assert full.streaming
+    assert b"".join(full.streaming_content) == payload
+    assert full["Content-Length"] == str(len(payload))
+    assert partial.status_code == status.HTTP_206_PARTIAL_CONTENT
+    assert partial["Content-Range"] == f"bytes 10-19/{len(payload)}"
+    assert b"".join(partial.streaming_content) == payload[10:20]
+    assert b"".join(suffix.streaming_content) == payload[-5:]
+    assert unsatisfiable.status_code == status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE
@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import json
+
+import pytest
+from django.contrib.auth import get_user_model
+
+from astraforge.domain.models.workspace import CommandResult
+from astraforge.sandbox import deepagent_backend, session_cache
+from astraforge.sandbox.models import SandboxSession
+from astraforge.sandbox.services import SandboxOrchestrator, SandboxProvisionError
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def _clear_session_cache(monkeypatch):
+    monkeypatch.setenv("SANDBOX_SESSION_CACHE_SEC", "60")
+    session_cache.clear()
+    yield
+    session_cache.clear()
+
+
+class _OrchestratorStub:
+    def __init__(self) -> None:
+        self.provisioned = 0
+        self.fail_exec = False
+
+    def provision(self, session: SandboxSession):
+        self.provisioned += 1
+        session.status = SandboxSession.Status.READY
+        session.save(update_fields=["status", "updated_at"])
+
+    def execute(self, session, command, *, cwd=None):
+        if self.fail_exec:
+            raise SandboxProvisionError("Sandbox is not ready for execution")
+        return CommandResult(exit_code=0, stdout="", stderr="")
+
+
+class _NoopRunner:
+    def run(self, command, *, cwd=None, env=None, stream=None, allow_failure=False):
+        return CommandResult(exit_code=0, stdout="", stderr="")
+
+
+def _backend(session: SandboxSession, orchestrator) -> deepagent_backend._SandboxBackend:
+    rt = type("RT", (), {"config": {"configurable": {"sandbox_session_id": str(session.id)}}})()
+    backend = deepagent_backend._SandboxBackend(rt)
+    backend.orchestrator = orchestrator
+    return backend
+
+
+def _create_session(user, **overrides) -> SandboxSession:
+    defaults = {
+        "mode": SandboxSession.Mode.DOCKER,
+        "image": "astraforge/codex-cli:latest",
+        "status": SandboxSession.Status.READY,
+        "ref": "docker://sandbox-cache",
+        "workspace_path": "/workspace",
+    }
+    defaults.update(overrides)
+    return SandboxSession.objects.create(user=user, **defaults)
+
+
+def test_repeated_tool_calls_reuse_cached_session(django_assert_num_queries):
+    user = get_user_model().objects.create_user(username="cache-hit", password="pass12345")
+    session = _create_session(user)
+    backend = _backend(session, _OrchestratorStub())
+
+    with django_assert_num_queries(1):
+        first = backend._session()
+    with django_assert_num_queries(0):
+        for _ in range(5):
+            assert backend._session() is first
+
+    # A fresh backend for the next tool call shares the process-wide cache.
+    with django_assert_num_queries(0):
+        _backend(session, _OrchestratorStub())._session()
+
+
+def test_terminate_invalidates_cached_session():
+    user = get_user_model().objects.create_user(username="cache-stop", password="pass12345")
+    session = _create_session(user)
+    orchestrator = _OrchestratorStub()
+    backend = _backend(session, orchestrator)
+    cached = backend._session()
+
+    SandboxOrchestrator(runner=_NoopRunner()).terminate(cached, reason="user")
+
+    assert session_cache.get(session.id) is None
+    backend._session()
+    assert orchestrator.provisioned == 1
+
+
+def test_exec_failure_invalidates_cached_session():
+    user = get_user_model().objects.create_user(username="cache-fail", password="pass12345")
+    session = _create_session(user)
+    orchestrator = _OrchestratorStub()
+    backend = _backend(session, orchestrator)
+    backend._session()
+    orchestrator.fail_exec = True
+
+    with pytest.raises(RuntimeError):
+        backend.ls_info("/workspace")
+    assert session_cache.get(session.id) is None
+
+
+def test_status_change_saved_elsewhere_invalidates_cached_session():
+    user = get_user_model().objects.create_user(username="cache-reaped", password="pass12345")
+    session = _create_session(user)
+    backend = _backend(session, _OrchestratorStub())
+    backend._session()
+
+    # Another code path (e.g. the reaper) saves its own copy of the row.
+    reaped = SandboxSession.objects.get(pk=session.pk)
+    reaped.status = SandboxSession.Status.TERMINATED
+    reaped.save(update_fields=["status", "updated_at"])
+
+    assert session_cache.get(session.id) is None
+
+
+def test_status_channel_message_from_another_process_invalidates_cached_session():
+    user = get_user_model().objects.create_user(username="cache-remote", password="pass12345")
+    session = _create_session(user)
+    session_cache.put(session)
+
+    def _message(status):
+        data = json.dumps({"id": str(session.id), "status": status}).encode("utf-8")
+        return {"type": "pmessage", "data": data}
+
+    session_cache.handle_status_message(_message(SandboxSession.Status.READY))
+    assert session_cache.get(session.id) is session
+    session_cache.handle_status_message(_message(SandboxSession.Status.TERMINATED))
+    assert session_cache.get(session.id) is None
@@ -1,11 +1,17 @@
 from __future__ import annotations
 
+import io
+import os
+import shutil
+import uuid
+
 import pytest
 import boto3
 from botocore.stub import ANY, Stubber
 from django.contrib.auth import get_user_model
 
 from astraforge.domain.models.workspace import CommandResult
+from astraforge.infrastructure.workspaces.codex import CommandRunner
 from astraforge.sandbox.models import SandboxSession, SandboxSnapshot
 from astraforge.sandbox.services import SandboxOrchestrator, SandboxProvisionError
 
@@ -74,6 +80,31 @@ def test_restore_snapshot_updates_metadata_and_executes_tar():
     assert "--strip-components=1" in joined_commands
 
 
+def test_record_latest_snapshot_keeps_stored_and_unsaved_metadata():
+    user = get_user_model().objects.create_user(username="snapshot-merge", password="pass12345")
+    session = _create_session(user, metadata={"owner": "ui"})
+    # Written by another process after ``session`` was loaded.
+    SandboxSession.objects.filter(pk=session.pk).update(
+        metadata={"owner": "ui", "terminated_reason": "idle_timeout"}
+    )
+    session.metadata = {**session.metadata, "pending": "not saved yet"}
+    snapshot_id = uuid.uuid4()
+
+    SandboxOrchestrator(runner=_RunnerSpy())._record_latest_snapshot(session, snapshot_id)
+
+    assert session.metadata == {
+        "owner": "ui",
+        "pending": "not saved yet",
+        "latest_snapshot_id": str(snapshot_id),
+    }
+    stored = SandboxSession.objects.get(pk=session.pk).metadata
+    assert stored == {
+        "owner": "ui",
+        "terminated_reason": "idle_timeout",
+        "latest_snapshot_id": str(snapshot_id),
+    }
+
+
 def test_create_snapshot_uploads_to_s3(monkeypatch):
     user = get_user_model().objects.create_user(username="s3user", password="pass12345")
     session = _create_session(user)
@@ -112,6 +143,27 @@ def test_create_snapshot_uploads_to_s3(monkeypatch):
     assert session.metadata["latest_snapshot_id"] == str(snapshot.id)
 
 
+def test_restore_snapshot_rebuilds_workspace_index_when_enabled(monkeypatch):
+    monkeypatch.setenv("SANDBOX_WORKSPACE_INDEX", "1")
+    user = get_user_model().objects.create_user(username="reindexer", password="pass12345")
+    session = _create_session(user)
+    snapshot = SandboxSnapshot.objects.create(
+        session=session,
+        label="latest",
+        archive_path=f"/tmp/astraforge-snapshots/{session.id}/restore-me.tar.gz",
+        include_paths=[session.workspace_path],
+        exclude_paths=[],
+    )
+    runner = _RunnerSpy()
+    orchestrator = SandboxOrchestrator(runner=runner)
+
+    orchestrator.restore_snapshot(session, snapshot)
+
+    last = " ".join(runner.commands[-1])
+    assert "astraforge-workspace-index --spawn --root /workspace query" in last
+    assert '"op": "rebuild"' in last
+
+
 def test_restore_snapshot_downloads_from_s3(monkeypatch):
     user = get_user_model().objects.create_user(username="restore-s3", password="pass12345")
     session = _create_session(user)
@@ -146,6 +198,40 @@ def test_restore_snapshot_downloads_from_s3(monkeypatch):
     assert "--strip-components=1" in joined_commands
 
 
+def test_restore_snapshot_downloads_from_s3_when_streaming_drops(monkeypatch):
+    user = get_user_model().objects.create_user(username="restore-drop", password="pass12345")
+    session = _create_session(user)
+    snapshot = SandboxSnapshot.objects.create(
+        session=session,
+        label="dropped",
+        s3_key=f"snapshots/{session.id}/dropped.tar.gz",
+        include_paths=[session.workspace_path],
+        exclude_paths=[],
+    )
+    runner = _RunnerSpy()
+    orchestrator = SandboxOrchestrator(runner=runner)
+    orchestrator._s3_bucket = "astraforge-snapshots"
+    monkeypatch.setattr(orchestrator, "_s3_client", lambda: object())
+    # The exec agent was up when checked but dropped before the stream started.
+    monkeypatch.setattr(orchestrator, "_can_stream_input", lambda _session: True)
+    monkeypatch.setattr(orchestrator, "_open_snapshot_stream", lambda _snap: io.BytesIO(b"payload"))
+    monkeypatch.setattr(orchestrator, "_run_with_input", lambda *_args: None)
+    monkeypatch.setattr(orchestrator, "_download_snapshot_from_s3", lambda _snap: b"payload")
+    uploaded: list[bytes] = []
+
+    def fake_upload_bytes(_session, path, content):
+        uploaded.append(content)
+        return CommandResult(exit_code=0, stdout="", stderr="")
+
+    monkeypatch.setattr(orchestrator, "upload_bytes", fake_upload_bytes)
+
+    orchestrator.restore_snapshot(session, snapshot)
+
+    assert uploaded == [b"payload"]
+    session.refresh_from_db()
+    assert session.metadata["latest_snapshot_id"] == str(snapshot.id)
+
+
 def test_restore_snapshot_missing_archive_raises(monkeypatch):
     user = get_user_model().objects.create_user(username="restore-missing", password="pass12345")
     session = _create_session(user)
@@ -174,3 +260,160 @@ def test_restore_snapshot_missing_archive_raises(monkeypatch):
 
     with pytest.raises(SandboxProvisionError):
         orchestrator.restore_snapshot(session, snapshot)
+
+
+class _MemoryS3:
+    def __init__(self) -> None:
+        self.objects: dict[str, bytes] = {}
+        self.puts: list[str] = []
+
+    def put_object(self, *, Bucket, Key, Body, ContentType=None):
+        self.objects[Key] = bytes(Body)
+        self.puts.append(Key)
+        return {}
+
+    def get_object(self, *, Bucket, Key):
+        return {"Body": io.BytesIO(self.objects[Key])}
+
+    def create_multipart_upload(self, *, Bucket, Key, ContentType=None):
+        self.parts: dict[int, bytes] = {}
+        return {"UploadId": "upload-1"}
+
+    def upload_part(self, *, Bucket, Key, UploadId, PartNumber, Body):
+        self.parts[PartNumber] = bytes(Body)
+        return {"ETag": f"etag-{PartNumber}"}
+
+    def complete_multipart_upload(self, *, Bucket, Key, UploadId, MultipartUpload):
+        numbers = [part["PartNumber"] for part in MultipartUpload["Parts"]]
+        assert numbers == sorted(self.parts)
+        self.objects[Key] = b"".join(self.parts[number] for number in numbers)
+        self.puts.append(Key)
+        return {}
+
+
+def _chunked_orchestrator(monkeypatch, s3: _MemoryS3, snapshot_dir) -> SandboxOrchestrator:
+    monkeypatch.setenv("SANDBOX_S3_BUCKET", "astraforge-snapshots")
+    monkeypatch.setenv("SANDBOX_SNAPSHOT_FORMAT", "chunked")
+    monkeypatch.setenv("SANDBOX_SNAPSHOT_CHUNK_BYTES", "4096")
+    orchestrator = SandboxOrchestrator(runner=CommandRunner(dry_run=False))
+    orchestrator._s3_client_cached = s3
+    # Run sandbox commands locally instead of through docker exec.
+    monkeypatch.setattr(orchestrator, "_exec_prefix", lambda *_a, **_k: [])
+    monkeypatch.setattr(orchestrator, "_wrap_exec", lambda _s, cmd, workdir=None: ["sh", "-c", cmd])
+    monkeypatch.setattr(orchestrator, "_snapshot_dir", lambda _s: str(snapshot_dir))
+    return orchestrator
+
+
+def test_chunked_snapshot_uploads_only_new_chunks_and_restores(monkeypatch, tmp_path):
+    snapshot_root = tmp_path / "snapshots"
+    workspace = tmp_path / "workspace"
+    (workspace / "src").mkdir(parents=True)
+    (workspace / "empty").mkdir()
+    (workspace / "src" / "app.py").write_text("print('hello')\n")
+    (workspace / "blob.bin").write_bytes(bytes(range(256)) * 64)  # 4 chunks of 4 KiB
+    (workspace / "copy.bin").write_bytes(bytes(range(256)) * 64)
+    (workspace / "link").symlink_to("src/app.py")
+    (workspace / "node_modules").mkdir()
+    (workspace / "node_modules" / "skip.js").write_text("ignored")
+    user = get_user_model().objects.create_user(username="chunker", password="pass12345")
+    session = _create_session(user, workspace_path=str(workspace))
+    s3 = _MemoryS3()
+    orchestrator = _chunked_orchestrator(monkeypatch, s3, snapshot_root)
+
+    first = orchestrator.create_snapshot(session, exclude_paths=["node_modules"])
+    (workspace / "src" / "app.py").write_text("print('changed')\n")
+    second = orchestrator.create_snapshot(session, exclude_paths=["node_modules"])
+
+    assert first.format == SandboxSnapshot.Format.CHUNKED
+    assert first.s3_key == f"snapshots/{session.id}/{first.id}.manifest.json.gz"
+    # blob.bin and copy.bin share the same single chunk digest.
+    assert first.manifest["new_chunks"] == 2
+    assert second.manifest["new_chunks"] == 1
+    assert second.size_bytes < first.size_bytes
+    assert not list(snapshot_root.glob("*.requests"))
+
+    shutil.rmtree(workspace)
+    orchestrator.restore_snapshot(session, second)
+
+    assert (workspace / "src" / "app.py").read_text() == "print('changed')\n"
+    assert (workspace / "copy.bin").read_bytes() == bytes(range(256)) * 64
+    assert os.readlink(workspace / "link") == "src/app.py"
+    assert (workspace / "empty").is_dir()
+    assert not (workspace / "node_modules").exists()
+    session.refresh_from_db()
+    assert session.metadata["latest_snapshot_id"] == str(second.id)
+
+
+def test_chunked_snapshot_scan_ignores_stderr_on_merged_exec_streams(monkeypatch, tmp_path):
+    snapshot_root = tmp_path / "snapshots"
+    workspace = tmp_path / "workspace"
+    workspace.mkdir()
+    (workspace / "app.py").write_text("print('hello')\n")
+    user = get_user_model().objects.create_user(username="noisy", password="pass12345")
+    session = _create_session(user, workspace_path=str(workspace))
+    orchestrator = _chunked_orchestrator(monkeypatch, _MemoryS3(), snapshot_root)
+    # Exec transports merge stderr into stdout, and the interpreter warns on startup.
+    noisy = 'exec 2>&1\npython3() { echo "warning: low entropy" >&2; command python3 "$@"; }\n'
+    monkeypatch.setattr(orchestrator, "_wrap_exec", lambda _s, cmd, workdir=None: ["sh", "-c", noisy + cmd])
+
+    snapshot = orchestrator.create_snapshot(session)
+
+    assert snapshot.format == SandboxSnapshot.Format.CHUNKED
+    assert snapshot.manifest["entries"] == 2  # workspace root and app.py
+    assert not list(snapshot_root.glob("*.scan-errors"))
+
+
+def test_snapshot_streams_between_sandbox_and_s3_without_staging(monkeypatch, tmp_path):
+    snapshot_root = tmp_path / "snapshots"
+    workspace = tmp_path / "workspace"
+    (workspace / "src").mkdir(parents=True)
+    payload = os.urandom(48 * 1024)
+    (workspace / "src" / "data.bin").write_bytes(payload)
+    user = get_user_model().objects.create_user(username="streamer", password="pass12345")
+    session = _create_session(user, workspace_path=str(workspace))
+    s3 = _MemoryS3()
+    monkeypatch.setenv("SANDBOX_S3_PART_BYTES", "16384")
+    orchestrator = _chunked_orchestrator(monkeypatch, s3, snapshot_root)
+    orchestrator._snapshot_format = SandboxSnapshot.Format.ARCHIVE
+
+    snapshot = orchestrator.create_snapshot(session, label="streamed")
+
+    assert snapshot.format == SandboxSnapshot.Format.ARCHIVE
+    assert snapshot.archive_path == ""
+    assert len(s3.parts) > 1
+    assert snapshot.size_bytes == len(s3.objects[snapshot.s3_key])
+    assert not snapshot_root.exists()
+
+    shutil.rmtree(workspace)
+    workspace.mkdir()
+    orchestrator.restore_snapshot(session, snapshot)
+
+    assert (workspace / "src" / "data.bin").read_bytes() == payload
+    assert not snapshot_root.exists()
+
+
+@pytest.mark.skipif(shutil.which("zstd") is None, reason="zstd is not installed")
+def test_snapshot_codec_is_recorded_and_detected_on_restore(monkeypatch, tmp_path):
+    workspace = tmp_path / "workspace"
+    workspace.mkdir()
+    (workspace / "notes.txt").write_text("hello " * 1000)
+    user = get_user_model().objects.create_user(username="zstd-user", password="pass12345")
+    session = _create_session(
+        user, workspace_path=str(workspace), metadata={"snapshot_codec": "zstd"}
+    )
+    s3 = _MemoryS3()
+    orchestrator = _chunked_orchestrator(monkeypatch, s3, tmp_path / "snapshots")
+    orchestrator._snapshot_format = SandboxSnapshot.Format.ARCHIVE
+
+    snapshot = orchestrator.create_snapshot(session)
+
+    assert snapshot.codec == SandboxSnapshot.Codec.ZSTD
+    assert snapshot.s3_key.endswith(".tar.zst")
+    assert s3.objects[snapshot.s3_key].startswith(b"\x28\xb5\x2f\xfd")
+
+    # A stale codec hint must not break restore: the archive header wins.
+    snapshot.codec = SandboxSnapshot.Codec.GZIP
+    (workspace / "notes.txt").unlink()
+    orchestrator.restore_snapshot(session, snapshot)
+
+    assert (workspace / "notes.txt").read_text() == "hello " * 1000
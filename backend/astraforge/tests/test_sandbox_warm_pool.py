@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import json
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from astraforge.domain.models.workspace import CommandResult
+from astraforge.sandbox.models import SandboxSession, SandboxWarmContainer
+from astraforge.sandbox.services import SandboxOrchestrator
+from astraforge.sandbox.views import SandboxSessionViewSet
+from astraforge.sandbox.warm_pool import pool_metrics
+
+pytestmark = pytest.mark.django_db
+
+_IMAGE = "astraforge/sandbox:latest"
+
+
+class _DockerRunner:
+    def __init__(self) -> None:
+        self.calls: list[list[str]] = []
+
+    def run(self, command, *, cwd=None, env=None, stream=None, allow_failure=False):
+        rendered = list(command)
+        self.calls.append(rendered)
+        if rendered[:2] == ["docker", "inspect"]:
+            return CommandResult(exit_code=0, stdout=json.dumps({"Running": True}), stderr="")
+        return CommandResult(exit_code=0, stdout="", stderr="")
+
+
+@pytest.fixture(autouse=True)
+def _warm_pool_env(monkeypatch):
+    cache.clear()
+    monkeypatch.setenv(
+        "SANDBOX_WARM_POOL",
+        json.dumps([{"mode": "docker", "image": _IMAGE, "cpu": "1", "memory": "1g", "size": 2}]),
+    )
+    monkeypatch.delenv("SANDBOX_DOCKER_VOLUME_MODE", raising=False)
+    yield
+    cache.clear()
+
+
+def _create_session(user, **overrides) -> SandboxSession:
+    defaults = {
+        "mode": SandboxSession.Mode.DOCKER,
+        "image": _IMAGE,
+        "cpu": "1",
+        "memory": "1g",
+        "status": SandboxSession.Status.STARTING,
+        "workspace_path": "/workspace",
+    }
+    defaults.update(overrides)
+    return SandboxSession.objects.create(user=user, **defaults)
+
+
+def test_refill_starts_warm_containers_and_provision_claims_one():
+    runner = _DockerRunner()
+    orchestrator = SandboxOrchestrator(runner=runner)
+
+    summary = orchestrator.refill_warm_pool()
+
+    assert summary["started"] == 2
+    run_calls = [call for call in runner.calls if call[:3] == ["docker", "run", "-d"]]
+    assert len(run_calls) == 2
+    assert "astraforge.sandbox.pool=warm" in run_calls[0]
+    assert run_calls[0][-1] == _IMAGE
+    assert SandboxWarmContainer.objects.filter(status=SandboxWarmContainer.Status.READY).count() == 2
+    assert orchestrator.refill_warm_pool()["started"] == 0
+
+    user = get_user_model().objects.create_user(username="warm-hit", password="pass12345")
+    session = _create_session(user)
+    warm_ident = orchestrator._extract_ref(SandboxWarmContainer.objects.first().ref)
+    runner.calls.clear()
+
+    orchestrator.provision(session)
+
+    session.refresh_from_db()
+    assert session.ref == f"docker://sandbox-{session.id}"
+    assert session.status == SandboxSession.Status.READY
+    assert session.metadata["warm_pool"] == "hit"
+    assert ["docker", "rename", warm_ident, f"sandbox-{session.id}"] in runner.calls
+    assert not any(call[:3] == ["docker", "run", "-d"] for call in runner.calls)
+    [metrics] = pool_metrics()
+    assert metrics["ready"] == 1
+    assert (metrics["hits"], metrics["misses"]) == (1, 0)
+
+
+def test_provision_counts_miss_and_cold_starts_when_pool_is_empty():
+    runner = _DockerRunner()
+    orchestrator = SandboxOrchestrator(runner=runner)
+    user = get_user_model().objects.create_user(username="warm-miss", password="pass12345")
+    session = _create_session(user)
+
+    orchestrator.provision(session)
+
+    session.refresh_from_db()
+    assert session.metadata["warm_pool"] == "miss"
+    assert any(call[:3] == ["docker", "run", "-d"] for call in runner.calls)
+    [metrics] = pool_metrics()
+    assert (metrics["hits"], metrics["misses"], metrics["hit_rate"]) == (0, 1, 0.0)
+
+    other = _create_session(user, image="other/image:latest")
+    orchestrator.provision(other)
+    other.refresh_from_db()
+    assert "warm_pool" not in other.metadata
+
+
+def test_refill_retires_containers_of_removed_profiles(monkeypatch):
+    runner = _DockerRunner()
+    orchestrator = SandboxOrchestrator(runner=runner)
+    orchestrator.refill_warm_pool()
+    refs = set(SandboxWarmContainer.objects.values_list("ref", flat=True))
+    monkeypatch.setenv("SANDBOX_WARM_POOL", "[]")
+    runner.calls.clear()
+
+    summary = orchestrator.refill_warm_pool()
+
+    assert summary["retired"] == 2
+    assert not SandboxWarmContainer.objects.exists()
+    removed = {f"docker://{call[3]}" for call in runner.calls if call[:3] == ["docker", "rm", "-f"]}
+    assert removed == refs
+
+
+def test_warm_pool_metrics_endpoint_is_admin_only():
+    factory = APIRequestFactory()
+    view = SandboxSessionViewSet.as_view(
+        {"get": "warm_pool"}, **SandboxSessionViewSet.warm_pool.kwargs
+    )
+    user = get_user_model().objects.create_user(username="warm-user", password="pass12345")
+    admin = get_user_model().objects.create_user(
+        username="warm-admin", password="pass12345", is_staff=True
+    )
+
+    request = factory.get("/sandbox/sessions/warm-pool/")
+    force_authenticate(request, user=user)
+    assert view(request).status_code == status.HTTP_403_FORBIDDEN
+
+    request = factory.get("/sandbox/sessions/warm-pool/")
+    force_authenticate(request, user=admin)
+    response = view(request)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data["profiles"][0]["size"] == 2
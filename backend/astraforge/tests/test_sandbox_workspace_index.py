@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+import errno
+import importlib.util
+import json
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+INDEX_PATH = Path(__file__).resolve().parents[3] / "sandbox" / "workspace_index.py"
+
+pytestmark = [
+    pytest.mark.skipif(not INDEX_PATH.exists(), reason="sandbox index not checked out"),
+    pytest.mark.skipif(not sys.platform.startswith("linux"), reason="inotify is Linux-only"),
+]
+
+
+@pytest.fixture
+def workspace(tmp_path):
+    root = tmp_path / "ws"
+    for rel in ["a.py", "src/b.py", "src/c.txt", "node_modules/dep/d.py", "pkg/src/e.py"]:
+        target = root / rel
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_text("needle here\nnothing\n")
+    return root
+
+
+@pytest.fixture
+def query(workspace, tmp_path):
+    socket_path = str(tmp_path / "index.sock")
+    daemon = subprocess.Popen(
+        [sys.executable, str(INDEX_PATH), "--serve", "--trigrams", "--socket", socket_path, "--root", str(workspace)]
+    )
+
+    def _query(request: dict) -> dict:
+        completed = subprocess.run(
+            [sys.executable, str(INDEX_PATH), "--socket", socket_path, "query", json.dumps(request)],
+            capture_output=True,
+            text=True,
+            check=False,
+        )
+        assert completed.returncode == 0, completed.stderr
+        return json.loads(completed.stdout)
+
+    deadline = time.monotonic() + 10
+    while True:
+        try:
+            if _query({"op": "status"})["ready"]:
+                break
+        except AssertionError:
+            pass
+        assert time.monotonic() < deadline, "index did not become ready"
+        time.sleep(0.05)
+    yield _query
+    daemon.kill()
+    daemon.wait()
+
+
+def _rel(root: Path, items: list[dict]) -> list[str]:
+    return [item["path"][len(str(root)) + 1:] for item in items]
+
+
+def test_ls_and_glob_skip_ignored_trees(workspace, query):
+    listing = query({"op": "ls", "path": str(workspace)})["entries"]
+    assert _rel(workspace, listing) == ["a.py", "node_modules", "pkg", "src"]
+    assert listing[1]["is_dir"] is True
+
+    py = query({"op": "glob", "path": str(workspace), "pattern": "*.py"})
+    assert _rel(workspace, py["files"]) == ["a.py", "pkg/src/e.py", "src/b.py"]
+    nested = query({"op": "glob", "path": str(workspace), "pattern": "src/*.py", "max_results": 1})
+    assert _rel(workspace, nested["files"]) == ["pkg/src/e.py"]
+    assert nested["truncated"] is True
+
+
+def test_index_follows_filesystem_changes(workspace, query):
+    (workspace / "a.py").unlink()
+    (workspace / "pkg").rename(workspace / "lib")
+    (workspace / "new" / "deep").mkdir(parents=True)
+    (workspace / "new" / "deep" / "f.py").write_text("another needle\n")
+
+    py = query({"op": "glob", "path": str(workspace), "pattern": "*.py"})
+    assert _rel(workspace, py["files"]) == ["lib/src/e.py", "new/deep/f.py", "src/b.py"]
+
+    grep = query({"op": "grep", "path": str(workspace), "pattern": "needle", "glob": "*.py"})
+    assert [(m["line"], m["text"]) for m in grep["matches"]] == [
+        (1, "needle here"),
+        (1, "another needle"),
+        (1, "needle here"),
+    ]
+
+
+def test_queries_fall_back_when_the_index_cannot_answer(workspace, query, tmp_path):
+    assert query({"op": "ls", "path": "/etc"})["fallback"] is True
+    assert query({"op": "grep", "path": str(workspace), "pattern": "need.e"})["fallback"] is True
+
+    missing = subprocess.run(
+        [sys.executable, str(INDEX_PATH), "--socket", str(tmp_path / "none.sock"), "query", "{}"],
+        check=False,
+    )
+    assert missing.returncode == 3
+
+
+def test_second_daemon_leaves_the_running_one_in_place(workspace, query, tmp_path):
+    socket_path = tmp_path / "index.sock"
+    before = socket_path.stat().st_ino
+
+    duplicate = subprocess.run(
+        [sys.executable, str(INDEX_PATH), "--serve", "--socket", str(socket_path), "--root", str(workspace)],
+        timeout=10,
+        check=False,
+    )
+
+    assert duplicate.returncode == 0
+    assert socket_path.stat().st_ino == before
+    assert query({"op": "status"})["ready"] is True
+    assert (tmp_path / "index.sock.pid").read_text().strip().isdigit()
+
+
+def _load_index_module():
+    spec = importlib.util.spec_from_file_location("astraforge_workspace_index", INDEX_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_grep_skips_files_above_the_max_filesize(workspace, query):
+    (workspace / "big.py").write_text("needle at the top\n" + "x" * 4096 + "\n")
+
+    capped = query(
+        {"op": "grep", "path": str(workspace), "pattern": "needle", "max_filesize": "1K"}
+    )
+    default = query({"op": "grep", "path": str(workspace), "pattern": "needle"})
+
+    assert all(not m["path"].endswith("big.py") for m in capped["matches"])
+    assert any(m["path"].endswith("big.py") for m in default["matches"])
+
+
+def test_inotify_failure_disables_the_index(workspace, monkeypatch):
+    module = _load_index_module()
+
+    def _no_watches(self, path):
+        raise OSError(errno.ENOSPC, f"inotify_add_watch failed for {path}")
+
+    monkeypatch.setattr(module._Inotify, "add", _no_watches)
+    index = module.WorkspaceIndex(str(workspace), (), trigrams=True)
+
+    index.build()
+
+    assert index.handle({"op": "status"})["disabled"]
+    assert index.handle({"op": "ls", "path": str(workspace)}) == {
+        "fallback": True,
+        "reason": "disabled",
+    }
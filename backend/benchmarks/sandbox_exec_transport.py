@@ -0,0 +1,72 @@
+"""Compare commands/second for per-command exec vs. the persistent exec agent.
+
+Usage (from ``backend/``):
+
+    # Against a running Docker sandbox built from sandbox/Dockerfile
+    python benchmarks/sandbox_exec_transport.py --container sandbox-<session-id>
+
+    # Without Docker: runs the agent and a plain subprocess on this host
+    python benchmarks/sandbox_exec_transport.py --local
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from astraforge.infrastructure.workspaces.codex import CommandRunner  # noqa: E402
+from astraforge.sandbox.exec_agent import ExecAgentChannel  # noqa: E402
+
+AGENT_PATH = Path(__file__).resolve().parents[2] / "sandbox" / "exec_agent.py"
+
+
+def _bench(label: str, count: int, call) -> float:
+    call()  # warm-up
+    started = time.perf_counter()
+    for _ in range(count):
+        call()
+    elapsed = time.perf_counter() - started
+    rate = count / elapsed if elapsed else float("inf")
+    print(f"{label:<12} {count:>5} cmds  {elapsed:8.3f}s  {rate:10.1f} cmds/s")
+    return rate
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--container", help="Docker container name of a running sandbox")
+    target.add_argument("--local", action="store_true", help="benchmark on this host")
+    parser.add_argument("-n", "--count", type=int, default=200)
+    parser.add_argument("--command", default="echo ok")
+    args = parser.parse_args()
+
+    if args.local:
+        exec_prefix: list[str] = []
+        agent_argv = [sys.executable, str(AGENT_PATH), "--stdio"]
+    else:
+        exec_prefix = ["docker", "exec", args.container]
+        agent_argv = ["docker", "exec", "-i", args.container, "astraforge-exec-agent", "--attach"]
+
+    runner = CommandRunner(dry_run=False)
+    script = ["sh", "-c", f"cd /tmp && {args.command}"]
+    exec_rate = _bench("exec", args.count, lambda: runner.run(exec_prefix + script, allow_failure=True))
+
+    channel = ExecAgentChannel(agent_argv)
+    if not channel.start():
+        print("exec agent unavailable; is astraforge-exec-agent installed in the image?")
+        return 1
+    try:
+        agent_rate = _bench("exec-agent", args.count, lambda: channel.run(script))
+    finally:
+        channel.close()
+
+    print(f"speedup      {agent_rate / exec_rate:.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+"""Compare agent glob latency: the inline ``Path.rglob`` script vs. ``rg --files``.
+
+Usage (from ``backend/``):
+
+    # Synthetic monorepo (packages with sources, node_modules and a .git directory)
+    python benchmarks/sandbox_glob.py --packages 200
+
+    # A real checkout
+    python benchmarks/sandbox_glob.py --path /path/to/monorepo --pattern "*.ts"
+
+Both commands run through ``sh -c`` on this host, exactly as the sandbox would
+run them. The fast path is skipped when neither ``rg`` nor ``fd`` is installed.
+"""
+
+from __future__ import annotations
+
+import argparse
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from astraforge.sandbox import fs_commands  # noqa: E402
+
+
+def _build_monorepo(root: Path, packages: int) -> None:
+    for index in range(packages):
+        pkg = root / "packages" / f"pkg{index:04d}"
+        for sub in ("src", "src/lib", "tests"):
+            (pkg / sub).mkdir(parents=True, exist_ok=True)
+            for n in range(10):
+                (pkg / sub / f"mod{n}.py").write_text(f"VALUE = {n}\n")
+                (pkg / sub / f"mod{n}.ts").write_text(f"export const v = {n};\n")
+        deps = pkg / "node_modules" / "dep" / "dist"
+        deps.mkdir(parents=True, exist_ok=True)
+        for n in range(40):
+            (deps / f"chunk{n}.js").write_text("module.exports = {};\n")
+    git = root / ".git" / "objects"
+    git.mkdir(parents=True, exist_ok=True)
+    for n in range(2000):
+        (git / f"obj{n:05d}").write_bytes(b"\0" * 64)
+
+
+def _time(label: str, command: str, repeat: int) -> float:
+    best = float("inf")
+    matches = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        completed = subprocess.run(
+            ["sh", "-c", command], capture_output=True, text=True, check=False
+        )
+        best = min(best, time.perf_counter() - started)
+        matches = len(fs_commands.parse_glob_output(completed.stdout))
+    print(f"{label:<10} {best * 1000:9.1f} ms  {matches:>7} matches")
+    return best
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--path", help="existing tree to search instead of a synthetic one")
+    parser.add_argument("--packages", type=int, default=200)
+    parser.add_argument("--pattern", default="*.py")
+    parser.add_argument("--max-results", type=int, default=fs_commands.DEFAULT_GLOB_MAX_RESULTS)
+    parser.add_argument("-n", "--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    tmp = None
+    if args.path:
+        root = Path(args.path).resolve()
+    else:
+        tmp = tempfile.mkdtemp(prefix="astraforge-glob-")
+        root = Path(tmp)
+        _build_monorepo(root, args.packages)
+
+    try:
+        ignore = fs_commands.DEFAULT_GLOB_IGNORE
+        legacy = _time(
+            "rglob",
+            fs_commands.python_glob_command(str(root), args.pattern, (), 10**9),
+            args.repeat,
+        )
+        if not (shutil.which("rg") or shutil.which("fd") or shutil.which("fdfind")):
+            print("rg/fd not installed; skipping the fast path")
+            return 0
+        fast = _time(
+            "native",
+            fs_commands.glob_command(
+                str(root), args.pattern, ignore=ignore, max_results=args.max_results
+            ),
+            args.repeat,
+        )
+        print(f"speedup    {legacy / fast:9.1f}x")
+    finally:
+        if tmp:
+            shutil.rmtree(tmp, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,128 @@
+"""Compare snapshot archive size and wall time per compression codec.
+
+Usage (from ``backend/``):
+
+    # Synthetic workspace (source files, a node_modules-like tree and binary assets)
+    python benchmarks/snapshot_codecs.py --size-mb 200
+
+    # A real workspace, e.g. a copy of /workspace from a sandbox
+    python benchmarks/snapshot_codecs.py --path /path/to/workspace --level 3
+
+Codecs whose binary is missing on this host are skipped. Run it inside the
+sandbox image to measure what the orchestrator will actually see.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import shlex
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from astraforge.sandbox.snapshot_codecs import CODECS  # noqa: E402
+
+_WORDS = "def class import return self value result request session sandbox snapshot workspace".split()
+
+
+def _build_workspace(root: Path, size_mb: int, seed: int = 7) -> None:
+    rng = random.Random(seed)
+    budget = size_mb * 1024 * 1024
+    # ~45% source-like text, ~45% many small dependency files, ~10% binary assets.
+    written = 0
+    src = root / "src"
+    deps = root / "node_modules"
+    assets = root / "assets"
+    for directory in (src, deps, assets):
+        directory.mkdir(parents=True, exist_ok=True)
+    index = 0
+    while written < budget * 0.45:
+        text = "\n".join(" ".join(rng.choices(_WORDS, k=12)) for _ in range(400)) + "\n"
+        path = src / f"pkg{index % 50}" / f"module_{index}.py"
+        path.parent.mkdir(exist_ok=True)
+        path.write_text(text)
+        written += len(text)
+        index += 1
+    while written < budget * 0.9:
+        text = f"module.exports = {{ id: {index}, name: 'dep-{index % 300}' }};\n" * rng.randint(5, 60)
+        path = deps / f"dep-{index % 300}" / "lib" / f"file_{index}.js"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text)
+        written += len(text)
+        index += 1
+    while written < budget:
+        blob = os.urandom(min(4 * 1024 * 1024, budget - written))
+        (assets / f"asset_{index}.bin").write_bytes(blob)
+        written += len(blob)
+        index += 1
+
+
+def _tar_flags(name: str, level: int | None, threads: int, operation: str) -> str:
+    codec = CODECS[name]
+    flags = codec.compress_flags(level=level, threads=threads) if operation == "c" else codec.extract_flags()
+    if flags == ["-z"]:
+        return f"-{operation}zf"
+    return " ".join([*flags, f"-{operation}f"])
+
+
+def _time(command: str) -> float:
+    started = time.perf_counter()
+    subprocess.run(["sh", "-c", command], check=True)
+    return time.perf_counter() - started
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--path", help="workspace to archive (default: generate a synthetic one)")
+    parser.add_argument("--size-mb", type=int, default=100, help="synthetic workspace size")
+    parser.add_argument("--codecs", default="none,gzip,pigz,zstd")
+    parser.add_argument("--level", type=int, default=None, help="compression level passed to the codec")
+    parser.add_argument("--threads", type=int, default=0, help="0 lets zstd/pigz use every core")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="astraforge-codec-bench-") as scratch:
+        scratch_path = Path(scratch)
+        if args.path:
+            workspace = Path(args.path).resolve()
+        else:
+            workspace = scratch_path / "workspace"
+            _build_workspace(workspace, args.size_mb)
+        raw_bytes = sum(p.stat().st_size for p in workspace.rglob("*") if p.is_file())
+        print(f"workspace {workspace} ({raw_bytes / 1e6:.1f} MB)")
+        print(f"{'codec':<6} {'size MB':>9} {'ratio':>6} {'create s':>9} {'extract s':>10}")
+        for name in [item.strip() for item in args.codecs.split(",") if item.strip()]:
+            codec = CODECS.get(name)
+            if codec is None:
+                print(f"{name:<6} unknown codec")
+                continue
+            if codec.binary and shutil.which(codec.binary) is None:
+                print(f"{name:<6} skipped ({codec.binary} not installed)")
+                continue
+            archive = scratch_path / f"snapshot{codec.extension}"
+            target = scratch_path / f"restore-{name}"
+            target.mkdir()
+            create = _time(
+                f"tar {_tar_flags(name, args.level, args.threads, 'c')} {shlex.quote(str(archive))} "
+                f"-C {shlex.quote(str(workspace))} ."
+            )
+            extract = _time(
+                f"tar {_tar_flags(name, None, 0, 'x')} {shlex.quote(str(archive))} -C {shlex.quote(str(target))}"
+            )
+            size = archive.stat().st_size
+            print(
+                f"{name:<6} {size / 1e6:9.1f} {raw_bytes / max(size, 1):6.2f} {create:9.2f} {extract:10.2f}"
+            )
+            archive.unlink()
+            shutil.rmtree(target)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
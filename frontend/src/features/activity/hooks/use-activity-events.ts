@@ -10,16 +10,13 @@ export const activityEventsQueryKey = (tenantId?: string) =>
 export function useActivityEvents(tenantId?: string, pageSize = DEFAULT_PAGE_SIZE) {
   return useInfiniteQuery({
     queryKey: activityEventsQueryKey(tenantId),
-    initialPageParam: 1,
+    initialPageParam: null as string | null,
     queryFn: ({ pageParam }) =>
       fetchActivityEvents({
         tenantId,
-        page:
-          typeof pageParam === "number" && !Number.isNaN(pageParam)
-            ? pageParam
-            : 1,
+        cursor: pageParam ?? undefined,
         pageSize
       }),
-    getNextPageParam: (lastPage) => lastPage.next_page ?? undefined
+    getNextPageParam: (lastPage) => lastPage.next_cursor ?? undefined
   });
 }
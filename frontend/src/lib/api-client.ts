@@ -385,6 +385,7 @@ export interface ActivityEventsPage {
   page_size: number;
   next_page: number | null;
   previous_page: number | null;
+  next_cursor: string | null;
   results: ActivityEventDto[];
   summary: ActivitySummary;
 }
@@ -393,11 +394,16 @@ export async function fetchActivityEvents(params: {
   tenantId?: string;
   page?: number;
   pageSize?: number;
+  cursor?: string;
 }) {
   const queryParams: Record<string, string | number> = {
-    page: params.page ?? 1,
     page_size: params.pageSize ?? 25
   };
+  if (params.cursor) {
+    queryParams.cursor = params.cursor;
+  } else {
+    queryParams.page = params.page ?? 1;
+  }
   if (params.tenantId) {
     queryParams.tenant_id = params.tenantId;
   }
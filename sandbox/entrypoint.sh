@@ -3,5 +3,16 @@ set -e
 
 echo "Sandbox started..."
 
+# Start the exec agent so the orchestrator can multiplex commands over a
+# single attached stream instead of forking one exec per command.
+if [ "${ASTRAFORGE_EXEC_AGENT:-1}" != "0" ] && command -v astraforge-exec-agent >/dev/null 2>&1; then
+    astraforge-exec-agent --serve &
+fi
+
+# Optional workspace file index answering agent ls/glob/grep without rescanning.
+if [ "${ASTRAFORGE_WORKSPACE_INDEX:-0}" = "1" ] && command -v astraforge-workspace-index >/dev/null 2>&1; then
+    astraforge-workspace-index --serve --root "${WORKSPACE_DIR:-/workspace}" &
+fi
+
 # Keep container alive
-tail -f /dev/null
\ No newline at end of file
+tail -f /dev/null
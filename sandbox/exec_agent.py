@@ -0,0 +1,375 @@
+#!/usr/bin/env python3
+"""Long-lived exec agent for AstraForge sandboxes.
+
+The orchestrator keeps a single ``docker exec -i``/``kubectl exec -i`` process
+attached to this agent and multiplexes every command over it instead of
+forking a fresh exec per tool call.
+
+Wire format (both directions): ``>BII`` header (frame type, request id,
+payload length) followed by the payload. Control payloads are JSON; stdin and
+stdout/stderr payloads are raw bytes.
+
+Flow control is per request and credit based: an ``EXEC`` spec carrying
+``window`` lets the agent send that many output bytes, and ``CREDIT`` frames
+(a ``>I`` byte count) from the host grant more. In the other direction the
+agent returns a ``CREDIT`` frame for every stdin chunk the command has been
+handed, so the host never has more than ``STDIN_WINDOW`` bytes in flight.
+
+Modes:
+
+- ``--serve``: listen on a Unix socket (started by ``entrypoint.sh``).
+- ``--attach``: bridge stdio to the socket when it is owned by the current
+  user, otherwise serve the protocol directly over stdio.
+- ``--stdio``: always serve over stdio (no daemon required).
+
+Only the Python standard library is used so the agent runs on any image with
+``python3``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import queue
+import signal
+import socket
+import struct
+import subprocess
+import sys
+import threading
+
+PROTOCOL_VERSION = 1
+HEADER = struct.Struct(">BII")
+CHUNK_SIZE = 64 * 1024
+CREDIT_FORMAT = struct.Struct(">I")
+STDIN_WINDOW = 1024 * 1024
+DEFAULT_SOCKET = os.getenv("ASTRAFORGE_EXEC_AGENT_SOCKET", "/tmp/astraforge-exec.sock")
+
+HELLO = 1
+EXEC = 2
+STDIN = 3
+STDIN_EOF = 4
+STDOUT = 5
+STDERR = 6
+EXIT = 7
+CANCEL = 8
+CREDIT = 9
+
+
+def _read_exact(stream, size: int) -> bytes | None:
+    data = bytearray()
+    while len(data) < size:
+        chunk = stream.read(size - len(data))
+        if not chunk:
+            return None
+        data.extend(chunk)
+    return bytes(data)
+
+
+def read_frame(stream):
+    header = _read_exact(stream, HEADER.size)
+    if header is None:
+        return None
+    kind, request_id, length = HEADER.unpack(header)
+    payload = _read_exact(stream, length) if length else b""
+    if payload is None:
+        return None
+    return kind, request_id, payload
+
+
+class _Writer:
+    def __init__(self, stream) -> None:
+        self._stream = stream
+        self._lock = threading.Lock()
+
+    def send(self, kind: int, request_id: int, payload: bytes = b"") -> None:
+        with self._lock:
+            self._stream.write(HEADER.pack(kind, request_id, len(payload)))
+            if payload:
+                self._stream.write(payload)
+            self._stream.flush()
+
+    def send_json(self, kind: int, request_id: int, body: dict) -> None:
+        self.send(kind, request_id, json.dumps(body).encode("utf-8"))
+
+
+class _Request:
+    """One running command plus the queue feeding its stdin."""
+
+    def __init__(self, request_id: int, spec: dict, writer: _Writer, on_done) -> None:
+        self.request_id = request_id
+        self.spec = spec
+        self.writer = writer
+        self.on_done = on_done
+        # Bounded by STDIN_WINDOW when the host waits for stdin credit.
+        self.stdin_queue: queue.Queue[bytes | None] = queue.Queue()
+        self.process: subprocess.Popen | None = None
+        try:
+            self.window = max(0, int(spec.get("window") or 0))
+        except (TypeError, ValueError):
+            self.window = 0
+        self._credit = self.window
+        self._credit_cond = threading.Condition()
+        self._cancelled = False
+
+    def start(self) -> None:
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def grant(self, size: int) -> None:
+        with self._credit_cond:
+            self._credit += size
+            self._credit_cond.notify_all()
+
+    def cancel(self) -> None:
+        with self._credit_cond:
+            self._cancelled = True
+            self._credit_cond.notify_all()
+        self.stdin_queue.put(None)
+        process = self.process
+        if process and process.poll() is None:
+            try:
+                os.killpg(process.pid, signal.SIGKILL)
+            except OSError:
+                process.kill()
+
+    def _pump_stdin(self) -> None:
+        assert self.process and self.process.stdin
+        stdin = self.process.stdin
+        try:
+            while True:
+                chunk = self.stdin_queue.get()
+                if chunk is None:
+                    break
+                stdin.write(chunk)
+                if self.window:
+                    self.writer.send(CREDIT, self.request_id, CREDIT_FORMAT.pack(len(chunk)))
+            stdin.flush()
+        except (BrokenPipeError, OSError):
+            pass
+        finally:
+            try:
+                stdin.close()
+            except OSError:
+                pass
+
+    def _await_credit(self) -> int:
+        if not self.window:
+            return CHUNK_SIZE
+        with self._credit_cond:
+            while self._credit <= 0 and not self._cancelled:
+                self._credit_cond.wait()
+            if self._cancelled:
+                return 0
+            return min(CHUNK_SIZE, self._credit)
+
+    def _pump_output(self, stream, kind: int) -> None:
+        try:
+            self._copy_output(stream, kind)
+        except OSError:
+            pass
+
+    def _copy_output(self, stream, kind: int) -> None:
+        while True:
+            size = self._await_credit()
+            if not size:
+                break
+            chunk = stream.read1(size) if hasattr(stream, "read1") else stream.read(size)
+            if not chunk:
+                break
+            if self.window:
+                with self._credit_cond:
+                    self._credit -= len(chunk)
+            self.writer.send(kind, self.request_id, chunk)
+
+    def _run(self) -> None:
+        spec = self.spec
+        merge_stderr = bool(spec.get("merge_stderr", True))
+        env = None
+        if spec.get("env"):
+            env = dict(os.environ)
+            env.update({str(k): str(v) for k, v in spec["env"].items()})
+        try:
+            self.process = subprocess.Popen(
+                list(spec["argv"]),
+                cwd=spec.get("cwd") or None,
+                env=env,
+                stdin=subprocess.PIPE if spec.get("stdin") else subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT if merge_stderr else subprocess.PIPE,
+                start_new_session=True,
+            )
+        except (OSError, ValueError, KeyError) as exc:
+            self.writer.send_json(EXIT, self.request_id, {"exit_code": 127, "error": str(exc)})
+            self.on_done(self.request_id)
+            return
+
+        if spec.get("stdin"):
+            # Abandoned once the command exits: it may be blocked on input nobody reads.
+            threading.Thread(target=self._pump_stdin, daemon=True).start()
+        stderr_pump = None
+        if not merge_stderr:
+            stderr_pump = threading.Thread(
+                target=self._pump_output, args=(self.process.stderr, STDERR), daemon=True
+            )
+            stderr_pump.start()
+        self._pump_output(self.process.stdout, STDOUT)
+        exit_code = self.process.wait()
+        if stderr_pump is not None:
+            # EXIT must follow every output frame, or the host drops the stderr tail.
+            stderr_pump.join()
+        self.writer.send_json(EXIT, self.request_id, {"exit_code": exit_code})
+        self.on_done(self.request_id)
+
+
+def serve(rfile, wfile) -> None:
+    """Serve the framed protocol until the peer closes the stream."""
+    writer = _Writer(wfile)
+    requests: dict[int, _Request] = {}
+    lock = threading.Lock()
+
+    def _done(request_id: int) -> None:
+        with lock:
+            requests.pop(request_id, None)
+
+    try:
+        while True:
+            frame = read_frame(rfile)
+            if frame is None:
+                break
+            kind, request_id, payload = frame
+            if kind == HELLO:
+                writer.send_json(
+                    HELLO,
+                    0,
+                    {
+                        "version": PROTOCOL_VERSION,
+                        "pid": os.getpid(),
+                        "flow_control": True,
+                        "stdin_window": STDIN_WINDOW,
+                    },
+                )
+            elif kind == EXEC:
+                try:
+                    spec = json.loads(payload.decode("utf-8"))
+                except ValueError as exc:
+                    writer.send_json(EXIT, request_id, {"exit_code": 127, "error": str(exc)})
+                    continue
+                request = _Request(request_id, spec, writer, _done)
+                with lock:
+                    requests[request_id] = request
+                request.start()
+            elif kind in (STDIN, STDIN_EOF, CANCEL, CREDIT):
+                with lock:
+                    request = requests.get(request_id)
+                if request is None:
+                    continue
+                if kind == STDIN:
+                    request.stdin_queue.put(payload)
+                elif kind == STDIN_EOF:
+                    request.stdin_queue.put(None)
+                elif kind == CREDIT:
+                    if len(payload) == CREDIT_FORMAT.size:
+                        request.grant(CREDIT_FORMAT.unpack(payload)[0])
+                else:
+                    request.cancel()
+    finally:
+        with lock:
+            pending = list(requests.values())
+        for request in pending:
+            request.stdin_queue.put(None)
+            request.cancel()
+
+
+def _serve_socket(path: str) -> None:
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(path)
+    os.chmod(path, 0o600)
+    server.listen(16)
+
+    def _handle(conn: socket.socket) -> None:
+        with conn:
+            rfile = conn.makefile("rb")
+            wfile = conn.makefile("wb")
+            try:
+                serve(rfile, wfile)
+            except OSError:
+                pass
+
+    while True:
+        conn, _ = server.accept()
+        threading.Thread(target=_handle, args=(conn,), daemon=True).start()
+
+
+def _attach(path: str) -> None:
+    stdin = sys.stdin.buffer
+    stdout = sys.stdout.buffer
+    try:
+        owned = os.stat(path).st_uid == os.getuid()
+    except OSError:
+        owned = False
+    conn = None
+    if owned:
+        try:
+            conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            conn.connect(path)
+        except OSError:
+            conn = None
+    if conn is None:
+        # No daemon (or one running as another user): serve in-process.
+        serve(stdin, stdout)
+        return
+
+    def _upstream() -> None:
+        try:
+            while True:
+                chunk = stdin.read1(CHUNK_SIZE)
+                if not chunk:
+                    break
+                conn.sendall(chunk)
+        except OSError:
+            pass
+        finally:
+            try:
+                conn.shutdown(socket.SHUT_WR)
+            except OSError:
+                pass
+
+    threading.Thread(target=_upstream, daemon=True).start()
+    try:
+        while True:
+            chunk = conn.recv(CHUNK_SIZE)
+            if not chunk:
+                break
+            stdout.write(chunk)
+            stdout.flush()
+    except OSError:
+        pass
+    finally:
+        conn.close()
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--serve", action="store_true", help="listen on a Unix socket")
+    mode.add_argument("--attach", action="store_true", help="bridge stdio to the daemon")
+    mode.add_argument("--stdio", action="store_true", help="serve over stdio")
+    parser.add_argument("--socket", default=DEFAULT_SOCKET)
+    args = parser.parse_args(argv)
+
+    if args.serve:
+        _serve_socket(args.socket)
+    elif args.attach:
+        _attach(args.socket)
+    else:
+        serve(sys.stdin.buffer, sys.stdout.buffer)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,588 @@
+#!/usr/bin/env python3
+"""In-sandbox workspace file index for AstraForge agent filesystem tools.
+
+The daemon walks the workspace once, keeps path/size/mtime for every entry in
+memory and follows changes with inotify, so ``ls``/``glob`` (and, with
+``--trigrams``, literal ``grep``) are answered without rescanning the tree.
+Pending inotify events are applied before every query, so a query always
+reflects writes that completed before it was sent.
+
+Wire format: one JSON request per line on a Unix socket, one JSON response per
+line back. A response of ``{"fallback": true}`` means the index cannot answer
+(still building, disabled because inotify is unavailable, path outside the
+root, pattern not indexable) and the caller should run its regular command
+instead.
+
+Modes:
+
+- ``--serve``: build the index and listen on the socket (started by
+  ``entrypoint.sh`` when ``ASTRAFORGE_WORKSPACE_INDEX=1``).
+- ``query JSON``: send one request and print the response. Exits with 3 when
+  no daemon is listening; ``--spawn`` then starts one for the next call.
+
+Only the Python standard library is used so the index runs on any image with
+``python3``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import ctypes
+import ctypes.util
+import errno
+import fcntl
+import fnmatch
+import json
+import os
+import select
+import socket
+import stat
+import struct
+import subprocess
+import sys
+import threading
+import time
+
+DEFAULT_SOCKET = os.getenv("ASTRAFORGE_WORKSPACE_INDEX_SOCKET", "/tmp/astraforge-index.sock")
+DEFAULT_ROOT = os.getenv("ASTRAFORGE_WORKSPACE_INDEX_ROOT", "/workspace")
+DEFAULT_IGNORE = ".git,node_modules,__pycache__,.venv"
+# Files above this size are never trigram-indexed and are always grep candidates.
+TRIGRAM_MAX_BYTES = 1024 * 1024
+# Like rg's --max-filesize: grep skips larger files; requests may override it.
+DEFAULT_GREP_MAX_FILESIZE = os.getenv("ASTRAFORGE_WORKSPACE_INDEX_GREP_MAX_FILESIZE", "10M")
+_SIZE_SUFFIXES = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+UNAVAILABLE_EXIT = 3
+
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_DONT_FOLLOW = 0x02000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = (
+    IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE
+    | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR | IN_DONT_FOLLOW
+)
+EVENT = struct.Struct("iIII")
+_REGEX_META = set(".^$*+?{}[]\\|()")
+
+
+class _Inotify:
+    def __init__(self) -> None:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.paths: dict[int, str] = {}
+
+    def add(self, path: str) -> None:
+        wd = self._add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            if err in (errno.ENOENT, errno.ENOTDIR, errno.EACCES):
+                return
+            raise OSError(err, f"inotify_add_watch failed for {path}")
+        self.paths[wd] = path
+
+    def read(self) -> list[tuple[str | None, str, int]]:
+        events: list[tuple[str | None, str, int]] = []
+        while True:
+            try:
+                data = os.read(self.fd, 256 * 1024)
+            except BlockingIOError:
+                return events
+            offset = 0
+            while offset + EVENT.size <= len(data):
+                wd, mask, _cookie, length = EVENT.unpack_from(data, offset)
+                raw = data[offset + EVENT.size: offset + EVENT.size + length]
+                offset += EVENT.size + length
+                name = os.fsdecode(raw.rstrip(b"\0"))
+                directory = self.paths.get(wd)
+                if mask & IN_IGNORED:
+                    self.paths.pop(wd, None)
+                events.append((directory, name, mask))
+
+
+def _glob_parts_match(pattern: list[str], parts: list[str]) -> bool:
+    if not pattern:
+        return not parts
+    head, rest = pattern[0], pattern[1:]
+    if head == "**":
+        return any(_glob_parts_match(rest, parts[i:]) for i in range(len(parts) + 1))
+    return bool(parts) and fnmatch.fnmatchcase(parts[0], head) and _glob_parts_match(rest, parts[1:])
+
+
+def glob_matches(pattern: str, relative: str) -> bool:
+    """``Path.rglob`` semantics: ``pattern`` may match at any depth below the base."""
+    parts = [part for part in pattern.split("/") if part]
+    if not parts or parts[0] != "**":
+        parts = ["**", *parts]
+    return _glob_parts_match(parts, relative.split("/"))
+
+
+def _trigrams(data: bytes) -> set[bytes]:
+    return {data[i:i + 3] for i in range(len(data) - 2)}
+
+
+def _iso(mtime: float) -> str:
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(mtime))
+
+
+def parse_size(value: str | int | None) -> int | None:
+    """Parse an rg-style size (``10M``, ``512K``, ``2048``); None means unlimited."""
+    text = str(value or "").strip().upper()
+    if not text:
+        return None
+    multiplier = _SIZE_SUFFIXES.get(text[-1], 1)
+    digits = text[:-1] if text[-1] in _SIZE_SUFFIXES else text
+    try:
+        return int(digits) * multiplier
+    except ValueError:
+        return None
+
+
+class WorkspaceIndex:
+    def __init__(self, root: str, ignore: tuple[str, ...], trigrams: bool = False) -> None:
+        self.root = os.path.realpath(root)
+        self.ignore = set(ignore)
+        self.trigrams_enabled = trigrams
+        self.lock = threading.RLock()
+        self.ready = False
+        # Set when inotify cannot watch the tree; queries then always fall back.
+        self.disabled: str | None = None
+        self.built_at = 0.0
+        self._inotify: _Inotify | None = None
+        # path -> (is_dir, size, mtime); ignored directories are listed but not descended.
+        self.entries: dict[str, tuple[bool, int, float]] = {}
+        self.children: dict[str, set[str]] = {}
+        self._file_grams: dict[str, set[bytes] | None] = {}
+        self._postings: dict[bytes, set[str]] = {}
+
+    # building -------------------------------------------------------------
+
+    def build(self) -> None:
+        try:
+            self._build()
+        except OSError as exc:
+            # e.g. ENOSPC once fs.inotify.max_user_watches is used up: an unwatched
+            # index would go stale, so stop answering and let callers run rg/find.
+            with self.lock:
+                self.ready = False
+                self.disabled = str(exc)
+                self._close_inotify()
+                self.entries.clear()
+                self.children.clear()
+                self._file_grams.clear()
+                self._postings.clear()
+
+    def _close_inotify(self) -> None:
+        if self._inotify is not None:
+            os.close(self._inotify.fd)
+            self._inotify = None
+
+    def _build(self) -> None:
+        inotify = _Inotify()
+        with self.lock:
+            self.ready = False
+            self.disabled = None
+            self._close_inotify()
+            self._inotify = inotify
+            self.entries.clear()
+            self.children.clear()
+            self._file_grams.clear()
+            self._postings.clear()
+            if os.path.isdir(self.root):
+                self._add_dir(self.root)
+            self.ready = True
+            self.built_at = time.time()
+
+    def _add_dir(self, top: str) -> None:
+        stack = [top]
+        while stack:
+            directory = stack.pop()
+            try:
+                st = os.lstat(directory)
+            except OSError:
+                continue
+            self.entries[directory] = (True, st.st_size, st.st_mtime)
+            names = self.children.setdefault(directory, set())
+            if self._inotify is not None:
+                self._inotify.add(directory)
+            try:
+                scan = list(os.scandir(directory))
+            except OSError:
+                continue
+            for item in scan:
+                names.add(item.name)
+                try:
+                    st = item.stat(follow_symlinks=False)
+                except OSError:
+                    continue
+                if stat.S_ISDIR(st.st_mode):
+                    if item.name in self.ignore:
+                        self.entries[item.path] = (True, st.st_size, st.st_mtime)
+                    else:
+                        stack.append(item.path)
+                else:
+                    self._set_file(item.path, st)
+
+    def _set_file(self, path: str, st: os.stat_result) -> None:
+        previous = self.entries.get(path)
+        self.entries[path] = (False, st.st_size, st.st_mtime)
+        if not self.trigrams_enabled:
+            return
+        if previous and previous[1:] == (st.st_size, st.st_mtime) and path in self._file_grams:
+            return
+        self._drop_grams(path)
+        grams: set[bytes] | None = None
+        if stat.S_ISREG(st.st_mode) and st.st_size <= TRIGRAM_MAX_BYTES:
+            try:
+                with open(path, "rb") as fh:
+                    data = fh.read(TRIGRAM_MAX_BYTES + 1)
+                grams = set() if b"\0" in data[:8192] else _trigrams(data)
+            except OSError:
+                grams = None
+        self._file_grams[path] = grams
+        for gram in grams or ():
+            self._postings.setdefault(gram, set()).add(path)
+
+    def _drop_grams(self, path: str) -> None:
+        for gram in self._file_grams.pop(path, None) or ():
+            holders = self._postings.get(gram)
+            if holders is not None:
+                holders.discard(path)
+                if not holders:
+                    del self._postings[gram]
+
+    def _remove(self, path: str) -> None:
+        self.entries.pop(path, None)
+        self._drop_grams(path)
+        for name in self.children.pop(path, set()):
+            self._remove(os.path.join(path, name))
+        parent = self.children.get(os.path.dirname(path))
+        if parent is not None:
+            parent.discard(os.path.basename(path))
+
+    def _refresh(self, path: str) -> None:
+        try:
+            st = os.lstat(path)
+        except OSError:
+            self._remove(path)
+            return
+        parent = self.children.get(os.path.dirname(path))
+        if parent is not None:
+            parent.add(os.path.basename(path))
+        if stat.S_ISDIR(st.st_mode):
+            if os.path.basename(path) in self.ignore:
+                self.entries[path] = (True, st.st_size, st.st_mtime)
+            elif path in self.children:
+                self.entries[path] = (True, st.st_size, st.st_mtime)
+            else:
+                self._add_dir(path)
+        else:
+            if path in self.children:
+                self._remove(path)
+            self._set_file(path, st)
+
+    def drain(self) -> None:
+        """Apply queued inotify events; a queue overflow triggers a full rebuild."""
+        with self.lock:
+            if self._inotify is None:
+                return
+            overflow = False
+            for directory, name, mask in self._inotify.read():
+                if mask & IN_Q_OVERFLOW:
+                    overflow = True
+                    continue
+                if directory is None:
+                    continue
+                path = os.path.join(directory, name) if name else directory
+                if mask & (IN_DELETE | IN_MOVED_FROM):
+                    self._remove(path)
+                elif mask & (IN_DELETE_SELF | IN_MOVE_SELF) and not name:
+                    if path == self.root:
+                        overflow = True
+                elif mask & (IN_CREATE | IN_MOVED_TO | IN_MODIFY | IN_CLOSE_WRITE | IN_ATTRIB):
+                    self._refresh(path)
+            if overflow:
+                self.build()
+
+    def watch(self) -> None:
+        while True:
+            inotify = self._inotify
+            if inotify is None:
+                time.sleep(0.5)
+                continue
+            try:
+                readable, _, _ = select.select([inotify.fd], [], [], 1.0)
+            except (OSError, ValueError):
+                time.sleep(0.5)
+                continue
+            if readable:
+                self.drain()
+
+    # queries --------------------------------------------------------------
+
+    def _inside(self, path: str) -> bool:
+        return path == self.root or path.startswith(self.root.rstrip("/") + "/")
+
+    def _entry(self, path: str) -> dict:
+        is_dir, size, mtime = self.entries[path]
+        return {"path": path, "is_dir": is_dir, "size": size, "modified_at": _iso(mtime)}
+
+    def _files_under(self, base: str):
+        prefix = base.rstrip("/") + "/"
+        for path, (is_dir, _size, _mtime) in self.entries.items():
+            if not is_dir and path.startswith(prefix):
+                yield path
+
+    def handle(self, request: dict) -> dict:
+        op = request.get("op")
+        if op == "status":
+            return {
+                "ready": self.ready,
+                "disabled": self.disabled,
+                "root": self.root,
+                "entries": len(self.entries),
+                "trigrams": self.trigrams_enabled,
+                "built_at": self.built_at,
+            }
+        if op == "rebuild":
+            self.build()
+            return {"ready": self.ready, "entries": len(self.entries)}
+        if self.disabled:
+            return {"fallback": True, "reason": "disabled"}
+        if not self.ready:
+            return {"fallback": True, "reason": "building"}
+        self.drain()
+        path = os.path.normpath(str(request.get("path") or self.root))
+        if not self._inside(path):
+            return {"fallback": True, "reason": "outside root"}
+        with self.lock:
+            if op == "ls":
+                names = sorted(self.children.get(path, ()))
+                entries = [
+                    self._entry(os.path.join(path, name))
+                    for name in names
+                    if os.path.join(path, name) in self.entries
+                ]
+                return {"entries": entries}
+            if op == "glob":
+                return self._glob(path, str(request.get("pattern") or "*"), int(request.get("max_results") or 5000))
+            if op == "grep":
+                return self._grep(path, request)
+        return {"error": f"unknown op {op!r}"}
+
+    def _glob(self, base: str, pattern: str, max_results: int) -> dict:
+        prefix = base.rstrip("/") + "/"
+        if "/" in pattern:
+            matched = [p for p in self._files_under(base) if glob_matches(pattern, p[len(prefix):])]
+        else:
+            # Single-component patterns only ever look at the file name.
+            matched = [
+                p for p in self._files_under(base)
+                if fnmatch.fnmatchcase(p[p.rfind("/") + 1:], pattern)
+            ]
+        matched.sort()
+        files = [self._entry(path) for path in matched[:max_results]]
+        return {"files": files, "truncated": len(matched) > max_results}
+
+    def _grep(self, base: str, request: dict) -> dict:
+        pattern = str(request.get("pattern") or "")
+        if not self.trigrams_enabled or len(pattern) < 3 or _REGEX_META & set(pattern):
+            return {"fallback": True, "reason": "not indexable"}
+        glob = request.get("glob")
+        max_matches = int(request.get("max_matches") or 1000)
+        max_bytes = int(request.get("max_bytes") or 512 * 1024)
+        max_filesize = parse_size(request.get("max_filesize", DEFAULT_GREP_MAX_FILESIZE))
+        needle = pattern.encode("utf-8")
+        candidates = None
+        for gram in _trigrams(needle):
+            holders = self._postings.get(gram, set())
+            candidates = set(holders) if candidates is None else candidates & holders
+        # Unindexed files (too large, unreadable) are always searched.
+        unindexed = {path for path, grams in self._file_grams.items() if grams is None}
+        prefix = base.rstrip("/") + "/"
+        matches: list[dict] = []
+        used = 0
+        for path in sorted((candidates or set()) | unindexed):
+            if not path.startswith(prefix):
+                continue
+            relative = path[len(prefix):]
+            if glob and not (
+                fnmatch.fnmatchcase(os.path.basename(path), glob) or glob_matches(glob, relative)
+            ):
+                continue
+            entry = self.entries.get(path)
+            if max_filesize is not None and entry is not None and entry[1] > max_filesize:
+                continue
+            try:
+                with open(path, "rb") as fh:
+                    data = fh.read() if max_filesize is None else fh.read(max_filesize + 1)
+            except OSError:
+                continue
+            if max_filesize is not None and len(data) > max_filesize:
+                continue
+            if needle not in data or b"\0" in data[:8192]:
+                continue
+            for number, line in enumerate(data.split(b"\n"), start=1):
+                if needle not in line:
+                    continue
+                text = line.decode("utf-8", errors="replace").rstrip("\r")
+                used += len(path) + len(text) + 16
+                if len(matches) >= max_matches or used > max_bytes:
+                    return {"matches": matches, "truncated": True}
+                matches.append({"path": path, "line": number, "text": text})
+        return {"matches": matches, "truncated": False}
+
+
+def _lock_path(socket_path: str) -> str:
+    return f"{socket_path}.pid"
+
+
+def _acquire_daemon_lock(socket_path: str) -> int | None:
+    """Hold an exclusive lock on the daemon's pidfile; None when another daemon owns it."""
+    fd = os.open(_lock_path(socket_path), os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        os.close(fd)
+        return None
+    os.ftruncate(fd, 0)
+    os.write(fd, f"{os.getpid()}\n".encode("ascii"))
+    return fd
+
+
+def _daemon_running(socket_path: str) -> bool:
+    """True while a daemon holds (or is starting up with) the pidfile lock."""
+    fd = _acquire_daemon_lock(socket_path)
+    if fd is None:
+        return True
+    os.close(fd)
+    return False
+
+
+def _socket_is_live(path: str) -> bool:
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except OSError:
+        return False
+    finally:
+        probe.close()
+    return True
+
+
+def _serve(index: WorkspaceIndex, path: str) -> None:
+    # Only a stale socket is replaced; unlinking a live one would orphan its daemon.
+    if _socket_is_live(path):
+        return
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(path)
+    os.chmod(path, 0o600)
+    server.listen(16)
+
+    def _handle(conn: socket.socket) -> None:
+        with conn:
+            rfile = conn.makefile("rb")
+            for line in rfile:
+                try:
+                    request = json.loads(line.decode("utf-8"))
+                    response = index.handle(request if isinstance(request, dict) else {})
+                except Exception as exc:  # noqa: BLE001 - reported to the caller
+                    response = {"error": str(exc)}
+                try:
+                    conn.sendall(json.dumps(response).encode("utf-8") + b"\n")
+                except OSError:
+                    return
+
+    while True:
+        conn, _ = server.accept()
+        threading.Thread(target=_handle, args=(conn,), daemon=True).start()
+
+
+def _spawn(args: argparse.Namespace) -> None:
+    # Concurrent first queries, or queries during the initial build, find the
+    # pidfile locked and leave startup to the daemon already on its way.
+    if _daemon_running(args.socket):
+        return
+    command = [sys.executable, os.path.abspath(__file__), "--serve", "--socket", args.socket, "--root", args.root]
+    if args.trigrams:
+        command.append("--trigrams")
+    subprocess.Popen(  # noqa: S603 - fixed argv
+        command,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+
+
+def _query(args: argparse.Namespace) -> int:
+    conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        conn.connect(args.socket)
+    except OSError:
+        conn.close()
+        if args.spawn:
+            _spawn(args)
+        return UNAVAILABLE_EXIT
+    with conn:
+        conn.sendall(args.request.encode("utf-8").rstrip(b"\n") + b"\n")
+        response = conn.makefile("rb").readline()
+    if not response:
+        return UNAVAILABLE_EXIT
+    sys.stdout.write(response.decode("utf-8"))
+    return 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--serve", action="store_true", help="build the index and listen")
+    parser.add_argument("--socket", default=DEFAULT_SOCKET)
+    parser.add_argument("--root", default=DEFAULT_ROOT)
+    parser.add_argument("--ignore", default=os.getenv("ASTRAFORGE_WORKSPACE_INDEX_IGNORE", DEFAULT_IGNORE))
+    parser.add_argument(
+        "--trigrams",
+        action="store_true",
+        default=os.getenv("ASTRAFORGE_WORKSPACE_INDEX_TRIGRAMS", "0") == "1",
+        help="also index file contents for literal grep",
+    )
+    parser.add_argument("--spawn", action="store_true", help="start the daemon if it is not running")
+    parser.add_argument("command", nargs="?", choices=["query"])
+    parser.add_argument("request", nargs="?", default='{"op": "status"}')
+    args = parser.parse_args(argv)
+
+    if args.command == "query":
+        return _query(args)
+    if not args.serve:
+        parser.error("use --serve or query")
+
+    lock_fd = _acquire_daemon_lock(args.socket)
+    if lock_fd is None:
+        return 0
+    ignore = tuple(name.strip() for name in args.ignore.split(",") if name.strip())
+    index = WorkspaceIndex(args.root, ignore, trigrams=args.trigrams)
+    threading.Thread(target=index.build, daemon=True).start()
+    threading.Thread(target=index.watch, daemon=True).start()
+    _serve(index, args.socket)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())